@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Operations Analysis Report - the VBA Analysis Macros in Python
+
+Runs the checks of the VBA macros CheckWaveStatus, VerifyTraining,
+AnalyzeStockIssues, CheckQualityRate, CheckInventoryMismatches,
+CheckSLACompliance and ViewSystemErrors over whole workbooks, without Excel,
+and writes one consolidated report for any number of sites.
+
+Each sheet is read once, for the columns all the checks need (see
+kpi_reader.py), and every check works on whole columns with NumPy rather
+than cell by cell. Columns are found by their header instead of the
+macros' fixed column numbers, so the formula-based workbook and the VBA
+workbook layout both work:
+
+    • Status values are compared case-insensitively, and "Complete" counts
+      as "COMPLETED" (the formula-based sheets use Complete/Completed)
+    • Response times in ms are converted to minutes for the SLA check
+    • Per-row formulas such as Duration (hrs) are evaluated (kpi_engine.py)
+
+Usage:
+    python3 analysis_report.py site.xlsx
+    python3 analysis_report.py sites/*.xlsx --report nightly.json
+    python3 analysis_report.py --manifest sites.json --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from kpi_engine import BLANK, DEFAULT_WORKBOOK, NUMBER, TEXT
+from kpi_reader import StreamingWorkbookModel
+
+# Row 2 of every tracking sheet holds the headers; rows up to LAYOUT_ROWS can
+# hold the HOW TO USE instructions and the sample formulas instead of data
+HEADER_ROW = 2
+LAYOUT_ROWS = 4
+
+COMPLETED = ['COMPLETED', 'COMPLETE']
+RESPONDED = ['RESPONDED', 'COMPLETED', 'COMPLETE']
+RESOLVED = ['RESOLVED']
+
+# Response time within which a query meets the SLA
+SLA_MINUTES = 5
+
+RATING_ICONS = {'good': '✓', 'warning': '⚠', 'poor': '✗', 'no data': '•', 'missing': '✗'}
+
+
+def _header_key(text):
+    return ' '.join(str(text).split()).casefold()
+
+
+def _is_record(cells):
+    """
+    Whether one of the first rows holds data rather than layout
+
+    Instruction and statistics rows start with a label ("HOW TO USE:");
+    sample rows only have an ID, formulas and a "← Copy this formula" hint.
+    """
+    first = cells.get(1)
+    if first is None or first == '' or (isinstance(first, str) and first.rstrip().endswith(':')):
+        return False
+    return any(value not in (None, '') and not (isinstance(value, str) and value[:1] in '=←')
+               for col, value in cells.items() if col != 1)
+
+
+class TrackingSheet:
+    """The records of one tracking sheet, column by column"""
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+        top = model.read_rows(name, LAYOUT_ROWS)
+        self.headers = {}
+        for col, text in sorted(top.get(HEADER_ROW, {}).items()):
+            if isinstance(text, str) and text.strip():
+                self.headers.setdefault(_header_key(text), (col, text.strip()))
+        self.layout = {row for row in range(1, LAYOUT_ROWS + 1)
+                       if row <= HEADER_ROW or not _is_record(top.get(row, {}))}
+        self.columns = {1}
+        self._records = None
+
+    def find(self, headers):
+        """(column, header) of the first of the headers present, or None"""
+        for header in headers:
+            if _header_key(header) in self.headers:
+                return self.headers[_header_key(header)]
+        return None
+
+    def load(self):
+        """Read all the columns asked for, in one pass over the sheet"""
+        self.model.load(self.name, self.columns)
+
+    @property
+    def records(self):
+        """Row indexes (0-based) of the records: rows with an ID below the layout rows"""
+        if self._records is None:
+            ids = self.model.sheet(self.name).column(1)
+            index = np.flatnonzero(ids.kind != BLANK)
+            self._records = index[~np.isin(index + 1, list(self.layout))]
+        return self._records
+
+    def values(self, col):
+        return self.model.sheet(self.name).column(col).take(self.records)
+
+
+class Analysis:
+    """
+    One check of the report
+
+    ``needs`` maps names to (sheet, header candidates); None instead of the
+    headers means the ID column, i.e. just the records. ``run`` gets
+    {name: (header, Values)} and returns (rating, message, metrics).
+    """
+
+    def __init__(self, name, title, needs, run):
+        self.name = name
+        self.title = title
+        self.needs = needs
+        self.run = run
+
+
+# ---------------------------------------------------------------------------
+# Column helpers
+# ---------------------------------------------------------------------------
+
+def _status(values):
+    """Upper-cased, stripped text of each cell ('' for anything else)"""
+    text = np.where(values.kind == TEXT, values.txt, '').astype(str)
+    return np.char.upper(np.char.strip(text))
+
+
+def _numbers(values):
+    """Numbers, and text that reads as one (like VBA's IsNumeric); NaN elsewhere"""
+    numbers = np.where(values.kind == NUMBER, values.num, np.nan)
+    for i in np.flatnonzero(values.kind == TEXT):
+        try:
+            numbers[i] = float(values.txt[i])
+        except ValueError:
+            pass
+    return numbers
+
+
+def _rate(part, total):
+    return part / total * 100 if total else 0.0
+
+
+def _open_and_resolved(values, what):
+    status = _status(values)
+    total = len(status)
+    resolved = int(np.isin(status, RESOLVED).sum())
+    opened = total - resolved
+    metrics = {'total': total, 'open': opened, 'resolved': resolved}
+    if opened == 0:
+        return 'good', f"No open {what}!", metrics
+    return 'warning', f"{opened} {what} need attention!", metrics
+
+
+# ---------------------------------------------------------------------------
+# The checks (same counts and thresholds as the VBA macros)
+# ---------------------------------------------------------------------------
+
+def check_wave_status(columns):
+    _, values = columns['status']
+    status = _status(values)
+    total = len(status)
+    if not total:
+        return 'no data', 'No wave data found!', {'total': 0}
+    completed = int(np.isin(status, COMPLETED).sum())
+    delayed = int((status == 'DELAYED').sum())
+    rate = _rate(completed, total)
+    metrics = {'total': total, 'completed': completed, 'delayed': delayed,
+               'in_progress': total - completed - delayed, 'completion_rate': round(rate, 2)}
+    if rate >= 95:
+        return 'good', 'Excellent wave performance!', metrics
+    if rate >= 80:
+        return 'warning', 'Good, but room for improvement', metrics
+    return 'poor', 'Wave completion needs attention!', metrics
+
+
+def verify_training(columns):
+    _, values = columns['status']
+    status = _status(values)
+    total = len(status)
+    if not total:
+        return 'no data', 'No training data found!', {'total': 0}
+    trained = int(np.isin(status, COMPLETED).sum())
+    rate = _rate(trained, total)
+    metrics = {'total': total, 'trained': trained, 'not_trained': total - trained,
+               'training_rate': round(rate, 2)}
+    if rate == 100:
+        return 'good', 'All employees trained!', metrics
+    if rate >= 80:
+        return 'warning', 'Most employees trained, finish remaining', metrics
+    return 'poor', 'Training needs attention!', metrics
+
+
+def analyze_stock_issues(columns):
+    _, status = columns['status']
+    _, duration = columns['duration']
+    status = _status(status)
+    total = len(status)
+    if not total:
+        return 'no data', 'No stock data found!', {'total': 0}
+    completed = np.isin(status, COMPLETED)
+    count = int(completed.sum())
+    # Like the macro: non-numeric durations add nothing but still count
+    hours = np.nansum(_numbers(duration)[completed])
+    average = float(hours / count) if count else 0.0
+    metrics = {'total': total, 'completed': count, 'pending': total - count,
+               'average_hours': round(average, 2)}
+    if average <= 2:
+        return 'good', 'Excellent replenishment speed!', metrics
+    if average <= 4:
+        return 'warning', 'Good, but could be faster', metrics
+    return 'poor', 'Replenishment taking too long! Target: Within 2-4 hours', metrics
+
+
+def check_quality_rate(columns):
+    _, audits = columns['audits']
+    _, orders = columns['orders']
+    count = len(audits)
+    if not count:
+        return 'no data', 'No quality audit data found!', {'audits': 0}
+    # The macro estimated orders from the row count; use the Total Orders figures
+    total_orders = float(np.nansum(_numbers(orders))) or 100.0
+    rate = _rate(count, total_orders)
+    metrics = {'audits': count, 'orders': total_orders, 'audit_rate': round(rate, 2)}
+    if rate >= 10:
+        return 'good', 'Excellent audit coverage!', metrics
+    if rate >= 5:
+        return 'warning', 'Meeting minimum, aim higher', metrics
+    return 'poor', 'Audit rate too low! Target: >5% (ideally 10%+)', metrics
+
+
+def check_inventory_mismatches(columns):
+    _, values = columns['status']
+    if not len(values):
+        return 'no data', 'No inventory mismatches recorded. Inventory is accurate!', {'total': 0}
+    return _open_and_resolved(values, 'inventory mismatch(es)')
+
+
+def check_sla_compliance(columns):
+    _, status = columns['status']
+    header, response = columns['response']
+    status = _status(status)
+    if not len(status):
+        return 'no data', 'No query data available for SLA calculation.', {'total': 0}
+    minutes = _numbers(response)
+    if '(ms)' in header.lower():
+        minutes = minutes / 60000
+    responded = np.isin(status, RESPONDED)
+    total = int(responded.sum())
+    # NaN (no response time) compares False, as IsNumeric failed in the macro
+    within = int((minutes[responded] <= SLA_MINUTES).sum())
+    rate = _rate(within, total)
+    metrics = {'responded': total, 'within_sla': within, 'compliance_rate': round(rate, 2)}
+    if rate >= 98:
+        return 'good', 'Excellent SLA compliance!', metrics
+    if rate >= 90:
+        return 'warning', 'Good, aim to reach 98%+', metrics
+    return 'poor', 'SLA compliance needs improvement!', metrics
+
+
+def view_system_errors(columns):
+    _, values = columns['status']
+    if not len(values):
+        return 'no data', 'No system errors recorded. System is running smoothly!', {'total': 0}
+    return _open_and_resolved(values, 'system error(s)')
+
+
+ANALYSES = [
+    Analysis('CheckWaveStatus', 'Wave Tracking Status',
+             {'status': ('Wave Tracking', ['Status'])}, check_wave_status),
+    Analysis('VerifyTraining', 'Employee Training Status',
+             {'status': ('Employee Training', ['Status'])}, verify_training),
+    Analysis('AnalyzeStockIssues', 'Stock Replenishment Analysis',
+             {'status': ('Stock Replenishment', ['Status']),
+              'duration': ('Stock Replenishment', ['Duration (hrs)', 'Duration (hours)'])},
+             analyze_stock_issues),
+    Analysis('CheckQualityRate', 'Quality Audit Coverage',
+             {'audits': ('Quality Audit', None),
+              'orders': ('Order Volumes', ['Total Orders'])}, check_quality_rate),
+    Analysis('CheckInventoryMismatches', 'Inventory Mismatch Status',
+             {'status': ('Inventory Mismatch', ['Status'])}, check_inventory_mismatches),
+    Analysis('CheckSLACompliance', 'SLA Compliance',
+             {'status': ('Bash Queries Response', ['Status']),
+              'response': ('Bash Queries Response',
+                           ['Response Time (mins)', 'Response Time (ms)'])},
+             check_sla_compliance),
+    Analysis('ViewSystemErrors', 'System Error Status',
+             {'status': ('System Errors', ['Status'])}, view_system_errors),
+]
+
+
+# ---------------------------------------------------------------------------
+# Running the checks
+# ---------------------------------------------------------------------------
+
+def analyse_workbook(path, analyses=None):
+    """
+    Run the checks on one workbook, reading each sheet once
+
+    Returns:
+        dict: {'workbook', 'status': 'ok' or 'error', 'seconds', 'checks':
+        [{'check', 'title', 'sheet', 'rating', 'message', 'metrics'}, ...]}
+    """
+    start = time.perf_counter()
+    try:
+        model = StreamingWorkbookModel(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        return {'workbook': path, 'status': 'error', 'error': f'{type(e).__name__}: {e}',
+                'seconds': None, 'checks': []}
+    try:
+        sheets = {}
+        plans = []
+        for analysis in analyses or ANALYSES:
+            found, missing = {}, None
+            for key, (sheet_name, headers) in analysis.needs.items():
+                if sheet_name not in model.parts:
+                    missing = f"Sheet '{sheet_name}' not found"
+                    break
+                if sheet_name not in sheets:
+                    sheets[sheet_name] = TrackingSheet(model, sheet_name)
+                sheet = sheets[sheet_name]
+                column = (1, None) if headers is None else sheet.find(headers)
+                if column is None:
+                    missing = f"Column '{headers[0]}' not found on '{sheet_name}'"
+                    break
+                sheet.columns.add(column[0])
+                found[key] = (sheet, *column)
+            plans.append((analysis, found, missing))
+
+        for sheet in sheets.values():
+            sheet.load()
+
+        checks = []
+        for analysis, found, missing in plans:
+            sheet_name = next(iter(analysis.needs.values()))[0]
+            if missing:
+                rating, message, metrics = 'missing', missing, {}
+            else:
+                rating, message, metrics = analysis.run(
+                    {key: (header or '', sheet.values(col))
+                     for key, (sheet, col, header) in found.items()})
+            checks.append({'check': analysis.name, 'title': analysis.title, 'sheet': sheet_name,
+                           'rating': rating, 'message': message, 'metrics': metrics})
+    finally:
+        model.close()
+    return {'workbook': path, 'status': 'ok', 'seconds': round(time.perf_counter() - start, 3),
+            'checks': checks}
+
+
+def build_report(paths, workers=None, progress=None):
+    """
+    Analyse several workbooks, in parallel worker processes
+
+    Args:
+        paths: Workbook paths (e.g. one per site)
+        workers: Worker processes (default: number of CPU cores)
+        progress: Optional callable receiving one line per finished workbook
+
+    Returns:
+        dict: Consolidated report with one entry per workbook
+    """
+    start = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    if workers == 1:
+        results = []
+        for path in paths:
+            results.append(analyse_workbook(path))
+            if progress:
+                progress(_workbook_lines(results[-1]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = []
+            for result in pool.map(analyse_workbook, paths):
+                results.append(result)
+                if progress:
+                    progress(_workbook_lines(result))
+
+    attention = {}
+    for result in results:
+        for check in result['checks']:
+            if check['rating'] in ('warning', 'poor', 'missing'):
+                attention[check['check']] = attention.get(check['check'], 0) + 1
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'workers': workers,
+        'total_seconds': round(time.perf_counter() - start, 3),
+        'failed': sum(1 for result in results if result['status'] != 'ok'),
+        'needs_attention': attention,
+        'workbooks': results,
+    }
+
+
+def _workbook_lines(result):
+    if result['status'] != 'ok':
+        return f"  ✗ {result['workbook']}: {result['error']}"
+    lines = [f"  📄 {os.path.basename(result['workbook'])} ({result['seconds']:.2f} s)"]
+    for check in result['checks']:
+        figures = ', '.join(f"{name.replace('_', ' ')} {value:g}"
+                            for name, value in check['metrics'].items())
+        lines.append(f"     {RATING_ICONS[check['rating']]} {check['title']:<30} {check['message']}")
+        if figures:
+            lines.append(f"       {figures}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Run the VBA analysis checks on tracking workbooks and write one report'
+    )
+    parser.add_argument('workbooks', nargs='*', metavar='WORKBOOK',
+                        help='Workbooks to analyse (default: the formula-based workbook)')
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='Analyse every site workbook of a multi-site manifest')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: number of CPU cores)')
+    parser.add_argument('--report', metavar='FILE',
+                        help='Write the consolidated report as JSON')
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Operations Analysis Report")
+    print("=" * 70)
+    print()
+
+    paths = list(args.workbooks)
+    if args.manifest:
+        from multi_site import load_manifest
+        try:
+            paths.extend(site.output for site in load_manifest(args.manifest))
+        except (OSError, ValueError) as e:
+            print(f"❌ Error: {e}")
+            return 1
+    if not paths:
+        paths = [os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_WORKBOOK)]
+
+    print(f"🔎 Analysing {len(paths)} workbook(s)...")
+    print()
+    report = build_report(paths, workers=args.workers, progress=print)
+    print()
+    print(f"⏱️  Total: {report['total_seconds']:.2f} s ({report['workers']} workers)")
+    for name, count in report['needs_attention'].items():
+        print(f"⚠  {name}: {count} workbook(s) need attention")
+    if report['failed']:
+        print(f"❌ {report['failed']} of {len(paths)} workbook(s) could not be read")
+    else:
+        print(f"✅ {len(paths)} workbook(s) analysed")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Report written to: {args.report}")
+    print()
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Incremental Append for the Formula-Based Tracking Workbook
+
+Adds one shift's rows to an existing workbook without re-saving it:
+
+    • Only the worksheets that receive rows, workbook.xml (named ranges) and,
+      when needed, styles.xml are rewritten
+    • Every other part of the .xlsx package is copied byte-for-byte, still
+      compressed
+    • Appended worksheets are stored as independent deflate segments. The
+      position of the last segment (the XML after </sheetData>) is kept in a
+      ZIP extra field, so the next append copies the compressed rows as-is
+      and only compresses the new ones
+
+The first append to a sheet written by another tool (openpyxl, Excel)
+recompresses that sheet once; after that, append cost scales with the number
+of new rows, not with the size of the file. A sheet holding nothing but its
+sample row (see create_formula_based_excel.SAMPLE_ROWS) gets the new rows in
+place of it, as if they had been there when the workbook was generated.
+
+Usage:
+    python3 append_workbook.py --import shift_waves.csv --import shift_picks.csv
+    python3 append_workbook.py other.xlsx --import "Wave Tracking=waves.csv"
+"""
+
+import argparse
+import os
+import re
+import struct
+import tempfile
+import zipfile
+import zlib
+from itertools import islice
+
+from create_formula_based_excel import (
+    DATA_START_ROW, RANGE_HEADROOM, SAMPLE_ROWS, TRACKING_SHEETS, data_range_refs,
+    derived_columns, is_sample_row, range_name,
+)
+from kpi_engine import cache_dashboard_values
+from parallel_generator import (
+    CHUNK_ROWS, add_date_styles, derived_column_styles, formula_columns, remove_row,
+    render_rows, set_defined_names,
+)
+from xlsx_package import (
+    RawZipWriter, build_timestamp, copy_member, crc32_combine, defined_names, extra_fields,
+    iter_raw, pack_extra_fields, sheet_parts,
+)
+from xml_loader import read_sheet
+
+# ZIP extra field ("EC") recording where an appended worksheet can be split
+APPEND_EXTRA_ID = 0x4345
+# compressed size, size and CRC-32 of everything before the last segment; last row
+_SPLIT = struct.Struct('<QQIQ')
+
+_ROW_NUMBER = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+_DIMENSION = re.compile(rb'<dimension\b[^>]*/>')
+_DIMENSION_LAST_ROW = re.compile(rb'<dimension\b[^>]*?\sref="[A-Z]+\d+:[A-Z]+(\d+)"')
+_RANGE_ROWS = re.compile(r'\$(\d+):\$[A-Z]+\$(\d+)$')
+
+
+def _raw_compressor():
+    return zlib.compressobj(6, zlib.DEFLATED, -15)
+
+
+class SheetSegments:
+    """
+    A worksheet part split into a compressed prefix (everything up to the
+    last row) and the uncompressed XML that follows </sheetData>
+    """
+
+    def __init__(self, prefix_chunks, prefix_compressed, prefix_size, prefix_crc, tail, last_row):
+        self.prefix_chunks = prefix_chunks
+        self.prefix_compressed = prefix_compressed
+        self.prefix_size = prefix_size
+        self.prefix_crc = prefix_crc
+        self.tail = tail
+        self.last_row = last_row
+
+
+def read_split(info):
+    """Return the split recorded by an earlier append, or None"""
+    payload = extra_fields(info.extra).get(APPEND_EXTRA_ID)
+    if payload is None or len(payload) != _SPLIT.size:
+        return None
+    return _SPLIT.unpack(payload)
+
+
+def _split_segments(fp, info):
+    """Reuse the compressed prefix of a worksheet written by an earlier append"""
+    split = read_split(info)
+    if split is None or info.compress_type != zipfile.ZIP_DEFLATED:
+        return None
+    prefix_compressed, prefix_size, prefix_crc, last_row = split
+    if prefix_compressed > info.compress_size:
+        return None
+    decompressor = zlib.decompressobj(-15)
+    try:
+        tail = b''.join(decompressor.decompress(block)
+                        for block in iter_raw(fp, info, start=prefix_compressed))
+    except zlib.error:
+        return None
+    # Only trust the split if it reproduces the member's size and checksum
+    if (prefix_size + len(tail) != info.file_size or
+            crc32_combine(prefix_crc, zlib.crc32(tail), len(tail)) != info.CRC):
+        return None
+    return SheetSegments(lambda: iter_raw(fp, info, stop=prefix_compressed),
+                         prefix_compressed, prefix_size, prefix_crc, tail, last_row)
+
+
+def _measured_last_row(zf, info):
+    """Last row of a worksheet from an earlier append's split or its <dimension>, or None"""
+    split = read_split(info)
+    if split is not None:
+        return split[3]
+    with zf.open(info) as member:
+        match = _DIMENSION_LAST_ROW.search(member.read(1 << 14))
+    return int(match.group(1)) if match else None
+
+
+def _scan_segments(zf, info, tmp, drop_row=None):
+    """
+    Recompress a worksheet's XML up to </sheetData> as a sync-flushed segment
+
+    Used the first time a sheet is appended to. <dimension> is dropped: it sits
+    in the prefix, which later appends copy without decompressing. So is
+    ``drop_row`` (a sample row), which only small sheets have: it is looked
+    for in the first block.
+    """
+    marker = b'</sheetData>'
+    compressor = _raw_compressor()
+    size = 0
+    crc = 0
+    last_row = 0
+    carry = b''
+    first = True
+    tail = None
+    with zf.open(info) as member:
+        while True:
+            block = member.read(1 << 20)
+            if first:
+                block = _DIMENSION.sub(b'', block, count=1)
+                if drop_row:
+                    block = remove_row(block, drop_row)
+                block = block.replace(b'<sheetData/>', b'<sheetData></sheetData>', 1)
+                block = block.replace(b'<sheetData />', b'<sheetData></sheetData>', 1)
+                first = False
+            buffer = carry + block
+            if tail is not None:
+                tail += block
+            else:
+                index = buffer.find(marker)
+                if index >= 0:
+                    data, tail = buffer[:index], buffer[index:]
+                    carry = b''
+                elif block:
+                    # Keep enough back to match a marker or <row> tag split across blocks
+                    keep = min(len(buffer), 4096)
+                    data, carry = buffer[:len(buffer) - keep], buffer[len(buffer) - keep:]
+                else:
+                    raise ValueError(f"{info.filename} has no </sheetData>")
+                rows = _ROW_NUMBER.findall(data)
+                if rows:
+                    last_row = int(rows[-1])
+                compressed = compressor.compress(data)
+                if compressed:
+                    tmp.write(compressed)
+                size += len(data)
+                crc = zlib.crc32(data, crc)
+            if not block:
+                break
+    tmp.write(compressor.flush(zlib.Z_SYNC_FLUSH))
+    compressed_size = tmp.tell()
+
+    def chunks():
+        tmp.seek(0)
+        yield from iter(lambda: tmp.read(1 << 20), b'')
+
+    return SheetSegments(chunks, compressed_size, size, crc, tail, last_row)
+
+
+def with_formulas(sheet_name, rows, first_row):
+    """
+    Write a sheet's per-row formulas into plain row lists, numbered from
+    ``first_row``; values given for formula columns are recalculated, as in
+    bulk imports
+    """
+    formulas = [(col - 1, template) for col, template, _ in derived_columns(sheet_name)]
+    width = max((i + 1 for i, _ in formulas), default=0)
+    for row_number, row in enumerate(rows, start=first_row):
+        row = list(row)
+        if formulas:
+            row.extend([None] * (width - len(row)))
+            for i, template in formulas:
+                row[i] = template.format(row=row_number)
+        yield row
+
+
+class WorkbookAppender:
+    """Appends rows to the tracking sheets of an existing workbook"""
+
+    def __init__(self, path='Ecom_Operations_Tracking_System_Formula_Based.xlsx',
+                 range_headroom=RANGE_HEADROOM, cache_values=False, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.range_headroom = range_headroom
+        # Refreshing the Dashboard's cached KPI values reads every tracking
+        # sheet, so it is off by default; Excel recalculates when the file is opened
+        self.cache_values = cache_values
+        self.chunk_rows = chunk_rows
+
+    def _render(self, rows, first_row, date_styles, column_styles, formulas, tmp):
+        """Compress new rows as one sync-flushed segment; return (size, crc, count)"""
+        compressor = _raw_compressor()
+        size = crc = count = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_rows))
+            if not chunk:
+                break
+            xml, _ = render_rows(chunk, first_row + count, date_styles, column_styles, formulas)
+            tmp.write(compressor.compress(xml))
+            size += len(xml)
+            crc = zlib.crc32(xml, crc)
+            count += len(chunk)
+        tmp.write(compressor.flush(zlib.Z_SYNC_FLUSH))
+        return size, crc, count
+
+    def append(self, data, output_path=None, progress=print):
+        """
+        Append rows to sheets of the workbook
+
+        Args:
+            data: Mapping of sheet name to an iterable of data rows (or a
+                bulk_import.TrackingImport); the formula columns of plain
+                rows are filled in (see with_formulas)
+            output_path: Destination (defaults to updating the workbook in place)
+            progress: Optional callable receiving one progress line per sheet
+
+        Returns:
+            dict: Number of rows appended per sheet
+        """
+        output_path = output_path or self.path
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp',
+                                        dir=os.path.dirname(os.path.abspath(output_path)))
+        os.close(fd)
+        appended = {}
+        try:
+            with zipfile.ZipFile(self.path) as zf, open(self.path, 'rb') as fp:
+                parts = sheet_parts(zf)
+                unknown = sorted(set(data) - set(parts))
+                if unknown:
+                    raise ValueError(f"Unknown sheet name(s) in data: {', '.join(unknown)}")
+                styles_xml, date_styles = add_date_styles(zf.read('xl/styles.xml'))
+
+                sheets = {}
+                temp_files = []
+                try:
+                    last_rows = {}
+                    existing = {}
+                    replaced = set()
+                    for sheet_name, rows in data.items():
+                        info = zf.getinfo(parts[sheet_name])
+                        segments = _split_segments(fp, info)
+                        if segments is None:
+                            head = tempfile.TemporaryFile()
+                            temp_files.append(head)
+                            segments = _scan_segments(zf, info, head)
+                        if self._only_sample_row(zf, sheet_name, segments):
+                            # The new rows take the place of the sample row
+                            head = tempfile.TemporaryFile()
+                            temp_files.append(head)
+                            segments = _scan_segments(zf, info, head, drop_row=DATA_START_ROW)
+                            replaced.add(sheet_name)
+                        first_row = segments.last_row + 1
+                        if hasattr(rows, 'iter_rows'):
+                            rows = rows.iter_rows(first_row)
+                        else:
+                            rows = with_formulas(sheet_name, rows, first_row)
+                        body = tempfile.TemporaryFile()
+                        temp_files.append(body)
+                        size, crc, count = self._render(rows, first_row, date_styles,
+                                                           self._column_styles(zf, info, sheet_name),
+                                                           formula_columns(sheet_name), body)
+                        sheets[info.filename] = (segments, body, size, crc, count)
+                        appended[sheet_name] = count
+                        last_rows[sheet_name] = segments.last_row + count
+                        existing[sheet_name] = segments.last_row
+                        if progress:
+                            progress(f"  ✓ {sheet_name} - {count:,} rows appended "
+                                     f"(rows {first_row:,}-{first_row + count - 1:,})"
+                                     if count else f"  ✓ {sheet_name} - no new rows")
+
+                    workbook_xml = self._extend_ranges(zf, last_rows, existing, replaced,
+                                                       progress)
+
+                    with RawZipWriter(tmp_path) as writer:
+                        for info in zf.infolist():
+                            if info.filename in sheets:
+                                self._write_sheet(writer, info, *sheets[info.filename])
+                            elif info.filename == 'xl/workbook.xml':
+                                writer.writestr(info.filename, workbook_xml, date_time=info.date_time)
+                            elif info.filename == 'xl/styles.xml':
+                                writer.writestr(info.filename, styles_xml, date_time=info.date_time)
+                            else:
+                                copy_member(writer, fp, info)
+                finally:
+                    for f in temp_files:
+                        f.close()
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        if self.cache_values and any(appended.values()):
+            build_time = build_timestamp()
+            cache_dashboard_values(output_path, now=build_time, volatile=build_time is not None)
+        return appended
+
+    def _only_sample_row(self, zf, sheet_name, segments):
+        """Whether a sheet holds its sample row and no data below it"""
+        if sheet_name not in SAMPLE_ROWS or segments.last_row != DATA_START_ROW:
+            return False
+        sheet = read_sheet(zf, sheet_name, first_row=DATA_START_ROW,
+                           max_col=len(TRACKING_SHEETS[sheet_name]))
+        return is_sample_row(sheet_name, sheet.row(DATA_START_ROW))
+
+    def _column_styles(self, zf, info, sheet_name):
+        """Cell styles of the formula columns, read from the sample row"""
+        with zf.open(info) as member:
+            head = member.read(1 << 16)
+        return derived_column_styles(sheet_name, head)
+
+    def _extend_ranges(self, zf, last_rows, existing, replaced=(), progress=None):
+        """
+        Keep ``range_headroom`` blank rows at the end of the named data ranges
+        of every tracking sheet; never shrink them
+
+        Sheets not appended to are measured too (see _measured_last_row), so
+        rows typed in Excel past the end of a range are counted again. A
+        range keeps its start row, except that it moves up to DATA_START_ROW
+        when new rows replace the sample row (earlier builds started ranges
+        below it).
+
+        Args:
+            last_rows: Last row of each appended sheet after the append
+            existing: Last row of each appended sheet before the append
+        """
+        current = defined_names(zf)
+        parts = sheet_parts(zf)
+        last_rows, existing = dict(last_rows), dict(existing)
+        for sheet_name in TRACKING_SHEETS:
+            if sheet_name not in last_rows and sheet_name in parts:
+                last_row = _measured_last_row(zf, zf.getinfo(parts[sheet_name]))
+                if last_row is not None:
+                    last_rows[sheet_name] = existing[sheet_name] = last_row
+        wanted = data_range_refs(last_rows, self.range_headroom)
+        refs = {}
+        for sheet_name, last_row in last_rows.items():
+            outside = None
+            for header in TRACKING_SHEETS.get(sheet_name, []):
+                name = range_name(sheet_name, header)
+                if name not in current:
+                    continue
+                old_start, old_end = map(int, _RANGE_ROWS.search(current[name]).groups())
+                if existing[sheet_name] > old_end:
+                    outside = (old_end + 1, existing[sheet_name])
+                start = DATA_START_ROW if sheet_name in replaced else old_start
+                match = _RANGE_ROWS.search(wanted[name])
+                end = max(int(match.group(2)), old_end)
+                if (start, end) != (old_start, old_end):
+                    refs[name] = (wanted[name][:match.start(1)] + str(start) +
+                                  wanted[name][match.end(1):match.start(2)] + str(end))
+            if outside and progress:
+                progress(f"  ⚠️  {sheet_name} - rows {outside[0]:,}-{outside[1]:,} were below "
+                         f"its named ranges, so the KPIs left them out; the ranges now cover them")
+        return set_defined_names(zf.read('xl/workbook.xml'), refs)
+
+    def _write_sheet(self, writer, info, segments, body, size, crc, count):
+        """Write prefix + new rows + tail, recording the split for the next append"""
+        tail_compressor = _raw_compressor()
+        tail_data = tail_compressor.compress(segments.tail) + tail_compressor.flush()
+        body_compressed = body.tell()
+
+        prefix_compressed = segments.prefix_compressed + body_compressed
+        prefix_size = segments.prefix_size + size
+        prefix_crc = crc32_combine(segments.prefix_crc, crc, size)
+        last_row = segments.last_row + count
+        total_crc = crc32_combine(prefix_crc, zlib.crc32(segments.tail), len(segments.tail))
+
+        fields = extra_fields(info.extra)
+        fields.pop(0x0001, None)
+        fields[APPEND_EXTRA_ID] = _SPLIT.pack(prefix_compressed, prefix_size, prefix_crc, last_row)
+
+        def chunks():
+            yield from segments.prefix_chunks()
+            body.seek(0)
+            yield from iter(lambda: body.read(1 << 20), b'')
+            yield tail_data
+
+        writer.write_compressed(info.filename, chunks(), total_crc,
+                                prefix_compressed + len(tail_data),
+                                prefix_size + len(segments.tail),
+                                date_time=info.date_time, extra=pack_extra_fields(fields))
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Append rows to an existing formula-based tracking workbook'
+    )
+    parser.add_argument('workbook', nargs='?',
+                        default='Ecom_Operations_Tracking_System_Formula_Based.xlsx',
+                        help='Workbook to append to (updated in place)')
+    parser.add_argument('--import', dest='imports', action='append', default=[], required=True,
+                        metavar='[SHEET=]FILE',
+                        help='CSV or Parquet export to append (repeatable)')
+    parser.add_argument('--output', metavar='FILE',
+                        help='Write the result to FILE instead of updating the workbook')
+    parser.add_argument('--cache-values', action='store_true',
+                        help='Refresh the cached Dashboard values (reads the whole workbook)')
+
+    args = parser.parse_args()
+
+    from bulk_import import import_sources
+    data = import_sources(args.imports)
+
+    print()
+    print("=" * 70)
+    print("APPEND TO TRACKING WORKBOOK")
+    print("=" * 70)
+    print()
+    for sheet_name, source in data.items():
+        for path, mapping in source.mappings.items():
+            print(f"📥 {os.path.basename(path)} → {sheet_name} ({mapping.describe()})")
+    print()
+
+    appender = WorkbookAppender(args.workbook, cache_values=args.cache_values)
+    appender.append(data, output_path=args.output)
+
+    for sheet_name, source in data.items():
+        for header, count in source.unconverted.items():
+            print(f"⚠️  {sheet_name} / {header}: {count:,} value(s) kept as text")
+    print(f"✅ Success! Rows appended to: {args.output or args.workbook}")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the E-Commerce Operations Tracking System
+
+Times workbook generation, .xlsm deployment and workbook loading, and
+measures their peak memory, at several data sizes. Each scenario runs in a
+fresh process so its peak memory is not affected by the previous ones.
+
+Scenarios:
+    generate            FormulaBasedExcelGenerator.generate (in memory)
+    generate-streaming  FormulaBasedExcelGenerator.generate (write-only mode)
+    generate-parallel   ParallelExcelGenerator.generate
+    generate-columns    ParallelExcelGenerator.generate from NumPy columns (column_writer)
+    deploy              XLSMDeployer.create_xlsm
+    load                openpyxl.load_workbook
+    load-read-only      openpyxl.load_workbook(read_only=True), all rows iterated
+    load-xml            xml_loader.load_sheets (column arrays from the worksheet XML)
+    kpis                kpi_engine.evaluate_dashboard
+    vba-compress        vba_compression.compress on a module source of N lines
+    vba-decompress      vba_compression.decompress of that module source
+
+Results are written as JSON, one record per scenario and size, so releases
+can be compared:
+
+Usage:
+    python3 benchmark.py                              # 1k, 100k and 1M rows per sheet
+    python3 benchmark.py --rows 1000 100000 --output results.json
+    python3 benchmark.py --scenarios generate-streaming load-read-only
+    python3 benchmark.py --compare baseline.json      # Exit 1 on regressions
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from importlib.metadata import PackageNotFoundError, version
+
+from create_formula_based_excel import DERIVED_COLUMNS, TRACKING_SHEETS
+
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+SCENARIOS = ['generate', 'generate-streaming', 'generate-parallel', 'generate-columns', 'deploy',
+             'load', 'load-read-only', 'load-xml', 'kpis', 'vba-compress', 'vba-decompress']
+# Scenarios that do not read the generated input workbook
+STANDALONE_PREFIXES = ('generate', 'vba-')
+DEFAULT_TIMEOUT = 3600
+DEFAULT_THRESHOLD = 0.20
+
+# Sample values for the text columns of the synthetic rows
+STATUS_VALUES = {
+    'Wave Tracking': ['Complete', 'In Progress'],
+    'Employee Training': ['Completed', 'Pending', 'In Progress'],
+    'Stock Replenishment': ['Complete', 'Pending'],
+    'Picking Tasks': ['Complete', 'Pending', 'In Progress'],
+    'Inventory Mismatch': ['Resolved', 'Open'],
+    'System Errors': ['Open', 'Resolved'],
+    'Bash Queries Response': ['Answered', 'Pending'],
+}
+
+
+class SyntheticRows:
+    """
+    Deterministic data rows for a tracking sheet
+
+    Like bulk_import.TrackingImport, the generators call ``iter_rows`` with
+    the sheet's first data row, so the per-row formulas are numbered correctly.
+    """
+
+    def __init__(self, sheet_name, count):
+        self.sheet_name = sheet_name
+        self.count = count
+
+    def iter_rows(self, first_row):
+        # Imported lazily: bulk_import imports the generator module
+        from bulk_import import DATE_HEADERS, NUMBER_HEADERS, PERCENT_HEADERS
+
+        headers = TRACKING_SHEETS[self.sheet_name]
+        derived = DERIVED_COLUMNS.get(self.sheet_name, {})
+        statuses = STATUS_VALUES.get(self.sheet_name, ['Complete'])
+        prefix = self.sheet_name[:3].upper()
+        start = datetime(2026, 1, 5, 6, 0)
+        for i in range(self.count):
+            moment = start + timedelta(minutes=i % 10_000)
+            row = []
+            for col, header in enumerate(headers):
+                if header in derived:
+                    row.append(derived[header][0].format(row=first_row + i))
+                elif header in DATE_HEADERS:
+                    row.append(moment + timedelta(minutes=15 * col))
+                elif header in PERCENT_HEADERS:
+                    row.append(0.8 + (i % 20) / 100)
+                elif header in NUMBER_HEADERS:
+                    row.append(10 + (i * 7 + col) % 90)
+                elif header == 'Status':
+                    row.append(statuses[i % len(statuses)])
+                elif col == 0:
+                    row.append(f'{prefix}-{i:07d}')
+                else:
+                    row.append(f'{header} {i % 50}')
+            yield row
+
+
+def synthetic_columns(sheet_name, count):
+    """The values of SyntheticRows as NumPy columns, for column_writer"""
+    import numpy as np
+    from bulk_import import DATE_HEADERS, NUMBER_HEADERS, PERCENT_HEADERS
+
+    derived = DERIVED_COLUMNS.get(sheet_name, {})
+    statuses = STATUS_VALUES.get(sheet_name, ['Complete'])
+    prefix = sheet_name[:3].upper()
+    index = np.arange(count)
+    moment = np.datetime64('2026-01-05T06:00') + (index % 10_000).astype('timedelta64[m]')
+    columns = {}
+    for col, header in enumerate(TRACKING_SHEETS[sheet_name]):
+        if header in derived:
+            continue
+        if header in DATE_HEADERS:
+            columns[header] = moment + np.timedelta64(15 * col, 'm')
+        elif header in PERCENT_HEADERS:
+            columns[header] = 0.8 + (index % 20) / 100
+        elif header in NUMBER_HEADERS:
+            columns[header] = 10 + (index * 7 + col) % 90
+        elif header == 'Status':
+            columns[header] = np.array(statuses)[index % len(statuses)]
+        elif col == 0:
+            columns[header] = np.char.add(f'{prefix}-', np.char.zfill(index.astype(str), 7))
+        else:
+            columns[header] = np.char.add(f'{header} ', (index % 50).astype(str))
+    return columns
+
+
+def benchmark_data(rows, sheets=None, columns=False):
+    """
+    Mapping of sheet name to synthetic rows, as passed to generate()
+
+    With ``columns``, each sheet is a {header: array} dict of the same values.
+    """
+    if columns:
+        return {name: synthetic_columns(name, rows) for name in (sheets or TRACKING_SHEETS)}
+    return {name: SyntheticRows(name, rows) for name in (sheets or TRACKING_SHEETS)}
+
+
+def module_source(lines):
+    """VBA_Modules.bas repeated to the given number of lines, cp1252-encoded"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'VBA_Modules.bas')
+    with open(path, 'rb') as f:
+        source = f.read().splitlines(keepends=True)
+    repeats, extra = divmod(lines, len(source))
+    return b''.join(source) * repeats + b''.join(source[:extra])
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process and its finished children, in MB"""
+    import resource
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(own, children) / scale
+
+
+def _run_scenario(scenario, rows, sheets, workbook, work_dir):
+    """Run one scenario; return (seconds, output bytes)"""
+    output = os.path.join(work_dir, f'{scenario}.xlsx')
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    if scenario.startswith('generate'):
+        from create_formula_based_excel import FormulaBasedExcelGenerator
+        from parallel_generator import ParallelExcelGenerator
+        if scenario in ('generate-parallel', 'generate-columns'):
+            generator = ParallelExcelGenerator(cache_values=False)
+        else:
+            generator = FormulaBasedExcelGenerator(streaming=scenario == 'generate-streaming',
+                                                   cache_values=False)
+        data = benchmark_data(rows, sheets, columns=scenario == 'generate-columns')
+        start = time.perf_counter()
+        with quiet:
+            generator.generate(output, data=data)
+        return time.perf_counter() - start, os.path.getsize(output)
+
+    if scenario == 'deploy':
+        from deploy_xlsm import XLSMDeployer
+        deployer = XLSMDeployer(base_dir=work_dir)
+        shutil.copy(workbook, deployer.source_xlsx)
+        start = time.perf_counter()
+        with quiet:
+            ok = deployer.create_xlsm()
+        seconds = time.perf_counter() - start
+        if not ok:
+            raise RuntimeError('create_xlsm failed')
+        return seconds, os.path.getsize(deployer.output_xlsm)
+
+    if scenario in ('load', 'load-read-only'):
+        import openpyxl
+        start = time.perf_counter()
+        wb = openpyxl.load_workbook(workbook, read_only=scenario == 'load-read-only')
+        if scenario == 'load-read-only':
+            for ws in wb.worksheets:
+                for _ in ws.iter_rows(values_only=True):
+                    pass
+        wb.close()
+        return time.perf_counter() - start, None
+
+    if scenario == 'load-xml':
+        from xml_loader import load_sheets
+        start = time.perf_counter()
+        load_sheets(workbook)
+        return time.perf_counter() - start, None
+
+    if scenario == 'kpis':
+        from kpi_engine import evaluate_dashboard
+        start = time.perf_counter()
+        evaluate_dashboard(workbook)
+        return time.perf_counter() - start, None
+
+    if scenario.startswith('vba-'):
+        from vba_compression import compress, decompress
+        source = module_source(rows)
+        if scenario == 'vba-compress':
+            start = time.perf_counter()
+            compressed = compress(source)
+            return time.perf_counter() - start, len(compressed)
+        compressed = compress(source)
+        start = time.perf_counter()
+        decompress(compressed)
+        return time.perf_counter() - start, len(source)
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def _scenario_process(queue, scenario, rows, sheets, workbook, work_dir):
+    """Child process entry point: run a scenario and report its measurements"""
+    try:
+        baseline = _peak_rss_mb()
+        seconds, output_bytes = _run_scenario(scenario, rows, sheets, workbook, work_dir)
+        queue.put({'status': 'ok', 'seconds': round(seconds, 4),
+                   'peak_rss_mb': round(_peak_rss_mb(), 1),
+                   'baseline_rss_mb': round(baseline, 1),
+                   'output_bytes': output_bytes})
+    except Exception as e:
+        queue.put({'status': 'error', 'error': f'{type(e).__name__}: {e}'})
+
+
+def run_isolated(scenario, rows, sheets, workbook, work_dir, timeout=DEFAULT_TIMEOUT):
+    """Run a scenario in a fresh process; return its result record"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_scenario_process,
+                              args=(queue, scenario, rows, sheets, workbook, work_dir))
+    process.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        result = {'status': 'timeout', 'error': f'no result after {timeout}s'}
+    process.join(5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    elif result.get('status') == 'ok' and process.exitcode:
+        result = {'status': 'error', 'error': f'exit code {process.exitcode}'}
+    return result
+
+
+def _input_workbook(rows, sheets, work_dir):
+    """Generate the workbook read by the deploy and load scenarios (not timed)"""
+    from create_formula_based_excel import FormulaBasedExcelGenerator
+    path = os.path.join(work_dir, f'input_{rows}.xlsx')
+    if not os.path.exists(path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            FormulaBasedExcelGenerator(streaming=True, cache_values=False).generate(
+                path, data=benchmark_data(rows, sheets))
+    return path
+
+
+def _package_versions():
+    versions = {}
+    for package in ('openpyxl', 'xlsxwriter', 'numpy'):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(row_counts=None, scenarios=None, sheets=None, timeout=DEFAULT_TIMEOUT,
+                   progress=print):
+    """
+    Run the benchmark scenarios at each size
+
+    Args:
+        row_counts: Rows per sheet to benchmark (default 1k, 100k, 1M)
+        scenarios: Scenario names (default: all)
+        sheets: Tracking sheets to fill (default: all ten)
+        timeout: Seconds allowed per scenario
+        progress: Optional callable receiving one line per result
+
+    Returns:
+        dict: Machine-readable report
+    """
+    row_counts = row_counts or DEFAULT_ROWS
+    scenarios = scenarios or SCENARIOS
+    sheets = list(sheets or TRACKING_SHEETS)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': _package_versions(),
+        'sheets': sheets,
+        'results': [],
+    }
+    work_dir = tempfile.mkdtemp(prefix='ecom-benchmark-')
+    try:
+        for rows in row_counts:
+            workbook = None
+            for scenario in scenarios:
+                if not scenario.startswith(STANDALONE_PREFIXES) and workbook is None:
+                    workbook = _input_workbook(rows, sheets, work_dir)
+                result = {'scenario': scenario, 'rows_per_sheet': rows,
+                          'total_rows': rows * len(sheets)}
+                result.update(run_isolated(scenario, rows, sheets, workbook, work_dir, timeout))
+                report['results'].append(result)
+                if progress:
+                    if result['status'] == 'ok':
+                        progress(f"  ✓ {scenario:<20} {rows:>10,} rows/sheet  "
+                                 f"{result['seconds']:>9.2f} s  {result['peak_rss_mb']:>8.1f} MB")
+                    else:
+                        progress(f"  ✗ {scenario:<20} {rows:>10,} rows/sheet  "
+                                 f"{result['status']}: {result.get('error', '')}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Find scenarios that got slower or use more memory than in a baseline
+
+    Args:
+        baseline: Earlier report (as returned by run_benchmarks)
+        current: New report
+        threshold: Allowed relative increase (0.2 = 20%)
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    previous = {(r['scenario'], r['rows_per_sheet']): r
+                for r in baseline['results'] if r.get('status') == 'ok'}
+    regressions = []
+    for result in current['results']:
+        key = (result['scenario'], result['rows_per_sheet'])
+        before = previous.get(key)
+        if before is None:
+            continue
+        label = f"{key[0]} @ {key[1]:,} rows/sheet"
+        if result.get('status') != 'ok':
+            regressions.append(f"{label}: {result['status']} (was ok)")
+            continue
+        for metric, unit in (('seconds', 's'), ('peak_rss_mb', 'MB')):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                change = result[metric] / before[metric] - 1
+                regressions.append(f"{label}: {metric} {before[metric]:.2f} → "
+                                   f"{result[metric]:.2f} {unit} (+{change:.0%})")
+    return regressions
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark workbook generation, deployment and loading'
+    )
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='Rows per sheet (default: 1000 100000 1000000)')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS,
+                        help='Scenarios to run (default: all)')
+    parser.add_argument('--sheets', nargs='+', choices=list(TRACKING_SHEETS), metavar='SHEET',
+                        help='Tracking sheets to fill (default: all)')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help=f'Seconds allowed per scenario (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='JSON results file (default: benchmark_results.json)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='Compare with an earlier results file; exit 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown/memory growth for --compare (default: 0.20)')
+
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Benchmark Suite")
+    print("=" * 70)
+    print()
+
+    report = run_benchmarks(args.rows, args.scenarios, args.sheets, args.timeout)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print()
+    print(f"💾 Results written to: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.threshold)
+        print()
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  • {line}")
+            return 1
+        print(f"✅ No regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Build Cache for the Generated Workbooks
+
+Generated workbooks are reproducible: the same sheet schema, input data and
+vbaProject.bin always give byte-identical files. A build is therefore named
+by a hash of its inputs, and when nothing has changed the stored artifact is
+copied to the output instead of being rebuilt.
+
+The key covers:
+    • The kind of artifact and the builder options
+    • The sheet schema (headers and formula columns)
+    • The input data: export files by content, in-memory rows by value
+    • Input files such as the source workbook and vbaProject.bin
+    • The builder scripts and the openpyxl/xlsxwriter versions, since they
+      decide the bytes written
+    • SOURCE_DATE_EPOCH, which sets the recorded build time
+
+Usage:
+    from build_cache import BuildCache
+    generator.generate(data=data, cache=BuildCache())
+
+    python3 create_formula_based_excel.py --cache-dir /tmp/ecom-cache
+    python3 deploy_xlsm.py --no-build-cache
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from importlib import metadata
+
+# Bump when the key layout changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'ecom-tracking',
+)
+
+# Scripts whose code decides the bytes of a build
+BUILDER_SOURCES = [
+    'build_cache.py', 'bulk_import.py', 'column_writer.py', 'create_formula_based_excel.py',
+    'deploy_xlsm.py', 'kpi_engine.py', 'parallel_generator.py', 'workbook_snapshot.py',
+    'xlsx_package.py', 'xml_loader.py',
+]
+
+# Libraries whose version decides the bytes of a build
+BUILDER_PACKAGES = ['openpyxl', 'xlsxwriter']
+
+
+def hash_file(path, digest=None):
+    """
+    Feed a file's content into a hashlib digest, 1 MB at a time
+
+    Returns:
+        The digest (a new sha256 when none is given)
+    """
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest
+
+
+def builder_fingerprint():
+    """Hash of the builder scripts and library versions"""
+    digest = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in BUILDER_SOURCES:
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            digest.update(name.encode() + b'\0')
+            hash_file(path, digest)
+    for package in BUILDER_PACKAGES:
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = None
+        digest.update(f'{package}={version}\0'.encode())
+    return digest.hexdigest()
+
+
+def data_fingerprint(data):
+    """
+    Hash of the rows passed to a generator
+
+    Sources with a ``fingerprint()`` method (e.g. bulk_import.TrackingImport)
+    hash themselves; lists and tuples of rows are hashed by value.
+
+    Returns:
+        str: Hex digest, or None when the data cannot be hashed without
+        consuming it (generators and other one-shot iterables)
+    """
+    digest = hashlib.sha256()
+    for sheet_name in sorted(data or {}):
+        rows = data[sheet_name]
+        digest.update(sheet_name.encode() + b'\0')
+        if hasattr(rows, 'fingerprint'):
+            digest.update(rows.fingerprint().encode())
+        elif isinstance(rows, (list, tuple)):
+            for row in rows:
+                digest.update(repr(tuple(row)).encode() + b'\n')
+        else:
+            return None
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Stores built workbooks under the hash of their inputs
+
+    Artifacts live in ``<directory>/<key[:2]>/<key><suffix>`` next to a JSON
+    manifest holding the artifact's SHA-256, which is checked before reuse.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or DEFAULT_CACHE_DIR
+
+    def key(self, kind, schema=None, options=None, data=None, files=()):
+        """
+        Compute the cache key of a build
+
+        Args:
+            kind: Name of the artifact type, e.g. 'formula-workbook'
+            schema: JSON-serializable sheet schema
+            options: JSON-serializable builder options
+            data: Optional mapping of sheet name to rows (see data_fingerprint)
+            files: Paths of input files, hashed by content
+
+        Returns:
+            str: Hex digest, or None when the build cannot be cached
+        """
+        data_hash = data_fingerprint(data)
+        if data and data_hash is None:
+            return None
+        inputs = {
+            'version': CACHE_VERSION,
+            'kind': kind,
+            'schema': schema,
+            'options': options,
+            'data': data_hash if data else None,
+            'files': [hash_file(path).hexdigest() for path in files],
+            'builder': builder_fingerprint(),
+            'source_date_epoch': os.environ.get('SOURCE_DATE_EPOCH'),
+        }
+        encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def artifact_path(self, key, suffix):
+        """Path of the stored artifact for a key"""
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def _manifest_path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def fetch(self, key, output_path):
+        """
+        Copy the cached artifact for a key to output_path
+
+        Returns:
+            bool: True on a hit; False when the key is not cached (corrupt
+            entries are removed)
+        """
+        suffix = os.path.splitext(output_path)[1]
+        artifact = self.artifact_path(key, suffix)
+        try:
+            with open(self._manifest_path(key)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not os.path.exists(artifact) or \
+                hash_file(artifact).hexdigest() != manifest.get('sha256'):
+            for path in (artifact, self._manifest_path(key)):
+                if os.path.exists(path):
+                    os.unlink(path)
+            return False
+        shutil.copyfile(artifact, output_path)
+        return True
+
+    def store(self, key, artifact_path):
+        """
+        Add a built artifact to the cache
+
+        Returns:
+            str: Path of the stored copy
+        """
+        suffix = os.path.splitext(artifact_path)[1]
+        destination = self.artifact_path(key, suffix)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(destination))
+        os.close(fd)
+        try:
+            shutil.copyfile(artifact_path, tmp_path)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        manifest = {
+            'key': key,
+            'sha256': hash_file(destination).hexdigest(),
+            'size': os.path.getsize(destination),
+            'stored': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(self._manifest_path(key), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return destination
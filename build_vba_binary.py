@@ -2,23 +2,25 @@
 """
 Build vbaProject.bin from VBA source files
 
-This script attempts to create a vbaProject.bin file from .bas and .frm source files.
-It uses olefile to create the OLE compound file structure required by Excel.
-
-WARNING: This is an experimental script. The created vbaProject.bin may not work
-in all Excel versions. The most reliable method is to create it using Excel on Windows.
-
-For production use, consider:
-1. Creating vbaProject.bin once using Excel on Windows
-2. Committing vbaProject.bin to repository
-3. Using deploy_xlsm.py --with-vba for all future deployments
+This script creates vbaProject.bin from the .bas and .frm source files with
+vba_project.VBAProject: the OLE compound file and the MS-OVBA streams are
+written in pure Python, so it runs on Linux (and in CI) without Excel.
+
+The project holds the module sources but no compiled p-code; Excel compiles
+it the first time the workbook is opened. UserForms also need their designer
+(.frx); without it the form is skipped and must be imported in the VBA editor.
+
+Usage:
+    python3 build_vba_binary.py                 # Build unless vbaProject.bin exists
+    python3 build_vba_binary.py --force         # Rebuild from the sources
+    python3 deploy_xlsm.py --with-vba           # Then embed it
 """
 
-import olefile
+import argparse
 import os
-import struct
 import sys
-import zlib
+
+from vba_compression import compress
 
 def read_vba_source(filepath):
     """Read VBA source code from .bas or .frm file"""
@@ -31,67 +33,71 @@ def read_vba_source(filepath):
 
 def compress_vba_code(code):
     """
-    Compress VBA code using RLE compression (simplified version)
-    
-    Note: Real VBA compression is more complex and uses a proprietary algorithm.
-    This is a simplified version that may not work in all cases.
+    Compress VBA code with the MS-OVBA algorithm used in module streams
+
+    Args:
+        code: Module source text
+
+    Returns:
+        bytes: Compressed container (see vba_compression.py)
     """
-    # Convert to bytes
-    code_bytes = code.encode('utf-8')
-    
-    # Use simple compression (not actual VBA compression)
-    compressed = zlib.compress(code_bytes, 9)
-    
-    return compressed
+    # VBA stores source in the project's code page (Windows-1252)
+    return compress(code.encode('cp1252', errors='replace'))
 
-def create_minimal_vba_project(vba_module_path, vba_form_path=None, output_path='vbaProject.bin'):
+def create_minimal_vba_project(vba_module_path, vba_form_path=None, output_path='vbaProject.bin',
+                               workbook_path=None):
     """
-    Attempt to create a minimal vbaProject.bin file
-    
-    WARNING: This is experimental and may not work with all Excel versions.
+    Create vbaProject.bin from VBA source files
+
+    Args:
+        vba_module_path: Standard module (.bas)
+        vba_form_path: Optional UserForm (.frm, with its .frx designer)
+        output_path: Where to write vbaProject.bin
+        workbook_path: Workbook whose sheets get document modules
+            (default: ThisWorkbook only)
+
+    Returns:
+        bool: True if the project was written
     """
-    
+    from vba_project import VBAProject, workbook_documents
+
     print("=" * 70)
-    print("VBA PROJECT BINARY BUILDER (Experimental)")
+    print("VBA PROJECT BINARY BUILDER")
     print("=" * 70)
     print()
-    print("⚠️  WARNING: This is an experimental script!")
-    print()
-    print("   Creating a proper vbaProject.bin requires:")
-    print("   • Complex OLE structure")
-    print("   • Proprietary VBA compression")
-    print("   • Excel-specific metadata")
-    print("   • VBA bytecode compilation")
-    print()
-    print("   This script creates a MINIMAL structure that may not work.")
-    print("   Recommended approach: Create vbaProject.bin using Excel.")
-    print()
-    
-    # Read VBA source
-    vba_code = read_vba_source(vba_module_path)
-    if not vba_code:
+
+    if not os.path.exists(vba_module_path):
         print(f"❌ Error: Could not read VBA module: {vba_module_path}")
         return False
-    
-    print(f"✓ Read VBA module: {os.path.basename(vba_module_path)}")
-    print(f"  Size: {len(vba_code)} characters")
-    
-    # Read form if provided
-    frm_code = None
+
+    project = VBAProject()
+    if not workbook_path or not os.path.exists(workbook_path):
+        workbook_path = None
+    for name in workbook_documents(workbook_path):
+        project.add_document(name)
+    print(f"✓ Document modules: {len(project.modules)} (ThisWorkbook + sheets)")
+
+    module = project.add_source(vba_module_path)
+    print(f"✓ Read VBA module: {os.path.basename(vba_module_path)} ({module.name})")
+    print(f"  Size: {len(module.source)} characters")
+
     if vba_form_path and os.path.exists(vba_form_path):
-        frm_code = read_vba_source(vba_form_path)
-        print(f"✓ Read VBA form: {os.path.basename(vba_form_path)}")
-        print(f"  Size: {len(frm_code)} characters")
-    
-    print()
-    print("❌ LIMITATION:")
-    print("   Python cannot create a fully compatible vbaProject.bin without Excel.")
+        form = project.add_source(vba_form_path)
+        if form:
+            print(f"✓ Read VBA form: {os.path.basename(vba_form_path)} ({form.name})")
+            print(f"  Size: {len(form.source)} characters")
+
+    size = project.write(output_path)
     print()
-    print("   The OLE structure, VBA compression, and bytecode compilation")
-    print("   require proprietary Microsoft Office components.")
+    for warning in project.warnings:
+        print(f"⚠️  {warning}")
+    if project.warnings:
+        print()
+    print(f"✅ Created: {output_path}")
+    print(f"   Size: {size:,} bytes")
+    print(f"   Modules: {', '.join(m.name for m in project.modules if m.kind != 'document')}")
     print()
-    
-    return False
+    return True
 
 def create_vba_project_template():
     """
@@ -211,24 +217,31 @@ vbaProject.bin contains compiled code. Always:
 
 def main():
     """Main entry point"""
-    
+    parser = argparse.ArgumentParser(description='Build vbaProject.bin from VBA source files')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild even if vbaProject.bin exists (replaces a binary saved by Excel)')
+    parser.add_argument('--output', metavar='FILE', default=None,
+                        help='Output path (default: vbaProject.bin next to this script)')
+    args = parser.parse_args()
+
     base_dir = os.path.dirname(os.path.abspath(__file__))
     vba_module = os.path.join(base_dir, 'VBA_Modules.bas')
     vba_form = os.path.join(base_dir, 'BashQueryForm.frm')
-    output_bin = os.path.join(base_dir, 'vbaProject.bin')
+    workbook = os.path.join(base_dir, 'Ecom_Operations_Tracking_System.xlsx')
+    output_bin = args.output or os.path.join(base_dir, 'vbaProject.bin')
     
     # Check if vbaProject.bin already exists
-    if os.path.exists(output_bin):
+    if os.path.exists(output_bin) and not args.force:
         print(f"✓ vbaProject.bin already exists!")
         print(f"  Location: {output_bin}")
         size = os.path.getsize(output_bin)
         print(f"  Size: {size:,} bytes")
         print()
         print("You can now run: python3 deploy_xlsm.py --with-vba")
+        print("To rebuild it from the sources: python3 build_vba_binary.py --force")
         return 0
     
-    # Attempt to create (will explain limitations)
-    result = create_minimal_vba_project(vba_module, vba_form, output_bin)
+    result = create_minimal_vba_project(vba_module, vba_form, output_bin, workbook)
     
     if not result:
         print("=" * 70)
@@ -236,22 +249,9 @@ def main():
         print("=" * 70)
         print()
         create_vba_project_template()
-        print()
-        print("=" * 70)
-        print("QUICK STEPS:")
-        print("=" * 70)
-        print()
-        print("1. Run: python3 deploy_xlsm.py")
-        print("2. Open Ecom_Operations_Tracking_System.xlsm in Excel")
-        print("3. Press Alt+F11 → File → Import → VBA_Modules.bas")
-        print("4. Save and close Excel")
-        print("5. Run: python3 deploy_xlsm.py --extract Ecom_Operations_Tracking_System.xlsm")
-        print("6. Run: python3 deploy_xlsm.py --with-vba")
-        print()
-        print("After step 5, vbaProject.bin is created and can be reused forever!")
-        print()
         return 1
     
+    print("You can now run: python3 deploy_xlsm.py --with-vba")
     return 0
 
 if __name__ == '__main__':
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Bulk CSV/Parquet Import for the Formula-Based Tracking System
+
+Maps WMS exports onto the tracking sheets by header name, so shifts no longer
+paste thousands of rows by hand:
+
+    • Source columns are matched to sheet headers by name ("wave_id",
+      "Wave ID" and "WAVE ID" all map to Wave ID); extra columns are ignored
+    • Files are read in chunks, so exports larger than memory can be imported
+    • Dates become Excel date serials, counts and percentages become numbers
+    • Duration, efficiency, variance and coverage formulas are written on
+      every imported row
+
+Usage:
+    python3 create_formula_based_excel.py --import waves.csv --import picks.parquet
+    python3 create_formula_based_excel.py --import "Wave Tracking=shift1.csv"
+
+    from bulk_import import import_sources
+    generator.generate(data=import_sources(['waves.csv', 'picks.parquet']))
+
+Parquet files need pyarrow (pip3 install pyarrow).
+"""
+
+import csv
+import hashlib
+import os
+import re
+from datetime import date, datetime, time
+from itertools import islice
+
+from openpyxl.utils.datetime import from_excel
+
+from create_formula_based_excel import DERIVED_COLUMNS, TRACKING_SHEETS
+
+# Source rows read and converted at a time
+CHUNK_ROWS = 10_000
+
+# Columns holding dates or times
+DATE_HEADERS = {
+    'Timestamp', 'Start Time', 'Target End', 'Actual End', 'Scheduled Date',
+    'Completion Date', 'Request Time', 'Received Time', 'Date', 'End Time', 'Date/Time',
+}
+
+# Columns holding counts, durations and amounts
+NUMBER_HEADERS = {
+    'Response Time (ms)', 'Tasks Total', 'Tasks Complete', 'Reorder Point',
+    'Current Stock', 'Order Qty', 'Items Processed', 'Items Audited', 'Pass', 'Fail',
+    'Items Picked', 'Target Time (mins)', 'Errors', 'Total Orders', 'Pending',
+    'Processing', 'Shipped', 'Delivered', 'Cancelled', 'Average Value',
+    'Tasks Completed', 'Average Time (mins)', 'System Count', 'Physical Count',
+}
+
+# Columns holding fractions; "95%" is read as 0.95. Training scores are
+# entered as percentages too (see the Employee Training instructions row).
+PERCENT_HEADERS = {'Accuracy %', 'Score'}
+
+# Text date formats tried after ISO 8601
+DATE_FORMATS = [
+    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y', '%m/%d/%y %H:%M', '%m/%d/%y',
+    '%d-%b-%Y %H:%M:%S', '%d-%b-%Y', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d',
+]
+TIME_FORMATS = ['%H:%M:%S', '%H:%M', '%I:%M %p', '%I:%M:%S %p']
+
+
+def normalize_header(header):
+    """
+    Header key used for matching, e.g. 'Duration (mins)' -> 'durationmins'
+
+    '%' counts as 'pct', so 'coverage_pct' matches 'Coverage %'.
+    """
+    return re.sub(r'[^a-z0-9]', '', str(header).lower().replace('%', 'pct'))
+
+
+def detect_sheet(headers):
+    """
+    Pick the tracking sheet whose headers best match a file's columns
+
+    Raises:
+        ValueError: If no sheet matches at least two columns, or two sheets
+            match equally well
+    """
+    keys = {normalize_header(h) for h in headers}
+    scores = sorted(
+        ((sum(normalize_header(h) in keys for h in sheet_headers), sheet_name)
+         for sheet_name, sheet_headers in TRACKING_SHEETS.items()),
+        reverse=True,
+    )
+    (best, sheet_name), (runner_up, _) = scores[0], scores[1]
+    if best < 2 or best == runner_up:
+        raise ValueError(
+            f"Cannot tell which sheet the columns {list(headers)} belong to; "
+            f"name it explicitly (e.g. 'Wave Tracking=file.csv')")
+    return sheet_name
+
+
+def _read_csv(path, chunk_rows):
+    """Yield the header, then lists of up to chunk_rows rows"""
+    # utf-8-sig strips the byte order mark Excel adds to CSV exports
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        yield next(reader, [])
+        while True:
+            chunk = list(islice(reader, chunk_rows))
+            if not chunk:
+                break
+            yield chunk
+
+
+def _read_parquet(path, chunk_rows):
+    """Yield the header, then lists of up to chunk_rows rows"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Reading Parquet files requires pyarrow: pip3 install pyarrow") from exc
+    parquet = pq.ParquetFile(path)
+    yield parquet.schema_arrow.names
+    for batch in parquet.iter_batches(batch_size=chunk_rows):
+        columns = [column.to_pylist() for column in batch.columns]
+        yield list(zip(*columns))
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Read a CSV or Parquet file in chunks
+
+    Yields:
+        The list of column names first, then lists of row tuples
+    """
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        return _read_parquet(path, chunk_rows)
+    return _read_csv(path, chunk_rows)
+
+
+def read_headers(path):
+    """Return the column names of a CSV or Parquet file"""
+    chunks = read_chunks(path, chunk_rows=1)
+    try:
+        return list(next(chunks))
+    finally:
+        chunks.close()
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _to_number(value, percent=False):
+    """Convert text such as '1,250', '$19.99' or '95%' to a number"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    text = str(value).strip().replace(',', '').lstrip('$')
+    scale = 1
+    if percent and text.endswith('%'):
+        text, scale = text[:-1], 100
+    try:
+        number = int(text)
+    except ValueError:
+        number = float(text)
+    return number / scale if scale != 1 else number
+
+
+def _to_date(value, formats):
+    """
+    Convert a date/time value to datetime (or time), which the writers store
+    as an Excel date serial
+
+    ``formats`` is shared per column so the format that worked last is tried first.
+    """
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, (date, time)):
+        return value
+    if isinstance(value, (int, float)):
+        return from_excel(value)
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for i, fmt in enumerate(formats):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if i:
+            formats.insert(0, formats.pop(i))
+        return parsed.time() if fmt in TIME_FORMATS else parsed
+    # Serial numbers exported as text
+    return from_excel(float(text))
+
+
+class ColumnMapping:
+    """How the columns of one source file map onto a tracking sheet"""
+
+    def __init__(self, sheet_name, source_headers, header_map=None):
+        self.sheet_name = sheet_name
+        headers = TRACKING_SHEETS[sheet_name]
+        derived = DERIVED_COLUMNS.get(sheet_name, {})
+        targets = {normalize_header(h): h for h in headers}
+        aliases = {normalize_header(src): dst for src, dst in (header_map or {}).items()}
+
+        self.sources = {}
+        self.ignored = []
+        # Source columns for formula columns are recalculated, not imported
+        self.replaced = []
+        for index, header in enumerate(source_headers):
+            key = normalize_header(header)
+            target = aliases.get(key) or targets.get(key)
+            if target in derived:
+                self.replaced.append(header)
+            elif target in headers and target not in self.sources:
+                self.sources[target] = index
+            else:
+                self.ignored.append(header)
+
+        self.columns = []
+        for header in headers:
+            if header in derived:
+                self.columns.append((None, 'formula', derived[header][0]))
+            elif header in self.sources:
+                kind = ('date' if header in DATE_HEADERS else
+                        'percent' if header in PERCENT_HEADERS else
+                        'number' if header in NUMBER_HEADERS else 'text')
+                self.columns.append((self.sources[header], kind, None))
+            else:
+                self.columns.append((None, 'blank', None))
+
+    def convert(self, source, date_formats, row_number=None, unconverted=None):
+        """
+        Build the sheet row of one source row
+
+        Args:
+            source: Sequence of source values, in source column order
+            date_formats: {column: formats} shared across rows (see _to_date)
+            row_number: Worksheet row for the per-row formulas; None leaves
+                the formula columns empty
+            unconverted: Optional {header: count} of cells kept as text
+                because they could not be converted
+
+        Returns:
+            list: Values in sheet header order
+        """
+        headers = TRACKING_SHEETS[self.sheet_name]
+        row = []
+        for i, (index, kind, template) in enumerate(self.columns):
+            if kind == 'formula':
+                row.append(template.format(row=row_number) if row_number is not None else None)
+                continue
+            value = source[index] if index is not None and index < len(source) else None
+            if kind == 'blank' or _blank(value):
+                row.append(None)
+                continue
+            try:
+                if kind == 'date':
+                    value = _to_date(value, date_formats.setdefault(i, DATE_FORMATS + TIME_FORMATS))
+                elif kind in ('number', 'percent'):
+                    value = _to_number(value, percent=kind == 'percent')
+            except (ValueError, TypeError, OverflowError):
+                if unconverted is not None:
+                    unconverted[headers[i]] = unconverted.get(headers[i], 0) + 1
+            row.append(value)
+        return row
+
+    def describe(self):
+        """One-line summary of the mapping"""
+        headers = TRACKING_SHEETS[self.sheet_name]
+        text = f"{len(self.sources)} of {len(headers)} columns"
+        if self.replaced:
+            text += f"; recalculated: {', '.join(map(str, self.replaced))}"
+        if self.ignored:
+            text += f"; ignored: {', '.join(map(str, self.ignored))}"
+        return text
+
+
+class TrackingImport:
+    """
+    CSV/Parquet exports to be imported into one tracking sheet
+
+    Pass it as a sheet's entry in the ``data`` mapping of
+    FormulaBasedExcelGenerator.generate() (or ParallelExcelGenerator). The
+    files are only read while the sheet is written, chunk by chunk.
+    """
+
+    def __init__(self, sheet_name, paths, header_map=None, chunk_rows=CHUNK_ROWS):
+        if sheet_name not in TRACKING_SHEETS:
+            raise ValueError(f"'{sheet_name}' is not a tracking sheet")
+        self.sheet_name = sheet_name
+        self.paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+        self.header_map = header_map
+        self.chunk_rows = chunk_rows
+        self.mappings = {path: ColumnMapping(sheet_name, read_headers(path), header_map)
+                         for path in self.paths}
+        # Cells kept as text because they could not be converted, per header
+        self.unconverted = {}
+
+    def fingerprint(self):
+        """Hash of the sheet, header map and file contents, for the build cache"""
+        digest = hashlib.sha256()
+        digest.update(self.sheet_name.encode() + b'\0')
+        digest.update(repr(sorted((self.header_map or {}).items())).encode() + b'\0')
+        for path in self.paths:
+            digest.update(f'{os.path.getsize(path)}\0'.encode())
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def iter_rows(self, first_row):
+        """
+        Yield the sheet rows of every file
+
+        Args:
+            first_row: Worksheet row number of the first imported row, used
+                for the per-row formulas
+        """
+        row_number = first_row
+        for path in self.paths:
+            mapping = self.mappings[path]
+            date_formats = {}
+            chunks = read_chunks(path, self.chunk_rows)
+            next(chunks)
+            for chunk in chunks:
+                for source in chunk:
+                    yield mapping.convert(source, date_formats, row_number, self.unconverted)
+                    row_number += 1
+
+
+def parse_source(spec):
+    """Split a '[SHEET=]PATH' command line value into (sheet or None, path)"""
+    sheet_name, sep, path = spec.partition('=')
+    if sep and sheet_name in TRACKING_SHEETS:
+        return sheet_name, path
+    return None, spec
+
+
+def import_sources(specs, header_map=None, chunk_rows=CHUNK_ROWS):
+    """
+    Group export files by tracking sheet
+
+    Args:
+        specs: File paths, optionally prefixed with a sheet name
+            ('Wave Tracking=waves.csv'); the sheet is detected from the
+            headers otherwise
+        header_map: Optional {source header: sheet header} for columns whose
+            names differ from the sheet's
+        chunk_rows: Rows read and converted at a time
+
+    Returns:
+        dict: Sheet name -> TrackingImport, ready to pass as ``data``
+    """
+    paths = {}
+    for spec in specs:
+        sheet_name, path = parse_source(spec)
+        if sheet_name is None:
+            headers = [header_map.get(h, h) for h in read_headers(path)] if header_map \
+                else read_headers(path)
+            sheet_name = detect_sheet(headers)
+        paths.setdefault(sheet_name, []).append(path)
+    return {sheet_name: TrackingImport(sheet_name, sheet_paths, header_map, chunk_rows)
+            for sheet_name, sheet_paths in paths.items()}
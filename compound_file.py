@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+"""
+OLE Compound File Writer and Reader
+
+vbaProject.bin is an OLE compound file ([MS-CFB]): a small FAT file system
+of 512-byte sectors holding storages (directories) and streams. This module
+writes version 3 compound files in pure Python, so VBA projects can be built
+on Linux without Office, and reads version 3 and 4 files lazily.
+
+Layout of a written file:
+
+    • Header sector (FAT and directory locations, first 109 DIFAT entries)
+    • Sectors of streams of 4096 bytes or more, each in one contiguous run
+    • The mini stream: smaller streams packed in 64-byte mini sectors
+    • The mini FAT, the directory and the FAT, then any DIFAT sectors
+
+All sector numbers are computed before anything is written, so the file is
+streamed to disk front to back in one pass. Timestamps are left empty and
+the directory trees are balanced deterministically, so the same streams
+always give the same bytes.
+
+The reader maps the file with mmap and parses only the header up front.
+Directory entries are found by searching the sibling trees, and FAT, mini FAT
+and stream sectors are read as a lookup reaches them, so reading one stream
+of a large file touches only the sectors on its way.
+
+Usage:
+    from compound_file import CompoundFileReader, CompoundFileWriter
+    writer = CompoundFileWriter()
+    writer.add_stream('VBA/dir', dir_stream)
+    writer.write('vbaProject.bin')
+
+    with CompoundFileReader('vbaProject.bin') as ole:
+        dir_stream = ole.read_stream('VBA/dir')
+"""
+
+import io
+import mmap
+import os
+import struct
+
+SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+SECTOR_SIZE = 512
+MINI_SECTOR_SIZE = 64
+MINI_STREAM_CUTOFF = 4096
+DIR_ENTRY_SIZE = 128
+
+# Special sector numbers
+DIFSECT = 0xFFFFFFFC
+FATSECT = 0xFFFFFFFD
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+# Directory entry object types
+STORAGE = 1
+STREAM = 2
+ROOT = 5
+
+BLACK = 1
+
+HEADER_DIFAT_ENTRIES = 109
+ENTRIES_PER_SECTOR = SECTOR_SIZE // 4
+
+_HEADER = struct.Struct('<8s16sHHHHH6sIIIIIIIII')
+_DIR_ENTRY = struct.Struct('<64sHBBIII16sIQQIQ')
+
+# Characters not allowed in storage and stream names
+INVALID_NAME_CHARS = set('/\\:!')
+
+
+class CompoundFileEntry:
+    """A storage or stream in the directory tree"""
+
+    def __init__(self, name, kind, data=b'', clsid=None):
+        if not name or len(name) > 31 or INVALID_NAME_CHARS & set(name):
+            raise ValueError(f"Invalid compound file entry name: {name!r}")
+        self.name = name
+        self.kind = kind
+        self.data = bytes(data)
+        self.clsid = clsid or bytes(16)
+        self.children = {}
+        # The root's size (that of the mini stream) and the directory links
+        # are filled in by the layout pass
+        self.size = len(self.data)
+        self.sid = None
+        self.start = ENDOFCHAIN
+        self.left = self.right = self.child = NOSTREAM
+
+    def sort_key(self):
+        """Sibling order of [MS-CFB] 2.6.4: shorter names first, then case-blind"""
+        return len(self.name), self.name.upper()
+
+
+def _balanced_tree(entries):
+    """Link sorted siblings into a balanced binary tree; return the root's SID"""
+    if not entries:
+        return NOSTREAM
+    middle = len(entries) // 2
+    node = entries[middle]
+    node.left = _balanced_tree(entries[:middle])
+    node.right = _balanced_tree(entries[middle + 1:])
+    return node.sid
+
+
+def _sectors(size, sector_size=SECTOR_SIZE):
+    return (size + sector_size - 1) // sector_size
+
+
+class CompoundFileWriter:
+    """
+    Build an OLE compound file from storages and streams
+
+    Paths use '/' between storage names, e.g. 'VBA/dir'. Storages on a path
+    are created as needed.
+    """
+
+    def __init__(self, clsid=None):
+        self.root = CompoundFileEntry('Root Entry', ROOT, clsid=clsid)
+
+    def _parent(self, parts):
+        node = self.root
+        for part in parts:
+            child = node.children.get(part.upper())
+            if child is None:
+                child = CompoundFileEntry(part, STORAGE)
+                node.children[part.upper()] = child
+            elif child.kind != STORAGE:
+                raise ValueError(f"{part!r} is a stream, not a storage")
+            node = child
+        return node
+
+    def add_storage(self, path, clsid=None):
+        """
+        Add a storage (created anyway when a stream is added below it)
+
+        Args:
+            path: Storage path
+            clsid: Optional 16-byte class ID
+        """
+        storage = self._parent(path.split('/'))
+        if clsid:
+            storage.clsid = clsid
+        return storage
+
+    def add_stream(self, path, data):
+        """
+        Add a stream, replacing any stream with the same path
+
+        Args:
+            path: Stream path
+            data: bytes-like stream content
+        """
+        *parents, name = path.split('/')
+        parent = self._parent(parents)
+        existing = parent.children.get(name.upper())
+        if existing is not None and existing.kind != STREAM:
+            raise ValueError(f"{path!r} is a storage, not a stream")
+        stream = CompoundFileEntry(name, STREAM, data)
+        parent.children[name.upper()] = stream
+        return stream
+
+    def _entries(self):
+        """All entries in directory order (root first), with SIDs assigned"""
+        entries = [self.root]
+        pending = [self.root]
+        while pending:
+            node = pending.pop(0)
+            for child in sorted(node.children.values(), key=CompoundFileEntry.sort_key):
+                child.sid = len(entries)
+                entries.append(child)
+                pending.append(child)
+        self.root.sid = 0
+        for entry in entries:
+            siblings = sorted(entry.children.values(), key=CompoundFileEntry.sort_key)
+            entry.child = _balanced_tree(siblings)
+        return entries
+
+    def _layout(self, entries):
+        """Assign sectors; return the layout used by write()"""
+        streams = [e for e in entries if e.kind == STREAM and e.data]
+        large = [e for e in streams if len(e.data) >= MINI_STREAM_CUTOFF]
+        small = [e for e in streams if len(e.data) < MINI_STREAM_CUTOFF]
+
+        next_sector = 0
+        for entry in large:
+            entry.start = next_sector
+            next_sector += _sectors(len(entry.data))
+
+        mini_fat = []
+        for entry in small:
+            entry.start = len(mini_fat)
+            count = _sectors(len(entry.data), MINI_SECTOR_SIZE)
+            mini_fat.extend(range(entry.start + 1, entry.start + count))
+            mini_fat.append(ENDOFCHAIN)
+        mini_stream_size = len(mini_fat) * MINI_SECTOR_SIZE
+        mini_stream_start = next_sector if mini_fat else ENDOFCHAIN
+        mini_stream_sectors = _sectors(mini_stream_size)
+        next_sector += mini_stream_sectors
+
+        mini_fat_start = next_sector if mini_fat else ENDOFCHAIN
+        mini_fat_sectors = _sectors(len(mini_fat) * 4)
+        next_sector += mini_fat_sectors
+
+        dir_start = next_sector
+        dir_sectors = _sectors(len(entries) * DIR_ENTRY_SIZE)
+        next_sector += dir_sectors
+
+        # The FAT also maps its own sectors and the DIFAT sectors
+        fat_sectors = difat_sectors = 0
+        while True:
+            total = next_sector + fat_sectors + difat_sectors
+            needed = _sectors(total * 4)
+            needed_difat = max(0, -(-(needed - HEADER_DIFAT_ENTRIES) // (ENTRIES_PER_SECTOR - 1)))
+            if (needed, needed_difat) == (fat_sectors, difat_sectors):
+                break
+            fat_sectors, difat_sectors = needed, needed_difat
+        fat_start = next_sector
+        difat_start = fat_start + fat_sectors
+
+        fat = []
+        chains = [(e.start, _sectors(len(e.data))) for e in large]
+        chains += [(mini_stream_start, mini_stream_sectors) if mini_fat else (0, 0),
+                   (mini_fat_start, mini_fat_sectors), (dir_start, dir_sectors)]
+        for start, count in chains:
+            if count:
+                fat.extend(range(start + 1, start + count))
+                fat.append(ENDOFCHAIN)
+        fat.extend([FATSECT] * fat_sectors)
+        fat.extend([DIFSECT] * difat_sectors)
+        fat.extend([FREESECT] * (fat_sectors * ENTRIES_PER_SECTOR - len(fat)))
+
+        self.root.start = mini_stream_start
+        self.root.size = mini_stream_size
+        return {
+            'large': large, 'small': small, 'mini_fat': mini_fat,
+            'mini_fat_start': mini_fat_start, 'mini_fat_sectors': mini_fat_sectors,
+            'dir_start': dir_start, 'fat': fat, 'fat_start': fat_start,
+            'fat_sectors': fat_sectors, 'difat_start': difat_start,
+            'difat_sectors': difat_sectors,
+        }
+
+    def _header(self, layout):
+        fat_ids = list(range(layout['fat_start'], layout['fat_start'] + layout['fat_sectors']))
+        difat = fat_ids[:HEADER_DIFAT_ENTRIES]
+        difat += [FREESECT] * (HEADER_DIFAT_ENTRIES - len(difat))
+        header = _HEADER.pack(
+            SIGNATURE, bytes(16), 0x003E, 0x0003, 0xFFFE, 9, 6, bytes(6),
+            0,                                  # directory sectors (0 in version 3)
+            layout['fat_sectors'], layout['dir_start'], 0, MINI_STREAM_CUTOFF,
+            layout['mini_fat_start'], layout['mini_fat_sectors'],
+            layout['difat_start'] if layout['difat_sectors'] else ENDOFCHAIN,
+            layout['difat_sectors'])
+        return header + struct.pack(f'<{HEADER_DIFAT_ENTRIES}I', *difat)
+
+    def _difat_sectors(self, layout):
+        fat_ids = list(range(layout['fat_start'], layout['fat_start'] + layout['fat_sectors']))
+        rest = fat_ids[HEADER_DIFAT_ENTRIES:]
+        per_sector = ENTRIES_PER_SECTOR - 1
+        for index in range(layout['difat_sectors']):
+            ids = rest[index * per_sector:(index + 1) * per_sector]
+            ids += [FREESECT] * (per_sector - len(ids))
+            last = index == layout['difat_sectors'] - 1
+            next_sector = ENDOFCHAIN if last else layout['difat_start'] + index + 1
+            yield struct.pack(f'<{ENTRIES_PER_SECTOR}I', *ids, next_sector)
+
+    @staticmethod
+    def _dir_entry(entry):
+        name = entry.name.encode('utf-16-le') + b'\x00\x00'
+        start = entry.start if entry.kind != STORAGE else 0
+        return _DIR_ENTRY.pack(name, len(name), entry.kind, BLACK, entry.left, entry.right,
+                               entry.child, entry.clsid, 0, 0, 0, start, entry.size)
+
+    def write(self, output):
+        """
+        Write the compound file
+
+        Args:
+            output: Path or binary file object
+
+        Returns:
+            int: Bytes written
+        """
+        if isinstance(output, (str, bytes)) or hasattr(output, '__fspath__'):
+            with open(output, 'wb') as f:
+                return self.write(f)
+
+        entries = self._entries()
+        layout = self._layout(entries)
+        written = 0
+
+        def emit(data, sector_size=SECTOR_SIZE):
+            nonlocal written
+            output.write(data)
+            pad = -len(data) % sector_size
+            if pad:
+                output.write(bytes(pad))
+            written += len(data) + pad
+
+        emit(self._header(layout))
+        for entry in layout['large']:
+            emit(entry.data)
+        if layout['small']:
+            mini_size = 0
+            for entry in layout['small']:
+                chunk = entry.data + bytes(-len(entry.data) % MINI_SECTOR_SIZE)
+                output.write(chunk)
+                mini_size += len(chunk)
+            pad = -mini_size % SECTOR_SIZE
+            output.write(bytes(pad))
+            written += mini_size + pad
+            mini_fat = layout['mini_fat']
+            mini_fat = mini_fat + [FREESECT] * (-len(mini_fat) % ENTRIES_PER_SECTOR)
+            emit(struct.pack(f'<{len(mini_fat)}I', *mini_fat))
+        directory = b''.join(self._dir_entry(entry) for entry in entries)
+        unused = _DIR_ENTRY.pack(bytes(64), 0, 0, 0, NOSTREAM, NOSTREAM, NOSTREAM,
+                                 bytes(16), 0, 0, 0, 0, 0)
+        directory += unused * (-len(entries) % (SECTOR_SIZE // DIR_ENTRY_SIZE))
+        emit(directory)
+        emit(struct.pack(f'<{len(layout["fat"])}I', *layout['fat']))
+        for sector in self._difat_sectors(layout):
+            emit(sector)
+        return written
+
+    def to_bytes(self):
+        """The compound file as bytes"""
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+
+class DirectoryEntry:
+    """A directory entry read from a compound file"""
+
+    __slots__ = ('sid', 'name', 'kind', 'left', 'right', 'child', 'start', 'size')
+
+    def __init__(self, sid, name, kind, left, right, child, start, size):
+        self.sid = sid
+        self.name = name
+        self.kind = kind
+        self.left = left
+        self.right = right
+        self.child = child
+        self.start = start
+        self.size = size
+
+    def sort_key(self):
+        return len(self.name), self.name.upper()
+
+
+class CompoundFileReader:
+    """
+    Read storages and streams of an OLE compound file
+
+    Args:
+        source: Path, binary file object with a fileno(), or bytes-like object
+        offset: Position of the compound file in the source, e.g. the data
+            of an uncompressed ZIP member
+
+    Raises:
+        ValueError: If the source is not a compound file
+    """
+
+    def __init__(self, source, offset=0):
+        self._file = None
+        self._map = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._data = bytes(source)
+        else:
+            if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+                source = self._file = open(source, 'rb')
+            self._data = self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self._base = offset
+        self._length = len(self._data) - offset
+
+        if self._length < SECTOR_SIZE or \
+                self._data[offset:offset + len(SIGNATURE)] != SIGNATURE:
+            self.close()
+            raise ValueError("Not an OLE compound file (bad signature)")
+        (_, _, _, self.major_version, _, sector_shift, mini_shift, _, _,
+         self._fat_count, self._first_dir, _, self._mini_cutoff, self._first_mini_fat,
+         self._mini_fat_count, self._first_difat, self._difat_count) = \
+            _HEADER.unpack_from(self._data, offset)
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_shift
+        self._per_sector = self.sector_size // 4
+        self._max_sectors = self._length // self.sector_size + 1
+
+        # Sector lists grown on demand by following their chains
+        self._fat_ids = list(struct.unpack_from(f'<{HEADER_DIFAT_ENTRIES}I', self._data,
+                                                offset + _HEADER.size))
+        self._next_difat = self._first_difat
+        self._dir_chain = [self._first_dir]
+        self._mini_fat_chain = [self._first_mini_fat] if self._mini_fat_count else []
+        self._mini_stream_chain = None
+        self._entries = {}
+
+    def close(self):
+        """Release the file mapping"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Sectors and chains
+
+    def _sector_offset(self, sector):
+        offset = (sector + 1) * self.sector_size
+        if sector >= DIFSECT or offset >= self._length:
+            raise ValueError(f"Sector {sector:#x} is outside the file")
+        return self._base + offset
+
+    def _fat_sector(self, index):
+        """Sector number of the index-th FAT sector, following the DIFAT chain as needed"""
+        while index >= len(self._fat_ids) and self._next_difat < DIFSECT:
+            position = self._sector_offset(self._next_difat)
+            ids = struct.unpack_from(f'<{self._per_sector}I', self._data, position)
+            self._fat_ids.extend(ids[:-1])
+            self._next_difat = ids[-1]
+        if index >= min(len(self._fat_ids), self._fat_count):
+            raise ValueError(f"FAT sector {index} does not exist")
+        return self._fat_ids[index]
+
+    def _next(self, sector):
+        """FAT entry of a sector: the next sector of its chain"""
+        fat_sector = self._fat_sector(sector // self._per_sector)
+        position = self._sector_offset(fat_sector) + (sector % self._per_sector) * 4
+        return struct.unpack_from('<I', self._data, position)[0]
+
+    def _extend_chain(self, chain, index):
+        """Follow a chain until it has index + 1 sectors; return that sector"""
+        while len(chain) <= index:
+            following = self._next(chain[-1])
+            if following >= DIFSECT or len(chain) > self._max_sectors:
+                raise ValueError("Sector chain ends early or loops")
+            chain.append(following)
+        return chain[index]
+
+    def _read_chain(self, start, size):
+        """Read size bytes of a regular sector chain, merging contiguous runs"""
+        out = bytearray(size)
+        filled = 0
+        sector = start
+        steps = 0
+        while filled < size:
+            if sector >= DIFSECT:
+                raise ValueError("Stream is shorter than its directory entry says")
+            run_start = sector
+            run = 1
+            while filled + run * self.sector_size < size:
+                following = self._next(sector)
+                if following != sector + 1:
+                    sector = following
+                    break
+                sector = following
+                run += 1
+            else:
+                sector = ENDOFCHAIN
+            take = min(run * self.sector_size, size - filled)
+            position = self._sector_offset(run_start)
+            out[filled:filled + take] = self._data[position:position + take]
+            filled += take
+            steps += run
+            if steps > self._max_sectors:
+                raise ValueError("Sector chain loops")
+        return bytes(out)
+
+    def _mini_next(self, mini_sector):
+        per_sector = self._per_sector
+        sector = self._extend_chain(self._mini_fat_chain, mini_sector // per_sector)
+        position = self._sector_offset(sector) + (mini_sector % per_sector) * 4
+        return struct.unpack_from('<I', self._data, position)[0]
+
+    def _read_mini_chain(self, start, size):
+        if self._mini_stream_chain is None:
+            root = self.entry(0)
+            self._mini_stream_chain = [root.start]
+        out = bytearray(size)
+        filled = 0
+        mini_sector = start
+        per_sector = self.sector_size // self.mini_sector_size
+        while filled < size:
+            if mini_sector >= DIFSECT or filled > self._length:
+                raise ValueError("Mini stream chain ends early or loops")
+            sector = self._extend_chain(self._mini_stream_chain, mini_sector // per_sector)
+            position = self._sector_offset(sector) + \
+                (mini_sector % per_sector) * self.mini_sector_size
+            take = min(self.mini_sector_size, size - filled)
+            out[filled:filled + take] = self._data[position:position + take]
+            filled += take
+            mini_sector = self._mini_next(mini_sector)
+        return bytes(out)
+
+    # Directory
+
+    def entry(self, sid):
+        """
+        Directory entry by stream ID
+
+        Args:
+            sid: Index of the entry in the directory
+
+        Returns:
+            DirectoryEntry: The parsed entry
+        """
+        cached = self._entries.get(sid)
+        if cached is not None:
+            return cached
+        per_sector = self.sector_size // DIR_ENTRY_SIZE
+        sector = self._extend_chain(self._dir_chain, sid // per_sector)
+        position = self._sector_offset(sector) + (sid % per_sector) * DIR_ENTRY_SIZE
+        (name, name_length, kind, _, left, right, child, _, _, _, _, start,
+         size) = _DIR_ENTRY.unpack_from(self._data, position)
+        if self.major_version == 3:
+            # Version 3 files may hold garbage in the high 32 bits
+            size &= 0xFFFFFFFF
+        name = name[:max(name_length - 2, 0)].decode('utf-16-le', errors='replace')
+        entry = DirectoryEntry(sid, name, kind, left, right, child, start, size)
+        self._entries[sid] = entry
+        return entry
+
+    def _siblings(self, sid):
+        """All entries of a sibling tree, in tree order"""
+        pending = [sid]
+        seen = set()
+        while pending:
+            sid = pending.pop()
+            if sid == NOSTREAM or sid in seen:
+                continue
+            seen.add(sid)
+            entry = self.entry(sid)
+            yield entry
+            pending.extend((entry.right, entry.left))
+
+    def _find_child(self, parent, name):
+        key = (len(name), name.upper())
+        sid = parent.child
+        steps = 0
+        # Binary search of the sibling tree; fall back to a full walk for
+        # writers that did not keep the tree ordered
+        while sid != NOSTREAM and steps <= len(self._entries) + 64:
+            entry = self.entry(sid)
+            entry_key = entry.sort_key()
+            if entry_key == key:
+                return entry
+            sid = entry.left if key < entry_key else entry.right
+            steps += 1
+        for entry in self._siblings(parent.child):
+            if entry.sort_key() == key:
+                return entry
+        return None
+
+    def find(self, path):
+        """
+        Directory entry of a storage or stream
+
+        Args:
+            path: '/'-separated path, e.g. 'VBA/dir'
+
+        Returns:
+            DirectoryEntry: The entry, or None if there is none
+        """
+        entry = self.entry(0)
+        for part in path.split('/'):
+            if entry.kind not in (STORAGE, ROOT):
+                return None
+            entry = self._find_child(entry, part)
+            if entry is None:
+                return None
+        return entry
+
+    def exists(self, path):
+        return self.find(path) is not None
+
+    def read_stream(self, path):
+        """
+        Read a whole stream
+
+        Args:
+            path: '/'-separated stream path
+
+        Returns:
+            bytes: Stream content
+
+        Raises:
+            KeyError: If there is no such stream
+        """
+        entry = path if isinstance(path, DirectoryEntry) else self.find(path)
+        if entry is None or entry.kind != STREAM:
+            raise KeyError(f"No stream {path!r} in the compound file")
+        if not entry.size:
+            return b''
+        if entry.size < self._mini_cutoff:
+            return self._read_mini_chain(entry.start, entry.size)
+        return self._read_chain(entry.start, entry.size)
+
+    def listdir(self, storage=''):
+        """
+        Paths of all streams below a storage
+
+        Args:
+            storage: Storage path ('' for the root)
+
+        Returns:
+            list: Stream paths, e.g. ['VBA/dir', ...]
+        """
+        parent = self.find(storage) if storage else self.entry(0)
+        paths = []
+        pending = [(parent, storage)]
+        while pending:
+            node, prefix = pending.pop()
+            for entry in self._siblings(node.child):
+                path = f'{prefix}/{entry.name}' if prefix else entry.name
+                if entry.kind == STREAM:
+                    paths.append(path)
+                elif entry.kind == STORAGE:
+                    pending.append((entry, path))
+        return sorted(paths)
@@ -6,39 +6,391 @@ This script creates an advanced Excel workbook with formulas instead of VBA.
 All calculations, metrics, and tracking are done using Excel formulas.
 
 Usage:
-    python3 create_formula_based_excel.py
+    python3 create_formula_based_excel.py                # Standard in-memory generation
+    python3 create_formula_based_excel.py --streaming    # Constant-memory write-only mode
+    python3 create_formula_based_excel.py --import waves.csv   # Bulk import a WMS export
 """
 
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter, column_index_from_string, quote_sheetname
+from openpyxl.utils.cell import coordinate_from_string
+from openpyxl.workbook.defined_name import DefinedName
 from datetime import datetime, timedelta
+import argparse
 import os
+import re
+
+from kpi_engine import cache_dashboard_values
+from xlsx_package import build_timestamp, make_reproducible
+
+
+# Column headers of each tracking sheet, in sheet order. Row 2 of every sheet
+# holds these headers, row 3 the HOW TO USE instructions, and data starts at
+# DATA_START_ROW. Until a sheet has data, that row holds its sample formulas.
+TRACKING_SHEETS = {
+    'Bash Queries Response':
+        ['Query ID', 'Timestamp', 'Query', 'Response', 'Response Time (ms)', 'Status'],
+    'Wave Tracking':
+        ['Wave ID', 'Start Time', 'Target End', 'Actual End', 'Duration (mins)',
+         'Tasks Total', 'Tasks Complete', 'Status', 'Notes'],
+    'Employee Training':
+        ['Employee ID', 'Name', 'Department', 'Training Module', 'Scheduled Date',
+         'Completion Date', 'Status', 'Score', 'Certifier', 'Notes'],
+    'Stock Replenishment':
+        ['Replen ID', 'SKU', 'Product Name', 'Reorder Point', 'Current Stock', 'Order Qty',
+         'Request Time', 'Received Time', 'Duration (hrs)', 'Status', 'Priority'],
+    'Quality Audit':
+        ['Audit ID', 'Date', 'Auditor', 'Items Processed', 'Items Audited', 'Coverage %',
+         'Pass', 'Fail', 'Pass Rate', 'Issues Found', 'Actions Taken'],
+    'Picking Tasks':
+        ['Task ID', 'Employee ID', 'Employee Name', 'Start Time', 'End Time', 'Items Picked',
+         'Target Time (mins)', 'Actual Time (mins)', 'Efficiency %', 'Errors', 'Status'],
+    'Order Volumes':
+        ['Date', 'Total Orders', 'Pending', 'Processing', 'Shipped', 'Delivered',
+         'Cancelled', 'Return Rate %', 'Average Value', 'Peak Hour'],
+    'Employee Performance':
+        ['Employee ID', 'Employee Name', 'Department', 'Date', 'Tasks Completed',
+         'Average Time (mins)', 'Accuracy %', 'Training Status', 'Performance Rating',
+         'Improvement Areas', 'Notes'],
+    'Inventory Mismatch':
+        ['Mismatch ID', 'Date', 'SKU', 'Product Name', 'System Count', 'Physical Count',
+         'Variance', 'Variance %', 'Root Cause', 'Resolution', 'Resolved By', 'Status'],
+    'System Errors':
+        ['Error ID', 'Date/Time', 'System/Module', 'Error Type', 'Severity', 'Description',
+         'Impact', 'Resolution', 'Resolved By', 'Status'],
+}
+
+DATA_START_ROW = 4
+
+# Per-row formula columns of the tracking sheets: header -> (formula template,
+# number format). The sample row carries them; imported rows get them too.
+DERIVED_COLUMNS = {
+    'Wave Tracking': {
+        'Duration (mins)': ('=(D{row}-B{row})*24*60', '0'),
+    },
+    'Stock Replenishment': {
+        'Duration (hrs)': ('=(H{row}-G{row})*24', '0.0'),
+    },
+    'Quality Audit': {
+        'Coverage %': ('=E{row}/D{row}', '0.0%'),
+        'Pass Rate': ('=G{row}/(G{row}+H{row})', '0.0%'),
+    },
+    'Picking Tasks': {
+        'Actual Time (mins)': ('=(E{row}-D{row})*24*60', '0'),
+        'Efficiency %': ('=G{row}/H{row}', '0%'),
+    },
+    'Order Volumes': {
+        'Return Rate %': ('=G{row}/B{row}', '0.0%'),
+    },
+    'Inventory Mismatch': {
+        'Variance': ('=F{row}-E{row}', None),
+        'Variance %': ('=(F{row}-E{row})/E{row}', '0.0%'),
+    },
+}
+
+# Sample row of the sheets with per-row formulas: {column: value} written
+# next to the formulas (see sample_formula) in DATA_START_ROW of an empty
+# sheet. Sheets given data get no sample row; the first data row takes its place.
+SAMPLE_ROWS = {
+    'Wave Tracking': {1: 'W-001', 9: '← Copy this formula down when you add data'},
+    'Stock Replenishment': {1: 'REP-001'},
+    'Quality Audit': {1: 'QA-001'},
+    'Picking Tasks': {1: 'PT-001'},
+    'Order Volumes': {},
+    'Inventory Mismatch': {1: 'INV-001'},
+}
+
+# Dashboard KPI rows, starting at DASHBOARD_KPI_ROW: metric, target label,
+# Current formula, Status formula and its default thresholds. In the Status
+# formula {cell} is the row's Current cell and {good}/{fair} the thresholds,
+# which a site can override (see dashboard_kpis).
+DASHBOARD_KPI_ROW = 6
+DASHBOARD_KPIS = [
+    ('Wave Completion (1 hour)', '100%',
+     '=COUNTIFS(WaveTracking_Status,"Complete",WaveTracking_DurationMins,"<=60")/COUNTIF(WaveTracking_Status,"Complete")',
+     '=IF({cell}>={good},"On Track",IF({cell}>={fair},"Needs Attention","Critical"))', ('0.95', '0.85')),
+    ('Employee Training Completion', '100%',
+     '=COUNTIF(EmployeeTraining_Status,"Completed")/COUNTA(EmployeeTraining_EmployeeID)',
+     '=IF({cell}>={good},"Excellent",IF({cell}>={fair},"Good","Needs Attention"))', ('0.95', '0.85')),
+    ('Stock Replenishment Time', '< 2 hours', '=AVERAGE(StockReplenishment_DurationHrs)',
+     '=IF({cell}<={good},"On Time",IF({cell}<={fair},"Delayed","Critical"))', ('2', '2.5')),
+    ('Quality Audit Coverage', '> 5%', '=AVERAGE(QualityAudit_CoveragePct)',
+     '=IF({cell}>={good},"Minimum",IF({cell}>={fair},"Good","Below Target"))', ('0.05', '0.07')),
+    ('Picking Efficiency', '> 95%', '=AVERAGE(PickingTasks_EfficiencyPct)',
+     '=IF({cell}>={good},"Excellent",IF({cell}>={fair},"Good","Needs Improvement"))', ('0.95', '0.90')),
+    ('SLA Compliance', '> 95%', '0.96',
+     '=IF({cell}>={good},"Excellent",IF({cell}>={fair},"Good","Below Target"))', ('0.95', '0.90')),
+    ('Inventory Accuracy', '> 99%',
+     '=1-ABS(SUM(InventoryMismatch_Variance))/SUM(InventoryMismatch_SystemCount)',
+     '=IF({cell}>={good},"Excellent",IF({cell}>={fair},"Good","Needs Improvement"))', ('0.99', '0.985')),
+    ('System Uptime', '> 99%', '0.992',
+     '=IF({cell}>={good},"Excellent",IF({cell}>={fair},"Good","Critical"))', ('0.99', '0.95')),
+]
+
+# Blank rows kept inside each named data range for manual entry below the
+# last pre-filled row
+RANGE_HEADROOM = 1000
+
+
+# Named cell styles shared by every sheet
+HEADER_STYLE = 'Ecom Header'
+TITLE_STYLE = 'Ecom Title'
+INSTRUCTION_STYLE = 'Ecom Instruction'
+WARNING_STYLE = 'Ecom Warning'
+SUCCESS_STYLE = 'Ecom Success'
+ALERT_STYLE = 'Ecom Alert'
+
+
+def build_named_styles():
+    """
+    Build the style registry used by the generator
+    
+    Each style is registered once per workbook and cells refer to it by name,
+    so styles.xml holds one entry per style rather than one per styled cell.
+    NamedStyle objects bind to a single workbook, so a fresh set is built for
+    every generator.
+    """
+    def solid(color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+    
+    thin = Side(style='thin')
+    centered = Alignment(horizontal='center', vertical='center')
+    return [
+        NamedStyle(name=HEADER_STYLE, fill=solid("366092"),
+                   font=Font(color="FFFFFF", bold=True, size=11), alignment=centered,
+                   border=Border(left=thin, right=thin, top=thin, bottom=thin)),
+        NamedStyle(name=TITLE_STYLE, fill=solid("4472C4"),
+                   font=Font(color="FFFFFF", bold=True, size=14), alignment=centered),
+        NamedStyle(name=INSTRUCTION_STYLE, fill=solid("D9E1F2"), font=Font(italic=True, size=9)),
+        NamedStyle(name=WARNING_STYLE, fill=solid("FFC7CE")),
+        NamedStyle(name=SUCCESS_STYLE, fill=solid("C6EFCE")),
+        NamedStyle(name=ALERT_STYLE, fill=solid("FFEB9C")),
+    ]
+
+
+def range_name(sheet_name, header):
+    """
+    Workbook-level name of a tracking column's data range
+    
+    e.g. ('Wave Tracking', 'Duration (mins)') -> 'WaveTracking_DurationMins'
+    """
+    def camel(text):
+        words = re.findall(r'[A-Za-z0-9]+', text.replace('%', ' Pct'))
+        return ''.join(word[:1].upper() + word[1:] for word in words)
+    return f"{camel(sheet_name)}_{camel(header)}"
+
+
+def data_range_refs(last_rows, headroom=RANGE_HEADROOM):
+    """
+    Return {range name: reference} for every tracking sheet column
+    
+    Each range starts at DATA_START_ROW. A sample row there adds nothing to
+    the KPIs (see sample_formula) until data is typed over it.
+    
+    Args:
+        last_rows: Mapping of sheet name to its last written row
+        headroom: Blank rows kept in each range below the last row
+    """
+    refs = {}
+    for sheet_name, headers in TRACKING_SHEETS.items():
+        first_row = DATA_START_ROW
+        last_row = max(last_rows.get(sheet_name, DATA_START_ROW), DATA_START_ROW) + headroom
+        for col, header in enumerate(headers, start=1):
+            letter = get_column_letter(col)
+            refs[range_name(sheet_name, header)] = (
+                f"{quote_sheetname(sheet_name)}!${letter}${first_row}:${letter}${last_row}")
+    return refs
+
+
+def dashboard_kpis(kpi_targets=None):
+    """
+    Dashboard KPI rows with any site-specific targets applied
+    
+    Args:
+        kpi_targets: Optional {metric: {'target': label, 'thresholds': [good, fair]}};
+            either key may be left out
+    
+    Returns:
+        list: (metric, target label, Current formula, Status formula,
+        Current number format) per row, from DASHBOARD_KPI_ROW down
+    
+    Raises:
+        ValueError: If a metric is unknown or thresholds are not a pair
+    """
+    kpi_targets = kpi_targets or {}
+    unknown = sorted(set(kpi_targets) - {kpi[0] for kpi in DASHBOARD_KPIS})
+    if unknown:
+        raise ValueError(f"Unknown KPI metric(s): {', '.join(unknown)}")
+    rows = []
+    for row, (name, target, current, status, thresholds) in enumerate(DASHBOARD_KPIS,
+                                                                      start=DASHBOARD_KPI_ROW):
+        # The number format follows the metric, not a site's target label
+        number_format = '0.0%' if '%' in target or 'hours' not in target else '0.0'
+        override = kpi_targets.get(name, {})
+        if 'thresholds' in override:
+            thresholds = override['thresholds']
+            if len(thresholds) != 2:
+                raise ValueError(f"{name}: thresholds must be [good, fair]")
+            thresholds = [str(value) for value in thresholds]
+        good, fair = thresholds
+        rows.append((name, override.get('target', target), current,
+                     status.format(cell=f'C{row}', good=good, fair=fair), number_format))
+    return rows
+
+
+def kpi_target_cells(kpi_targets):
+    """
+    Dashboard cells that differ from the defaults for the given targets
+    
+    Returns:
+        dict: Cell reference -> value (target labels in column B, Status
+        formulas in column D)
+    """
+    cells = {}
+    defaults = dashboard_kpis()
+    for row, (kpi, default) in enumerate(zip(dashboard_kpis(kpi_targets), defaults),
+                                         start=DASHBOARD_KPI_ROW):
+        if kpi[1] != default[1]:
+            cells[f'B{row}'] = kpi[1]
+        if kpi[3] != default[3]:
+            cells[f'D{row}'] = kpi[3]
+    return cells
+
+
+def derived_columns(sheet_name):
+    """
+    Return [(column index, formula template, number format)] of a sheet's
+    per-row formula columns
+    """
+    headers = TRACKING_SHEETS.get(sheet_name, [])
+    return [(headers.index(header) + 1, template, number_format)
+            for header, (template, number_format) in DERIVED_COLUMNS.get(sheet_name, {}).items()]
+
+
+def sample_formula(template, row):
+    """
+    A per-row formula as written in the sample row: "" until every cell it
+    reads holds a number, so AVERAGE and SUM over the named ranges skip the
+    sample row and count it once data is typed over it
+    
+    e.g. '=(H{row}-G{row})*24' -> '=IF(COUNT(G4,H4)<2,"",(H4-G4)*24)'
+    """
+    formula = template.format(row=row)[1:]
+    cells = sorted(set(re.findall(r'\b[A-Z]{1,3}%d\b' % row, formula)))
+    return f'=IF(COUNT({",".join(cells)})<{len(cells)},"",{formula})'
+
+
+def is_sample_row(sheet_name, values):
+    """
+    Whether a row holds a sheet's sample formulas rather than data
+    
+    Args:
+        sheet_name: Tracking sheet name
+        values: The row's values in column order; per-row formula columns
+            are not looked at
+    
+    Returns:
+        bool: True if every other cell is blank or holds the sample value
+    """
+    if sheet_name not in SAMPLE_ROWS:
+        return False
+    sample = SAMPLE_ROWS[sheet_name]
+    formulas = {col for col, _, _ in derived_columns(sheet_name)}
+    return all(value is None or value == '' or value != value or value == sample.get(col)
+               for col, value in enumerate(values, start=1) if col not in formulas)
+
+
+class StreamingSheet:
+    """
+    Worksheet adapter used in streaming mode.
+
+    The fixed layout of a sheet (titles, headers, instruction and sample rows)
+    is buffered as write-only cells through the same ``ws['A1']``/``ws.cell()``
+    calls the ``create_*`` methods already use. Data rows are then streamed
+    straight to the write-only worksheet, so memory stays flat no matter how
+    many rows are written.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.title = ws.title
+        self.column_dimensions = ws.column_dimensions
+        self._cells = {}
+        self._flushed = False
+
+    @property
+    def max_row(self):
+        return max((row for row, _ in self._cells), default=0)
+
+    @property
+    def max_column(self):
+        return max((col for _, col in self._cells), default=0)
+
+    def cell(self, row, column, value=None):
+        """Return the buffered layout cell at (row, column)"""
+        if self._flushed:
+            raise RuntimeError(f"Layout of '{self.title}' has already been written")
+        cell = self._cells.get((row, column))
+        if cell is None:
+            cell = WriteOnlyCell(self.ws)
+            self._cells[(row, column)] = cell
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def __getitem__(self, coordinate):
+        column, row = coordinate_from_string(coordinate)
+        return self.cell(row=row, column=column_index_from_string(column))
+
+    def __setitem__(self, coordinate, value):
+        self[coordinate].value = value
+
+    def merge_cells(self, range_string):
+        self.ws.merged_cells.add(range_string)
+
+    def flush_layout(self):
+        """Write the buffered layout rows in order"""
+        if self._flushed:
+            return
+        max_row, max_column = self.max_row, self.max_column
+        for row in range(1, max_row + 1):
+            self.ws.append([self._cells.get((row, col)) for col in range(1, max_column + 1)])
+        self._cells = {}
+        self._flushed = True
+
+    def append(self, row):
+        """Stream a data row below the layout"""
+        self.flush_layout()
+        self.ws.append(row)
+
 
 class FormulaBasedExcelGenerator:
     """Creates formula-only Excel workbook with dashboard and tracking sheets"""
     
-    def __init__(self):
-        self.wb = openpyxl.Workbook()
+    def __init__(self, streaming=False, range_headroom=RANGE_HEADROOM, cache_values=True,
+                 kpi_targets=None):
+        # Streaming mode uses openpyxl's write-only backend: rows are written
+        # to disk as they are produced instead of being held in memory
+        self.streaming = streaming
+        self.range_headroom = range_headroom
+        # Store Dashboard results as cached values so headless readers see them
+        self.cache_values = cache_values
+        # Site-specific Dashboard targets (see dashboard_kpis)
+        self.kpi_targets = kpi_targets or {}
+        dashboard_kpis(self.kpi_targets)
+        # Sheets build() writes data to; they get no sample row
+        self.data_sheets = set()
+        self.wb = openpyxl.Workbook(write_only=streaming)
         # Remove default sheet
         if 'Sheet' in self.wb.sheetnames:
             del self.wb['Sheet']
         
-        # Define styles
-        self.header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        self.header_font = Font(color="FFFFFF", bold=True, size=11)
-        self.title_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        self.title_font = Font(color="FFFFFF", bold=True, size=14)
-        self.warning_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-        self.success_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        self.alert_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-        
-        self.thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        # Register the shared styles once; cells refer to them by name
+        for style in build_named_styles():
+            self.wb.add_named_style(style)
+        self.center_alignment = Alignment(horizontal='center')
     
     def apply_header_style(self, ws, row, start_col=1, end_col=None):
         """Apply header styling to a row"""
@@ -46,18 +398,23 @@ class FormulaBasedExcelGenerator:
             end_col = ws.max_column
         
         for col in range(start_col, end_col + 1):
-            cell = ws.cell(row=row, column=col)
-            cell.fill = self.header_fill
-            cell.font = self.header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = self.thin_border
+            ws.cell(row=row, column=col).style = HEADER_STYLE
     
     def apply_title_style(self, ws, row, col):
         """Apply title styling to a cell"""
-        cell = ws.cell(row=row, column=col)
-        cell.fill = self.title_fill
-        cell.font = self.title_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
+        ws.cell(row=row, column=col).style = TITLE_STYLE
+    
+    def apply_instruction_style(self, ws, row, start_col, end_col):
+        """Apply the light blue HOW TO USE styling to a row"""
+        for col in range(start_col, end_col + 1):
+            ws.cell(row=row, column=col).style = INSTRUCTION_STYLE
+    
+    def create_sheet(self, title, index=None):
+        """Create a worksheet, wrapped for row streaming in streaming mode"""
+        ws = self.wb.create_sheet(title, index)
+        if self.streaming:
+            return StreamingSheet(ws)
+        return ws
     
     def set_column_widths(self, ws, widths):
         """Set column widths"""
@@ -66,7 +423,7 @@ class FormulaBasedExcelGenerator:
     
     def create_dashboard(self):
         """Create Dashboard sheet with formulas for KPI calculations"""
-        ws = self.wb.create_sheet("Dashboard", 0)
+        ws = self.create_sheet("Dashboard", 0)
         
         # Title
         ws['A1'] = 'E-COMMERCE OPERATIONS DASHBOARD'
@@ -90,46 +447,23 @@ class FormulaBasedExcelGenerator:
         self.apply_header_style(ws, 5, 1, 5)
         
         # KPI Rows with formulas
-        kpis = [
-            ('Wave Completion (1 hour)', '100%', '=COUNTIFS(\'Wave Tracking\'!H:H,"Complete",\'Wave Tracking\'!E:E,"<=60")/COUNTIF(\'Wave Tracking\'!H:H,"Complete")', 
-             '=IF(C6>=0.95,"On Track",IF(C6>=0.85,"Needs Attention","Critical"))', '=NOW()'),
-            ('Employee Training Completion', '100%', '=COUNTIF(\'Employee Training\'!G:G,"Completed")/COUNTA(\'Employee Training\'!A:A)-1',
-             '=IF(C7>=0.95,"Excellent",IF(C7>=0.85,"Good","Needs Attention"))', '=NOW()'),
-            ('Stock Replenishment Time', '< 2 hours', '=AVERAGE(\'Stock Replenishment\'!I:I)',
-             '=IF(C8<=2,"On Time",IF(C8<=2.5,"Delayed","Critical"))', '=NOW()'),
-            ('Quality Audit Coverage', '> 5%', '=AVERAGE(\'Quality Audit\'!F:F)',
-             '=IF(C9>=0.05,"Minimum",IF(C9>=0.07,"Good","Below Target"))', '=NOW()'),
-            ('Picking Efficiency', '> 95%', '=AVERAGE(\'Picking Tasks\'!I:I)',
-             '=IF(C10>=0.95,"Excellent",IF(C10>=0.90,"Good","Needs Improvement"))', '=NOW()'),
-            ('SLA Compliance', '> 95%', '0.96',
-             '=IF(C11>=0.95,"Excellent",IF(C11>=0.90,"Good","Below Target"))', '=NOW()'),
-            ('Inventory Accuracy', '> 99%', '=1-ABS(SUM(\'Inventory Mismatch\'!G:G))/SUM(\'Inventory Mismatch\'!E:E)',
-             '=IF(C12>=0.99,"Excellent",IF(C12>=0.985,"Good","Needs Improvement"))', '=NOW()'),
-            ('System Uptime', '> 99%', '0.992',
-             '=IF(C13>=0.99,"Excellent",IF(C13>=0.95,"Good","Critical"))', '=NOW()'),
-        ]
-        
-        row = 6
-        for kpi_name, target, current, status, last_updated in kpis:
+        row = DASHBOARD_KPI_ROW
+        for kpi_name, target, current, status, number_format in dashboard_kpis(self.kpi_targets):
             ws.cell(row=row, column=1, value=kpi_name)
             ws.cell(row=row, column=2, value=target)
             ws.cell(row=row, column=3, value=current)
             ws.cell(row=row, column=4, value=status)
-            ws.cell(row=row, column=5, value=last_updated)
+            ws.cell(row=row, column=5, value='=NOW()')
             
             # Format current column based on type
-            current_cell = ws.cell(row=row, column=3)
-            if '%' in target or 'hours' not in target:
-                current_cell.number_format = '0.0%'
-            else:
-                current_cell.number_format = '0.0'
+            ws.cell(row=row, column=3).number_format = number_format
             
             # Format last updated
             ws.cell(row=row, column=5).number_format = 'yyyy-mm-dd hh:mm'
             
             # Apply conditional formatting to status
             status_cell = ws.cell(row=row, column=4)
-            status_cell.alignment = Alignment(horizontal='center')
+            status_cell.alignment = self.center_alignment
             
             row += 1
         
@@ -140,20 +474,20 @@ class FormulaBasedExcelGenerator:
         
         row += 2
         ws[f'A{row}'] = 'Total Orders Today'
-        ws[f'B{row}'] = '=SUM(\'Order Volumes\'!B3:B3)'
+        ws[f'B{row}'] = '=SUM(OrderVolumes_TotalOrders)'
         ws[f'B{row}'].number_format = '#,##0'
         
         row += 1
         ws[f'A{row}'] = 'Active Employees'
-        ws[f'B{row}'] = '=COUNTA(\'Employee Performance\'!A:A)-1'
+        ws[f'B{row}'] = '=COUNTA(EmployeePerformance_EmployeeID)'
         
         row += 1
         ws[f'A{row}'] = 'Pending Tasks'
-        ws[f'B{row}'] = '=COUNTIF(\'Wave Tracking\'!H:H,"In Progress")+COUNTIF(\'Picking Tasks\'!K:K,"In Progress")'
+        ws[f'B{row}'] = '=COUNTIF(WaveTracking_Status,"In Progress")+COUNTIF(PickingTasks_Status,"In Progress")'
         
         row += 1
         ws[f'A{row}'] = 'System Alerts'
-        ws[f'B{row}'] = '=COUNTIF(\'System Errors\'!J:J,"Open")'
+        ws[f'B{row}'] = '=COUNTIF(SystemErrors_Status,"Open")'
         
         # Critical Alerts
         row += 2
@@ -179,7 +513,7 @@ class FormulaBasedExcelGenerator:
     
     def create_bash_queries(self):
         """Create Bash Queries Response sheet"""
-        ws = self.wb.create_sheet("Bash Queries Response")
+        ws = self.create_sheet("Bash Queries Response")
         
         # Title
         ws['A1'] = 'BASH QUERIES RESPONSE LOG'
@@ -187,7 +521,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Query ID', 'Timestamp', 'Query', 'Response', 'Response Time (ms)', 'Status']
+        headers = TRACKING_SHEETS['Bash Queries Response']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 6)
@@ -201,11 +535,7 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=6, value='Enter status: Completed, Pending, or Failed')
         
         # Make instructions row stand out with light blue background
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 7):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        self.apply_instruction_style(ws, 3, 1, 6)
         
         self.set_column_widths(ws, [12, 20, 35, 50, 18, 12])
         
@@ -213,7 +543,7 @@ class FormulaBasedExcelGenerator:
     
     def create_wave_tracking(self):
         """Create Wave Tracking sheet with duration formulas"""
-        ws = self.wb.create_sheet("Wave Tracking")
+        ws = self.create_sheet("Wave Tracking")
         
         # Title
         ws['A1'] = 'WAVE TRACKING - 1 HOUR COMPLETION MONITORING'
@@ -221,8 +551,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Wave ID', 'Start Time', 'Target End', 'Actual End', 'Duration (mins)', 
-                   'Tasks Total', 'Tasks Complete', 'Status', 'Notes']
+        headers = TRACKING_SHEETS['Wave Tracking']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 9)
@@ -238,18 +567,11 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=8, value='Status: Complete or In Progress')
         ws.cell(row=3, column=9, value='Optional notes')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 10):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 9)
         
         # Add a sample formula in row 4 for Duration column to show how it works
-        ws.cell(row=4, column=1, value='W-001')
-        ws.cell(row=4, column=5, value='=(D4-B4)*24*60')
-        ws.cell(row=4, column=5).number_format = '0'
-        ws.cell(row=4, column=9, value='← Copy this formula down when you add data')
+        self.write_sample_row(ws)
         
         self.set_column_widths(ws, [12, 15, 15, 15, 15, 12, 15, 15, 35])
         
@@ -257,7 +579,7 @@ class FormulaBasedExcelGenerator:
     
     def create_employee_training(self):
         """Create Employee Training sheet"""
-        ws = self.wb.create_sheet("Employee Training")
+        ws = self.create_sheet("Employee Training")
         
         # Title
         ws['A1'] = 'EMPLOYEE TRAINING SCHEDULE & STATUS'
@@ -265,8 +587,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Employee ID', 'Name', 'Department', 'Training Module', 'Scheduled Date', 
-                   'Completion Date', 'Status', 'Score', 'Certifier', 'Notes']
+        headers = TRACKING_SHEETS['Employee Training']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 10)
@@ -283,12 +604,8 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=9, value='Name of certifier/trainer')
         ws.cell(row=3, column=10, value='Optional notes')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 11):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 10)
         
         self.set_column_widths(ws, [12, 20, 15, 20, 15, 15, 15, 10, 15, 20])
         
@@ -296,7 +613,7 @@ class FormulaBasedExcelGenerator:
     
     def create_stock_replenishment(self):
         """Create Stock Replenishment sheet with duration formulas"""
-        ws = self.wb.create_sheet("Stock Replenishment")
+        ws = self.create_sheet("Stock Replenishment")
         
         # Title
         ws['A1'] = 'STOCK REPLENISHMENT MONITORING'
@@ -304,8 +621,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Replen ID', 'SKU', 'Product Name', 'Reorder Point', 'Current Stock', 
-                   'Order Qty', 'Request Time', 'Received Time', 'Duration (hrs)', 'Status', 'Priority']
+        headers = TRACKING_SHEETS['Stock Replenishment']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 11)
@@ -323,17 +639,11 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=10, value='Status: In Progress or Complete')
         ws.cell(row=3, column=11, value='Priority: Low, Medium, High, Urgent')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 12):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 11)
         
         # Add sample formula in row 4
-        ws.cell(row=4, column=1, value='REP-001')
-        ws.cell(row=4, column=9, value='=(H4-G4)*24')
-        ws.cell(row=4, column=9).number_format = '0.0'
+        self.write_sample_row(ws)
         
         self.set_column_widths(ws, [12, 12, 20, 12, 12, 12, 20, 20, 18, 15, 12])
         
@@ -341,7 +651,7 @@ class FormulaBasedExcelGenerator:
     
     def create_quality_audit(self):
         """Create Quality Audit sheet with formula-based calculations"""
-        ws = self.wb.create_sheet("Quality Audit")
+        ws = self.create_sheet("Quality Audit")
         
         # Title
         ws['A1'] = 'QUALITY AUDIT - 5%+ COVERAGE TRACKING'
@@ -349,8 +659,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Audit ID', 'Date', 'Auditor', 'Items Processed', 'Items Audited', 
-                   'Coverage %', 'Pass', 'Fail', 'Pass Rate', 'Issues Found', 'Actions Taken']
+        headers = TRACKING_SHEETS['Quality Audit']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 11)
@@ -368,19 +677,11 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=10, value='Description of issues')
         ws.cell(row=3, column=11, value='Corrective actions taken')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 12):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 11)
         
         # Add sample formulas in row 4
-        ws.cell(row=4, column=1, value='QA-001')
-        ws.cell(row=4, column=6, value='=E4/D4')
-        ws.cell(row=4, column=6).number_format = '0.0%'
-        ws.cell(row=4, column=9, value='=G4/(G4+H4)')
-        ws.cell(row=4, column=9).number_format = '0.0%'
+        self.write_sample_row(ws)
         
         self.set_column_widths(ws, [12, 20, 15, 15, 15, 15, 10, 10, 15, 30, 25])
         
@@ -388,7 +689,7 @@ class FormulaBasedExcelGenerator:
     
     def create_picking_tasks(self):
         """Create Picking Tasks sheet with efficiency formulas"""
-        ws = self.wb.create_sheet("Picking Tasks")
+        ws = self.create_sheet("Picking Tasks")
         
         # Title
         ws['A1'] = 'PICKING TASK MONITORING - EFFICIENCY TRACKING'
@@ -396,8 +697,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Task ID', 'Employee ID', 'Employee Name', 'Start Time', 'End Time', 
-                   'Items Picked', 'Target Time (mins)', 'Actual Time (mins)', 'Efficiency %', 'Errors', 'Status']
+        headers = TRACKING_SHEETS['Picking Tasks']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 11)
@@ -415,19 +715,11 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=10, value='Number of errors')
         ws.cell(row=3, column=11, value='Status: Complete or In Progress')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 12):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 11)
         
         # Add sample formulas in row 4
-        ws.cell(row=4, column=1, value='PT-001')
-        ws.cell(row=4, column=8, value='=(E4-D4)*24*60')
-        ws.cell(row=4, column=8).number_format = '0'
-        ws.cell(row=4, column=9, value='=G4/H4')
-        ws.cell(row=4, column=9).number_format = '0%'
+        self.write_sample_row(ws)
         
         self.set_column_widths(ws, [12, 12, 20, 20, 20, 12, 18, 20, 15, 10, 15])
         
@@ -435,7 +727,7 @@ class FormulaBasedExcelGenerator:
     
     def create_order_volumes(self):
         """Create Order Volumes sheet"""
-        ws = self.wb.create_sheet("Order Volumes")
+        ws = self.create_sheet("Order Volumes")
         
         # Title
         ws['A1'] = 'ORDER VOLUMES - DAILY TRENDS'
@@ -443,8 +735,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Date', 'Total Orders', 'Pending', 'Processing', 'Shipped', 
-                   'Delivered', 'Cancelled', 'Return Rate %', 'Average Value', 'Peak Hour']
+        headers = TRACKING_SHEETS['Order Volumes']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 10)
@@ -461,16 +752,11 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=9, value='Average order value')
         ws.cell(row=3, column=10, value='Peak hour (e.g., 14:00)')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 11):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 10)
         
         # Add sample formula in row 4
-        ws.cell(row=4, column=8, value='=G4/B4')
-        ws.cell(row=4, column=8).number_format = '0.0%'
+        self.write_sample_row(ws)
         
         self.set_column_widths(ws, [12, 12, 10, 12, 10, 10, 10, 18, 15, 12])
         
@@ -478,7 +764,7 @@ class FormulaBasedExcelGenerator:
     
     def create_employee_performance(self):
         """Create Employee Performance sheet"""
-        ws = self.wb.create_sheet("Employee Performance")
+        ws = self.create_sheet("Employee Performance")
         
         # Title
         ws['A1'] = 'EMPLOYEE PERFORMANCE METRICS'
@@ -486,8 +772,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Employee ID', 'Employee Name', 'Department', 'Date', 'Tasks Completed', 
-                   'Average Time (mins)', 'Accuracy %', 'Training Status', 'Performance Rating', 'Improvement Areas', 'Notes']
+        headers = TRACKING_SHEETS['Employee Performance']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 11)
@@ -505,12 +790,8 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=10, value='Areas for improvement')
         ws.cell(row=3, column=11, value='Additional notes')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 12):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 11)
         
         self.set_column_widths(ws, [12, 20, 12, 20, 15, 18, 12, 15, 22, 25, 25])
         
@@ -518,7 +799,7 @@ class FormulaBasedExcelGenerator:
     
     def create_inventory_mismatch(self):
         """Create Inventory Mismatch sheet with variance formulas"""
-        ws = self.wb.create_sheet("Inventory Mismatch")
+        ws = self.create_sheet("Inventory Mismatch")
         
         # Title
         ws['A1'] = 'INVENTORY MISMATCH - DISCREPANCY TRACKING'
@@ -526,8 +807,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Mismatch ID', 'Date', 'SKU', 'Product Name', 'System Count', 'Physical Count', 
-                   'Variance', 'Variance %', 'Root Cause', 'Resolution', 'Resolved By', 'Status']
+        headers = TRACKING_SHEETS['Inventory Mismatch']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 12)
@@ -546,18 +826,11 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=11, value='Person who resolved')
         ws.cell(row=3, column=12, value='Status: Open or Resolved')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 13):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 12)
         
         # Add sample formulas in row 4
-        ws.cell(row=4, column=1, value='INV-001')
-        ws.cell(row=4, column=7, value='=F4-E4')
-        ws.cell(row=4, column=8, value='=(F4-E4)/E4')
-        ws.cell(row=4, column=8).number_format = '0.0%'
+        self.write_sample_row(ws)
         
         self.set_column_widths(ws, [12, 20, 12, 20, 12, 15, 15, 18, 25, 25, 15, 12])
         
@@ -565,7 +838,7 @@ class FormulaBasedExcelGenerator:
     
     def create_system_errors(self):
         """Create System Errors sheet"""
-        ws = self.wb.create_sheet("System Errors")
+        ws = self.create_sheet("System Errors")
         
         # Title
         ws['A1'] = 'SYSTEM ERRORS LOG'
@@ -573,8 +846,7 @@ class FormulaBasedExcelGenerator:
         self.apply_title_style(ws, 1, 1)
         
         # Headers
-        headers = ['Error ID', 'Date/Time', 'System/Module', 'Error Type', 'Severity', 
-                   'Description', 'Impact', 'Resolution', 'Resolved By', 'Status']
+        headers = TRACKING_SHEETS['System Errors']
         for col, header in enumerate(headers, start=1):
             ws.cell(row=2, column=col, value=header)
         self.apply_header_style(ws, 2, 1, 10)
@@ -591,12 +863,8 @@ class FormulaBasedExcelGenerator:
         ws.cell(row=3, column=9, value='Person/team who resolved')
         ws.cell(row=3, column=10, value='Status: Open or Resolved')
         
-        # Make instructions row stand out
-        instruction_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        for col in range(1, 11):
-            cell = ws.cell(row=3, column=col)
-            cell.fill = instruction_fill
-            cell.font = Font(italic=True, size=9)
+        # Make instructions row stand out with light blue background
+        self.apply_instruction_style(ws, 3, 1, 10)
         
         self.set_column_widths(ws, [12, 20, 20, 18, 12, 35, 20, 30, 15, 12])
         
@@ -604,7 +872,7 @@ class FormulaBasedExcelGenerator:
     
     def create_insights(self):
         """Create Insights & Analytics sheet"""
-        ws = self.wb.create_sheet("Insights & Analytics")
+        ws = self.create_sheet("Insights & Analytics")
         
         # Title
         ws['A1'] = 'INSIGHTS & ANALYTICS'
@@ -709,64 +977,237 @@ class FormulaBasedExcelGenerator:
         
         return ws
     
-    def generate(self, filename='Ecom_Operations_Tracking_System_Formula_Based.xlsx'):
-        """Generate the complete workbook"""
-        print()
-        print("=" * 70)
-        print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
-        print("Formula-Based Excel Generator (No VBA)")
-        print("=" * 70)
-        print()
-        
-        print("📝 Creating sheets with formulas...")
-        
-        self.create_dashboard()
-        print("  ✓ Dashboard (with KPI formulas)")
-        
-        self.create_bash_queries()
-        print("  ✓ Bash Queries Response")
-        
-        self.create_wave_tracking()
-        print("  ✓ Wave Tracking (with duration formulas)")
-        
-        self.create_employee_training()
-        print("  ✓ Employee Training")
-        
-        self.create_stock_replenishment()
-        print("  ✓ Stock Replenishment (with duration formulas)")
-        
-        self.create_quality_audit()
-        print("  ✓ Quality Audit (with coverage & pass rate formulas)")
-        
-        self.create_picking_tasks()
-        print("  ✓ Picking Tasks (with efficiency formulas)")
+    def write_sample_row(self, ws):
+        """
+        Write a sheet's sample row (SAMPLE_ROWS and the per-row formulas)
+        
+        Sheets that build() is given data for get none: their first data row
+        is written in its place.
+        """
+        if ws.title in self.data_sheets:
+            return
+        for col, value in SAMPLE_ROWS[ws.title].items():
+            ws.cell(row=DATA_START_ROW, column=col, value=value)
+        self.write_derived_formulas(ws, DATA_START_ROW)
+    
+    def write_derived_formulas(self, ws, row):
+        """Write a sheet's per-row formulas (duration, efficiency, ...) into its sample row"""
+        for col, template, number_format in derived_columns(ws.title):
+            cell = ws.cell(row=row, column=col, value=sample_formula(template, row))
+            if number_format:
+                cell.number_format = number_format
+    
+    def define_data_ranges(self, last_rows):
+        """
+        Define a bounded named range for every tracking sheet column
+        
+        Dashboard formulas reference these names instead of whole columns, so
+        recalculation cost grows with the data rather than the sheet size.
+        
+        Args:
+            last_rows: Mapping of sheet name to its last written row
+        """
+        for name, ref in data_range_refs(last_rows, self.range_headroom).items():
+            self.wb.defined_names[name] = DefinedName(name, attr_text=ref)
+    
+    def write_rows(self, ws, rows):
+        """
+        Append data rows below a sheet's layout rows
+        
+        Args:
+            ws: Worksheet (or StreamingSheet) returned by a create_* method
+            rows: Iterable of row value lists, written in order
+        
+        Returns:
+            int: Number of rows written
+        """
+        # Formula columns keep the number format of the sample row
+        formats = [(col - 1, number_format) for col, _, number_format in derived_columns(ws.title)
+                   if number_format]
+        formulas = {col - 1 for col, _, _ in derived_columns(ws.title)}
+        count = 0
+        for row in rows:
+            row = list(row)
+            # openpyxl stores text starting with '=' as a formula; outside the
+            # formula columns it is data (e.g. an imported "=HYPERLINK(...)")
+            texts = [i for i, value in enumerate(row)
+                     if isinstance(value, str) and value[:1] == '=' and i not in formulas]
+            if texts and self.streaming:
+                for i in texts:
+                    row[i] = WriteOnlyCell(ws.ws, row[i])
+                    row[i].data_type = 's'
+            if formats:
+                if self.streaming:
+                    for i, number_format in formats:
+                        if i < len(row) and row[i] is not None:
+                            cell = WriteOnlyCell(ws.ws, row[i])
+                            cell.number_format = number_format
+                            row[i] = cell
+                    ws.append(row)
+                else:
+                    ws.append(row)
+                    for i, number_format in formats:
+                        if i < len(row) and row[i] is not None:
+                            ws.cell(row=ws.max_row, column=i + 1).number_format = number_format
+            else:
+                ws.append(row)
+            if texts and not self.streaming:
+                for i in texts:
+                    ws.cell(row=ws.max_row, column=i + 1).data_type = 's'
+            count += 1
         
-        self.create_order_volumes()
-        print("  ✓ Order Volumes (with return rate formulas)")
+        # In streaming mode the layout still has to be written for empty sheets
+        if self.streaming:
+            ws.flush_layout()
         
-        self.create_employee_performance()
-        print("  ✓ Employee Performance")
+        return count
+    
+    def build(self, data=None, progress=None):
+        """
+        Create all 12 sheets, write data rows and define the named ranges
+        
+        Args:
+            data: Optional mapping of sheet name to an iterable of data rows,
+                or to columns (see column_writer.py)
+            progress: Optional callable receiving one progress line per sheet
+        
+        Returns:
+            dict: Last written row of every sheet
+        """
+        # Imported here: column_writer imports this module
+        from column_writer import columns_to_sheets
+        data = columns_to_sheets(data)
+        self.data_sheets = set(data)
+        sheets = [
+            (self.create_dashboard, "Dashboard (with KPI formulas)"),
+            (self.create_bash_queries, "Bash Queries Response"),
+            (self.create_wave_tracking, "Wave Tracking (with duration formulas)"),
+            (self.create_employee_training, "Employee Training"),
+            (self.create_stock_replenishment, "Stock Replenishment (with duration formulas)"),
+            (self.create_quality_audit, "Quality Audit (with coverage & pass rate formulas)"),
+            (self.create_picking_tasks, "Picking Tasks (with efficiency formulas)"),
+            (self.create_order_volumes, "Order Volumes (with return rate formulas)"),
+            (self.create_employee_performance, "Employee Performance"),
+            (self.create_inventory_mismatch, "Inventory Mismatch (with variance formulas)"),
+            (self.create_system_errors, "System Errors"),
+            (self.create_insights, "Insights & Analytics"),
+        ]
         
-        self.create_inventory_mismatch()
-        print("  ✓ Inventory Mismatch (with variance formulas)")
+        last_rows = {}
+        for create, label in sheets:
+            ws = create()
+            layout_rows = ws.max_row
+            rows = data.get(ws.title, ())
+            # Data starts right below the layout rows, in place of the sample
+            # row; bulk import sources number their formula rows from there
+            if hasattr(rows, 'iter_rows'):
+                rows = rows.iter_rows(layout_rows + 1)
+            count = self.write_rows(ws, rows)
+            last_rows[ws.title] = layout_rows + count
+            if progress:
+                progress(f"  ✓ {label} - {count:,} data rows" if count else f"  ✓ {label}")
+        
+        unknown = sorted(set(data) - set(last_rows))
+        if unknown:
+            raise ValueError(f"Unknown sheet name(s) in data: {', '.join(unknown)}")
+        
+        self.define_data_ranges(last_rows)
+        return last_rows
+    
+    def save(self, output_path, progress=None):
+        """
+        Save the built workbook as a reproducible package
         
-        self.create_system_errors()
-        print("  ✓ System Errors")
+        The Dashboard values are evaluated and cached when ``cache_values`` is
+        set (see generate() for the recorded build time).
         
-        self.create_insights()
-        print("  ✓ Insights & Analytics")
+        Args:
+            output_path: Destination workbook
+            progress: Optional callable receiving progress lines
+        """
+        self.wb.save(output_path)
         
+        build_time = build_timestamp()
+        if self.cache_values:
+            if progress:
+                progress("🧮 Evaluating Dashboard KPIs...")
+            cache_dashboard_values(output_path, now=build_time, volatile=build_time is not None)
+        make_reproducible(output_path, build_time)
+    
+    def cache_key(self, cache, data=None):
+        """Build cache key for this generator's output, or None if uncacheable"""
+        return cache.key(
+            'formula-workbook',
+            schema={'sheets': TRACKING_SHEETS, 'derived': DERIVED_COLUMNS},
+            options={'streaming': self.streaming, 'range_headroom': self.range_headroom,
+                     'cache_values': self.cache_values, 'kpi_targets': self.kpi_targets},
+            data=data,
+        )
+    
+    def generate(self, filename='Ecom_Operations_Tracking_System_Formula_Based.xlsx', data=None,
+                 cache=None):
+        """
+        Generate the complete workbook
+        
+        The output is reproducible: the same data gives a byte-identical file.
+        The build time recorded in the file comes from SOURCE_DATE_EPOCH; when
+        it is unset, NOW()/TODAY() cells are left without a cached value.
+        
+        Args:
+            filename: Output file name (relative to this script's directory)
+            data: Optional mapping of sheet name to an iterable of data rows.
+                Rows are consumed lazily, so generators can be passed in
+                streaming mode to keep memory flat for very large sheets.
+            cache: Optional build_cache.BuildCache; an unchanged build is
+                copied from it instead of being regenerated
+        
+        Returns:
+            str: Path of the saved workbook
+        """
+        print()
+        print("=" * 70)
+        print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+        print("Formula-Based Excel Generator (No VBA)")
+        print("=" * 70)
         print()
-        print("💾 Saving workbook...")
         
         output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
-        self.wb.save(output_path)
+        key = self.cache_key(cache, data) if cache else None
+        if key and cache.fetch(key, output_path):
+            print(f"♻️  Inputs unchanged - reused cached build {key[:12]}")
+            print(f"✅ Success! File created: {filename}")
+            print()
+            return output_path
+        
+        if not data and not self.streaming:
+            # The empty layout is the same for every build: copy it from the
+            # pre-rendered snapshot instead of rebuilding it through openpyxl
+            from workbook_snapshot import get_snapshot
+            print("📸 Copying the pre-rendered sheet layout...")
+            snapshot = get_snapshot(self.range_headroom, self.cache_values, cache=cache)
+            snapshot.instantiate(output_path, self.kpi_targets)
+        else:
+            if self.streaming:
+                print("📝 Streaming sheets with formulas (write-only mode)...")
+            else:
+                print("📝 Creating sheets with formulas...")
+            
+            self.build(data, progress=print)
+            
+            print()
+            print("💾 Saving workbook...")
+            self.save(output_path, progress=print)
+        
+        if key:
+            cache.store(key, output_path)
         
         print(f"✅ Success! File created: {filename}")
         print()
         print("📊 Features Included:")
         print("  • 12 comprehensive tracking sheets")
         print("  • Dashboard with live KPI calculations")
+        if self.cache_values:
+            print("  • Cached KPI values readable without Excel")
         print("  • Automatic duration calculations")
         print("  • Coverage and efficiency formulas")
         print("  • Variance tracking formulas")
@@ -779,8 +1220,46 @@ class FormulaBasedExcelGenerator:
 
 def main():
     """Main entry point"""
-    generator = FormulaBasedExcelGenerator()
-    generator.generate()
+    parser = argparse.ArgumentParser(
+        description='Create the formula-based E-Commerce Operations Tracking workbook'
+    )
+    parser.add_argument('--streaming', action='store_true',
+                        help='Use the constant-memory write-only backend')
+    parser.add_argument('--no-cache-values', action='store_true',
+                        help='Skip storing evaluated Dashboard values in the file')
+    parser.add_argument('--output', metavar='FILE',
+                        default='Ecom_Operations_Tracking_System_Formula_Based.xlsx',
+                        help='Output file name')
+    parser.add_argument('--import', dest='imports', action='append', default=[],
+                        metavar='[SHEET=]FILE',
+                        help='Import rows from a CSV or Parquet export (repeatable); '
+                             'the sheet is detected from the headers unless given')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None,
+                        help='Build cache directory (default: ~/.cache/ecom-tracking)')
+    parser.add_argument('--no-build-cache', action='store_true',
+                        help='Always rebuild instead of reusing an unchanged build')
+    
+    args = parser.parse_args()
+    
+    data = None
+    if args.imports:
+        from bulk_import import import_sources
+        data = import_sources(args.imports)
+        for sheet_name, source in data.items():
+            for path, mapping in source.mappings.items():
+                print(f"📥 {os.path.basename(path)} → {sheet_name} ({mapping.describe()})")
+    
+    generator = FormulaBasedExcelGenerator(streaming=args.streaming,
+                                           cache_values=not args.no_cache_values)
+    cache = None
+    if not args.no_build_cache:
+        from build_cache import BuildCache
+        cache = BuildCache(args.cache_dir)
+    generator.generate(args.output, data=data, cache=cache)
+    
+    for sheet_name, source in (data or {}).items():
+        for header, count in source.unconverted.items():
+            print(f"⚠️  {sheet_name} / {header}: {count:,} value(s) kept as text")
 
 if __name__ == '__main__':
     main()
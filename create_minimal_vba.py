@@ -9,83 +9,19 @@ but the actual VBA code must still be imported through Excel.
 This is a bootstrap solution for environments without Excel.
 """
 
-import struct
+import io
 import os
 
-def create_minimal_ole_header():
-    """
-    Create a minimal OLE file header
-    
-    OLE files start with a specific signature and header structure.
-    """
-    # OLE file signature (8 bytes): D0 CF 11 E0 A1 B1 1A E1
-    signature = bytes([0xD0, 0xCF, 0x11, 0xE0, 0xA1, 0xB1, 0x1A, 0xE1])
-    
-    # Class ID (16 bytes of zeros)
-    clsid = bytes(16)
-    
-    # Minor version (2 bytes): 0x003E  
-    minor_version = struct.pack('<H', 0x003E)
-    
-    # Major version (2 bytes): 0x0003 for version 3, 0x0004 for version 4
-    major_version = struct.pack('<H', 0x0003)
-    
-    # Byte order (2 bytes): 0xFFFE for little-endian
-    byte_order = struct.pack('<H', 0xFFFE)
-    
-    # Sector size (2 bytes): 0x0009 (512 bytes)
-    sector_size = struct.pack('<H', 0x0009)
-    
-    # Mini sector size (2 bytes): 0x0006 (64 bytes)
-    mini_sector_size = struct.pack('<H', 0x0006)
-    
-    # Reserved (6 bytes of zeros)
-    reserved1 = bytes(6)
-    
-    # Total sectors (4 bytes): 0 for version 3
-    total_sectors = struct.pack('<I', 0)
-    
-    # FAT sectors (4 bytes)
-    fat_sectors = struct.pack('<I', 0)
-    
-    # First directory sector (4 bytes)
-    first_dir_sector = struct.pack('<I', 0)
-    
-    # Transaction signature (4 bytes)
-    trans_sig = struct.pack('<I', 0)
-    
-    # Mini stream cutoff size (4 bytes): 0x00001000 (4096 bytes)
-    mini_cutoff = struct.pack('<I', 0x00001000)
-    
-    # First mini FAT sector (4 bytes)
-    first_mini_fat = struct.pack('<I', 0xFFFFFFFE)
-    
-    # Total mini FAT sectors (4 bytes)
-    total_mini_fat = struct.pack('<I', 0)
-    
-    # First DIFAT sector (4 bytes)
-    first_difat = struct.pack('<I', 0xFFFFFFFE)
-    
-    # Total DIFAT sectors (4 bytes)
-    total_difat = struct.pack('<I', 0)
-    
-    # DIFAT array (436 bytes)
-    difat = struct.pack('<I', 0xFFFFFFFD) + (bytes([0xFF]) * 432)
-    
-    # Combine all parts
-    header = (signature + clsid + minor_version + major_version + byte_order +
-              sector_size + mini_sector_size + reserved1 + total_sectors +
-              fat_sectors + first_dir_sector + trans_sig + mini_cutoff +
-              first_mini_fat + total_mini_fat + first_difat + total_difat + difat)
-    
-    return header
+from vba_project import VBAProject, workbook_documents
 
 def create_bootstrap_vba_project():
     """
     Create a minimal bootstrap vbaProject.bin
     
-    This creates just enough structure for Excel to recognize the file
-    as containing macros, but the actual VBA code must be imported via Excel.
+    This creates an empty but valid VBA project (ThisWorkbook and one
+    document module per sheet) so Excel recognizes the file as containing
+    macros; the actual VBA code must be imported via Excel, or the complete
+    project built with build_vba_binary.py.
     """
     
     print("Creating minimal VBA project bootstrap...")
@@ -98,23 +34,17 @@ def create_bootstrap_vba_project():
     print()
     print("   You MUST still import VBA_Modules.bas using Excel:")
     print("   Alt+F11 → File → Import → VBA_Modules.bas")
+    print("   (or build the full project: python3 build_vba_binary.py --force)")
     print()
     
-    # Create OLE header
-    header = create_minimal_ole_header()
-    
-    # Pad to create a minimal valid OLE file (at least 512 bytes)
-    # Real VBA projects are much larger with complex structures
-    padding = bytes(512 - len(header)) if len(header) < 512 else bytes()
-    
-    minimal_vba = header + padding
-    
-    # Add a second sector with minimal directory entries
-    # This is highly simplified and may not work in all cases
-    dir_sector = bytes(512)
-    minimal_vba += dir_sector
+    workbook = 'Ecom_Operations_Tracking_System.xlsx'
+    project = VBAProject()
+    for name in workbook_documents(workbook if os.path.exists(workbook) else None):
+        project.add_document(name)
     
-    return minimal_vba
+    buffer = io.BytesIO()
+    project.write(buffer)
+    return buffer.getvalue()
 
 def main():
     """Main entry point"""
@@ -96,6 +96,14 @@ def extract_vba_from_xlsm(xlsm_file, output_bin):
                 print(f"✅ Successfully extracted vbaProject.bin")
                 print(f"   Size: {len(vba_data)} bytes")
                 print(f"   Saved to: {output_bin}")
+                
+                # List the modules by decompiling the dir stream
+                from vba_project import read_modules
+                try:
+                    for name, source in read_modules(vba_data).items():
+                        print(f"   • {name} ({len(source.splitlines())} lines)")
+                except (KeyError, ValueError) as e:
+                    print(f"   ⚠️  Could not read the modules: {e}")
                 return True
             else:
                 print(f"❌ No VBA project found in {xlsm_file}")
@@ -4,23 +4,26 @@ Script to create a deployment-ready .xlsm file with VBA code embedded.
 
 This script creates Ecom_Operations_Tracking_System.xlsm with all VBA code
 pre-installed, so users can simply open and use it without manual import.
+When vbaProject.bin is present it is injected into the existing .xlsx at the
+ZIP level, which keeps all formatting and takes about as long as a file copy.
 
 Requirements:
     - xlsxwriter (for creating Excel files with VBA support)
     - openpyxl (for reading existing Excel structure)
 """
 
-import xlsxwriter
-import openpyxl
 import os
 import sys
 from datetime import datetime
 
+from xlsx_package import inject_vba_project
+
 def create_xlsm_with_vba():
     """
     Create a macro-enabled Excel workbook with VBA code embedded.
     
-    This function:
+    If vbaProject.bin exists it is added to a copy of the .xlsx package
+    directly. Otherwise this function:
     1. Reads the structure from the existing .xlsx file
     2. Creates a new .xlsm file with xlsxwriter
     3. Embeds the VBA project binary
@@ -49,6 +52,23 @@ def create_xlsm_with_vba():
         print(f"❌ Error: VBA module not found: {vba_module}")
         return False
     
+    if os.path.exists(vba_bin):
+        print(f"✓ Injecting VBA project from: {os.path.basename(vba_bin)}")
+        try:
+            inject_vba_project(source_xlsx, vba_bin, output_xlsm)
+        except Exception as e:
+            print(f"❌ Error injecting VBA project: {e}")
+            return False
+        print()
+        print("✅ Successfully created macro-enabled workbook!")
+        print(f"   File: {output_xlsm}")
+        print(f"   Size: {os.path.getsize(output_xlsm) / 1024:.1f} KB")
+        return True
+    
+    # Only the rebuild needs the spreadsheet libraries
+    import openpyxl
+    import xlsxwriter
+    
     print(f"📂 Reading structure from: {os.path.basename(source_xlsx)}")
     
     # Read the existing workbook structure
@@ -65,14 +85,9 @@ def create_xlsm_with_vba():
     try:
         workbook = xlsxwriter.Workbook(output_xlsm, {'constant_memory': False})
         
-        # Add VBA project if binary exists
-        if os.path.exists(vba_bin):
-            print(f"✓ Embedding VBA project from: {os.path.basename(vba_bin)}")
-            workbook.add_vba_project(vba_bin)
-        else:
-            print(f"⚠ Warning: VBA binary not found: {os.path.basename(vba_bin)}")
-            print(f"  The .xlsm will be created but VBA code must be added manually.")
-            print(f"  See instructions in README_VBA.md")
+        print(f"⚠ Warning: VBA binary not found: {os.path.basename(vba_bin)}")
+        print(f"  The .xlsm will be created but VBA code must be added manually.")
+        print(f"  See instructions in README_VBA.md")
         
         # Create formats for styling
         header_format = workbook.add_format({
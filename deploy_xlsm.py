@@ -8,17 +8,111 @@ It automates the complete deployment process.
 Usage:
     python3 deploy_xlsm.py                    # Create .xlsm without VBA (needs manual import)
     python3 deploy_xlsm.py --with-vba         # Create .xlsm with VBA (requires vbaProject.bin)
+    python3 deploy_xlsm.py --with-vba --rebuild   # Re-create the sheets instead of injecting
     python3 deploy_xlsm.py --extract <file>   # Extract VBA from existing .xlsm
+    python3 deploy_xlsm.py --no-build-cache   # Rebuild even if nothing changed
 """
 
-import xlsxwriter
-import openpyxl
 import os
 import sys
 import argparse
 import zipfile
 from datetime import datetime
 
+# openpyxl and xlsxwriter are imported where the sheets are re-created, so
+# injecting, extracting and diffing VBA start without loading them
+from xlsx_package import (
+    build_timestamp, inject_vba_project, make_reproducible, sheet_layout, sheet_parts,
+)
+
+# openpyxl style names -> xlsxwriter format values
+BORDER_STYLES = [
+    None, 'thin', 'medium', 'dashed', 'dotted', 'thick', 'double', 'hair', 'mediumDashed',
+    'dashDot', 'mediumDashDot', 'dashDotDot', 'mediumDashDotDot', 'slantDashDot',
+]
+FILL_PATTERNS = [
+    None, 'solid', 'mediumGray', 'darkGray', 'lightGray', 'darkHorizontal', 'darkVertical',
+    'darkDown', 'darkUp', 'darkGrid', 'darkTrellis', 'lightHorizontal', 'lightVertical',
+    'lightDown', 'lightUp', 'lightGrid', 'lightTrellis', 'gray125', 'gray0625',
+]
+HORIZONTAL_ALIGN = {'centerContinuous': 'center_across'}
+VERTICAL_ALIGN = {'center': 'vcenter', 'justify': 'vjustify', 'distributed': 'vdistributed'}
+UNDERLINE = {'single': 1, 'double': 2, 'singleAccounting': 33, 'doubleAccounting': 34}
+
+
+def _rgb(color):
+    """'#RRGGBB' for an RGB or indexed openpyxl color; theme colors give None"""
+    if color is None:
+        return None
+    if color.type == 'rgb' and isinstance(color.rgb, str):
+        return '#' + color.rgb[-6:]
+    if color.type == 'indexed' and color.indexed < 64:
+        from openpyxl.styles.colors import COLOR_INDEX
+        return '#' + COLOR_INDEX[color.indexed][-6:]
+    return None
+
+
+def cell_format_options(cell):
+    """
+    xlsxwriter format properties equivalent to an openpyxl cell's style
+    
+    Covers the number format, font, solid and patterned fills, borders and
+    alignment. Theme colors are not resolved and fall back to the default.
+    """
+    options = {}
+    if cell.number_format != 'General':
+        options['num_format'] = cell.number_format
+    
+    font = cell.font
+    if font.name:
+        options['font_name'] = font.name
+    if font.sz:
+        options['font_size'] = font.sz
+    if font.b:
+        options['bold'] = True
+    if font.i:
+        options['italic'] = True
+    if font.strike:
+        options['font_strikeout'] = True
+    if font.u in UNDERLINE:
+        options['underline'] = UNDERLINE[font.u]
+    if _rgb(font.color):
+        options['font_color'] = _rgb(font.color)
+    
+    fill = cell.fill
+    if getattr(fill, 'patternType', None) in FILL_PATTERNS[1:]:
+        options['pattern'] = FILL_PATTERNS.index(fill.patternType)
+        if fill.patternType == 'solid':
+            if _rgb(fill.fgColor):
+                options['bg_color'] = _rgb(fill.fgColor)
+        else:
+            if _rgb(fill.fgColor):
+                options['fg_color'] = _rgb(fill.fgColor)
+            if _rgb(fill.bgColor):
+                options['bg_color'] = _rgb(fill.bgColor)
+    
+    for side in ('left', 'right', 'top', 'bottom'):
+        edge = getattr(cell.border, side)
+        if edge is not None and edge.style in BORDER_STYLES:
+            options[side] = BORDER_STYLES.index(edge.style)
+            if _rgb(edge.color):
+                options[f'{side}_color'] = _rgb(edge.color)
+    
+    alignment = cell.alignment
+    if alignment.horizontal and alignment.horizontal != 'general':
+        options['align'] = HORIZONTAL_ALIGN.get(alignment.horizontal, alignment.horizontal)
+    if alignment.vertical and alignment.vertical != 'bottom':
+        options['valign'] = VERTICAL_ALIGN.get(alignment.vertical, alignment.vertical)
+    if alignment.wrap_text:
+        options['text_wrap'] = True
+    if alignment.shrink_to_fit:
+        options['shrink'] = True
+    if alignment.indent:
+        options['indent'] = int(alignment.indent)
+    if alignment.text_rotation:
+        options['rotation'] = alignment.text_rotation
+    return options
+
 class XLSMDeployer:
     """Creates deployment-ready .xlsm files with optional VBA embedding"""
     
@@ -64,12 +158,17 @@ class XLSMDeployer:
         print()
         return True
     
-    def create_xlsm(self, include_vba=False):
+    def create_xlsm(self, include_vba=False, cache=None):
         """
         Create the .xlsm file with optional VBA embedding
         
+        The output is reproducible: the same source workbook and
+        vbaProject.bin give a byte-identical file.
+        
         Args:
             include_vba: If True, embed VBA from vbaProject.bin
+            cache: Optional build_cache.BuildCache; an unchanged build is
+                copied from it instead of being regenerated
         
         Returns:
             bool: True if successful
@@ -88,17 +187,35 @@ class XLSMDeployer:
                 print(f"  Creating .xlsm without embedded VBA.")
                 print(f"  See instructions below for adding VBA manually.")
         
-        # Read source workbook
+        key = None
+        if cache and os.path.exists(self.source_xlsx):
+            inputs = [self.source_xlsx] + ([self.vba_bin] if has_vba else [])
+            key = cache.key('xlsm', options={'include_vba': has_vba}, files=inputs)
+            if cache.fetch(key, self.output_xlsm):
+                print(f"♻️  Inputs unchanged - reused cached build {key[:12]}")
+                print(f"✅ Created: {os.path.basename(self.output_xlsm)}")
+                return True
+        
+        import openpyxl
+        import xlsxwriter
+        
+        # Open the source workbook for streaming (rows are read on demand)
         try:
-            wb_source = openpyxl.load_workbook(self.source_xlsx, data_only=False)
-            print(f"✓ Loaded source workbook: {len(wb_source.sheetnames)} sheets")
+            wb_source = openpyxl.load_workbook(self.source_xlsx, read_only=True, data_only=False)
+            with zipfile.ZipFile(self.source_xlsx) as zf:
+                parts = sheet_parts(zf)
+                layouts = {name: sheet_layout(zf, part) for name, part in parts.items()}
+            print(f"✓ Opened source workbook: {len(wb_source.sheetnames)} sheets")
         except Exception as e:
             print(f"❌ Error loading source workbook: {e}")
             return False
         
         # Create new workbook
         try:
-            workbook = xlsxwriter.Workbook(self.output_xlsm, {'constant_memory': False})
+            workbook = xlsxwriter.Workbook(self.output_xlsm, {
+                'constant_memory': True,
+                'strings_to_urls': False,
+            })
             
             # Add VBA project if available
             if has_vba:
@@ -106,78 +223,22 @@ class XLSMDeployer:
                 workbook.add_vba_project(self.vba_bin)
                 print(f"  VBA code is now embedded in the workbook!")
             
-            # Create cell formats
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#4472C4',
-                'font_color': 'white',
-                'border': 1,
-                'align': 'center',
-                'valign': 'vcenter'
-            })
-            
-            title_format = workbook.add_format({
-                'bold': True,
-                'font_size': 16,
-                'bg_color': '#D9E1F2',
-                'align': 'left'
-            })
-            
-            subtitle_format = workbook.add_format({
-                'italic': True,
-                'font_size': 10,
-                'font_color': '#666666'
-            })
-            
             # Copy sheets
             print()
             print("📑 Copying sheets:")
+            formats = {}
             for sheet_name in wb_source.sheetnames:
-                print(f"  → {sheet_name}")
-                ws_source = wb_source[sheet_name]
                 ws_dest = workbook.add_worksheet(sheet_name)
-                
-                # Copy cell values
-                max_row = 0
-                max_col = 0
-                for row_idx, row in enumerate(ws_source.iter_rows()):
-                    for col_idx, cell in enumerate(row):
-                        if cell.value is not None:
-                            max_row = max(max_row, row_idx)
-                            max_col = max(max_col, col_idx)
-                            
-                            # Apply formatting based on position
-                            if row_idx == 0 and sheet_name == 'Dashboard':
-                                ws_dest.write(row_idx, col_idx, cell.value, title_format)
-                            elif row_idx == 1 and sheet_name == 'Dashboard':
-                                ws_dest.write(row_idx, col_idx, cell.value, subtitle_format)
-                            elif row_idx == 0:
-                                ws_dest.write(row_idx, col_idx, cell.value, header_format)
-                            else:
-                                ws_dest.write(row_idx, col_idx, cell.value)
-                
-                # Set column widths
-                if sheet_name == 'Dashboard':
-                    ws_dest.set_column('A:A', 45)
-                    ws_dest.set_column('B:B', 15)
-                    ws_dest.set_column('C:C', 15)
-                    ws_dest.set_column('D:D', 20)
-                    ws_dest.set_column('E:E', 20)
-                elif 'Response' in sheet_name or 'Query' in sheet_name:
-                    ws_dest.set_column('A:B', 12)
-                    ws_dest.set_column('C:D', 20)
-                    ws_dest.set_column('E:G', 25)
-                    ws_dest.set_column('H:H', 30)
-                else:
-                    ws_dest.set_column('A:Z', 14)
-                
-                # Freeze first row for non-Dashboard sheets
-                if sheet_name != 'Dashboard':
-                    ws_dest.freeze_panes(1, 0)
+                rows = self.copy_sheet(wb_source[sheet_name], ws_dest, layouts[sheet_name],
+                                       workbook, formats)
+                print(f"  → {sheet_name} ({rows:,} rows)")
             
             # Close workbook
             workbook.close()
             wb_source.close()
+            make_reproducible(self.output_xlsm, build_timestamp())
+            if key:
+                cache.store(key, self.output_xlsm)
             
             print()
             print("=" * 70)
@@ -215,6 +276,107 @@ class XLSMDeployer:
             traceback.print_exc()
             return False
     
+    def inject_vba(self):
+        """
+        Create the .xlsm by adding vbaProject.bin to the source workbook
+        
+        Unlike create_xlsm(), the sheets are not re-created: the package is
+        patched at the ZIP level and every other part is copied unchanged,
+        so formatting is kept exactly and the cost is close to a file copy.
+        
+        Returns:
+            bool: True if successful
+        """
+        print("📝 Injecting VBA project into the workbook package...")
+        print()
+        if not os.path.exists(self.vba_bin):
+            print(f"❌ Error: VBA binary not found: {os.path.basename(self.vba_bin)}")
+            return False
+        print(f"✓ VBA binary found: {os.path.basename(self.vba_bin)}")
+        
+        try:
+            inject_vba_project(self.source_xlsx, self.vba_bin, self.output_xlsm)
+        except (OSError, zipfile.BadZipFile, KeyError) as e:
+            print(f"❌ Error injecting VBA project: {e}")
+            return False
+        
+        size_kb = os.path.getsize(self.output_xlsm) / 1024
+        print(f"✅ Created: {os.path.basename(self.output_xlsm)} ({size_kb:.1f} KB)")
+        print(f"   Location: {self.output_xlsm}")
+        print()
+        print("🎉 VBA code is EMBEDDED and ready to use!")
+        print("   Open the file, enable macros and press Alt + F8.")
+        return True
+    
+    def copy_sheet(self, ws_source, ws_dest, layout, workbook, formats):
+        """
+        Stream one sheet into a constant-memory xlsxwriter worksheet
+        
+        Rows are written as they are read, so only one row of each sheet is
+        in memory. Cell styles, merged ranges and column widths are carried
+        over; frozen panes too, falling back to a frozen title row on the
+        tracking sheets.
+        
+        Args:
+            ws_source: Read-only openpyxl worksheet
+            ws_dest: xlsxwriter worksheet
+            layout: xlsx_package.sheet_layout() of the source sheet
+            workbook: Destination xlsxwriter workbook
+            formats: Cache of xlsxwriter formats by source style, shared
+                across sheets
+        
+        Returns:
+            int: Number of rows copied
+        """
+        for first_col, last_col, width in layout['widths']:
+            # Pixel widths reproduce the stored width exactly
+            ws_dest.set_column_pixels(first_col - 1, last_col - 1, round(width * 7))
+        
+        if layout['freeze']:
+            ws_dest.freeze_panes(*layout['freeze'])
+        elif ws_source.title != 'Dashboard':
+            ws_dest.freeze_panes(1, 0)
+        
+        from openpyxl.utils.cell import range_boundaries
+        
+        # Merged ranges as 0-based (first row, first col, last row, last col), in row order
+        merges = sorted((min_row - 1, min_col - 1, max_row - 1, max_col - 1)
+                        for min_col, min_row, max_col, max_row in map(range_boundaries,
+                                                                      layout['merges']))
+        next_merge = 0
+        
+        # Don't trust the source's <dimension> record; rows are then not
+        # padded to its width, and gaps within a row come back as EmptyCell
+        ws_source.reset_dimensions()
+        rows = 0
+        for row_idx, row in enumerate(ws_source.iter_rows()):
+            # Record merges before writing their first row: with no format,
+            # merge_range() writes no blank cells into later rows, which
+            # constant-memory mode would flush the current row for
+            while next_merge < len(merges) and merges[next_merge][0] <= row_idx:
+                ws_dest.merge_range(*merges[next_merge], None)
+                next_merge += 1
+            for col_idx, cell in enumerate(row):
+                if cell.value is None and not getattr(cell, 'has_style', False):
+                    continue
+                cell_format = None
+                if cell.has_style:
+                    key = tuple(cell.style_array)
+                    cell_format = formats.get(key)
+                    if cell_format is None:
+                        cell_format = workbook.add_format(cell_format_options(cell))
+                        formats[key] = cell_format
+                if cell.value is None:
+                    ws_dest.write_blank(row_idx, col_idx, None, cell_format)
+                else:
+                    ws_dest.write(row_idx, col_idx, cell.value, cell_format)
+            rows += 1
+        
+        # Merges below the last row with cells
+        for merge in merges[next_merge:]:
+            ws_dest.merge_range(*merge, None)
+        return rows
+    
     def extract_vba(self, xlsm_file):
         """
         Extract vbaProject.bin from an existing .xlsm file
@@ -244,6 +406,7 @@ class XLSMDeployer:
                     print(f"✅ Successfully extracted vbaProject.bin")
                     print(f"   Size: {len(vba_data):,} bytes")
                     print(f"   Saved to: {self.vba_bin}")
+                    self.print_modules(vba_data)
                     print()
                     print("✓ You can now run this script with --with-vba to create")
                     print("  a new .xlsm file with the extracted VBA code embedded.")
@@ -255,6 +418,57 @@ class XLSMDeployer:
             print(f"❌ Error extracting VBA: {e}")
             return False
     
+    def print_modules(self, vba_project):
+        """List the modules of a VBA project with their line counts"""
+        from vba_project import read_modules
+        try:
+            modules = read_modules(vba_project)
+        except (KeyError, ValueError) as e:
+            print(f"   ⚠️  Could not read the modules: {e.args[0] if e.args else e}")
+            return
+        print(f"   Modules: {len(modules)}")
+        for name, source in modules.items():
+            print(f"     • {name} ({len(source.splitlines())} lines)")
+
+    def diff_vba(self, xlsm_files, show_diff=True):
+        """
+        Compare the macros embedded in .xlsm files with VBA_Modules.bas
+
+        Args:
+            xlsm_files: Workbooks (or vbaProject.bin files) to check
+            show_diff: Print the unified diff of changed modules
+
+        Returns:
+            bool: True if every file matches the sources
+        """
+        from vba_project import diff_modules
+        sources = [self.vba_module]
+        print(f"🔍 Comparing embedded VBA with {os.path.basename(self.vba_module)}")
+        print()
+        matching = 0
+        for xlsm_file in xlsm_files:
+            try:
+                changes = diff_modules(xlsm_file, sources)
+            except (KeyError, ValueError, OSError, zipfile.BadZipFile) as e:
+                print(f"  ❌ {xlsm_file}: {e.args[0] if isinstance(e, KeyError) else e}")
+                continue
+            missing = [name for name, diff in changes.items() if diff is None]
+            changed = {name: diff for name, diff in changes.items() if diff}
+            if not changed and not missing:
+                matching += 1
+                print(f"  ✓ {xlsm_file}")
+                continue
+            details = [f"{name} missing" for name in missing]
+            details += [f"{name} differs" for name in changed]
+            print(f"  ✗ {xlsm_file}: {', '.join(details)}")
+            if show_diff:
+                for diff in changed.values():
+                    for line in diff:
+                        print(f"      {line}")
+        print()
+        print(f"{matching} of {len(xlsm_files)} file(s) match the sources")
+        return matching == len(xlsm_files)
+
     def print_vba_instructions(self):
         """Print instructions for manually adding VBA"""
         print()
@@ -287,8 +501,20 @@ def main():
     )
     parser.add_argument('--with-vba', action='store_true',
                         help='Embed VBA from vbaProject.bin')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='With --with-vba, re-create the sheets through xlsxwriter '
+                             'instead of injecting the VBA project into the package')
     parser.add_argument('--extract', metavar='FILE',
                         help='Extract VBA from existing .xlsm file')
+    parser.add_argument('--diff-vba', metavar='FILE', nargs='+',
+                        help='Compare the VBA embedded in .xlsm files with VBA_Modules.bas; '
+                             'exit 1 if any differ')
+    parser.add_argument('--summary', action='store_true',
+                        help='With --diff-vba, list changed modules without the diffs')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None,
+                        help='Build cache directory (default: ~/.cache/ecom-tracking)')
+    parser.add_argument('--no-build-cache', action='store_true',
+                        help='Always rebuild instead of reusing an unchanged build')
     
     args = parser.parse_args()
     
@@ -302,11 +528,23 @@ def main():
         else:
             return 1
     
+    if args.diff_vba:
+        return 0 if deployer.diff_vba(args.diff_vba, show_diff=not args.summary) else 1
+    
     # Create mode
     if not deployer.check_files():
         return 1
     
-    if deployer.create_xlsm(include_vba=args.with_vba):
+    # Embedding VBA only needs the package patched, not the sheets re-created
+    if args.with_vba and not args.rebuild and os.path.exists(deployer.vba_bin):
+        return 0 if deployer.inject_vba() else 1
+    
+    cache = None
+    if not args.no_build_cache:
+        from build_cache import BuildCache
+        cache = BuildCache(args.cache_dir)
+    
+    if deployer.create_xlsm(include_vba=args.with_vba, cache=cache):
         print()
         return 0
     else:
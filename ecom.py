@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+E-Commerce Operations Tracking System - Command Line
+
+One entry point for the generator, deployment and VBA scripts. Each
+subcommand imports its script only when it runs, so openpyxl, xlsxwriter and
+NumPy are loaded by the commands that need them and `--help` or the light
+commands start almost as fast as the interpreter itself.
+
+Commands:
+    generate    Create the formula-based workbook (create_formula_based_excel.py)
+    deploy      Create the .xlsm deployment file (deploy_xlsm.py)
+    extract     Extract vbaProject.bin from an .xlsm and list its modules
+    build-vba   Build vbaProject.bin from the VBA sources (build_vba_binary.py)
+    verify      Check the deployment files, or the VBA embedded in .xlsm files
+    kpis        Print the Dashboard KPIs of a workbook as JSON (kpi_reader.py)
+    report      Run the VBA analysis checks on workbooks (analysis_report.py)
+    formulas    Report recalculation hot spots of a workbook (formula_graph.py)
+    store       Query and export the SQLite operational store (ops_store.py)
+    ingest      Run the JSON record ingest daemon (ingest_daemon.py)
+    table       Summarise a tracking sheet as a columnar table (tracking_table.py)
+    load        Load sheets as column arrays from the worksheet XML (xml_loader.py)
+
+Usage:
+    python3 ecom.py generate --import waves.csv
+    python3 ecom.py deploy --with-vba
+    python3 ecom.py extract Ecom_Operations_Tracking_System.xlsm
+    python3 ecom.py verify Ecom_Operations_Tracking_System.xlsm
+    python3 ecom.py kpis site.xlsx --watch 30
+    python3 ecom.py report sites/*.xlsx --report nightly.json
+    python3 ecom.py formulas site.xlsx --max volatile_cells=0
+    python3 ecom.py store ops.db --find "System Errors" --status Open
+    python3 ecom.py ingest --socket /tmp/ecom-ingest.sock --store ops.db
+    python3 ecom.py table site.xlsx "Picking Tasks" --by "Employee ID"
+    python3 ecom.py load site.xlsx --compare
+    python3 ecom.py <command> --help       # Options of one command
+    python3 ecom.py --startup-time          # Time --help and the light commands
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+PROG = 'ecom.py'
+
+# Commands that must not load the spreadsheet libraries
+LIGHT_COMMANDS = ['extract', 'build-vba', 'verify']
+HEAVY_MODULES = ['openpyxl', 'xlsxwriter', 'numpy', 'olefile']
+
+# Startup overhead allowed on top of the bare interpreter, in milliseconds
+STARTUP_BUDGET_MS = 100
+
+
+def run_script(command, module_name, argv):
+    """
+    Run a script's main() with its own argument parser
+
+    Returns:
+        int: Exit code
+    """
+    module = importlib.import_module(module_name)
+    saved = sys.argv
+    sys.argv = [f'{PROG} {command}'] + list(argv)
+    try:
+        return module.main() or 0
+    finally:
+        sys.argv = saved
+
+
+def extract(argv):
+    """Extract vbaProject.bin from a macro-enabled workbook"""
+    parser = argparse.ArgumentParser(prog=f'{PROG} extract',
+                                     description='Extract vbaProject.bin from an .xlsm file')
+    parser.add_argument('workbook', help='Macro-enabled workbook (.xlsm)')
+    parser.add_argument('--output', metavar='FILE', default='vbaProject.bin',
+                        help='Where to save the VBA project (default: vbaProject.bin)')
+    args = parser.parse_args(argv)
+
+    from create_vba_project import extract_vba_from_xlsm
+    return 0 if extract_vba_from_xlsm(args.workbook, args.output) else 1
+
+
+def verify(argv):
+    """Check the deployment files, or compare embedded VBA with the sources"""
+    parser = argparse.ArgumentParser(
+        prog=f'{PROG} verify',
+        description='Without files, check that the deployment files are present. '
+                    'With .xlsm files, compare their VBA with VBA_Modules.bas.')
+    parser.add_argument('workbooks', nargs='*', metavar='XLSM',
+                        help='Macro-enabled workbooks to compare with the sources')
+    parser.add_argument('--summary', action='store_true',
+                        help='List changed modules without the diffs')
+    args = parser.parse_args(argv)
+
+    if not args.workbooks:
+        from test_deployment import test_deployment
+        return test_deployment()
+    from deploy_xlsm import XLSMDeployer
+    return 0 if XLSMDeployer().diff_vba(args.workbooks, show_diff=not args.summary) else 1
+
+
+# Command -> (script module whose main() runs it, or a function taking the
+# command's arguments; help). Modules are only imported when their command runs.
+COMMANDS = {
+    'generate': ('create_formula_based_excel', 'Create the formula-based workbook'),
+    'deploy': ('deploy_xlsm', 'Create the .xlsm deployment file'),
+    'extract': (extract, 'Extract vbaProject.bin from an .xlsm and list its modules'),
+    'build-vba': ('build_vba_binary', 'Build vbaProject.bin from the VBA sources'),
+    'verify': (verify, 'Check the deployment files, or the VBA embedded in .xlsm files'),
+    'kpis': ('kpi_reader', 'Print the Dashboard KPIs of a workbook as JSON'),
+    'report': ('analysis_report', 'Run the VBA analysis checks on workbooks'),
+    'formulas': ('formula_graph', 'Report recalculation hot spots of a workbook'),
+    'store': ('ops_store', 'Query and export the SQLite operational store'),
+    'ingest': ('ingest_daemon', 'Run the JSON record ingest daemon'),
+    'table': ('tracking_table', 'Summarise a tracking sheet as a columnar table'),
+    'load': ('xml_loader', 'Load sheets as column arrays from the worksheet XML'),
+}
+
+
+def measure_startup(commands=None, repeat=5):
+    """
+    Time ``--help`` of the CLI and of the light commands in fresh processes
+
+    The time of a bare interpreter (``python -c pass``) is measured the same
+    way and subtracted, so the overhead is what this CLI adds.
+
+    Args:
+        commands: Argument lists to time (default: --help and each light
+            command's --help)
+        repeat: Runs per command; the fastest is kept
+
+    Returns:
+        list: (arguments, seconds, overhead seconds) per command
+    """
+    script = os.path.abspath(__file__)
+    commands = commands or [['--help']] + [[name, '--help'] for name in LIGHT_COMMANDS]
+
+    def best(args):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           cwd=os.path.dirname(script), check=False)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    baseline = best([sys.executable, '-c', 'pass'])
+    results = []
+    for args in commands:
+        seconds = best([sys.executable, script] + args)
+        results.append((args, seconds, max(0.0, seconds - baseline)))
+    return results
+
+
+def print_startup_times(repeat=5):
+    """Print the startup overhead of --help and the light commands"""
+    print()
+    print(f"⏱️  Startup time (best of {repeat}, bare interpreter subtracted)")
+    print()
+    over_budget = 0
+    for args, seconds, overhead in measure_startup(repeat=repeat):
+        ok = overhead * 1000 < STARTUP_BUDGET_MS
+        over_budget += not ok
+        print(f"  {'✓' if ok else '✗'} {' '.join(args):<22} {overhead * 1000:>7.1f} ms "
+              f"({seconds * 1000:.1f} ms total)")
+    print()
+    if over_budget:
+        print(f"❌ {over_budget} command(s) over the {STARTUP_BUDGET_MS} ms budget")
+        return 1
+    print(f"✅ All within the {STARTUP_BUDGET_MS} ms budget")
+    return 0
+
+
+def build_parser():
+    """Top-level parser; options after the command are parsed by the command"""
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description='E-Commerce Operations Tracking System',
+        epilog=f'Run "{PROG} <command> --help" for the options of a command.',
+    )
+    parser.add_argument('--startup-time', action='store_true',
+                        help='Measure the startup time of --help and the light commands')
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    """Main entry point"""
+    parser = build_parser()
+    # Everything the top-level parser doesn't know belongs to the command
+    args, rest = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    if args.startup_time:
+        return print_startup_times()
+    if not args.command:
+        parser.print_help()
+        return 1
+    target, _ = COMMANDS[args.command]
+    if callable(target):
+        return target(rest)
+    return run_script(args.command, target, rest)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Formula Dependency Graph Analyzer
+
+Parses every formula of a generated or filled workbook, builds the
+dependency graph across sheets and reports what makes recalculation slow:
+
+    • Volatile cells (NOW, TODAY, RAND, OFFSET, INDIRECT, ...), which Excel
+      recalculates after every change, and the formulas depending on them
+    • Whole-column references (A:A), which scan 1,048,576 rows
+    • Fan-in hot spots: the formulas reading the most cells, and the ranges
+      read by the most formulas
+    • Estimated recalculation cost, in cells read, for a full recalculation
+      and for the volatile cells alone
+    • The longest chain of formulas depending on formulas (e.g. an alert
+      built on a KPI built on a per-row Duration)
+
+A per-row formula copied down a column is one node of the graph (e.g.
+'Wave Tracking'!E4:E1004), so filled workbooks stay quick to analyse.
+
+The build fails (exit code 1) when a measure is past its threshold; the
+defaults in THRESHOLDS can be changed with --max NAME=VALUE.
+
+Usage:
+    python3 formula_graph.py
+    python3 formula_graph.py site.xlsx --json graph.json
+    python3 formula_graph.py site.xlsx --max volatile_cells=0 --max recalc_cost=5e6
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import Counter
+
+import numpy as np
+
+from kpi_engine import (
+    DEFAULT_WORKBOOK, column_letter, formula_groups, parse_area, parse_formula, split_reference,
+)
+from kpi_reader import BLOCK_SIZE, StreamingWorkbookModel, shift_formula
+
+# Functions Excel recalculates on every change
+VOLATILE = {'NOW', 'TODAY', 'RAND', 'RANDBETWEEN', 'RANDARRAY', 'OFFSET', 'INDIRECT',
+            'CELL', 'INFO'}
+
+EXCEL_ROWS = 1048576
+
+# Measure -> largest value that passes. The generated workbook has NOW() in
+# Dashboard B2 and in the eight KPI "Last Updated" cells.
+THRESHOLDS = {
+    'volatile_cells': 10,
+    'volatile_cost': 1000,
+    'whole_column_refs': 0,
+    'max_fan_in': 1_000_000,
+    'recalc_cost': 20_000_000,
+    'chain_depth': 5,
+    'circular_refs': 0,
+}
+
+TOP = 5
+
+_FORMULA_CELL = re.compile(rb'<c r="([A-Z]{1,3})(\d+)"[^>]*?><f\b([^>]*?)(?:/>|>(.*?)</f>)', re.S)
+_SHARED_INDEX = re.compile(rb'\bsi="(\d+)"')
+
+
+class FormulaNode:
+    """The cells of one column sharing a formula (one cell for most Dashboard formulas)"""
+
+    def __init__(self, sheet, col, rows, template, formula):
+        self.sheet = sheet
+        self.col = col
+        self.rows = np.asarray(rows) + 1
+        self.template = template
+        # The formula as written in the first cell
+        self.formula = formula
+        self.areas = []
+        self.functions = set()
+        self.unresolved = []
+        self.parsed = True
+        self.precedents = set()
+        self.dependents = set()
+
+    @property
+    def cells(self):
+        return len(self.rows)
+
+    @property
+    def label(self):
+        sheet = f"'{self.sheet}'" if re.search(r'[^A-Za-z0-9_]', self.sheet) else self.sheet
+        letter = column_letter(self.col)
+        first, last = int(self.rows[0]), int(self.rows[-1])
+        if first == last:
+            return f"{sheet}!{letter}{first}"
+        return f"{sheet}!{letter}{first}:{letter}{last}"
+
+    @property
+    def volatile(self):
+        return bool(self.functions & VOLATILE)
+
+    @property
+    def fan_in(self):
+        """Cells one evaluation of the formula reads"""
+        return sum(area_size(area) for _, area in self.areas)
+
+    @property
+    def cost(self):
+        """Cells read to recalculate every cell of the node, plus the cells themselves"""
+        return self.cells * (1 + self.fan_in)
+
+
+def area_label(area):
+    """Readable text of a resolved area; same-row references name the column"""
+    sheet, col1, row1, col2, row2 = area
+    sheet = f"'{sheet}'" if re.search(r'[^A-Za-z0-9_]', sheet) else sheet
+    first, last = column_letter(col1), column_letter(col2)
+    if row1 == 0:
+        return f"{sheet}!{first} (same row)" if col1 == col2 else f"{sheet}!{first}:{last} (same row)"
+    if row1 is None:
+        return f"{sheet}!{first}:{last}"
+    return f"{sheet}!{first}{row1}:{last}{row2}" if (col1, row1) != (col2, row2) else f"{sheet}!{first}{row1}"
+
+
+def area_size(area):
+    _, col1, row1, col2, row2 = area
+    if row1 == 0:
+        return col2 - col1 + 1
+    return (col2 - col1 + 1) * ((row2 or EXCEL_ROWS) - (row1 or 1) + 1)
+
+
+def _walk(node, refs, functions):
+    kind = node[0]
+    if kind == 'ref':
+        refs.append(node[1])
+    elif kind == 'func':
+        functions.add(node[1])
+        for arg in node[2]:
+            _walk(arg, refs, functions)
+    elif kind == 'op':
+        _walk(node[2], refs, functions)
+        _walk(node[3], refs, functions)
+    elif kind in ('neg', 'pct'):
+        _walk(node[1], refs, functions)
+
+
+def iter_formulas(model, sheet_name):
+    """
+    Stream the formula cells of a sheet; shared formulas are expanded
+
+    Yields:
+        (column, row, formula text with '=')
+    """
+    shared = {}
+    with model.zf.open(model.parts[sheet_name]) as f:
+        pending = b''
+        while True:
+            block = f.read(BLOCK_SIZE)
+            data = pending + block
+            end = len(data) if not block else data.rfind(b'</row>') + 6
+            if block and end < 6:
+                pending = data
+                continue
+            chunk, pending = data[:end], data[end:]
+            for letter, row, attrs, text in _FORMULA_CELL.findall(chunk):
+                row = int(row)
+                col = _column(letter)
+                index = _SHARED_INDEX.search(attrs) if b'shared' in attrs else None
+                if text:
+                    formula = html.unescape(text.decode('utf-8'))
+                    if index:
+                        shared[int(index.group(1))] = (formula, row, col)
+                elif index and int(index.group(1)) in shared:
+                    formula, master_row, master_col = shared[int(index.group(1))]
+                    formula = shift_formula(formula, row - master_row, col - master_col)
+                else:
+                    continue
+                yield col, row, '=' + formula
+            if not block:
+                break
+
+
+_COLUMNS = {}
+
+
+def _column(letter):
+    if letter not in _COLUMNS:
+        col = 0
+        for char in letter.decode():
+            col = col * 26 + ord(char) - 64
+        _COLUMNS[letter] = col
+    return _COLUMNS[letter]
+
+
+def build_graph(path):
+    """
+    Parse every formula of a workbook into FormulaNodes linked by dependencies
+
+    Returns:
+        list: FormulaNode, in sheet and column order
+    """
+    model = StreamingWorkbookModel(path)
+    try:
+        nodes = []
+        for sheet_name in model.parts:
+            columns = {}
+            for col, row, formula in iter_formulas(model, sheet_name):
+                columns.setdefault(col, {})[row] = formula
+            for col, cells in sorted(columns.items()):
+                raw = [None] * max(cells)
+                for row, formula in cells.items():
+                    raw[row - 1] = formula
+                for template, rows in formula_groups(raw).items():
+                    nodes.append(FormulaNode(sheet_name, col, rows, template, raw[rows[0]]))
+
+        for node in nodes:
+            refs = []
+            try:
+                _walk(parse_formula(node.template), refs, node.functions)
+            except ValueError:
+                node.parsed = False
+                continue
+            for text in refs:
+                reference = model.names.get(text, text)
+                sheet, area = split_reference(reference)
+                bounds = parse_area(area)
+                sheet = sheet or node.sheet
+                if bounds is None or sheet not in model.parts:
+                    node.unresolved.append(text)
+                else:
+                    # Defined names are kept to show them in the report
+                    node.areas.append((text if text in model.names else None, (sheet, *bounds)))
+    finally:
+        model.close()
+
+    link(nodes)
+    return nodes
+
+
+def link(nodes):
+    """Connect each node to the formula nodes inside the areas it reads"""
+    by_column = {}
+    for node in nodes:
+        by_column.setdefault((node.sheet, node.col), []).append(node)
+    for node in nodes:
+        for _, (sheet, col1, row1, col2, row2) in node.areas:
+            for col in range(col1, col2 + 1):
+                for other in by_column.get((sheet, col), ()):
+                    if other is node:
+                        continue
+                    if row1 == 0:
+                        # Same-row reference: the rows of both must overlap
+                        hit = np.isin(node.rows, other.rows).any()
+                    else:
+                        low, high = row1 or 1, row2 or EXCEL_ROWS
+                        start = np.searchsorted(other.rows, low)
+                        hit = start < len(other.rows) and other.rows[start] <= high
+                    if hit:
+                        node.precedents.add(other)
+                        other.dependents.add(node)
+
+
+def chain_depths(nodes):
+    """
+    Longest chain of formula nodes below each node
+
+    Returns:
+        (depths {node: depth}, nodes on a circular reference)
+    """
+    depths = {}
+    circular = set()
+    for start in nodes:
+        if start in depths:
+            continue
+        # Iterative depth-first search; 'visiting' marks the current path
+        stack = [(start, iter(start.precedents))]
+        visiting = {start}
+        while stack:
+            node, precedents = stack[-1]
+            advanced = False
+            for other in precedents:
+                if other in visiting:
+                    # Every node of the path back to 'other' is on the cycle
+                    for below, _ in reversed(stack):
+                        circular.add(below)
+                        if below is other:
+                            break
+                    continue
+                if other not in depths:
+                    visiting.add(other)
+                    stack.append((other, iter(other.precedents)))
+                    advanced = True
+                    break
+            if not advanced:
+                stack.pop()
+                visiting.discard(node)
+                depths[node] = 1 + max((depths.get(other, 0) for other in node.precedents
+                                        if other not in visiting), default=0)
+    return depths, circular
+
+
+def analyse(nodes):
+    """
+    Work out the measures and hot spots of a formula graph
+
+    Returns:
+        dict: JSON-ready report; 'measures' holds the values compared with
+        the thresholds
+    """
+    volatile = [node for node in nodes if node.volatile]
+    # Everything downstream of a volatile cell is recalculated with it
+    affected, pending = set(volatile), list(volatile)
+    while pending:
+        for other in pending.pop().dependents:
+            if other not in affected:
+                affected.add(other)
+                pending.append(other)
+
+    whole_column = [(node, area_label(area)) for node in nodes for _, area in node.areas
+                    if area[2] is None]
+    reads = Counter()
+    for node in nodes:
+        for name, area in node.areas:
+            label = area_label(area)
+            reads[f'{name} ({label})' if name else label] += node.cells
+
+    depths, circular = chain_depths(nodes)
+    chain = []
+    if depths:
+        node = max(nodes, key=lambda n: (depths[n], n.cost))
+        while node is not None:
+            chain.append(node.label)
+            below = [other for other in node.precedents if other not in circular]
+            node = max(below, key=lambda n: depths[n]) if below else None
+
+    by_fan_in = sorted(nodes, key=lambda n: n.fan_in, reverse=True)[:TOP]
+    measures = {
+        'volatile_cells': sum(node.cells for node in volatile),
+        'volatile_cost': sum(node.cost for node in affected),
+        'whole_column_refs': sum(node.cells for node, _ in whole_column),
+        'max_fan_in': by_fan_in[0].fan_in if by_fan_in else 0,
+        'recalc_cost': sum(node.cost for node in nodes),
+        'chain_depth': max(depths.values(), default=0),
+        'circular_refs': len(circular),
+    }
+    return {
+        'formula_cells': sum(node.cells for node in nodes),
+        'formula_groups': len(nodes),
+        'measures': measures,
+        'volatile': [{'cells': node.label, 'formula': node.formula} for node in volatile],
+        'volatile_dependents': sorted(node.label for node in affected - set(volatile)),
+        'whole_column': [{'cells': node.label, 'reference': text} for node, text in whole_column],
+        'fan_in': [{'cells': node.label, 'cells_read': node.fan_in, 'formula': node.formula}
+                   for node in by_fan_in if node.fan_in],
+        'most_read': [{'reference': reference, 'formula_cells': count}
+                      for reference, count in reads.most_common(TOP)],
+        'most_expensive': [{'cells': node.label, 'cost': node.cost}
+                           for node in sorted(nodes, key=lambda n: n.cost, reverse=True)[:TOP]],
+        'longest_chain': chain,
+        'circular': sorted(node.label for node in circular),
+        'unresolved': sorted({f'{node.label}: {text}' for node in nodes
+                              for text in node.unresolved}),
+        'unparsed': [node.label for node in nodes if not node.parsed],
+    }
+
+
+def check_thresholds(report, thresholds=None):
+    """
+    Compare the measures of a report with their limits
+
+    Returns:
+        dict: {measure: (value, limit)} for every measure past its limit
+    """
+    limits = dict(THRESHOLDS, **(thresholds or {}))
+    return {name: (value, limits[name]) for name, value in report['measures'].items()
+            if limits.get(name) is not None and value > limits[name]}
+
+
+def analyse_workbook(path, thresholds=None):
+    """Build the graph of a workbook and return its report, with 'exceeded' filled in"""
+    report = {'workbook': path, **analyse(build_graph(path))}
+    report['exceeded'] = {name: {'value': value, 'limit': limit}
+                          for name, (value, limit) in check_thresholds(report, thresholds).items()}
+    return report
+
+
+def _threshold(text):
+    name, _, value = text.partition('=')
+    if name not in THRESHOLDS or not value:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=VALUE with NAME one of {', '.join(THRESHOLDS)}")
+    try:
+        return name, int(float(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value}")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Report volatile cells, whole-column scans, fan-in hot spots and '
+                    'recalculation cost of a workbook; fails past the thresholds'
+    )
+    parser.add_argument('workbook', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             DEFAULT_WORKBOOK))
+    parser.add_argument('--max', dest='limits', action='append', type=_threshold, default=[],
+                        metavar='NAME=VALUE',
+                        help=f"Change a threshold (repeatable): {', '.join(THRESHOLDS)}")
+    parser.add_argument('--json', metavar='FILE', help='Write the full report as JSON')
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Formula Dependency Graph")
+    print("=" * 70)
+    print()
+
+    try:
+        report = analyse_workbook(args.workbook, dict(args.limits))
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    print(f"📄 {os.path.basename(args.workbook)}: {report['formula_cells']:,} formula cells "
+          f"in {report['formula_groups']} groups")
+    print()
+    print("⚡ Volatile cells:")
+    for item in report['volatile']:
+        print(f"  • {item['cells']:<50} {item['formula']}")
+    if report['volatile_dependents']:
+        print(f"  Recalculated with them: {', '.join(report['volatile_dependents'])}")
+    if report['whole_column']:
+        print()
+        print("📏 Whole-column references:")
+        for item in report['whole_column']:
+            print(f"  • {item['cells']:<50} {item['reference']}")
+    print()
+    print("🔥 Fan-in hot spots (cells read per calculation):")
+    for item in report['fan_in']:
+        print(f"  • {item['cells']:<50} {item['cells_read']:>12,}")
+    print()
+    print("📚 Most read ranges (formula cells reading them):")
+    for item in report['most_read']:
+        print(f"  • {item['reference']:<50} {item['formula_cells']:>12,}")
+    print()
+    print(f"🔗 Longest chain: {' → '.join(reversed(report['longest_chain']))}")
+    for label in report['unresolved']:
+        print(f"  ⚠ Unresolved reference {label}")
+    for label in report['unparsed']:
+        print(f"  ⚠ Formula not understood: {label}")
+
+    print()
+    print("📊 Measures:")
+    limits = dict(THRESHOLDS, **dict(args.limits))
+    for name, value in report['measures'].items():
+        mark = '✗' if name in report['exceeded'] else '✓'
+        print(f"  {mark} {name:<20} {value:>14,}   (limit {limits[name]:,})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print()
+        print(f"💾 Report written to: {args.json}")
+    print()
+    if report['exceeded']:
+        print(f"❌ {len(report['exceeded'])} measure(s) over the limit: "
+              f"{', '.join(report['exceeded'])}")
+        print()
+        return 1
+    print("✅ All measures within the limits")
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
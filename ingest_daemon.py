@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Event Ingest Daemon for the Tracking Sheets
+
+Accepts JSON records from the WMS, scanners and chat bots instead of typing
+each Bash query, wave or picking task in by hand:
+
+    • Records arrive over a local socket (one JSON record or list of records
+      per line) or as .json/.jsonl files in a drop directory
+    • Each record names its sheet and is checked against the sheet's
+      headers; fields are matched by name as in bulk imports ("wave_id" is
+      Wave ID), dates and numbers are converted and formula columns are
+      recalculated. Text starting with '=' is rejected, so nobody who can
+      reach the socket can plant a formula in the workbook
+    • Records are buffered in memory and flushed in batches when
+      --batch-size records are waiting or --flush-seconds have passed, to
+      the workbook (appended, see append_workbook.py) or to the SQLite store
+      (see ops_store.py)
+    • The buffer is bounded: when it is full, sockets and the drop directory
+      are not read until a flush has made room
+    • A flush that fails (e.g. the workbook is open in Excel) is retried with
+      a growing delay; records that still cannot be written at shutdown are
+      saved to a dead-letter .jsonl file, which can be dropped in again
+
+Record format:
+    {"sheet": "Wave Tracking", "Wave ID": "W-104", "Start Time": "2026-01-05T08:00",
+     "Status": "In Progress"}
+
+Usage:
+    python3 ingest_daemon.py --socket /tmp/ecom-ingest.sock
+    python3 ingest_daemon.py --port 8765 --drop-dir incoming/ --store ops.db
+    echo '{"sheet": "Picking Tasks", "Task ID": "PT-9"}' | nc -U /tmp/ecom-ingest.sock
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from bulk_import import ColumnMapping
+from create_formula_based_excel import TRACKING_SHEETS, derived_columns
+from kpi_engine import DEFAULT_WORKBOOK
+
+# Records flushed together
+BATCH_SIZE = 5_000
+
+# Longest time a record waits in the buffer
+FLUSH_SECONDS = 5.0
+
+# Records held in memory before readers are paused
+MAX_PENDING = 50_000
+
+# Seconds between drop directory scans
+DROP_POLL_SECONDS = 1.0
+
+# Drop directory files are moved here once their records are flushed
+PROCESSED_DIR = 'processed'
+
+# Bytes of a drop file read at a time
+READ_BYTES = 1024 * 1024
+
+# First wait before a failed flush is retried; doubled after each failure
+RETRY_SECONDS = 1.0
+MAX_RETRY_SECONDS = 60.0
+
+# Largest line accepted on the socket
+MAX_LINE = 16 * 1024 * 1024
+
+
+class RecordBatch:
+    """
+    Validated rows of one sheet, passed as the sheet's ``data`` entry when a
+    batch is flushed; per-row formulas are numbered from the first free row
+    """
+
+    def __init__(self, sheet_name):
+        self.sheet_name = sheet_name
+        self.headers = TRACKING_SHEETS[sheet_name]
+        self.rows = []
+        self.formulas = [(col - 1, template) for col, template, _ in derived_columns(sheet_name)]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def iter_rows(self, first_row):
+        for row_number, row in enumerate(self.rows, start=first_row):
+            for i, template in self.formulas:
+                row[i] = template.format(row=row_number)
+            yield row
+
+    def records(self):
+        """The rows as JSON records in the format the daemon accepts"""
+        formula_columns = {i for i, _ in self.formulas}
+        for row in self.rows:
+            record = {'sheet': self.sheet_name}
+            for i, (header, value) in enumerate(zip(self.headers, row)):
+                if value is not None and i not in formula_columns:
+                    record[header] = value.isoformat() if hasattr(value, 'isoformat') else value
+            yield record
+
+
+class RecordValidator:
+    """Checks records against the sheet headers and converts them to sheet rows"""
+
+    def __init__(self, sheets=None):
+        self.sheets = set(sheets or TRACKING_SHEETS)
+        # (sheet, field names) -> (ColumnMapping, date formats)
+        self.mappings = {}
+
+    def validate(self, record):
+        """
+        Turn a record into a sheet row
+
+        Returns:
+            (sheet name, row values in header order; formula columns None)
+
+        Raises:
+            ValueError: If the record is not an object, names no accepted
+                sheet, has fields that are not headers of the sheet, values
+                that cannot be converted or text that starts with '=' (a
+                formula planted through the socket)
+        """
+        if not isinstance(record, dict):
+            raise ValueError("a record must be a JSON object")
+        sheet_name = record.get('sheet')
+        if sheet_name not in self.sheets:
+            raise ValueError(f"unknown sheet: {sheet_name!r}")
+        fields = tuple(key for key in record if key != 'sheet')
+        key = (sheet_name, fields)
+        if key not in self.mappings:
+            mapping = ColumnMapping(sheet_name, fields)
+            if mapping.ignored:
+                raise ValueError(f"{sheet_name} has no column(s): {', '.join(mapping.ignored)}")
+            if not mapping.sources:
+                raise ValueError(f"no {sheet_name} fields in the record")
+            self.mappings[key] = (mapping, {})
+        mapping, date_formats = self.mappings[key]
+        unconverted = {}
+        row = mapping.convert([record[field] for field in fields], date_formats,
+                              unconverted=unconverted)
+        if unconverted:
+            raise ValueError(f"invalid value for {', '.join(unconverted)}")
+        formulas = [header for header, value in zip(TRACKING_SHEETS[sheet_name], row)
+                    if isinstance(value, str) and value.startswith('=')]
+        if formulas:
+            raise ValueError(f"formulas are not accepted: {', '.join(formulas)}")
+        return sheet_name, row
+
+
+class WorkbookTarget:
+    """Appends flushed batches to a workbook (see append_workbook.py)"""
+
+    def __init__(self, path, cache_values=False):
+        from append_workbook import WorkbookAppender
+        # Refreshing the cached Dashboard values reads the whole workbook, so
+        # it is off by default; Excel recalculates when the file is opened
+        self.appender = WorkbookAppender(path, cache_values=cache_values)
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def write(self, batches):
+        return self.appender.append(batches, progress=None)
+
+    def close(self):
+        pass
+
+
+class StoreTarget:
+    """Loads flushed batches into the SQLite store (see ops_store.py)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.store = None
+
+    def write(self, batches):
+        # Opened in the flush thread: SQLite connections stay in their thread
+        if self.store is None:
+            from ops_store import OperationalStore
+            self.store = OperationalStore(self.path)
+        return self.store.load(batches)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+class IngestService:
+    """
+    Buffers validated records and flushes them in batches
+
+    Producers (socket clients, the drop directory) await submit(); a single
+    flusher task writes batches in a worker thread, so records keep arriving
+    while a batch is written, up to ``max_pending`` records. A batch that
+    fails is kept and retried until it is written; once ``closing`` is set,
+    what still fails is appended to the ``dead_letter`` file instead.
+    """
+
+    def __init__(self, target, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS,
+                 max_pending=MAX_PENDING, sheets=None, progress=print,
+                 retry_seconds=RETRY_SECONDS, dead_letter=None):
+        self.target = target
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retry_seconds = retry_seconds
+        self.dead_letter = dead_letter or f"{target.path}.failed.jsonl"
+        self.validator = RecordValidator(sheets)
+        self.queue = asyncio.Queue(max_pending)
+        self.progress = progress
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stats = {'received': 0, 'rejected': 0, 'written': 0, 'flushes': 0,
+                      'dead_lettered': 0}
+        self.closing = asyncio.Event()
+        self.flusher = None
+
+    def start(self):
+        self.flusher = asyncio.create_task(self._flush_loop())
+
+    async def submit(self, record):
+        """
+        Validate a record and buffer it; waits while the buffer is full
+
+        Raises:
+            ValueError: If the record is invalid (see RecordValidator.validate)
+        """
+        self.stats['received'] += 1
+        try:
+            item = self.validator.validate(record)
+        except ValueError:
+            self.stats['rejected'] += 1
+            raise
+        await self.queue.put(item)
+
+    async def after_flush(self, callback):
+        """
+        Have the flusher await ``callback()`` once every record submitted so
+        far has been written (or saved to the dead-letter file)
+        """
+        await self.queue.put(callback)
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batches = {}
+            callbacks = []
+            count = 0
+            item = await self.queue.get()
+            deadline = loop.time() + self.flush_seconds
+            while item is not None:
+                if callable(item):
+                    # Records queued before it are in this batch or an earlier one
+                    callbacks.append(item)
+                else:
+                    sheet_name, row = item
+                    if sheet_name not in batches:
+                        batches[sheet_name] = RecordBatch(sheet_name)
+                    batches[sheet_name].rows.append(row)
+                    count += 1
+                    if count >= self.batch_size:
+                        break
+                # Take what is already buffered without waiting
+                try:
+                    item = self.queue.get_nowait()
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if batches:
+                await self._flush(batches, count)
+            for callback in callbacks:
+                try:
+                    await callback()
+                except Exception as e:
+                    if self.progress:
+                        self.progress(f"❌ {e}")
+            if item is None:
+                return
+
+    async def _flush(self, batches, count):
+        """Write a batch, retrying with a growing delay until it is written or closing"""
+        delay = self.retry_seconds
+        while True:
+            error = await self._write(batches, count)
+            if error is None:
+                return
+            if self.closing.is_set():
+                await self._save_dead_letter(batches, count, error)
+                return
+            if self.progress:
+                self.progress(f"❌ Flush of {count:,} records to {self.target.name} failed: "
+                              f"{error}; retrying in {delay:g}s")
+            try:
+                # Closing cuts the wait short for a last attempt
+                await asyncio.wait_for(self.closing.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+    async def _write(self, batches, count):
+        """Write a batch in the flush thread; returns the exception if it failed"""
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.target.write,
+                                                             batches)
+        except Exception as e:
+            return e
+        self.stats['written'] += count
+        self.stats['flushes'] += 1
+        if self.progress:
+            sheets = ', '.join(f"{name} {len(batch):,}" for name, batch in batches.items())
+            self.progress(f"💾 Flushed {count:,} records to {self.target.name} "
+                          f"in {time.perf_counter() - start:.2f}s ({sheets})")
+        return None
+
+    async def _save_dead_letter(self, batches, count, error):
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, _append_records, self.dead_letter, batches)
+        except OSError as e:
+            if self.progress:
+                self.progress(f"❌ Flush of {count:,} records to {self.target.name} failed "
+                              f"({error}) and they could not be saved: {e}")
+            return
+        self.stats['dead_lettered'] += count
+        if self.progress:
+            self.progress(f"❌ Flush of {count:,} records to {self.target.name} failed "
+                          f"({error}); saved to {self.dead_letter}")
+
+    async def close(self):
+        """Flush everything still buffered and stop the flusher"""
+        self.closing.set()
+        if self.flusher is not None:
+            await self.queue.put(None)
+            await self.flusher
+            self.flusher = None
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.target.close)
+        self.executor.shutdown()
+
+    async def submit_line(self, line):
+        """
+        Submit the record (or list of records) of one JSON line
+
+        Returns:
+            dict: Reply for the sender, {'accepted': n} or {'accepted': n, 'errors': [...]}
+        """
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            self.stats['received'] += 1
+            self.stats['rejected'] += 1
+            return {'accepted': 0, 'errors': [f"invalid JSON: {e}"]}
+        records = data if isinstance(data, list) else [data]
+        accepted, errors = 0, []
+        for index, record in enumerate(records):
+            try:
+                await self.submit(record)
+                accepted += 1
+            except ValueError as e:
+                errors.append(f"record {index + 1}: {e}" if len(records) > 1 else str(e))
+        return {'accepted': accepted, 'errors': errors} if errors else {'accepted': accepted}
+
+    async def handle_client(self, reader, writer):
+        """Read JSON lines from a socket client, replying with one JSON line each"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                reply = await self.submit_line(line)
+                writer.write(json.dumps(reply).encode() + b'\n')
+                # Only wait for the client when its replies pile up
+                if writer.transport.get_write_buffer_size() > 64 * 1024:
+                    await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def ingest_file(self, path):
+        """
+        Submit the records of a .json or .jsonl file, read in a worker thread;
+        .jsonl lines are submitted as they are read
+
+        Returns:
+            (records accepted, error messages); a file that cannot be read
+            is reported as an error after the records read before it
+        """
+        loop = asyncio.get_running_loop()
+        accepted, errors = 0, []
+        try:
+            f = await loop.run_in_executor(None, partial(open, path, encoding='utf-8'))
+            with f:
+                if path.endswith('.jsonl'):
+                    number = 0
+                    while True:
+                        lines = await loop.run_in_executor(None, f.readlines, READ_BYTES)
+                        if not lines:
+                            break
+                        for line in lines:
+                            number += 1
+                            if not line.strip():
+                                continue
+                            reply = await self.submit_line(line)
+                            accepted += reply['accepted']
+                            errors.extend(f"line {number}: {error}"
+                                          for error in reply.get('errors', []))
+                else:
+                    reply = await self.submit_line(await loop.run_in_executor(None, f.read))
+                    accepted += reply['accepted']
+                    errors.extend(reply.get('errors', []))
+        except (OSError, UnicodeDecodeError) as e:
+            errors.append(str(e))
+        return accepted, errors
+
+    async def watch_directory(self, directory, poll_seconds=DROP_POLL_SECONDS, stop=None):
+        """
+        Ingest the .json/.jsonl files dropped into a directory, oldest first,
+        until ``stop`` (an asyncio.Event) is set
+
+        Writers should create files under another name (e.g. .tmp) and
+        rename them when complete. A file is moved to processed/ once its
+        records have been flushed, with a .errors file next to it listing
+        rejected records. A file being read when ``stop`` is set is read to
+        the end, so no file is left half ingested.
+        """
+        loop = asyncio.get_running_loop()
+        stop = stop or asyncio.Event()
+        await loop.run_in_executor(None, partial(os.makedirs, os.path.join(directory, PROCESSED_DIR),
+                                                 exist_ok=True))
+        # Read files waiting for their flush
+        pending = set()
+        while not stop.is_set():
+            for name in await loop.run_in_executor(None, _dropped_files, directory):
+                if stop.is_set():
+                    break
+                if name in pending:
+                    continue
+                accepted, errors = await self.ingest_file(os.path.join(directory, name))
+                pending.add(name)
+                await self.after_flush(partial(self._file_flushed, directory, name,
+                                               accepted, errors, pending))
+            try:
+                await asyncio.wait_for(stop.wait(), poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _file_flushed(self, directory, name, accepted, errors, pending):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _move_processed,
+                                                             directory, name, errors)
+        except OSError as e:
+            # Left pending, so it is not ingested twice
+            if self.progress:
+                self.progress(f"❌ {name} could not be moved to {PROCESSED_DIR}/: {e}")
+            return
+        pending.discard(name)
+        if self.progress:
+            self.progress(f"📥 {name}: {accepted:,} records"
+                          + (f", {len(errors)} rejected" if errors else ''))
+
+
+def _dropped_files(directory):
+    """Names of the .json/.jsonl files in a directory, oldest first"""
+    entries = [entry for entry in os.scandir(directory)
+               if entry.is_file() and entry.name.endswith(('.json', '.jsonl'))]
+    return [entry.name for entry in sorted(entries, key=lambda e: (e.stat().st_mtime, e.name))]
+
+
+def _move_processed(directory, name, errors):
+    """Move a drop file to processed/, with a .errors file if records were rejected"""
+    done = os.path.join(directory, PROCESSED_DIR)
+    os.replace(os.path.join(directory, name), os.path.join(done, name))
+    if errors:
+        with open(os.path.join(done, name + '.errors'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(errors) + '\n')
+
+
+def _append_records(path, batches):
+    """Append the records of unwritten batches to a dead-letter .jsonl file"""
+    with open(path, 'a', encoding='utf-8') as f:
+        for batch in batches.values():
+            for record in batch.records():
+                f.write(json.dumps(record) + '\n')
+
+async def serve(service, socket_path=None, port=None, drop_dir=None, stop=None):
+    """
+    Run the ingest sources until ``stop`` (an asyncio.Event) is set, then
+    flush what is buffered; batches that still fail go to the dead-letter file
+
+    Args:
+        service: IngestService
+        socket_path: Unix socket to listen on
+        port: TCP port to listen on, on 127.0.0.1 only
+        drop_dir: Directory watched for .json/.jsonl files
+    """
+    stop = stop or asyncio.Event()
+    service.start()
+    servers, tasks = [], []
+    try:
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            servers.append(await asyncio.start_unix_server(service.handle_client, socket_path,
+                                                           limit=MAX_LINE))
+        if port is not None:
+            servers.append(await asyncio.start_server(service.handle_client, '127.0.0.1', port,
+                                                      limit=MAX_LINE))
+        if drop_dir:
+            tasks.append(asyncio.create_task(service.watch_directory(drop_dir, stop=stop)))
+        await stop.wait()
+    finally:
+        # Producers waiting on a full buffer must not wait on a target that keeps failing
+        service.closing.set()
+        stop.set()
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Ingest JSON records from a socket or drop directory into the workbook '
+                    'or the SQLite store, in batches'
+    )
+    parser.add_argument('--socket', metavar='PATH', help='Unix socket to listen on')
+    parser.add_argument('--port', type=int, help='TCP port to listen on (127.0.0.1 only)')
+    parser.add_argument('--drop-dir', metavar='DIR', help='Directory watched for .json/.jsonl files')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK,
+                        help=f'Workbook to append to (default: {DEFAULT_WORKBOOK})')
+    parser.add_argument('--store', metavar='DB', help='Write to this SQLite store instead')
+    parser.add_argument('--cache-values', action='store_true',
+                        help='Refresh the cached Dashboard values after each workbook flush')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Records per flush (default {BATCH_SIZE:,})')
+    parser.add_argument('--flush-seconds', type=float, default=FLUSH_SECONDS,
+                        help=f'Longest wait before a flush (default {FLUSH_SECONDS:g})')
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help=f'Records buffered before readers pause (default {MAX_PENDING:,})')
+    parser.add_argument('--dead-letter', metavar='FILE',
+                        help='Where records that cannot be written by shutdown are saved '
+                             '(default: the workbook or store name + .failed.jsonl)')
+    args = parser.parse_args()
+
+    if not (args.socket or args.port is not None or args.drop_dir):
+        parser.error('give at least one of --socket, --port and --drop-dir')
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Event Ingest Daemon")
+    print("=" * 70)
+    print()
+
+    if args.store:
+        target = StoreTarget(args.store)
+    else:
+        if not os.path.exists(args.workbook):
+            print(f"❌ Error: workbook not found: {args.workbook}")
+            return 1
+        target = WorkbookTarget(args.workbook, cache_values=args.cache_values)
+
+    async def run():
+        service = IngestService(target, args.batch_size, args.flush_seconds, args.max_pending,
+                                dead_letter=args.dead_letter)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"🎯 Writing to: {target.name} (batches of {args.batch_size:,} "
+              f"or every {args.flush_seconds:g}s)")
+        if args.socket:
+            print(f"🔌 Listening on {args.socket}")
+        if args.port is not None:
+            print(f"🔌 Listening on 127.0.0.1:{args.port}")
+        if args.drop_dir:
+            print(f"📂 Watching {args.drop_dir}")
+        print("   Press Ctrl+C to stop (buffered records are flushed first)")
+        print()
+        await serve(service, args.socket, args.port, args.drop_dir, stop)
+        return service
+
+    try:
+        service = asyncio.run(run())
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    stats = service.stats
+    print()
+    print(f"✅ Stopped: {stats['received']:,} records received, {stats['written']:,} written "
+          f"in {stats['flushes']:,} flushes, {stats['rejected']:,} rejected")
+    if stats['dead_lettered']:
+        print(f"⚠️  {stats['dead_lettered']:,} records could not be written; saved to "
+              f"{service.dead_letter} (drop it in again to retry)")
+    print()
+    return 1 if stats['dead_lettered'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1171 @@
+#!/usr/bin/env python3
+"""
+KPI Evaluation Engine for the Formula-Based Workbook
+
+Evaluates the Dashboard formulas of a generated or filled workbook in Python
+and stores the results as cached values next to the formulas. Headless readers
+(openpyxl with data_only=True, BI scrapers, test scripts) then see the KPI
+numbers and statuses without Excel having to open and recalculate the file.
+
+Sheets are read straight from the worksheet XML into NumPy arrays with
+xml_loader, the same loader kpi_reader uses. Range functions (COUNTIF, COUNTIFS,
+AVERAGE, SUM, COUNTA, ...) reduce whole columns at once, and per-row formulas
+such as the Duration and Efficiency columns are grouped by their relative
+form and evaluated as one vector operation per group.
+
+Usage:
+    python3 kpi_engine.py [workbook.xlsx]           # Print Dashboard KPIs
+    python3 kpi_engine.py [workbook.xlsx] --cache   # Also store cached values
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+import zipfile
+from datetime import date, datetime, time, timedelta
+from itertools import repeat
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+# Sheets are read with xml_loader, which builds on this module, so
+# WorkbookModel imports it when it first reads one. openpyxl is only
+# imported by dashboard_kpis().
+from xlsx_package import defined_names, rewrite_members, sheet_parts
+
+DEFAULT_WORKBOOK = 'Ecom_Operations_Tracking_System_Formula_Based.xlsx'
+
+# Cell kinds stored in Values.kind
+BLANK, NUMBER, TEXT, BOOL, ERROR = range(5)
+
+ERROR_CODES = {'#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A'}
+
+# Day 0 of Excel's 1900 date system
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def to_serial(value):
+    """Excel serial number of a datetime, date, time or timedelta"""
+    if isinstance(value, timedelta):
+        return value.total_seconds() / 86400
+    if isinstance(value, time):
+        return (value.hour * 3600 + value.minute * 60 + value.second +
+                value.microsecond / 1e6) / 86400
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    days = (value - EXCEL_EPOCH).days
+    # Excel counts the non-existent 1900-02-29
+    if 0 < days <= 60:
+        days -= 1
+    return days + to_serial(value.time())
+
+
+def column_index(letters):
+    """1-based index of a column name: 'A' -> 1, 'AA' -> 27"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def column_letter(index):
+    """Column name of a 1-based index: 27 -> 'AA'"""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class ExcelError(str):
+    """An Excel error value such as #DIV/0!"""
+
+
+_NUMBER_TYPES = {type(None), int, float}
+_TEXT_TYPES = {type(None), str}
+
+
+class Values:
+    """
+    A column of Excel values held as parallel NumPy arrays
+
+    ``kind`` holds the cell kind, ``num`` the numeric value of numbers and
+    booleans, and ``txt`` the string of text cells and the code of errors.
+    Scalars are Values of length 1 and broadcast against columns.
+    """
+
+    __slots__ = ('kind', 'num', 'txt')
+
+    def __init__(self, kind, num, txt):
+        self.kind = kind
+        self.num = num
+        self.txt = txt
+
+    def __len__(self):
+        return len(self.kind)
+
+    @classmethod
+    def empty(cls, size):
+        return cls(np.zeros(size, dtype=np.int8), np.full(size, np.nan), np.full(size, None, dtype=object))
+
+    @classmethod
+    def from_python(cls, values):
+        """Build Values from Python cell values (formulas are left blank)"""
+        result = cls.empty(len(values))
+        kind, num, txt = result.kind, result.num, result.txt
+        types = set(map(type, values))
+        # Whole columns of numbers or of text are converted in one go
+        if types <= _NUMBER_TYPES:
+            present = np.array([value is not None for value in values], dtype=bool)
+            kind[present] = NUMBER
+            num[present] = [value for value in values if value is not None]
+            return result
+        if types <= _TEXT_TYPES:
+            kind[:] = [BLANK if value is None or value[:1] == '=' else
+                       ERROR if value in ERROR_CODES else TEXT for value in values]
+            txt[:] = values
+            txt[kind == BLANK] = None
+            return result
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                kind[i], num[i] = BOOL, float(value)
+            elif isinstance(value, (int, float)):
+                kind[i], num[i] = NUMBER, value
+            elif isinstance(value, (datetime, date, time, timedelta)):
+                kind[i], num[i] = NUMBER, to_serial(value)
+            elif isinstance(value, str):
+                if value.startswith('='):
+                    continue
+                if value in ERROR_CODES:
+                    kind[i], txt[i] = ERROR, value
+                else:
+                    kind[i], txt[i] = TEXT, value
+            else:
+                kind[i], txt[i] = TEXT, str(value)
+        return result
+
+    @classmethod
+    def scalar(cls, value):
+        return cls.from_python([value]) if not isinstance(value, ExcelError) else cls.error(value, 1)
+
+    @classmethod
+    def error(cls, code, size):
+        result = cls.empty(size)
+        result.kind[:] = ERROR
+        result.txt[:] = code
+        return result
+
+    @classmethod
+    def concat(cls, parts):
+        if not parts:
+            return cls.empty(0)
+        return cls(np.concatenate([p.kind for p in parts]),
+                   np.concatenate([p.num for p in parts]),
+                   np.concatenate([p.txt for p in parts]))
+
+    def take(self, index):
+        return Values(self.kind[index], self.num[index], self.txt[index])
+
+    def copy(self):
+        return Values(self.kind.copy(), self.num.copy(), self.txt.copy())
+
+    def broadcast(self, size):
+        if len(self) == size:
+            return self
+        return Values(np.broadcast_to(self.kind, size).copy(),
+                      np.broadcast_to(self.num, size).copy(),
+                      np.broadcast_to(self.txt, size).copy())
+
+    def put(self, index, other):
+        other = other.broadcast(len(index))
+        self.kind[index] = other.kind
+        self.num[index] = other.num
+        self.txt[index] = other.txt
+
+    def first_error(self):
+        errors = np.flatnonzero(self.kind == ERROR)
+        return ExcelError(self.txt[errors[0]]) if len(errors) else None
+
+    def item(self, i=0):
+        """Return a single value as a Python object"""
+        kind = self.kind[i]
+        if kind == NUMBER:
+            return float(self.num[i])
+        if kind == TEXT:
+            return self.txt[i]
+        if kind == BOOL:
+            return bool(self.num[i])
+        if kind == ERROR:
+            return ExcelError(self.txt[i])
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Coercions
+# ---------------------------------------------------------------------------
+
+def _as_numbers(values):
+    """Numbers for arithmetic: blanks are 0, numeric text converts, other text is #VALUE!"""
+    num = np.where(values.kind == BLANK, 0.0, values.num)
+    err = np.where(values.kind == ERROR, values.txt, None)
+    for i in np.flatnonzero(values.kind == TEXT):
+        try:
+            num[i] = float(values.txt[i])
+        except ValueError:
+            err[i] = '#VALUE!'
+    return num, err
+
+
+def _as_text(values):
+    """Text for concatenation (&) and TEXT()"""
+    txt = np.full(len(values), '', dtype=object)
+    is_num = values.kind == NUMBER
+    txt[is_num] = [_general_format(number) for number in values.num[is_num].tolist()]
+    is_txt = (values.kind == TEXT) | (values.kind == ERROR)
+    txt[is_txt] = values.txt[is_txt]
+    is_bool = values.kind == BOOL
+    txt[is_bool] = np.where(values.num[is_bool] != 0, 'TRUE', 'FALSE')
+    return txt
+
+
+def _general_format(number):
+    """Excel 'General' display of a number"""
+    if float(number).is_integer():
+        return str(int(number))
+    return f'{number:.15g}'
+
+
+def _as_bools(values):
+    """Booleans for IF conditions"""
+    cond = np.where(values.kind == BLANK, False, values.num != 0)
+    err = np.where(values.kind == ERROR, values.txt, None)
+    for i in np.flatnonzero(values.kind == TEXT):
+        upper = values.txt[i].upper()
+        if upper in ('TRUE', 'FALSE'):
+            cond[i] = upper == 'TRUE'
+        else:
+            err[i] = '#VALUE!'
+    return cond, err
+
+
+def _numbers_result(num, err):
+    """Build Values from numeric results and error codes"""
+    size = len(num)
+    result = Values.empty(size)
+    bad = ~np.isfinite(num)
+    result.kind[:] = NUMBER
+    result.num[:] = num
+    has_err = err != None  # noqa: E711 - elementwise comparison on object array
+    num_err = bad & ~has_err
+    result.kind[num_err] = ERROR
+    result.txt[num_err] = '#NUM!'
+    result.kind[has_err] = ERROR
+    result.txt[has_err] = err[has_err]
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Operators
+# ---------------------------------------------------------------------------
+
+def _arithmetic(op, left, right):
+    size = max(len(left), len(right))
+    a, a_err = _as_numbers(left.broadcast(size))
+    b, b_err = _as_numbers(right.broadcast(size))
+    err = np.where(a_err != None, a_err, b_err)  # noqa: E711
+    with np.errstate(all='ignore'):
+        if op == '+':
+            num = a + b
+        elif op == '-':
+            num = a - b
+        elif op == '*':
+            num = a * b
+        elif op == '/':
+            num = a / b
+            err = np.where((err == None) & (b == 0), '#DIV/0!', err)  # noqa: E711
+        elif op == '^':
+            num = np.power(a, b)
+        else:
+            raise ValueError(f"Unsupported operator: {op}")
+    return _numbers_result(num, err)
+
+
+def _concat(left, right):
+    size = max(len(left), len(right))
+    left, right = left.broadcast(size), right.broadcast(size)
+    result = Values.empty(size)
+    result.kind[:] = TEXT
+    result.txt[:] = _as_text(left) + _as_text(right)
+    for side in (right, left):
+        is_err = side.kind == ERROR
+        result.kind[is_err] = ERROR
+        result.txt[is_err] = side.txt[is_err]
+    return result
+
+
+# Excel orders mixed comparisons as numbers < text < booleans
+_RANKS = np.array([-1, 0, 1, 2, 3])  # by kind: BLANK, NUMBER, TEXT, BOOL, ERROR
+
+
+def _compare(op, left, right):
+    size = max(len(left), len(right))
+    left, right = left.broadcast(size), right.broadcast(size)
+    compare = _COMPARISONS[op]
+    # A blank takes the type of the other operand (0, "" or FALSE)
+    lk = np.where(left.kind == BLANK, np.where(right.kind == BLANK, NUMBER, right.kind), left.kind)
+    rk = np.where(right.kind == BLANK, lk, right.kind)
+    result = Values.empty(size)
+    result.kind[:] = BOOL
+    matched = np.zeros(size, dtype=bool)
+    same = lk == rk
+    numeric = same & ((lk == NUMBER) | (lk == BOOL))
+    matched[numeric] = compare(np.where(left.kind == BLANK, 0.0, left.num)[numeric],
+                               np.where(right.kind == BLANK, 0.0, right.num)[numeric])
+    text = np.flatnonzero(same & (lk == TEXT))
+    if len(text):
+        matched[text] = compare(_lowered(np.where(left.kind == BLANK, '', left.txt)[text]),
+                                _lowered(np.where(right.kind == BLANK, '', right.txt)[text]))
+    # Mixed types compare by rank
+    mixed = ~same
+    matched[mixed] = compare(_RANKS[lk[mixed]], _RANKS[rk[mixed]])
+    result.num[:] = matched
+    # Errors win, the left operand's first
+    for side in (right, left):
+        is_err = side.kind == ERROR
+        result.kind[is_err] = ERROR
+        result.num[is_err] = np.nan
+        result.txt[is_err] = side.txt[is_err]
+    return result
+
+
+def _lowered(texts):
+    """Lower-cased copy of an object array of strings, each distinct string lowered once"""
+    texts = texts.tolist()
+    lower = {text: text.lower() for text in set(texts)}
+    result = np.empty(len(texts), dtype=object)
+    result[:] = list(map(lower.__getitem__, texts))
+    return result
+
+
+_COMPARISONS = {
+    '=': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+# ---------------------------------------------------------------------------
+# Functions
+# ---------------------------------------------------------------------------
+
+_CRITERION = re.compile(r'^(<=|>=|<>|<|>|=)?(.*)$', re.S)
+
+
+def _criteria_mask(values, criterion):
+    """Vectorized COUNTIF-style criteria matching"""
+    crit = criterion.item()
+    if isinstance(crit, ExcelError):
+        return np.zeros(len(values), dtype=bool)
+    if isinstance(crit, (float, bool)) or crit is None:
+        target = float(crit or 0)
+        return (values.kind == NUMBER) & (values.num == target)
+
+    op, operand = _CRITERION.match(crit).groups()
+    op = op or '='
+    try:
+        target = float(operand)
+    except ValueError:
+        target = None
+
+    if target is not None:
+        is_num = values.kind == NUMBER
+        with np.errstate(invalid='ignore'):
+            matched = is_num & _COMPARISONS[op](values.num, target)
+        if op == '<>':
+            matched = ~is_num | matched
+        return matched
+
+    is_text = values.kind == TEXT
+    lowered = np.full(len(values), '', dtype=object)
+    lowered[is_text] = _lowered(values.txt[is_text])
+    operand = operand.lower()
+    if op in ('=', '<>'):
+        if operand == '':
+            matched = values.kind == BLANK
+        elif '*' in operand or '?' in operand:
+            pattern = re.compile(re.escape(operand).replace(r'\*', '.*').replace(r'\?', '.') + '$', re.S)
+            matched = is_text & np.array([bool(pattern.match(t)) for t in lowered], dtype=bool)
+        else:
+            matched = is_text & (lowered == operand)
+        return ~matched if op == '<>' else matched
+    return is_text & _COMPARISONS[op](lowered, operand)
+
+
+def _aggregate_numbers(args):
+    """Numbers taken by SUM/AVERAGE: ranges ignore text and blanks, scalars coerce"""
+    parts = []
+    for arg, is_range in args:
+        error = arg.first_error()
+        if error:
+            return None, error
+        if is_range:
+            parts.append(arg.num[arg.kind == NUMBER])
+        else:
+            num, err = _as_numbers(arg)
+            if err[0] is not None:
+                return None, ExcelError(err[0])
+            parts.append(num)
+    return (np.concatenate(parts) if parts else np.zeros(0)), None
+
+
+def _fn_sum(args):
+    numbers, error = _aggregate_numbers(args)
+    return Values.scalar(error or float(numbers.sum()))
+
+
+def _fn_average(args):
+    numbers, error = _aggregate_numbers(args)
+    if error:
+        return Values.scalar(error)
+    if not len(numbers):
+        return Values.scalar(ExcelError('#DIV/0!'))
+    return Values.scalar(float(numbers.mean()))
+
+
+def _fn_min(args):
+    numbers, error = _aggregate_numbers(args)
+    return Values.scalar(error or float(numbers.min() if len(numbers) else 0))
+
+
+def _fn_max(args):
+    numbers, error = _aggregate_numbers(args)
+    return Values.scalar(error or float(numbers.max() if len(numbers) else 0))
+
+
+def _fn_count(args):
+    return Values.scalar(float(sum(int((arg.kind == NUMBER).sum()) for arg, _ in args)))
+
+
+def _fn_counta(args):
+    return Values.scalar(float(sum(int((arg.kind != BLANK).sum()) for arg, _ in args)))
+
+
+def _fn_countif(args):
+    (values, _), (criterion, _) = args
+    return Values.scalar(float(_criteria_mask(values, criterion).sum()))
+
+
+def _fn_countifs(args):
+    if len(args) % 2:
+        return Values.scalar(ExcelError('#VALUE!'))
+    mask = None
+    for (values, _), (criterion, _) in zip(args[::2], args[1::2]):
+        matched = _criteria_mask(values, criterion)
+        if mask is not None and len(matched) != len(mask):
+            return Values.scalar(ExcelError('#VALUE!'))
+        mask = matched if mask is None else mask & matched
+    return Values.scalar(float(mask.sum()))
+
+
+def _fn_abs(args):
+    (values, _), = args
+    num, err = _as_numbers(values)
+    return _numbers_result(np.abs(num), err)
+
+
+def _fn_round(args):
+    (values, _), (digits, _) = args
+    num, err = _as_numbers(values)
+    places, _ = _as_numbers(digits)
+    factor = 10.0 ** places
+    with np.errstate(all='ignore'):
+        rounded = np.sign(num) * np.floor(np.abs(num) * factor + 0.5) / factor
+    return _numbers_result(rounded, err)
+
+
+def _fn_if(args):
+    condition = args[0][0]
+    when_true = args[1][0] if len(args) > 1 else Values.scalar(True)
+    when_false = args[2][0] if len(args) > 2 else Values.scalar(False)
+    size = max(len(condition), len(when_true), len(when_false))
+    cond, err = _as_bools(condition.broadcast(size))
+    result = when_false.broadcast(size).copy()
+    chosen = np.flatnonzero(cond)
+    if len(chosen):
+        result.put(chosen, when_true.broadcast(size).take(chosen))
+    has_err = err != None  # noqa: E711
+    result.kind[has_err] = ERROR
+    result.txt[has_err] = err[has_err]
+    return result
+
+
+def _fn_text(args):
+    (values, _), (fmt, _) = args
+    fmt = fmt.item()
+    num, err = _as_numbers(values)
+    result = Values.empty(len(values))
+    result.kind[:] = TEXT
+    result.txt[:] = [_format_number(x, fmt) for x in num]
+    has_err = err != None  # noqa: E711
+    result.kind[has_err] = ERROR
+    result.txt[has_err] = err[has_err]
+    return result
+
+
+def _format_number(number, fmt):
+    """Subset of Excel number formats used by TEXT(): 0, 0.0, #,##0, 0%, 0.0%"""
+    if not math.isfinite(number):
+        return ''
+    percent = fmt.endswith('%')
+    body = fmt.rstrip('%')
+    if percent:
+        number *= 100
+    decimals = len(body.split('.', 1)[1]) if '.' in body else 0
+    rounded = math.floor(abs(number) * 10 ** decimals + 0.5) / 10 ** decimals
+    text = f"{rounded:{',' if ',' in body else ''}.{decimals}f}"
+    if number < 0 and rounded:
+        text = '-' + text
+    return text + ('%' if percent else '')
+
+
+FUNCTIONS = {
+    'SUM': _fn_sum,
+    'AVERAGE': _fn_average,
+    'MIN': _fn_min,
+    'MAX': _fn_max,
+    'COUNT': _fn_count,
+    'COUNTA': _fn_counta,
+    'COUNTIF': _fn_countif,
+    'COUNTIFS': _fn_countifs,
+    'ABS': _fn_abs,
+    'ROUND': _fn_round,
+    'IF': _fn_if,
+    'TEXT': _fn_text,
+}
+
+# Functions whose result depends on the evaluation time
+VOLATILE_FUNCTIONS = ('NOW', 'TODAY')
+
+
+# ---------------------------------------------------------------------------
+# Formula parsing
+# ---------------------------------------------------------------------------
+
+_PRECEDENCE = [('=', '<>', '<', '>', '<=', '>='), ('&',), ('+', '-'), ('*', '/'), ('^',)]
+
+
+class Token:
+    """A formula token; the type and subtype names follow openpyxl's tokenizer"""
+
+    __slots__ = ('value', 'type', 'subtype')
+
+    OPERAND, FUNC, ARRAY, PAREN, SEP = 'OPERAND', 'FUNC', 'ARRAY', 'PAREN', 'SEP'
+    OP_PRE, OP_IN, OP_POST = 'OPERATOR-PREFIX', 'OPERATOR-INFIX', 'OPERATOR-POSTFIX'
+    TEXT, NUMBER, LOGICAL, ERROR, RANGE = 'TEXT', 'NUMBER', 'LOGICAL', 'ERROR', 'RANGE'
+    OPEN, CLOSE, ARG = 'OPEN', 'CLOSE', 'ARG'
+
+    def __init__(self, value, type_, subtype=''):
+        self.value = value
+        self.type = type_
+        self.subtype = subtype
+
+    def __repr__(self):
+        return f'Token({self.value!r}, {self.type!r}, {self.subtype!r})'
+
+
+_NUMBER = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[Ee][+-]?\d+)?(?![\w.:!$])')
+_OPERAND = re.compile(r"(?:'(?:[^']|'')*'|[^\s+\-*/^&=<>,;(){}%\"'])+")
+_ERROR = re.compile('|'.join(re.escape(code) for code in sorted(ERROR_CODES, key=len, reverse=True)))
+
+
+def tokenize(formula):
+    """
+    Split a formula into Tokens (whitespace is dropped)
+
+    Raises:
+        ValueError: On an unterminated string or an unknown character
+    """
+    text = formula[1:] if formula.startswith('=') else formula
+    tokens = []
+    # Open parentheses: True for a function call, False for grouping
+    stack = []
+    pos = 0
+    while pos < len(text):
+        char = text[pos]
+        if char.isspace():
+            pos += 1
+            continue
+        previous = tokens[-1] if tokens else None
+        # A value has just ended, so + and - are infix rather than prefix
+        after_value = previous is not None and (
+            previous.type == Token.OPERAND or previous.subtype == Token.CLOSE or
+            previous.type == Token.OP_POST)
+        if char == '"':
+            end = pos + 1
+            while True:
+                end = text.find('"', end)
+                if end < 0:
+                    raise ValueError(f"Unterminated string in {formula}")
+                if text.startswith('""', end):
+                    end += 2
+                    continue
+                break
+            tokens.append(Token(text[pos:end + 1], Token.OPERAND, Token.TEXT))
+            pos = end + 1
+        elif char == '#' and _ERROR.match(text, pos):
+            match = _ERROR.match(text, pos)
+            tokens.append(Token(match.group(0), Token.OPERAND, Token.ERROR))
+            pos = match.end()
+        elif char in '+-' and not after_value:
+            tokens.append(Token(char, Token.OP_PRE))
+            pos += 1
+        elif text.startswith(('<=', '>=', '<>'), pos):
+            tokens.append(Token(text[pos:pos + 2], Token.OP_IN))
+            pos += 2
+        elif char in '+-*/^&=<>':
+            tokens.append(Token(char, Token.OP_IN))
+            pos += 1
+        elif char == '%':
+            tokens.append(Token(char, Token.OP_POST))
+            pos += 1
+        elif char == '(':
+            stack.append(False)
+            tokens.append(Token(char, Token.PAREN, Token.OPEN))
+            pos += 1
+        elif char == ')':
+            if not stack:
+                raise ValueError(f"Unbalanced parentheses in {formula}")
+            tokens.append(Token(char, Token.FUNC if stack.pop() else Token.PAREN, Token.CLOSE))
+            pos += 1
+        elif char in ',;':
+            tokens.append(Token(char, Token.SEP, Token.ARG))
+            pos += 1
+        elif char in '{}':
+            tokens.append(Token(char, Token.ARRAY, Token.OPEN if char == '{' else Token.CLOSE))
+            pos += 1
+        else:
+            match = _NUMBER.match(text, pos)
+            if match:
+                tokens.append(Token(match.group(0), Token.OPERAND, Token.NUMBER))
+                pos = match.end()
+                continue
+            match = _OPERAND.match(text, pos)
+            if not match:
+                raise ValueError(f"Unexpected character {char!r} in {formula}")
+            value = match.group(0)
+            pos = match.end()
+            if pos < len(text) and text[pos] == '(':
+                stack.append(True)
+                tokens.append(Token(value + '(', Token.FUNC, Token.OPEN))
+                pos += 1
+            elif value.upper() in ('TRUE', 'FALSE'):
+                tokens.append(Token(value, Token.OPERAND, Token.LOGICAL))
+            else:
+                tokens.append(Token(value, Token.OPERAND, Token.RANGE))
+    return tokens
+
+
+def parse_formula(formula):
+    """
+    Parse an Excel formula into a small expression tree
+
+    Nodes are tuples: ('num', float), ('str', text), ('bool', flag),
+    ('err', code), ('ref', reference), ('func', NAME, [args]),
+    ('op', operator, left, right), ('neg', node) and ('pct', node).
+    """
+    tokens = tokenize(formula)
+    parser = _Parser(tokens)
+    node = parser.expression()
+    if parser.pos != len(tokens):
+        raise ValueError(f"Unexpected token {tokens[parser.pos].value!r} in {formula}")
+    return node
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def advance(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of formula")
+        self.pos += 1
+        return token
+
+    def expression(self, level=0):
+        if level == len(_PRECEDENCE):
+            return self.unary()
+        node = self.expression(level + 1)
+        while True:
+            token = self.peek()
+            if token is None or token.type != Token.OP_IN or token.value not in _PRECEDENCE[level]:
+                return node
+            self.advance()
+            node = ('op', token.value, node, self.expression(level + 1))
+
+    def unary(self):
+        token = self.peek()
+        if token is not None and token.type == Token.OP_PRE:
+            self.advance()
+            operand = self.unary()
+            return ('neg', operand) if token.value == '-' else operand
+        node = self.primary()
+        while self.peek() is not None and self.peek().type == Token.OP_POST:
+            self.advance()
+            node = ('pct', node)
+        return node
+
+    def primary(self):
+        token = self.advance()
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                return ('num', float(token.value))
+            if token.subtype == Token.TEXT:
+                return ('str', token.value[1:-1].replace('""', '"'))
+            if token.subtype == Token.LOGICAL:
+                return ('bool', token.value.upper() == 'TRUE')
+            if token.subtype == Token.ERROR:
+                return ('err', token.value)
+            return ('ref', token.value)
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            name = token.value[:-1].upper()
+            args = []
+            if self.peek().type == Token.FUNC and self.peek().subtype == Token.CLOSE:
+                self.advance()
+                return ('func', name, args)
+            while True:
+                args.append(self.expression())
+                token = self.advance()
+                if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                    return ('func', name, args)
+                if token.type != Token.SEP:
+                    raise ValueError(f"Unexpected token {token.value!r}")
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self.expression()
+            if self.advance().type != Token.PAREN:
+                raise ValueError("Unbalanced parentheses")
+            return node
+        raise ValueError(f"Unexpected token {token.value!r}")
+
+
+_SHEET_REF = re.compile(r"^(?:'((?:[^']|'')+)'|([^'!]+))!(.+)$")
+_AREA = re.compile(r'^\$?([A-Z]{1,3})\$?(\d*)(?::\$?([A-Z]{1,3})\$?(\d*))?$')
+_CELL_IN_FORMULA = re.compile(r"(?<![A-Za-z0-9_!$.'])(\$?[A-Z]{1,3})(\$?)(\d+)(?![A-Za-z0-9_(!])")
+
+
+def split_reference(reference):
+    """Split "'Sheet Name'!A1:B2" into (sheet name or None, area)"""
+    match = _SHEET_REF.match(reference)
+    if not match:
+        return None, reference
+    sheet = match.group(1).replace("''", "'") if match.group(1) else match.group(2)
+    return sheet, match.group(3)
+
+
+def parse_area(area):
+    """Parse 'A1', 'A1:B9' or 'A:A' into (col1, row1, col2, row2); rows are None for whole columns"""
+    match = _AREA.match(area.upper())
+    if not match:
+        return None
+    col1, row1, col2, row2 = match.groups()
+    if col2 is None:
+        col2, row2 = col1, row1
+    return (column_index(col1), int(row1) if row1 else None,
+            column_index(col2), int(row2) if row2 else None)
+
+
+def relative_template(formula, row):
+    """
+    Rewrite same-row relative references as row 0, e.g. '=(D5-B5)*24*60'
+    on row 5 becomes '=(D0-B0)*24*60', so rows sharing a formula group together
+    """
+    parts = formula.split('"')
+    for i in range(0, len(parts), 2):
+        parts[i] = _CELL_IN_FORMULA.sub(
+            lambda m: f"{m.group(1)}{m.group(2)}0" if not m.group(2) and int(m.group(3)) == row else m.group(0),
+            parts[i])
+    return '"'.join(parts)
+
+
+# A same-row reference in a formula whose row number was replaced by \0
+_ROW_SLOT = re.compile(r"(?<![A-Za-z0-9_!$.'])\$?[A-Z]{1,3}\x00(?![A-Za-z0-9_(!\x00])")
+
+
+def formula_groups(raw, rows=None):
+    """
+    Group the formula cells of a column by relative template
+
+    Formulas copied down a column only differ in their row number, so the
+    row number is blanked out first and the template worked out once per
+    distinct formula rather than once per row.
+
+    Args:
+        raw: Cell values of the column (only '=...' text counts), or the
+            formula texts alone when ``rows`` is given
+        rows: Row indexes (0-based) of the formula texts
+
+    Returns:
+        dict: {template: [row indexes (0-based)]}
+    """
+    if rows is None:
+        rows = [i for i, value in enumerate(raw) if isinstance(value, str) and value.startswith('=')]
+        raw = [raw[i] for i in rows]
+    if not len(rows):
+        return {}
+    rows = np.asarray(rows)
+    # Row numbers are blanked out with str.replace mapped over the column,
+    # which beats np.char.replace (a Python loop too, plus the str arrays)
+    keys = list(map(str.replace, raw, map(str, (rows + 1).tolist()), repeat('\0')))
+    if keys.count(keys[0]) == len(keys):
+        # Usually one formula copied down the whole column
+        distinct, inverse = keys[:1], np.zeros(len(keys), dtype=np.int64)
+    else:
+        distinct, inverse = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    members = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+    groups = {}
+    # Templates in the order of their first cell
+    for k in np.argsort([positions[0] for positions in members], kind='stable').tolist():
+        key = distinct[k]
+        # Only reuse it when every blanked number is a relative row
+        # reference; otherwise (e.g. '=E5*5' on row 5) work it out per row
+        parts = key.split('"')
+        slots = sum(len(_ROW_SLOT.findall(part)) for part in parts[0::2])
+        if slots == key.count('\0'):
+            groups.setdefault(key.replace('\0', '0'), []).extend(rows[members[k]].tolist())
+            continue
+        for position in members[k].tolist():
+            row = int(rows[position])
+            groups.setdefault(relative_template(raw[position], row + 1), []).append(row)
+    for group in groups.values():
+        group.sort()
+    return groups
+
+
+# ---------------------------------------------------------------------------
+# Workbook model
+# ---------------------------------------------------------------------------
+
+class SheetModel:
+    """Cell data of one sheet, resolved column by column on demand"""
+
+    def __init__(self, workbook, name, cells=None):
+        self.workbook = workbook
+        self.name = name
+        self.max_row = 0
+        # Per column: Values of the cells (formula cells blank) and the
+        # formula cells as (row indexes, texts)
+        self._values = {}
+        self._formulas = {}
+        self._resolved = {}
+        self._resolving = set()
+        self._groups = {}
+        if cells is not None:
+            self.add(cells)
+
+    def add(self, cells):
+        """Take in the columns of an xml_loader.SheetValues"""
+        if cells.max_row > self.max_row:
+            self.max_row = cells.max_row
+            self._resolved.clear()
+        for col in cells.columns:
+            self._values[col] = cells.columns[col]
+            self._formulas.pop(col, None)
+            self._groups.pop(col, None)
+            self._resolved.pop(col, None)
+        self._formulas.update(cells.formulas)
+
+    def formula(self, col, row):
+        """Formula text of a cell ('=...'), or None"""
+        if col not in self._formulas:
+            return None
+        rows, texts = self._formulas[col]
+        found = np.searchsorted(rows, row - 1)
+        return texts[found] if found < len(rows) and rows[found] == row - 1 else None
+
+    def templates(self, col):
+        """Formula cells of a column grouped by relative template (see formula_groups)"""
+        if col not in self._groups:
+            rows, texts = self._formulas.get(col, (np.zeros(0, dtype=np.int64), []))
+            self._groups[col] = formula_groups(list(texts), rows)
+        return self._groups[col]
+
+    def column(self, col):
+        """Return the resolved Values of a whole column (rows 1..max_row)"""
+        if col in self._resolved:
+            return self._resolved[col]
+        if col in self._resolving:
+            raise ValueError(f"Circular reference in column {col} of '{self.name}'")
+        self._resolving.add(col)
+        try:
+            values = Values.empty(self.max_row)
+            read = self._values.get(col)
+            if read is not None and len(read):
+                values.put(np.arange(len(read)), read)
+            for template, index in self.templates(col).items():
+                index = np.array(index)
+                try:
+                    result = self.workbook.evaluate(parse_formula(template), self.name, index)
+                except (ValueError, KeyError):
+                    result = Values.error('#NAME?', 1)
+                values.put(index, result)
+            self._resolved[col] = values
+        finally:
+            self._resolving.discard(col)
+        return values
+
+    def area(self, col1, row1, col2, row2):
+        """Values of a rectangular area, column by column"""
+        row1 = row1 or 1
+        row2 = min(row2 or self.max_row, self.max_row)
+        parts = [self.column(col).take(slice(row1 - 1, row2)) for col in range(col1, col2 + 1)]
+        return Values.concat(parts)
+
+
+class WorkbookModel:
+    """Lazily loaded workbook used to evaluate formulas"""
+
+    def __init__(self, path, now=None):
+        self.path = path
+        # Time used for NOW()/TODAY() (defaults to the current time)
+        self.now = now
+        self.zf = zipfile.ZipFile(path)
+        self.names = defined_names(self.zf)
+        self.parts = sheet_parts(self.zf)
+        self.sheets = {}
+
+    def close(self):
+        self.zf.close()
+
+    def read(self, sheet_name, columns=None):
+        """Read columns of a worksheet (default all) as an xml_loader.SheetValues"""
+        from xml_loader import read_values
+        return read_values(self.zf, sheet_name, columns)
+
+    def sheet(self, name):
+        if name not in self.sheets:
+            self.sheets[name] = SheetModel(self, name, self.read(name))
+        return self.sheets[name]
+
+    def reference(self, reference, sheet_name, rows):
+        """
+        Resolve a cell, range or defined name to Values
+
+        Returns (values, True): like Excel, aggregate functions treat any
+        reference as a range and skip the text in it.
+        """
+        if reference in self.names:
+            reference = self.names[reference]
+        sheet, area = split_reference(reference)
+        bounds = parse_area(area)
+        if bounds is None:
+            raise KeyError(reference)
+        col1, row1, col2, row2 = bounds
+        sheet = self.sheet(sheet or sheet_name)
+        if row1 == 0:
+            # Same-row reference of a grouped per-row formula
+            column = sheet.column(col1)
+            index = np.asarray(rows)
+            inside = index < sheet.max_row
+            values = Values.empty(len(index))
+            values.put(np.flatnonzero(inside), column.take(index[inside]))
+            return values, True
+        return sheet.area(col1, row1, col2, row2), True
+
+    def evaluate(self, node, sheet_name, rows=(0,)):
+        """Evaluate an expression tree; per-row references use ``rows``"""
+        values, _ = self._evaluate(node, sheet_name, rows)
+        return values
+
+    def _evaluate(self, node, sheet_name, rows):
+        kind = node[0]
+        if kind in ('num', 'str', 'bool'):
+            return Values.scalar(node[1]), False
+        if kind == 'err':
+            return Values.error(node[1], 1), False
+        if kind == 'ref':
+            return self.reference(node[1], sheet_name, rows)
+        if kind == 'neg':
+            return _arithmetic('-', Values.scalar(0.0), self.evaluate(node[1], sheet_name, rows)), False
+        if kind == 'pct':
+            return _arithmetic('/', self.evaluate(node[1], sheet_name, rows), Values.scalar(100.0)), False
+        if kind == 'op':
+            _, op, left, right = node
+            left = self.evaluate(left, sheet_name, rows)
+            right = self.evaluate(right, sheet_name, rows)
+            if op == '&':
+                return _concat(left, right), False
+            if op in _COMPARISONS:
+                return _compare(op, left, right), False
+            return _arithmetic(op, left, right), False
+        if kind == 'func':
+            _, name, args = node
+            if name in VOLATILE_FUNCTIONS:
+                now = self.now or datetime.now()
+                return Values.scalar(now if name == 'NOW' else float(int(to_serial(now)))), False
+            if name not in FUNCTIONS:
+                raise ValueError(f"Unsupported function: {name}")
+            return FUNCTIONS[name]([self._evaluate(arg, sheet_name, rows) for arg in args]), False
+        raise ValueError(f"Unknown node: {kind}")
+
+    def formula_cells(self, sheet_name):
+        """Return {coordinate: value} for every formula cell of a sheet"""
+        sheet = self.sheet(sheet_name)
+        results = {}
+        for col in sorted(sheet._formulas):
+            values = sheet.column(col)
+            for i in sheet._formulas[col][0].tolist():
+                results[f"{column_letter(col)}{i + 1}"] = values.item(i)
+        return results
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def evaluate_dashboard(path, sheet_name='Dashboard', now=None):
+    """
+    Evaluate every formula on the Dashboard
+
+    Args:
+        now: Time used for NOW()/TODAY() (defaults to the current time)
+
+    Returns:
+        dict: {coordinate: value}; errors are ExcelError strings and
+        NOW()/TODAY() results are Excel date serials
+    """
+    model = WorkbookModel(path, now=now)
+    try:
+        return model.formula_cells(sheet_name)
+    finally:
+        model.close()
+
+
+def dashboard_kpis(path, values=None):
+    """
+    Return the Dashboard KPI table as a list of dicts
+
+    Each entry has metric, target, current and status, read from the KPI rows
+    (row 6 until the first empty Metric cell).
+    """
+    import openpyxl
+    values = values if values is not None else evaluate_dashboard(path)
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        rows = list(wb['Dashboard'].iter_rows(min_row=6, max_col=4, values_only=True))
+    finally:
+        wb.close()
+    kpis = []
+    for offset, (metric, target, current, status) in enumerate(rows):
+        if not metric:
+            break
+        row = 6 + offset
+        kpis.append({
+            'metric': metric,
+            'target': target,
+            'current': values.get(f'C{row}', current),
+            'status': values.get(f'D{row}', status),
+        })
+    return kpis
+
+
+_FORMULA_CELL = re.compile(r'<c r="([A-Z]+\d+)"([^>]*?)>(<f>.*?</f>)(?:<v\s*/>|<v>[^<]*</v>)?</c>', re.S)
+
+
+_VOLATILE_CALL = re.compile(r'\b(?:%s)\s*\(' % '|'.join(VOLATILE_FUNCTIONS))
+
+
+def _cached_cell(match, values, volatile=True):
+    coordinate, attrs, formula = match.groups()
+    if coordinate not in values or values[coordinate] is None:
+        return match.group(0)
+    if not volatile and _VOLATILE_CALL.search(formula):
+        return match.group(0)
+    value = values[coordinate]
+    attrs = re.sub(r'\s+t="[^"]*"', '', attrs)
+    if isinstance(value, ExcelError):
+        cell_type, text = 'e', value
+    elif isinstance(value, bool):
+        cell_type, text = 'b', '1' if value else '0'
+    elif isinstance(value, str):
+        cell_type, text = 'str', value
+    else:
+        cell_type, text = None, repr(float(value))
+    type_attr = f' t="{cell_type}"' if cell_type else ''
+    return f'<c r="{coordinate}"{attrs}{type_attr}>{formula}<v>{escape(text)}</v></c>'
+
+
+def write_cached_values(path, values, sheet_name='Dashboard', output_path=None, volatile=True):
+    """
+    Store computed values as the cached results of a sheet's formula cells
+
+    Only the sheet's worksheet part is rewritten. Formulas are kept, so Excel
+    still recalculates them on open.
+
+    Args:
+        volatile: Also cache cells calling NOW()/TODAY(). Reproducible builds
+            without a fixed build time leave them empty.
+    """
+    with zipfile.ZipFile(path) as zf:
+        part = sheet_parts(zf)[sheet_name]
+        xml = zf.read(part).decode('utf-8')
+    xml = _FORMULA_CELL.sub(lambda m: _cached_cell(m, values, volatile), xml)
+    return rewrite_members(path, {part: xml.encode('utf-8')}, output_path)
+
+
+def cache_dashboard_values(path, output_path=None, now=None, volatile=True):
+    """
+    Evaluate the Dashboard and store its cached values; returns the values
+
+    Args:
+        now: Time used for NOW()/TODAY() (defaults to the current time)
+        volatile: Also cache cells calling NOW()/TODAY()
+    """
+    values = evaluate_dashboard(path, now=now)
+    write_cached_values(path, values, output_path=output_path, volatile=volatile)
+    return values
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Evaluate Dashboard KPIs of a tracking workbook')
+    parser.add_argument('workbook', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_WORKBOOK))
+    parser.add_argument('--cache', action='store_true',
+                        help='Store the evaluated values as cached formula results')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.workbook):
+        print(f"❌ Error: File not found: {args.workbook}")
+        return 1
+
+    values = evaluate_dashboard(args.workbook)
+    print()
+    print(f"📊 Dashboard KPIs: {os.path.basename(args.workbook)}")
+    print()
+    for kpi in dashboard_kpis(args.workbook, values):
+        current = kpi['current']
+        shown = f"{current:.4g}" if isinstance(current, float) else current
+        print(f"  • {kpi['metric']:<32} {str(shown):>12}   {kpi['status']}")
+
+    if args.cache:
+        write_cached_values(args.workbook, values)
+        print()
+        print(f"✓ Cached values stored in {os.path.basename(args.workbook)}")
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
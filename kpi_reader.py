@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+"""
+Headless Dashboard KPI Reader
+
+Reads the Dashboard KPIs of a filled tracking workbook without Excel and
+without openpyxl, for monitoring that polls site workbooks:
+
+    1. The Dashboard KPI formulas are parsed to find the sheets and columns
+       each KPI depends on, through the named data ranges and the per-row
+       formulas of those columns (e.g. Duration needs Start and Actual End).
+    2. Only those columns of those worksheet parts are stream-parsed, with
+       xml_loader.read_values(): its regular expression only matches the
+       wanted columns, so other columns and sheets are never turned into
+       objects, and their cells are converted into column arrays in bulk.
+    3. The KPIs are evaluated with kpi_engine, which reads sheets the same
+       way, and printed as JSON.
+
+Usage:
+    python3 kpi_reader.py site.xlsx
+    python3 kpi_reader.py site.xlsx --indent 2
+    python3 ecom.py kpis site.xlsx
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+from kpi_engine import (
+    DEFAULT_WORKBOOK, VOLATILE_FUNCTIONS, ExcelError, SheetModel, Values, WorkbookModel,
+    column_index, column_letter, formula_groups, parse_area, parse_formula, split_reference,
+    to_serial,
+)
+
+# First KPI row of the Dashboard (columns: Metric, Target, Current, Status)
+KPI_ROW = 6
+KPI_COLUMNS = 4
+
+BLOCK_SIZE = 1 << 20
+# Start of a sheet searched for per-row formulas before the full pass
+PROBE_SIZE = 1 << 16
+
+_LAST_ROW = re.compile(rb'<row\b[^>]*?\br="(\d+)"')
+_TYPE = re.compile(rb'\bt="(\w+)"')
+_FORMULA = re.compile(rb'<f\b([^>]*?)(?:/>|>(.*?)</f>)', re.S)
+_SHARED_INDEX = re.compile(rb'\bsi="(\d+)"')
+_VALUE = re.compile(rb'<v>(.*?)</v>', re.S)
+_TEXT = re.compile(rb'<t\b[^>]*?(?:/>|>(.*?)</t>)', re.S)
+_PHONETIC = re.compile(rb'<rPh\b.*?</rPh>', re.S)
+_STRING_ITEM = re.compile(rb'<si>(.*?)</si>|<si/>', re.S)
+_VOLATILE_CALL = re.compile(r'\b(?:%s)\s*\(' % '|'.join(VOLATILE_FUNCTIONS))
+_CELL_REF = re.compile(r"(?<![A-Za-z0-9_!$.'])(\$?)([A-Z]{1,3})(\$?)(\d+)(?![A-Za-z0-9_(!])")
+
+
+def _cell_pattern(columns=None):
+    """Regular expression matching the <c> elements of the given columns (default: all)"""
+    if columns is None:
+        letters = rb'[A-Z]{1,3}'
+    else:
+        letters = b'|'.join(column_letter(col).encode() for col in sorted(columns))
+    # The body is matched a run of text at a time, not byte by byte
+    return re.compile(rb'<c r="(' + letters + rb')(\d+)"([^>/]*)(?:/>|>([^<]*(?:<(?!/c>)[^<]*)*)</c>)')
+
+
+class SharedString(int):
+    """Index into the shared string table, resolved after the sheets are read"""
+
+
+def _text(data):
+    text = data.decode('utf-8')
+    return html.unescape(text) if '&' in text else text
+
+
+def _number(data):
+    # Like openpyxl: integers stay int
+    if b'.' in data or b'E' in data or b'e' in data:
+        return float(data)
+    return int(data)
+
+
+def shift_formula(formula, rows, cols):
+    """Move the relative references of a formula, as Excel does for shared formulas"""
+    def shift(match):
+        col_abs, col, row_abs, row = match.groups()
+        if not col_abs:
+            col = column_letter(column_index(col) + cols)
+        if not row_abs:
+            row = str(int(row) + rows)
+        return f'{col_abs}{col}{row_abs}{row}'
+
+    parts = formula.split('"')
+    for i in range(0, len(parts), 2):
+        parts[i] = _CELL_REF.sub(shift, parts[i])
+    return '"'.join(parts)
+
+
+def _cell_value(row, col, attrs, body, shared_formulas):
+    """Python value of one <c> element: number, text, bool, error or '=formula'"""
+    if not body:
+        return None
+    if b't="' not in attrs:
+        if body[:3] == b'<v>' and body[-4:] == b'</v>':
+            # Plain number, by far the most common cell
+            return _number(body[3:-4]) if len(body) > 7 else None
+        cell_type = b'n'
+    else:
+        cell_type = _TYPE.search(attrs).group(1)
+        if (cell_type == b'inlineStr' and body[:7] == b'<is><t>'
+                and body.find(b'<', 7) == len(body) - 9):
+            # Inline text written by openpyxl or the parallel generator
+            return _text(body[7:-9])
+
+    formula = _FORMULA.search(body)
+    if formula:
+        attrs, text = formula.groups()
+        shared = _SHARED_INDEX.search(attrs) if b'shared' in attrs else None
+        if text:
+            text = _text(text)
+            if shared:
+                shared_formulas[int(shared.group(1))] = (text, row, col)
+            return '=' + text
+        if shared and int(shared.group(1)) in shared_formulas:
+            text, master_row, master_col = shared_formulas[int(shared.group(1))]
+            return '=' + shift_formula(text, row - master_row, col - master_col)
+        # The group's first cell was not read: fall back to the cached value
+
+    if cell_type == b'inlineStr':
+        return ''.join(_text(text or b'') for text in _TEXT.findall(_PHONETIC.sub(b'', body)))
+    value = _VALUE.search(body)
+    if value is None:
+        return None
+    value = value.group(1)
+    if cell_type == b's':
+        return SharedString(int(value))
+    if cell_type in (b'str', b'e'):
+        text = _text(value)
+        return ExcelError(text) if cell_type == b'e' else text
+    if cell_type == b'b':
+        return value.strip() == b'1'
+    if cell_type == b'd':
+        return to_serial(datetime.fromisoformat(value.decode()))
+    return _number(value) if value else None
+
+
+def read_shared_strings(zf, indexes):
+    """
+    Stream the shared string table, keeping only the given entries
+
+    Args:
+        zf: Open zipfile.ZipFile of the workbook
+        indexes: Set of string indexes the sheets refer to
+
+    Returns:
+        dict: {index: text}
+    """
+    table = {}
+    try:
+        f = zf.open('xl/sharedStrings.xml')
+    except KeyError:
+        return table
+    last = max(indexes)
+    index = 0
+    with f:
+        pending = b''
+        while index <= last:
+            block = f.read(BLOCK_SIZE)
+            data = pending + block
+            end = len(data) if not block else data.rfind(b'</si>') + 5
+            if end < 5:
+                pending = data
+                if not block:
+                    break
+                continue
+            chunk, pending = data[:end], data[end:]
+            for match in _STRING_ITEM.finditer(chunk):
+                if index in indexes:
+                    body = _PHONETIC.sub(b'', match.group(1) or b'')
+                    table[index] = ''.join(_text(text or b'') for text in _TEXT.findall(body))
+                index += 1
+            if not block:
+                break
+    return table
+
+
+class StreamingSheetModel(SheetModel):
+    """
+    Sheet model holding only the columns read so far
+
+    Columns are read by StreamingWorkbookModel.load(); a column that is
+    asked for but was not read is loaded then, so results never depend on
+    the dependency analysis being complete.
+    """
+
+    def __init__(self, workbook, name):
+        super().__init__(workbook, name)
+        self._cells = {}
+        # Column -> set of (sheet name, column) its formulas read
+        self.column_refs = {}
+
+    def add(self, cells):
+        if cells.max_row > self.max_row:
+            self._cells.clear()
+        super().add(cells)
+
+    def column(self, col):
+        if col not in self._values:
+            self.workbook.load(self.name, {col})
+        return super().column(col)
+
+    def formula(self, col, row):
+        if col not in self._values:
+            self.workbook.load(self.name, {col})
+        return super().formula(col, row)
+
+    def value(self, col, row):
+        """Raw value of a cell (formulas as '=...' text)"""
+        raw = self.formula(col, row)
+        if raw is None:
+            values = self._values[col]
+            raw = values.item(row - 1) if row <= len(values) else None
+        return raw
+
+    def cell(self, col, row):
+        """Evaluate one cell without resolving the rest of its column"""
+        key = (col, row)
+        if key not in self._cells:
+            raw = self.value(col, row)
+            if self.formula(col, row) is not None:
+                if key in self._resolving:
+                    raise ValueError(f"Circular reference at {column_letter(col)}{row}")
+                self._resolving.add(key)
+                try:
+                    values = self.workbook.evaluate(parse_formula(raw), self.name)
+                except (ValueError, KeyError):
+                    values = None
+                finally:
+                    self._resolving.discard(key)
+                result = values.item() if values is not None else ExcelError('#NAME?')
+            else:
+                result = raw
+            self._cells[key] = result
+        return self._cells[key]
+
+    def area(self, col1, row1, col2, row2):
+        if col1 == col2 and row1 and row1 == row2:
+            # A single cell, e.g. C6 in a Status formula
+            value = self.cell(col1, row1)
+            if isinstance(value, ExcelError):
+                return Values.error(value, 1)
+            return Values.from_python([value])
+        return super().area(col1, row1, col2, row2)
+
+
+class StreamingWorkbookModel(WorkbookModel):
+    """Workbook model reading only the worksheet columns formulas refer to"""
+
+    def __init__(self, path, now=None):
+        super().__init__(path, now)
+        # Cells read per sheet, for the report
+        self.cells_read = {}
+
+    def adopt(self, sheet):
+        """Reuse the columns another model read from an unchanged sheet"""
+        copy = self.sheet(sheet.name)
+        copy.max_row = sheet.max_row
+        copy._values, copy._formulas = sheet._values, sheet._formulas
+        copy._groups, copy.column_refs = sheet._groups, sheet.column_refs
+
+    def sheet(self, name):
+        if name not in self.sheets:
+            if name not in self.parts:
+                raise KeyError(name)
+            self.sheets[name] = StreamingSheetModel(self, name)
+        return self.sheets[name]
+
+    def references(self, formula, sheet_name):
+        """
+        Areas a formula refers to
+
+        Returns:
+            list: (sheet name, col1, row1, col2, row2); rows are None for
+            whole columns and 0 for same-row references of per-row formulas
+        """
+        areas = []
+        stack = [parse_formula(formula)]
+        while stack:
+            node = stack.pop()
+            if node[0] == 'ref':
+                reference = self.names.get(node[1], node[1])
+                sheet, area = split_reference(reference)
+                bounds = parse_area(area)
+                if bounds:
+                    areas.append((sheet or sheet_name, *bounds))
+            elif node[0] == 'func':
+                stack.extend(node[2])
+            elif node[0] == 'op':
+                stack.extend(node[2:])
+            elif node[0] in ('neg', 'pct'):
+                stack.append(node[1])
+        return areas
+
+    def formula_refs(self, formulas, sheet_name):
+        """Set of (sheet name, column) the given formula templates read"""
+        refs = set()
+        for template in formulas:
+            try:
+                areas = self.references(template, sheet_name)
+            except ValueError:
+                continue
+            for name, col1, _, col2, _ in areas:
+                refs.update((name, col) for col in range(col1, col2 + 1))
+        return refs
+
+    def load(self, sheet_name, columns, follow=True):
+        """
+        Read columns of a sheet, then the columns their formulas refer to
+
+        Args:
+            sheet_name: Sheet to read
+            columns: Column indexes (1-based)
+            follow: Also read the columns the formulas of these columns use
+        """
+        sheet = self.sheet(sheet_name)
+        columns = set(columns) - set(sheet._values)
+        if columns and follow:
+            columns = self._probe(sheet, columns)
+        while columns:
+            self._read_columns(sheet, columns)
+            if not follow:
+                return
+            # Per-row formulas (Duration, Efficiency, ...) need their inputs
+            columns = set()
+            for col in list(sheet._values):
+                if col in sheet.column_refs:
+                    continue
+                refs = sheet.column_refs[col] = self.formula_refs(sheet.templates(col), sheet_name)
+                columns.update(c for name, c in refs if name == sheet_name)
+                for name in {name for name, _ in refs if name != sheet_name and name in self.parts}:
+                    self.load(name, {c for n, c in refs if n == name})
+            columns -= set(sheet._values)
+
+    def read_rows(self, sheet_name, last_row):
+        """
+        Read every cell of the first rows of a sheet (titles, headers, ...)
+
+        Returns:
+            dict: {row: {column: value}} for the rows up to ``last_row``
+        """
+        with self.zf.open(self.parts[sheet_name]) as f:
+            data = b''
+            end = None
+            while end is None:
+                block = f.read(PROBE_SIZE)
+                data += block
+                for match in _LAST_ROW.finditer(data):
+                    if int(match.group(1)) > last_row:
+                        end = match.start()
+                        break
+                if not block:
+                    end = len(data) if end is None else end
+        rows = {}
+        strings = set()
+        for letter, row, attrs, body in _cell_pattern().findall(data[:end]):
+            row, col = int(row), column_index(letter.decode())
+            if row <= last_row:
+                value = _cell_value(row, col, attrs, body, {})
+                if type(value) is SharedString:
+                    strings.add(value)
+                rows.setdefault(row, {})[col] = value
+        if strings:
+            table = read_shared_strings(self.zf, strings)
+            for cells in rows.values():
+                for col, value in cells.items():
+                    if type(value) is SharedString:
+                        cells[col] = table.get(value)
+        return rows
+
+    def _probe(self, sheet, columns):
+        """
+        Add the columns that the formulas at the top of the sheet refer to
+
+        Reading them in the same pass saves going through the sheet again
+        for the inputs of per-row formulas; load() still checks every row.
+        """
+        with self.zf.open(self.parts[sheet.name]) as f:
+            head = f.read(PROBE_SIZE)
+        head = head[:head.rfind(b'</row>') + 6]
+        columns = set(columns)
+        pending = columns
+        while pending:
+            values = {col: [] for col in pending}
+            self._scan(head, _cell_pattern(pending), values, {}, set())
+            found = set()
+            for raw in values.values():
+                found.update(col for name, col in self.formula_refs(formula_groups(raw), sheet.name)
+                             if name == sheet.name)
+            pending = found - columns - set(sheet._values)
+            columns |= pending
+        return columns
+
+    @staticmethod
+    def _scan(chunk, pattern, values, shared_formulas, strings):
+        """Append the cells of complete rows to their columns; returns the cell count"""
+        indexes = {}
+        count = 0
+        for letter, row, attrs, body in pattern.findall(chunk):
+            row = int(row)
+            col = indexes.get(letter)
+            if col is None:
+                col = indexes[letter] = column_index(letter.decode())
+            value = _cell_value(row, col, attrs, body, shared_formulas)
+            column = values[col]
+            if len(column) < row - 1:
+                column.extend([None] * (row - 1 - len(column)))
+            column.append(value)
+            if type(value) is SharedString:
+                strings.add(value)
+            count += 1
+        return count
+
+    def _read_columns(self, sheet, columns):
+        """Stream one worksheet part, keeping the cells of the given columns"""
+        cells = self.read(sheet.name, columns)
+        sheet.add(cells)
+        for col in columns:
+            # Columns without cells are read too
+            sheet._values.setdefault(col, Values.empty(0))
+        self.cells_read[sheet.name] = self.cells_read.get(sheet.name, 0) + cells.cells
+
+
+def evaluate_kpis(model):
+    """
+    Evaluate the Dashboard KPIs with a streaming model
+
+    Returns:
+        dict: {'kpis': [{'metric', 'target', 'current', 'status',
+        'depends_on': {sheet: [column letters]}}, ...],
+        'cells_read': {sheet: cells}, 'volatile': bool}
+    """
+    dashboard = model.sheet('Dashboard')
+    # The Daily Summary and Alerts formulas are not KPIs: don't follow them
+    model.load('Dashboard', range(1, KPI_COLUMNS + 1), follow=False)
+    rows = []
+    row = KPI_ROW
+    while dashboard.value(1, row):
+        rows.append(row)
+        row += 1
+
+    # Direct dependencies of each KPI, following Dashboard cell references
+    formulas = set()
+
+    def dependencies(formula, seen):
+        formulas.add(formula)
+        found = set()
+        for sheet, col1, row1, col2, row2 in model.references(formula, 'Dashboard'):
+            if sheet == 'Dashboard' and row1 and row1 == row2 and col1 == col2:
+                if (col1, row1) not in seen:
+                    seen.add((col1, row1))
+                    raw = dashboard.formula(col1, row1)
+                    if raw is not None:
+                        found |= dependencies(raw, seen)
+                continue
+            found.update((sheet, col) for col in range(col1, col2 + 1))
+        return found
+
+    direct = {}
+    for row in rows:
+        found = set()
+        for col in (3, 4):
+            raw = dashboard.formula(col, row)
+            if raw is not None:
+                found |= dependencies(raw, {(col, row)})
+        direct[row] = found
+
+    # One pass per sheet for the columns of all KPIs together
+    needed = {}
+    for found in direct.values():
+        for sheet, col in found:
+            needed.setdefault(sheet, set()).add(col)
+    for sheet, columns in needed.items():
+        if sheet in model.parts:
+            model.load(sheet, columns)
+
+    kpis = []
+    for row in rows:
+        # Follow per-row formulas to the columns they read
+        columns = set()
+        pending = list(direct[row])
+        while pending:
+            sheet, col = pending.pop()
+            if (sheet, col) in columns:
+                continue
+            columns.add((sheet, col))
+            if sheet in model.sheets:
+                pending.extend(model.sheets[sheet].column_refs.get(col, ()))
+        depends_on = {}
+        for sheet, col in sorted(columns):
+            depends_on.setdefault(sheet, []).append(column_letter(col))
+        kpis.append({
+            'metric': dashboard.value(1, row),
+            'target': dashboard.value(2, row),
+            'current': dashboard.cell(3, row),
+            'status': dashboard.cell(4, row),
+            'depends_on': depends_on,
+        })
+        for sheet, col in columns:
+            if sheet in model.sheets and sheet != 'Dashboard':
+                formulas.update(model.sheets[sheet].templates(col))
+
+    volatile = any(_VOLATILE_CALL.search(formula) for formula in formulas)
+    return {'kpis': kpis, 'cells_read': dict(model.cells_read), 'volatile': volatile}
+
+
+def read_kpis(path, now=None):
+    """
+    Evaluate the Dashboard KPIs of a workbook without loading it whole
+
+    Args:
+        path: Tracking workbook (.xlsx or .xlsm)
+        now: Time used for NOW()/TODAY() (defaults to the current time)
+
+    Returns:
+        dict: See evaluate_kpis()
+    """
+    model = StreamingWorkbookModel(path, now=now)
+    try:
+        return evaluate_kpis(model)
+    finally:
+        model.close()
+
+
+class KpiPoller:
+    """
+    Read the KPIs of one workbook again and again, re-reading only what changed
+
+    The CRC-32 of every worksheet part is in the ZIP directory. Sheets whose
+    part is unchanged since the last poll keep the columns already read, and
+    when nothing changed (and no KPI uses NOW/TODAY) the last result is
+    returned straight away.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.result = None
+        self._crcs = {}
+        self._sheets = {}
+
+    def poll(self, now=None):
+        """
+        Returns:
+            dict: See evaluate_kpis(), plus 'changed' (sheets read again)
+        """
+        model = StreamingWorkbookModel(self.path, now=now)
+        try:
+            crcs = {name: model.zf.getinfo(part).CRC for name, part in model.parts.items()}
+            if self.result and crcs == self._crcs and not self.result['volatile']:
+                return dict(self.result, cells_read={}, changed=[])
+            for name, sheet in self._sheets.items():
+                if crcs.get(name) == self._crcs.get(name):
+                    model.adopt(sheet)
+            result = evaluate_kpis(model)
+        finally:
+            model.close()
+        result['changed'] = sorted(model.cells_read)
+        self.result, self._crcs, self._sheets = result, crcs, model.sheets
+        return result
+
+
+def _json_value(value):
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _print_report(path, report, start, indent=None):
+    for kpi in report['kpis']:
+        kpi['current'] = _json_value(kpi['current'])
+    output = {'workbook': path, **report, 'seconds': round(time.perf_counter() - start, 4)}
+    print(json.dumps(output, indent=indent, ensure_ascii=False), flush=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Print the Dashboard KPIs of a workbook as JSON, without opening it in full'
+    )
+    parser.add_argument('workbook', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             DEFAULT_WORKBOOK))
+    parser.add_argument('--indent', type=int, default=None,
+                        help='Pretty-print the JSON with this indent')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Poll the workbook every SECONDS, one JSON line per poll; '
+                             'only changed sheets are read again')
+    args = parser.parse_args()
+
+    poller = KpiPoller(args.workbook)
+    while True:
+        start = time.perf_counter()
+        try:
+            report = poller.poll()
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            message = e.args[0] if isinstance(e, KeyError) else str(e)
+            print(json.dumps({'workbook': args.workbook, 'error': f'{type(e).__name__}: {message}'}),
+                  flush=True)
+            if not args.watch:
+                return 1
+        else:
+            _print_report(args.workbook, report, start, args.indent)
+        if not args.watch:
+            return 0
+        try:
+            time.sleep(args.watch)
+        except KeyboardInterrupt:
+            return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
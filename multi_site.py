@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Multi-Site Workbook Builder
+
+Builds one tracking workbook per warehouse from a site manifest. The shared
+layout (the 12-sheet skeleton) is rendered once; every site is then built in
+its own worker process by splicing its KPI targets and prefill data into the
+skeleton, optionally with the VBA project embedded.
+
+Manifest (JSON; paths are relative to the manifest):
+
+    {
+      "output_dir": "sites",
+      "defaults": {"vba": false, "kpi_targets": {}},
+      "sites": [
+        {"name": "Leeds",
+         "kpi_targets": {"Picking Efficiency": {"target": "> 97%",
+                                                "thresholds": [0.97, 0.92]}},
+         "prefill": ["Wave Tracking=leeds/waves.csv", "leeds/picks.csv"],
+         "vba": true},
+        {"name": "Bristol", "output": "bristol/tracking.xlsx"}
+      ]
+    }
+
+KPI targets use the Dashboard metric names; "target" is the label shown in
+the Target column and "thresholds" the [good, fair] limits of the Status
+formula. Prefill entries take the same [SHEET=]FILE form as --import.
+
+Usage:
+    python3 multi_site.py sites.json
+    python3 multi_site.py sites.json --workers 4 --report build_report.json
+    python3 multi_site.py sites.json --site Leeds --site Bristol
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from parallel_generator import ParallelExcelGenerator
+
+DEFAULT_OUTPUT_DIR = 'sites'
+
+
+class SiteSpec:
+    """One site of the manifest"""
+
+    def __init__(self, name, output, kpi_targets=None, prefill=(), vba=False,
+                 cache_values=True):
+        self.name = name
+        self.output = output
+        self.kpi_targets = kpi_targets or {}
+        self.prefill = list(prefill)
+        self.vba = vba
+        self.cache_values = cache_values
+
+
+def site_slug(name):
+    """File-name-safe form of a site name"""
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', name.strip()).strip('_')
+    if not slug:
+        raise ValueError(f"Site name {name!r} gives an empty file name")
+    return slug
+
+
+def load_manifest(path, output_dir=None):
+    """
+    Read a site manifest
+
+    Args:
+        path: JSON manifest
+        output_dir: Override of the manifest's output_dir
+
+    Returns:
+        list: SiteSpec per site, with absolute paths
+
+    Raises:
+        ValueError: If the manifest is malformed or names a site twice
+    """
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    output_dir = os.path.join(base, output_dir or manifest.get('output_dir', DEFAULT_OUTPUT_DIR))
+    defaults = manifest.get('defaults', {})
+    sites = manifest.get('sites')
+    if not isinstance(sites, list) or not sites:
+        raise ValueError(f"{path}: 'sites' must be a non-empty list")
+
+    specs = []
+    outputs = set()
+    for entry in sites:
+        if 'name' not in entry:
+            raise ValueError(f"{path}: every site needs a 'name'")
+        settings = {**defaults, **entry}
+        # Site targets refine the defaults metric by metric
+        targets = {**defaults.get('kpi_targets', {}), **entry.get('kpi_targets', {})}
+        vba = bool(settings.get('vba', False))
+        extension = '.xlsm' if vba else '.xlsx'
+        output = os.path.join(base, entry['output']) if entry.get('output') else \
+            os.path.join(output_dir, site_slug(entry['name']) + extension)
+        if output in outputs:
+            raise ValueError(f"{path}: two sites write {output}")
+        outputs.add(output)
+        prefill = []
+        for spec in settings.get('prefill', []):
+            sheet, sep, file_path = spec.rpartition('=')
+            file_path = os.path.join(base, file_path)
+            prefill.append(f'{sheet}={file_path}' if sep else file_path)
+        specs.append(SiteSpec(entry['name'], output, targets, prefill, vba,
+                              settings.get('cache_values', True)))
+    return specs
+
+
+def vba_project_bytes(base_dir):
+    """
+    The VBA project embedded in sites with "vba": the committed
+    vbaProject.bin if there is one, else a project built from the sources
+    """
+    vba_bin = os.path.join(base_dir, 'vbaProject.bin')
+    if os.path.exists(vba_bin):
+        with open(vba_bin, 'rb') as f:
+            return f.read()
+    from create_formula_based_excel import TRACKING_SHEETS
+    from vba_project import VBAProject, workbook_documents
+    project = VBAProject()
+    # Dashboard and Insights & Analytics besides the tracking sheets
+    for name in workbook_documents(len(TRACKING_SHEETS) + 2):
+        project.add_document(name)
+    project.add_source(os.path.join(base_dir, 'VBA_Modules.bas'))
+    buffer = io.BytesIO()
+    project.write(buffer)
+    return buffer.getvalue()
+
+
+def build_site(site, skeleton, vba_project=None):
+    """
+    Worker task: build one site's workbook from the shared skeleton
+
+    Args:
+        site: SiteSpec
+        skeleton: ParallelExcelGenerator.build_skeleton() result
+        vba_project: vbaProject.bin bytes, for sites with VBA
+
+    Returns:
+        dict: Summary record (site, status, seconds, rows, output, bytes, error)
+    """
+    start = time.perf_counter()
+    result = {'site': site.name, 'output': site.output, 'rows': 0}
+    try:
+        os.makedirs(os.path.dirname(site.output) or '.', exist_ok=True)
+        data = None
+        if site.prefill:
+            from bulk_import import import_sources
+            data = import_sources(site.prefill)
+        generator = ParallelExcelGenerator(workers=1, cache_values=site.cache_values,
+                                           kpi_targets=site.kpi_targets)
+        workbook = site.output
+        if site.vba:
+            workbook = os.path.splitext(site.output)[0] + '.build.xlsx'
+        # Each worker builds one site; the per-site console output is dropped
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate(workbook, data=data, skeleton=skeleton)
+        if site.vba:
+            from xlsx_package import inject_vba_project
+            try:
+                inject_vba_project(workbook, vba_project, site.output)
+            finally:
+                os.unlink(workbook)
+        result['rows'] = sum(generator.data_rows.values())
+        result.update(status='ok', bytes=os.path.getsize(site.output))
+    except Exception as e:
+        result.update(status='error', error=f'{type(e).__name__}: {e}')
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def build_sites(sites, workers=None, progress=print):
+    """
+    Build the workbooks of several sites in parallel
+
+    Args:
+        sites: SiteSpec list (see load_manifest)
+        workers: Worker processes (default: number of CPU cores)
+        progress: Optional callable receiving one line per finished site
+
+    Returns:
+        dict: Report with the per-site records and total timings
+    """
+    start = time.perf_counter()
+    skeleton = ParallelExcelGenerator().build_skeleton()
+    skeleton_seconds = time.perf_counter() - start
+    vba_project = None
+    if any(site.vba for site in sites):
+        vba_project = vba_project_bytes(os.path.dirname(os.path.abspath(__file__)))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sites)))
+    results = []
+    if workers == 1:
+        outcomes = (build_site(site, skeleton, vba_project) for site in sites)
+        for result in outcomes:
+            results.append(result)
+            if progress:
+                progress(_result_line(result))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(build_site, site, skeleton, vba_project) for site in sites]
+            for site, future in zip(sites, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself failed (e.g. it was killed)
+                    result = {'site': site.name, 'output': site.output, 'rows': 0,
+                              'status': 'error', 'error': f'{type(e).__name__}: {e}',
+                              'seconds': None}
+                results.append(result)
+                if progress:
+                    progress(_result_line(result))
+
+    return {
+        'workers': workers,
+        'skeleton_seconds': round(skeleton_seconds, 3),
+        'total_seconds': round(time.perf_counter() - start, 3),
+        'failed': sum(1 for result in results if result['status'] != 'ok'),
+        'sites': results,
+    }
+
+
+def _result_line(result):
+    if result['status'] == 'ok':
+        return (f"  ✓ {result['site']:<24} {result['seconds']:>7.2f} s  "
+                f"{result['rows']:>10,} rows  {result['bytes'] / 1024:>9,.0f} KB  "
+                f"{os.path.basename(result['output'])}")
+    return f"  ✗ {result['site']:<24} {result['error']}"
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Build one tracking workbook per site from a manifest'
+    )
+    parser.add_argument('manifest', help='Site manifest (JSON)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: number of CPU cores)')
+    parser.add_argument('--output-dir', metavar='DIR', default=None,
+                        help="Output directory (default: the manifest's output_dir, or sites/)")
+    parser.add_argument('--site', dest='only', action='append', default=[], metavar='NAME',
+                        help='Only build the named site (repeatable)')
+    parser.add_argument('--report', metavar='FILE',
+                        help='Write the per-site summary as JSON')
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Multi-Site Workbook Builder")
+    print("=" * 70)
+    print()
+
+    try:
+        sites = load_manifest(args.manifest, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    if args.only:
+        missing = sorted(set(args.only) - {site.name for site in sites})
+        if missing:
+            print(f"❌ Error: not in the manifest: {', '.join(missing)}")
+            return 1
+        sites = [site for site in sites if site.name in args.only]
+
+    print(f"🏭 Building {len(sites)} site workbook(s)...")
+    report = build_sites(sites, workers=args.workers)
+    print()
+    print(f"⏱️  Skeleton: {report['skeleton_seconds']:.2f} s, "
+          f"total: {report['total_seconds']:.2f} s ({report['workers']} workers)")
+    if report['failed']:
+        print(f"❌ {report['failed']} of {len(sites)} site(s) failed")
+    else:
+        print(f"✅ All {len(sites)} site workbooks created")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to: {args.report}")
+    print()
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+SQLite Operational Store for the Tracking Sheets
+
+Keeps the tracking data in an SQLite database whose tables mirror the sheets
+of the formula-based workbook, so lookups such as "open errors" or
+"in-progress waves" use an index instead of scanning whole columns:
+
+    • One table per tracking sheet, one column per header (e.g. Wave
+      Tracking -> wave_tracking, Duration (mins) -> duration_mins)
+    • Status, Employee ID, SKU and each sheet's date column are indexed;
+      text compares case-insensitively, as in Excel
+    • Per-row formula columns (duration, efficiency, variance, coverage)
+      are generated columns computed from the same formulas
+    • Dates are stored as Excel date serials, so the generated columns and
+      the Dashboard KPIs work out exactly as in the workbook
+    • Rows are inserted in batches inside one transaction per load
+    • The 12-sheet workbook is exported as a view of the store
+
+Usage:
+    python3 ops_store.py ops.db --import waves.csv --import errors.csv
+    python3 ops_store.py ops.db --find "System Errors" --status Open
+    python3 ops_store.py ops.db --kpis
+    python3 ops_store.py ops.db --export site.xlsx
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+
+from openpyxl.utils.datetime import from_excel
+
+from bulk_import import DATE_HEADERS, NUMBER_HEADERS, PERCENT_HEADERS, import_sources
+from create_formula_based_excel import DERIVED_COLUMNS, TRACKING_SHEETS, dashboard_kpis
+from kpi_engine import (
+    EXCEL_EPOCH, ExcelError, Values, WorkbookModel, column_index, parse_formula, to_serial,
+)
+from parallel_generator import ParallelExcelGenerator
+
+# Rows sent to SQLite per executemany() call
+BATCH_ROWS = 5_000
+
+# Indexed columns, besides the date column of each sheet
+INDEXED_HEADERS = ['Status', 'Employee ID', 'SKU']
+
+# Covering indexes for the KPI queries that filter on one column and read another
+KPI_INDEXES = {
+    'Wave Tracking': [('Status', 'Duration (mins)')],
+}
+
+# Dashboard Current formulas as SQL over the store; a NULL result is shown
+# as #DIV/0!, like the formula on an empty sheet
+KPI_QUERIES = {
+    'Wave Completion (1 hour)':
+        "SELECT (SELECT COUNT(*) FROM wave_tracking"
+        " WHERE status = 'Complete' AND duration_mins <= 60) * 1.0"
+        " / (SELECT NULLIF(COUNT(*), 0) FROM wave_tracking WHERE status = 'Complete')",
+    'Employee Training Completion':
+        "SELECT (SELECT COUNT(*) FROM employee_training WHERE status = 'Completed') * 1.0"
+        " / NULLIF(COUNT(employee_id), 0) FROM employee_training",
+    'Stock Replenishment Time': "SELECT AVG(duration_hrs) FROM stock_replenishment",
+    'Quality Audit Coverage': "SELECT AVG(coverage_pct) FROM quality_audit",
+    'Picking Efficiency': "SELECT AVG(efficiency_pct) FROM picking_tasks",
+    'Inventory Accuracy':
+        "SELECT 1 - ABS(SUM(variance)) / NULLIF(SUM(system_count), 0) FROM inventory_mismatch",
+}
+
+
+def sql_name(text):
+    """
+    SQL identifier of a sheet or header
+
+    e.g. 'Wave Tracking' -> 'wave_tracking', 'Coverage %' -> 'coverage_pct'
+    """
+    return '_'.join(re.findall(r'[a-z0-9]+', text.lower().replace('%', ' pct')))
+
+
+def date_header(sheet_name):
+    """The first date column of a sheet, or None"""
+    return next((h for h in TRACKING_SHEETS[sheet_name] if h in DATE_HEADERS), None)
+
+
+def _derived_sql(sheet_name, template):
+    """
+    Translate a per-row formula template into a generated column expression
+
+    Blank cells count as 0, as in Excel; a division by zero gives NULL.
+    """
+    headers = TRACKING_SHEETS[sheet_name]
+
+    def column(match):
+        return f'COALESCE({sql_name(headers[column_index(match.group(1)) - 1])}, 0)'
+    return re.sub(r'([A-Z]+)\{row\}', column, template.lstrip('='))
+
+
+def table_schema(sheet_name):
+    """
+    CREATE TABLE and CREATE INDEX statements of a tracking sheet
+
+    Returns:
+        list: SQL statements
+    """
+    table = sql_name(sheet_name)
+    derived = DERIVED_COLUMNS.get(sheet_name, {})
+    columns = []
+    for header in TRACKING_SHEETS[sheet_name]:
+        name = sql_name(header)
+        if header in derived:
+            expression = _derived_sql(sheet_name, derived[header][0])
+            columns.append(f'{name} REAL GENERATED ALWAYS AS ({expression}) VIRTUAL')
+        elif header in DATE_HEADERS or header in NUMBER_HEADERS or header in PERCENT_HEADERS:
+            # REAL affinity also turns numbers stored as text into numbers
+            columns.append(f'{name} REAL')
+        else:
+            columns.append(f'{name} TEXT COLLATE NOCASE')
+    statements = [f'CREATE TABLE IF NOT EXISTS {table} (\n    '
+                  + ',\n    '.join(columns) + '\n)']
+    indexed = [h for h in INDEXED_HEADERS if h in TRACKING_SHEETS[sheet_name]]
+    if date_header(sheet_name):
+        indexed.append(date_header(sheet_name))
+    indexed = [(header,) for header in indexed] + KPI_INDEXES.get(sheet_name, [])
+    for headers in indexed:
+        names = [sql_name(header) for header in headers]
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(names)} "
+                          f"ON {table} ({', '.join(names)})")
+    return statements
+
+
+# Excel serials of datetimes from here on are plain day counts since EXCEL_EPOCH
+_LEAP_DAY = datetime(1900, 3, 1)
+_DAY = timedelta(days=1)
+
+
+def _to_sql(value):
+    if type(value) is datetime and value >= _LEAP_DAY:
+        # The common case, without to_serial()'s checks
+        return (value - EXCEL_EPOCH) / _DAY
+    if isinstance(value, (datetime, date, time_of_day)):
+        return to_serial(value)
+    if isinstance(value, str):
+        if not value.strip() or value.startswith('='):
+            return None
+    return value
+
+
+def _from_sql(value, is_date):
+    if is_date and isinstance(value, float):
+        return from_excel(value)
+    return value
+
+
+class StoreSheet:
+    """
+    The rows of one table, passed as a sheet's ``data`` entry when the
+    workbook is exported; per-row formulas are written again on every row
+    """
+
+    def __init__(self, store, sheet_name):
+        self.store = store
+        self.sheet_name = sheet_name
+
+    def iter_rows(self, first_row):
+        """Yield the sheet rows in insertion order, numbering formulas from first_row"""
+        headers = TRACKING_SHEETS[self.sheet_name]
+        derived = DERIVED_COLUMNS.get(self.sheet_name, {})
+        dates = [header in DATE_HEADERS for header in headers]
+        columns = ', '.join(sql_name(h) for h in headers)
+        cursor = self.store.conn.execute(
+            f'SELECT {columns} FROM {sql_name(self.sheet_name)} ORDER BY rowid')
+        row_number = first_row
+        while True:
+            batch = cursor.fetchmany(BATCH_ROWS)
+            if not batch:
+                break
+            for values in batch:
+                yield [derived[header][0].format(row=row_number) if header in derived
+                       else _from_sql(value, is_date)
+                       for header, value, is_date in zip(headers, values, dates)]
+                row_number += 1
+
+
+class _KpiStatus(WorkbookModel):
+    """Evaluates the Dashboard Status formulas on Current values from the store"""
+
+    def __init__(self, current):
+        self.current = current
+        self.now = None
+        self.names = {}
+
+    def reference(self, reference, sheet_name, rows):
+        return Values.from_python([self.current]), False
+
+
+class OperationalStore:
+    """SQLite database holding the rows of every tracking sheet"""
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if path != ':memory:':
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            for sheet_name in TRACKING_SHEETS:
+                for statement in table_schema(sheet_name):
+                    self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _insert(self, sheet_name, rows, batch_rows):
+        if sheet_name not in TRACKING_SHEETS:
+            raise ValueError(f"'{sheet_name}' is not a tracking sheet")
+        headers = TRACKING_SHEETS[sheet_name]
+        derived = DERIVED_COLUMNS.get(sheet_name, {})
+        stored = [i for i, header in enumerate(headers) if header not in derived]
+        keys = [(headers[i], sql_name(headers[i])) for i in stored]
+        sql = (f"INSERT INTO {sql_name(sheet_name)} ({', '.join(name for _, name in keys)}) "
+               f"VALUES ({', '.join('?' * len(keys))})")
+
+        count = 0
+        batch = []
+        for row in rows:
+            if isinstance(row, dict):
+                values = [_to_sql(row.get(header, row.get(name))) for header, name in keys]
+            else:
+                row = list(row)
+                if len(row) > len(headers):
+                    raise ValueError(f"{sheet_name}: row {count + 1} has {len(row)} values, "
+                                     f"the sheet has {len(headers)} columns")
+                row += [None] * (len(headers) - len(row))
+                values = [_to_sql(row[i]) for i in stored]
+            batch.append(values)
+            count += 1
+            if len(batch) >= batch_rows:
+                self.conn.executemany(sql, batch)
+                batch = []
+        if batch:
+            self.conn.executemany(sql, batch)
+        return count
+
+    def load(self, data, batch_rows=BATCH_ROWS):
+        """
+        Insert the rows of several sheets in one transaction
+
+        Args:
+            data: Mapping of sheet name to rows, in the generator's ``data``
+                format: value lists in header order (formula columns are
+                recalculated, so any value there is ignored) or dicts keyed
+                by header or column name; bulk_import sources work too
+            batch_rows: Rows per executemany() call
+
+        Returns:
+            dict: Sheet name -> rows inserted
+
+        Raises:
+            ValueError: If a sheet is unknown or a row is too long; nothing
+                is inserted then
+        """
+        counts = {}
+        with self.conn:
+            for sheet_name, rows in data.items():
+                # Bulk import sources number their formula rows; the store doesn't need them
+                if hasattr(rows, 'iter_rows'):
+                    rows = rows.iter_rows(1)
+                counts[sheet_name] = self._insert(sheet_name, rows, batch_rows)
+        return counts
+
+    def insert(self, sheet_name, rows, batch_rows=BATCH_ROWS):
+        """Insert rows into one sheet in a transaction; returns the row count"""
+        return self.load({sheet_name: rows}, batch_rows)[sheet_name]
+
+    def import_files(self, specs, header_map=None):
+        """Import CSV/Parquet exports (see bulk_import.import_sources)"""
+        return self.load(import_sources(specs, header_map))
+
+    def count(self, sheet_name):
+        return self.conn.execute(f'SELECT COUNT(*) FROM {sql_name(sheet_name)}').fetchone()[0]
+
+    def find(self, sheet_name, status=None, employee_id=None, sku=None, since=None, until=None,
+             limit=None):
+        """
+        Rows of a sheet matching every given filter, through the indexes
+
+        Args:
+            status, employee_id, sku: Exact values, compared case-insensitively
+            since, until: Bounds (datetime or date) on the sheet's date column
+            limit: Optional maximum number of rows
+
+        Returns:
+            list: One {header: value} dict per row, dates as datetime
+
+        Raises:
+            ValueError: If the sheet has no column for a filter
+        """
+        if sheet_name not in TRACKING_SHEETS:
+            raise ValueError(f"'{sheet_name}' is not a tracking sheet")
+        headers = TRACKING_SHEETS[sheet_name]
+        conditions, params = [], []
+        for header, value in (('Status', status), ('Employee ID', employee_id), ('SKU', sku)):
+            if value is None:
+                continue
+            if header not in headers:
+                raise ValueError(f"{sheet_name} has no {header} column")
+            conditions.append(f'{sql_name(header)} = ?')
+            params.append(value)
+        if since is not None or until is not None:
+            if not date_header(sheet_name):
+                raise ValueError(f"{sheet_name} has no date column")
+            column = sql_name(date_header(sheet_name))
+            if since is not None:
+                conditions.append(f'{column} >= ?')
+                params.append(to_serial(since))
+            if until is not None:
+                conditions.append(f'{column} < ?')
+                params.append(to_serial(until))
+
+        sql = f"SELECT {', '.join(sql_name(h) for h in headers)} FROM {sql_name(sheet_name)}"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY rowid'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        dates = [header in DATE_HEADERS for header in headers]
+        return [{header: _from_sql(value, is_date)
+                 for header, value, is_date in zip(headers, values, dates)}
+                for values in self.conn.execute(sql, params)]
+
+    def kpis(self, kpi_targets=None):
+        """
+        The Dashboard KPI table worked out from the store
+
+        Current values follow the Dashboard formulas over the stored rows
+        (the workbook's sample row 4 is not data); Status uses the Dashboard
+        Status formulas with the site's targets.
+
+        Returns:
+            list: {'metric', 'target', 'current', 'status'} per KPI
+        """
+        kpis = []
+        for metric, target, current, status, _ in dashboard_kpis(kpi_targets):
+            if metric in KPI_QUERIES:
+                value = self.conn.execute(KPI_QUERIES[metric]).fetchone()[0]
+                current = ExcelError('#DIV/0!') if value is None else value
+            model = _KpiStatus(current)
+            kpis.append({
+                'metric': metric,
+                'target': target,
+                'current': current,
+                'status': model.evaluate(parse_formula(status), 'Dashboard').item(),
+            })
+        return kpis
+
+    def export(self, path, generator=None):
+        """
+        Write the 12-sheet workbook with the rows of the store
+
+        Args:
+            path: Output workbook
+            generator: Optional FormulaBasedExcelGenerator or
+                ParallelExcelGenerator (default: ParallelExcelGenerator, which
+                renders the rows of large tables fastest)
+
+        Returns:
+            str: Path of the saved workbook
+        """
+        generator = generator or ParallelExcelGenerator()
+        data = {sheet_name: StoreSheet(self, sheet_name) for sheet_name in TRACKING_SHEETS
+                if self.count(sheet_name)}
+        return generator.generate(os.path.abspath(path), data=data)
+
+
+def _parse_date(text):
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date: {text}")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='SQLite store mirroring the tracking sheets: import exports, '
+                    'query by status/employee/SKU/date, work out the KPIs, export the workbook'
+    )
+    parser.add_argument('database', help='SQLite database file (created if missing)')
+    parser.add_argument('--import', dest='imports', action='append', default=[], metavar='FILE',
+                        help="CSV/Parquet export to import, optionally 'Sheet Name=FILE' "
+                             "(repeatable)")
+    parser.add_argument('--find', metavar='SHEET', help='Print the matching rows of a sheet')
+    parser.add_argument('--status')
+    parser.add_argument('--employee', dest='employee_id', metavar='ID')
+    parser.add_argument('--sku')
+    parser.add_argument('--since', type=_parse_date, metavar='DATE')
+    parser.add_argument('--until', type=_parse_date, metavar='DATE')
+    parser.add_argument('--limit', type=int, default=50, help='Rows printed by --find (default 50)')
+    parser.add_argument('--kpis', action='store_true', help='Print the Dashboard KPIs')
+    parser.add_argument('--export', metavar='XLSX', help='Write the workbook from the store')
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Operational Store (SQLite)")
+    print("=" * 70)
+    print()
+
+    try:
+        with OperationalStore(args.database) as store:
+            if args.imports:
+                start = time.perf_counter()
+                counts = store.import_files(args.imports)
+                print(f"📥 Imported in {time.perf_counter() - start:.2f}s:")
+                for sheet_name, count in counts.items():
+                    print(f"  ✓ {sheet_name} - {count:,} rows")
+                print()
+
+            if args.find:
+                start = time.perf_counter()
+                rows = store.find(args.find, status=args.status, employee_id=args.employee_id,
+                                  sku=args.sku, since=args.since, until=args.until)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"🔎 {args.find}: {len(rows):,} matching rows ({elapsed:.1f} ms)")
+                for row in rows[:args.limit]:
+                    print("  • " + ' | '.join(f"{header}: {value}" for header, value in row.items()
+                                              if value is not None))
+                if len(rows) > args.limit:
+                    print(f"  ... {len(rows) - args.limit:,} more")
+                print()
+
+            if args.kpis:
+                start = time.perf_counter()
+                kpis = store.kpis()
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"📊 Dashboard KPIs ({elapsed:.1f} ms):")
+                for kpi in kpis:
+                    current = kpi['current']
+                    if isinstance(current, float):
+                        current = f"{current:.3f}"
+                    print(f"  • {kpi['metric']:<32} {current:>10}   {kpi['status']}")
+                print()
+
+            if args.export:
+                store.export(args.export)
+
+            if not (args.imports or args.find or args.kpis or args.export):
+                print("📦 Rows per sheet:")
+                for sheet_name in TRACKING_SHEETS:
+                    print(f"  • {sheet_name:<28} {store.count(sheet_name):>10,}")
+                print()
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Parallel Workbook Generator for the Formula-Based Tracking System
+
+Builds the same workbook as create_formula_based_excel.py, but renders the
+data rows of every tracking sheet in a process pool. Each worker turns a
+chunk of rows into worksheet XML and deflates it itself; a single writer then
+assembles the .xlsx package from the pre-compressed parts without
+recompressing anything.
+
+How it works:
+    1. The fixed layout (titles, headers, formulas, styles, named ranges) is
+       built once by FormulaBasedExcelGenerator with no data - the skeleton,
+       kept as a snapshot of the serialized package (workbook_snapshot.py).
+    2. Data rows are split into chunks. Each worker renders its chunk's <row>
+       elements and compresses them as a sync-flushed deflate segment, so the
+       segments of one sheet can simply be concatenated.
+    3. The writer copies the skeleton parts, splicing the chunk segments into
+       each worksheet's <sheetData> and updating the dimensions and named
+       ranges for the new row counts.
+
+Usage:
+    python3 parallel_generator.py                 # Use all CPU cores
+    python3 parallel_generator.py --workers 4     # Limit the process pool
+    python3 parallel_generator.py --import waves.csv --import picks.parquet
+"""
+
+import argparse
+import numbers
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from xml.sax.saxutils import escape
+
+import numpy as np
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.datetime import to_excel
+
+from column_writer import columns_to_sheets
+from create_formula_based_excel import (
+    DATA_START_ROW, DERIVED_COLUMNS, TRACKING_SHEETS, RANGE_HEADROOM, SAMPLE_ROWS,
+    data_range_refs, derived_columns, kpi_target_cells,
+)
+from kpi_engine import cache_dashboard_values
+from xlsx_package import (
+    RawZipWriter, build_timestamp, crc32_combine, make_reproducible, sheet_parts,
+)
+
+# Rows rendered per worker task
+CHUNK_ROWS = 50_000
+
+# Built-in number formats applied to date/time values in data rows
+DATE_NUMBER_FORMATS = {
+    'datetime': 22,   # m/d/yy h:mm
+    'date': 14,       # m/d/yyyy
+    'time': 21,       # h:mm:ss
+    'timedelta': 46,  # [h]:mm:ss
+}
+
+
+def _cell_xml(ref, value, date_styles, style='', formula=False):
+    """
+    Render one data cell, or '' for an empty value
+
+    Text starting with '=' is a formula only in a formula column
+    (``formula``); anywhere else it is written as a string, so an imported
+    "=HYPERLINK(...)" stays inert text.
+    """
+    if value is None or value == '':
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}"{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if value != value or value in (float('inf'), float('-inf')):
+            return ''
+        return f'<c r="{ref}"{style}><v>{value!r}</v></c>'
+    if isinstance(value, (datetime, date, time, timedelta)):
+        kind = ('datetime' if isinstance(value, datetime) else
+                'date' if isinstance(value, date) else
+                'time' if isinstance(value, time) else 'timedelta')
+        return f'<c r="{ref}" s="{date_styles[kind]}"><v>{to_excel(value)!r}</v></c>'
+    text = str(value)
+    if formula and text.startswith('=') and len(text) > 1:
+        return f'<c r="{ref}"{style}><f>{escape(text[1:])}</f><v /></c>'
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def render_rows(rows, first_row, date_styles, column_styles=None, formula_columns=()):
+    """
+    Render data rows as worksheet <row> elements
+
+    Args:
+        rows: Iterable of row value lists
+        first_row: Worksheet row number of the first row
+        date_styles: Cell style index for each kind of date/time value
+        column_styles: Optional {column index (0-based): cell style index}
+            for the formula columns
+        formula_columns: Column indices (0-based) whose '=' text is written
+            as a formula (see formula_columns()); all other text is a string
+
+    Returns:
+        tuple: (xml bytes, widest row in columns)
+    """
+    parts = []
+    width = 0
+    letters = []
+    styles = []
+    formulas = []
+    for row_number, row in enumerate(rows, start=first_row):
+        row = list(row)
+        while len(letters) < len(row):
+            i = len(letters)
+            letters.append(get_column_letter(i + 1))
+            style = (column_styles or {}).get(i)
+            styles.append(f' s="{style}"' if style is not None else '')
+            formulas.append(i in formula_columns)
+        if len(row) > width:
+            width = len(row)
+        cells = ''.join(_cell_xml(f'{letters[i]}{row_number}', value, date_styles, styles[i],
+                                  formulas[i])
+                        for i, value in enumerate(row))
+        parts.append(f'<row r="{row_number}">{cells}</row>')
+    return ''.join(parts).encode('utf-8'), width
+
+
+def _render_chunk(rows, first_row, date_styles, column_styles, tmp_dir, formula_columns=()):
+    """
+    Worker task: render and deflate one chunk of rows into a temporary file
+
+    A column_writer.ColumnSheet chunk is rendered with its vectorized writer.
+
+    The segment ends with a sync flush, so segments can be concatenated into
+    a single deflate stream once a final block is appended.
+    """
+    if hasattr(rows, 'render'):
+        xml, width = rows.render(first_row, date_styles, column_styles)
+    else:
+        xml, width = render_rows(rows, first_row, date_styles, column_styles, formula_columns)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    data = compressor.compress(xml) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    fd, path = tempfile.mkstemp(suffix='.deflate', dir=tmp_dir)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path, zlib.crc32(xml), len(xml), len(data), width, len(rows)
+
+
+def add_date_styles(styles_xml):
+    """
+    Make sure styles.xml has a cell format for each kind of date/time value
+
+    Formats added by an earlier run are reused.
+
+    Returns:
+        tuple: (styles.xml bytes, {kind: cell style index})
+    """
+    match = re.search(rb'<cellXfs count="(\d+)">(.*?)</cellXfs>', styles_xml, re.S)
+    existing = re.findall(rb'<xf [^>]*?(?:/>|>.*?</xf>)', match.group(2), re.S)
+    count = len(existing)
+    date_styles = {}
+    xfs = b''
+    for kind, num_fmt in DATE_NUMBER_FORMATS.items():
+        xf = (f'<xf numFmtId="{num_fmt}" fontId="0" fillId="0" borderId="0" '
+              f'applyNumberFormat="1" xfId="0" />').encode()
+        if xf in existing:
+            date_styles[kind] = existing.index(xf)
+            continue
+        date_styles[kind] = count
+        xfs += xf
+        count += 1
+    new = b'<cellXfs count="%d">' % count + match.group(2) + xfs + b'</cellXfs>'
+    return styles_xml[:match.start()] + new + styles_xml[match.end():], date_styles
+
+
+def formula_columns(sheet_name):
+    """0-based indices of a sheet's per-row formula columns, the only cells written as formulas"""
+    return frozenset(col - 1 for col, _, _ in derived_columns(sheet_name))
+
+
+def derived_column_styles(sheet_name, sheet_xml):
+    """Style index of each formula column's sample cell in row 4"""
+    styles = {}
+    for col, _, _ in derived_columns(sheet_name):
+        match = re.search(rb'<c r="%s4" s="(\d+)"' % get_column_letter(col).encode(), sheet_xml)
+        if match:
+            styles[col - 1] = int(match.group(1))
+    return styles
+
+
+def set_defined_names(workbook_xml, refs):
+    """Point the workbook's named data ranges at their new references"""
+    def replace(match):
+        name = match.group(2).decode()
+        if name not in refs:
+            return match.group(0)
+        return match.group(1) + escape(refs[name]).encode() + b'</definedName>'
+    return re.sub(rb'(<definedName name="([^"]+)"[^>]*>)[^<]*</definedName>', replace, workbook_xml)
+
+
+def remove_row(sheet_xml, row):
+    """Remove one row (e.g. a sample row) from a worksheet part"""
+    return re.sub(rb'<row r="%d"[^>]*?(?:/>|>.*?</row>)' % row, b'', sheet_xml, count=1,
+                  flags=re.S)
+
+
+def set_cells(sheet_xml, cells):
+    """
+    Replace the content of existing cells in a worksheet part
+
+    Each cell keeps its style; strings are written inline and formulas
+    without a cached value.
+
+    Args:
+        sheet_xml: Worksheet XML bytes
+        cells: {cell reference: text, number or '=formula'}
+
+    Returns:
+        bytes: The patched worksheet XML
+
+    Raises:
+        KeyError: If a cell is not in the worksheet
+    """
+    for ref, value in cells.items():
+        match = re.search(rb'<c r="%s"([^>]*?)(?:/>|>.*?</c>)' % ref.encode(), sheet_xml, re.S)
+        if match is None:
+            raise KeyError(f"Cell {ref} is not in the worksheet")
+        style = re.search(rb' s="\d+"', match.group(1))
+        style = style.group(0).decode() if style else ''
+        cell = _cell_xml(ref, value, {}, style) or f'<c r="{ref}"{style} />'
+        sheet_xml = sheet_xml[:match.start()] + cell.encode('utf-8') + sheet_xml[match.end():]
+    return sheet_xml
+
+
+class ParallelExcelGenerator:
+    """Generates the formula-based workbook with data rows rendered in parallel"""
+
+    def __init__(self, workers=None, chunk_rows=CHUNK_ROWS, range_headroom=RANGE_HEADROOM,
+                 cache_values=True, kpi_targets=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+        self.range_headroom = range_headroom
+        self.cache_values = cache_values
+        # Site-specific Dashboard targets, spliced into the shared skeleton
+        self.dashboard_cells = kpi_target_cells(kpi_targets)
+        self.kpi_targets = kpi_targets or {}
+        self.data_rows = {}
+
+    def build_skeleton(self):
+        """
+        The workbook layout with no data rows and the default targets
+
+        The skeleton only depends on ``range_headroom``, so one skeleton can
+        be shared by the generators of many sites (see multi_site.py). It is
+        rendered once per process (see workbook_snapshot.py).
+
+        Returns:
+            WorkbookSnapshot: Skeleton package and its layout rows
+        """
+        from workbook_snapshot import get_snapshot
+        return get_snapshot(self.range_headroom, cache_values=False)
+
+    def render_data(self, data, layout_rows, date_styles, column_styles, tmp_dir, progress=None):
+        """
+        Render all data rows in the process pool
+
+        Returns:
+            dict: Sheet name -> list of chunk results, in row order
+        """
+        chunks = {}
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        # Bound the number of chunks held in flight so large generators
+        # are consumed at the pace the workers can render them
+        max_pending = self.workers * 2
+        pending = []
+        try:
+            for sheet_name, rows in data.items():
+                results = chunks.setdefault(sheet_name, [])
+                first_row = layout_rows[sheet_name] + 1
+                if hasattr(rows, 'render'):
+                    # Columns are sliced into chunks and rendered in bulk
+                    sheet_chunks = (rows.take(start, start + self.chunk_rows)
+                                 for start in range(0, len(rows), self.chunk_rows))
+                else:
+                    # Bulk import sources number their formula rows from the first data row
+                    if hasattr(rows, 'iter_rows'):
+                        rows = rows.iter_rows(first_row)
+                    rows = iter(rows)
+                    sheet_chunks = iter(lambda: list(islice(rows, self.chunk_rows)), [])
+                count = 0
+                for chunk in sheet_chunks:
+                    args = (chunk, first_row + count, date_styles,
+                            column_styles.get(sheet_name), tmp_dir, formula_columns(sheet_name))
+                    count += len(chunk)
+                    if pool is None:
+                        results.append(_render_chunk(*args))
+                        continue
+                    future = pool.submit(_render_chunk, *args)
+                    results.append(future)
+                    pending.append(future)
+                    if len(pending) >= max_pending:
+                        pending.pop(0).result()
+                if progress:
+                    progress(f"  ✓ {sheet_name} - {count:,} data rows")
+            if pool is not None:
+                chunks = {name: [future.result() for future in results]
+                          for name, results in chunks.items()}
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return chunks
+
+    def write_sheet(self, writer, name, xml, chunks, last_row):
+        """Splice pre-compressed row chunks into a skeleton worksheet part"""
+        xml = xml.replace(b'<sheetData />', b'<sheetData></sheetData>')
+        dimension = re.search(rb'<dimension ref="([^"]+)" ?/>', xml)
+        if dimension:
+            min_col, min_row, max_col, _ = range_boundaries(dimension.group(1).decode())
+            max_col = max([max_col] + [chunk[4] for chunk in chunks])
+            ref = f'{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{last_row}'
+            xml = xml[:dimension.start(1)] + ref.encode() + xml[dimension.end(1):]
+        split = xml.index(b'</sheetData>')
+        head, tail = xml[:split], xml[split:]
+
+        # Every segment gets its own compressor: back-references must not
+        # reach across the chunks spliced in between
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        head_data = compressor.compress(head) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        tail_data = compressor.compress(tail) + compressor.flush()
+
+        crc = zlib.crc32(head)
+        file_size = len(head)
+        compress_size = len(head_data) + len(tail_data)
+        for _, chunk_crc, chunk_size, chunk_compressed, _, _ in chunks:
+            crc = crc32_combine(crc, chunk_crc, chunk_size)
+            file_size += chunk_size
+            compress_size += chunk_compressed
+        crc = crc32_combine(crc, zlib.crc32(tail), len(tail))
+        file_size += len(tail)
+
+        def pieces():
+            yield head_data
+            for path, *_ in chunks:
+                with open(path, 'rb') as f:
+                    yield from iter(lambda: f.read(1 << 20), b'')
+                os.unlink(path)
+            yield tail_data
+
+        writer.write_compressed(name, pieces(), crc, compress_size, file_size)
+
+    def cache_key(self, cache, data=None):
+        """Build cache key for this generator's output, or None if uncacheable"""
+        return cache.key(
+            'formula-workbook-parallel',
+            schema={'sheets': TRACKING_SHEETS, 'derived': DERIVED_COLUMNS},
+            # The deflate segment boundaries follow the chunk size
+            options={'chunk_rows': self.chunk_rows, 'range_headroom': self.range_headroom,
+                     'cache_values': self.cache_values, 'kpi_targets': self.kpi_targets},
+            data=data,
+        )
+
+    def generate(self, filename='Ecom_Operations_Tracking_System_Formula_Based.xlsx', data=None,
+                 cache=None, skeleton=None):
+        """
+        Generate the complete workbook
+
+        Output is reproducible for a given ``chunk_rows``, whatever the number
+        of workers (see FormulaBasedExcelGenerator.generate).
+
+        Args:
+            filename: Output file name (relative to this script's directory)
+            data: Optional mapping of sheet name to an iterable of data rows.
+                Rows are pulled in chunks of ``chunk_rows`` and sent to the
+                worker processes, so values must be picklable. A sheet can
+                also be given as columns - a {header: array} dict, a pandas
+                DataFrame or a column_writer.ColumnSheet - which are written
+                without building rows (see column_writer.py).
+            cache: Optional build_cache.BuildCache; an unchanged build is
+                copied from it instead of being regenerated
+            skeleton: Optional result of build_skeleton() to reuse
+
+        Returns:
+            str: Path of the saved workbook
+        """
+        print()
+        print("=" * 70)
+        print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+        print(f"Parallel Formula-Based Excel Generator ({self.workers} workers)")
+        print("=" * 70)
+        print()
+
+        data = columns_to_sheets(data)
+        output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+        key = self.cache_key(cache, data) if cache else None
+        if key and cache.fetch(key, output_path):
+            print(f"♻️  Inputs unchanged - reused cached build {key[:12]}")
+            print(f"✅ Success! File created: {filename}")
+            print()
+            return output_path
+
+        if skeleton is None:
+            print("📝 Building sheet layout...")
+            skeleton = self.build_skeleton()
+        layout_rows = dict(skeleton.layout_rows)
+        skeleton = skeleton.open()
+        unknown = sorted(set(data) - set(layout_rows))
+        if unknown:
+            raise ValueError(f"Unknown sheet name(s) in data: {', '.join(unknown)}")
+        # The first data row takes the place of a sheet's sample row
+        replaced = set(data) & set(SAMPLE_ROWS)
+        for name in replaced:
+            layout_rows[name] = DATA_START_ROW - 1
+
+        styles_xml, date_styles = add_date_styles(skeleton.read('xl/styles.xml'))
+        parts = sheet_parts(skeleton)
+        column_styles = {name: derived_column_styles(name, skeleton.read(part))
+                         for name, part in parts.items()}
+
+        tmp_dir = tempfile.mkdtemp(prefix='xlsx-parts-',
+                                   dir=os.path.dirname(output_path))
+        try:
+            print("⚙️  Rendering data rows...")
+            chunks = self.render_data(data, layout_rows, date_styles, column_styles, tmp_dir,
+                                      progress=print)
+
+            last_rows = {
+                name: rows + sum(chunk[5] for chunk in chunks.get(name, ()))
+                for name, rows in layout_rows.items()
+            }
+            # Data rows written per sheet, for callers' summaries
+            self.data_rows = {name: last_rows[name] - layout_rows[name] for name in chunks}
+
+            print()
+            print("💾 Assembling workbook...")
+            sheet_by_part = {part: name for name, part in parts.items()}
+            with RawZipWriter(output_path) as writer:
+                for info in skeleton.infolist():
+                    name = info.filename
+                    xml = skeleton.read(name)
+                    if name == 'xl/styles.xml':
+                        xml = styles_xml
+                    elif name == 'xl/workbook.xml':
+                        xml = set_defined_names(xml, data_range_refs(last_rows,
+                                                                     self.range_headroom))
+                    elif sheet_by_part.get(name) in chunks:
+                        sheet_name = sheet_by_part[name]
+                        if sheet_name in replaced:
+                            xml = remove_row(xml, DATA_START_ROW)
+                        self.write_sheet(writer, name, xml, chunks[sheet_name],
+                                         last_rows[sheet_name])
+                        continue
+                    elif sheet_by_part.get(name) == 'Dashboard' and self.dashboard_cells:
+                        xml = set_cells(xml, self.dashboard_cells)
+                    writer.writestr(name, xml)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        build_time = build_timestamp()
+        if self.cache_values:
+            print("🧮 Evaluating Dashboard KPIs...")
+            cache_dashboard_values(output_path, now=build_time, volatile=build_time is not None)
+        make_reproducible(output_path, build_time)
+        if key:
+            cache.store(key, output_path)
+
+        print(f"✅ Success! File created: {filename}")
+        print()
+        print("=" * 70)
+        print()
+
+        return output_path
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Create the formula-based workbook, rendering sheets in parallel'
+    )
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: number of CPU cores)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f'Rows rendered per worker task (default: {CHUNK_ROWS:,})')
+    parser.add_argument('--no-cache-values', action='store_true',
+                        help='Skip storing evaluated Dashboard values in the file')
+    parser.add_argument('--output', metavar='FILE',
+                        default='Ecom_Operations_Tracking_System_Formula_Based.xlsx',
+                        help='Output file name')
+
+    parser.add_argument('--import', dest='imports', action='append', default=[],
+                        metavar='[SHEET=]FILE',
+                        help='Import rows from a CSV or Parquet export (repeatable)')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None,
+                        help='Build cache directory (default: ~/.cache/ecom-tracking)')
+    parser.add_argument('--no-build-cache', action='store_true',
+                        help='Always rebuild instead of reusing an unchanged build')
+
+    args = parser.parse_args()
+
+    data = None
+    if args.imports:
+        from bulk_import import import_sources
+        data = import_sources(args.imports)
+        for sheet_name, source in data.items():
+            for path, mapping in source.mappings.items():
+                print(f"📥 {os.path.basename(path)} → {sheet_name} ({mapping.describe()})")
+
+    generator = ParallelExcelGenerator(workers=args.workers, chunk_rows=args.chunk_rows,
+                                       cache_values=not args.no_cache_values)
+    cache = None
+    if not args.no_build_cache:
+        from build_cache import BuildCache
+        cache = BuildCache(args.cache_dir)
+    generator.generate(args.output, data=data, cache=cache)
+
+
+if __name__ == '__main__':
+    main()
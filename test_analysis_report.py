@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the Python port of the VBA analysis macros
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from analysis_report import analyse_workbook, build_report
+from create_formula_based_excel import FormulaBasedExcelGenerator
+
+START = datetime(2026, 1, 5, 8, 0)
+
+
+def checks_of(result):
+    return {check['check']: check for check in result['checks']}
+
+
+def build_site(path):
+    """Formula-based workbook with a few records on each checked sheet"""
+    data = {
+        'Wave Tracking': [[f'W-{i}', START, None, None, None, 10, 10, status, '']
+                          for i, status in enumerate(['Complete'] * 9 + ['In Progress'])],
+        'Employee Training': [[f'E-{i}', 'Name', 'Picking', 'Safety', START, None,
+                               'Completed' if i else 'Pending'] for i in range(5)],
+        'Stock Replenishment': [[f'R-{i}', 'SKU', 'Tote', 10, 5, 20, START,
+                                 START + timedelta(hours=hours), f'=(H{4 + i}-G{4 + i})*24',
+                                 status, 'High']
+                                for i, (hours, status) in enumerate([(3, 'Complete'),
+                                                                     (5, 'Complete'),
+                                                                     (9, 'In Progress')])],
+        'Quality Audit': [[f'QA-{i}', START, 'Team', 100, 5] for i in range(6)],
+        'Order Volumes': [[START, 40], [START, 60]],
+        'Bash Queries Response': [['Q-1', START, 'Where?', 'Here', 120000, 'Completed'],
+                                  ['Q-2', START, 'When?', 'Soon', 600000, 'Completed'],
+                                  ['Q-3', START, 'Why?', '', None, 'Pending']],
+        'Inventory Mismatch': [['INV-1', START, 'SKU', 'Tote', 10, 9, None, None, '', '', '',
+                                'Resolved']],
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        FormulaBasedExcelGenerator(cache_values=False).generate(path, data=data)
+    return path
+
+
+def test_formula_based_workbook():
+    """Checks find their columns by header and evaluate per-row formulas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        result = analyse_workbook(build_site(os.path.join(tmp, 'site.xlsx')))
+    assert result['status'] == 'ok'
+    checks = checks_of(result)
+
+    # The W-001 sample row is not a wave
+    waves = checks['CheckWaveStatus']
+    assert waves['metrics']['total'] == 10 and waves['metrics']['completed'] == 9
+    assert waves['rating'] == 'warning'
+    assert checks['VerifyTraining']['metrics']['training_rate'] == 80
+    # Duration (hrs) comes from the =(H-G)*24 formulas of completed requests
+    stock = checks['AnalyzeStockIssues']
+    assert stock['metrics']['average_hours'] == 4 and stock['rating'] == 'warning'
+    quality = checks['CheckQualityRate']
+    assert quality['metrics']['orders'] == 100 and quality['rating'] == 'warning'
+    # Response times are in ms on this layout
+    sla = checks['CheckSLACompliance']
+    assert sla['metrics'] == {'responded': 2, 'within_sla': 1, 'compliance_rate': 50}
+    assert checks['CheckInventoryMismatches']['rating'] == 'good'
+    assert checks['ViewSystemErrors']['rating'] == 'no data'
+
+
+def test_vba_workbook_layout():
+    """The VBA workbook's upper-case statuses and text numbers"""
+    checks = checks_of(analyse_workbook('Ecom_Operations_Tracking_System.xlsx'))
+    assert checks['CheckWaveStatus']['metrics']['completed'] == 2
+    assert checks['AnalyzeStockIssues']['metrics']['average_hours'] == 3.5
+    assert checks['CheckSLACompliance']['metrics']['within_sla'] == 2
+    errors = checks['ViewSystemErrors']
+    assert errors['metrics'] == {'total': 3, 'open': 1, 'resolved': 2}
+    # The STATISTICS row of Quality Audit is not an audit
+    assert checks['CheckQualityRate']['metrics']['audits'] == 4
+
+
+def test_consolidated_report():
+    """Several workbooks in worker processes; unreadable ones are reported"""
+    with tempfile.TemporaryDirectory() as tmp:
+        site = build_site(os.path.join(tmp, 'site.xlsx'))
+        missing = os.path.join(tmp, 'missing.xlsx')
+        report = build_report([site, 'Ecom_Operations_Tracking_System.xlsx', missing], workers=2)
+    assert [result['workbook'] for result in report['workbooks']][0] == site
+    assert report['failed'] == 1
+    assert report['workbooks'][2]['status'] == 'error'
+    assert report['needs_attention']['CheckWaveStatus'] == 2
+
+
+if __name__ == '__main__':
+    test_formula_based_workbook()
+    test_vba_workbook_layout()
+    test_consolidated_report()
+    print("✅ Analysis report tests passed")
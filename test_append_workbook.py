@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for appending rows to an existing workbook
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+
+from append_workbook import WorkbookAppender, read_split
+from column_writer import ColumnSheet
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from parallel_generator import ParallelExcelGenerator
+from test_generator import generate_quietly, wave_rows
+from xlsx_package import iter_raw
+
+START = datetime(2026, 1, 5, 8, 0)
+
+
+def stock_rows(count):
+    """Stock Replenishment rows; the Duration (hrs) column is left to the formula"""
+    for i in range(count):
+        yield [f'REP-{i:03d}', 'SKU-1', 'Tote', 10, 5, 20, START,
+               START + timedelta(hours=i + 1), None, 'Complete', 'High']
+
+
+def raw_members(path):
+    """{part name: raw compressed bytes}"""
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as fp:
+        return {info.filename: b''.join(iter_raw(fp, info)) for info in zf.infolist()}
+
+
+def test_append_rewrites_only_affected_parts():
+    """Appended rows follow the existing ones; untouched parts are copied as-is"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_quietly(FormulaBasedExcelGenerator(cache_values=False),
+                                os.path.join(tmp, 'tracking.xlsx'),
+                                data={'Wave Tracking': wave_rows(10)})
+        before = raw_members(path)
+
+        appender = WorkbookAppender(path, cache_values=False)
+        assert appender.append({'Wave Tracking': wave_rows(5, first_row=14)}, progress=None) == \
+            {'Wave Tracking': 5}
+        after_first = raw_members(path)
+        with zipfile.ZipFile(path) as zf:
+            first_split = read_split(zf.getinfo('xl/worksheets/sheet3.xml'))
+        assert first_split[3] == 18
+        changed = {name for name in before if before[name] != after_first[name]}
+        assert changed == {'xl/worksheets/sheet3.xml', 'xl/workbook.xml', 'xl/styles.xml'}
+
+        appender.append({'Wave Tracking': wave_rows(3, first_row=19),
+                         'Stock Replenishment': stock_rows(2)}, progress=None)
+        after_second = raw_members(path)
+        with zipfile.ZipFile(path) as zf:
+            assert zf.testzip() is None
+            assert read_split(zf.getinfo('xl/worksheets/sheet3.xml'))[3] == 21
+        # The second append copies the previously appended rows without recompressing them
+        prefix = after_first['xl/worksheets/sheet3.xml'][:first_split[0]]
+        assert after_second['xl/worksheets/sheet3.xml'].startswith(prefix)
+        assert after_second['xl/theme/theme1.xml'] == before['xl/theme/theme1.xml']
+
+        wb = openpyxl.load_workbook(path)
+        waves = wb['Wave Tracking']
+        assert waves.max_row == 21
+        assert waves['A14'].value == 'W-100' and waves['A19'].value == 'W-100'
+        assert waves['E21'].value == '=(D21-B21)*24*60'
+        # The first rows appended to a sheet holding only its sample row replace it
+        stock = wb['Stock Replenishment']
+        assert stock.max_row == 5 and stock['A4'].value == 'REP-000'
+        assert stock['G5'].value == START
+        # Plain rows get the per-row formulas the generator writes
+        assert stock['I4'].value == '=(H4-G4)*24' and stock['I5'].value == '=(H5-G5)*24'
+        assert wb.defined_names['WaveTracking_Status'].attr_text == "'Wave Tracking'!$H$4:$H$1021"
+        assert wb.defined_names['StockReplenishment_Status'].attr_text == \
+            "'Stock Replenishment'!$J$4:$J$1005"
+        # The ranges of sheets still holding a sample row start at it too
+        assert wb.defined_names['QualityAudit_Pass'].attr_text == "'Quality Audit'!$G$4:$G$1004"
+
+
+def test_append_kpis():
+    """Dashboard values cached after appending plain rows see the new rows and their formulas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'tracking.xlsx'))
+        stock = [('REP-0', 'SKU-1', 'Tote', 10, 5, 20, START, START + timedelta(hours=3)),
+                 ['REP-1', 'SKU-1', 'Tote', 10, 5, 20, START, START + timedelta(hours=3), 99,
+                  'Complete', 'High']]
+        WorkbookAppender(path, cache_values=True).append({'Stock Replenishment': stock},
+                                                         progress=None)
+        dashboard = openpyxl.load_workbook(path, data_only=True)['Dashboard']
+        assert abs(dashboard['C8'].value - 3) < 1e-9 and dashboard['D8'].value == 'Critical'
+
+        # A second append goes below the first one
+        WorkbookAppender(path, cache_values=True).append({'Stock Replenishment': [
+            ['REP-2', 'SKU-1', 'Tote', 10, 5, 20, START, START + timedelta(hours=6), None,
+             'Complete', 'High']]}, progress=None)
+        dashboard = openpyxl.load_workbook(path, data_only=True)['Dashboard']
+        assert abs(dashboard['C8'].value - 4) < 1e-9
+        wb = openpyxl.load_workbook(path)
+    assert [row[0].value for row in wb['Stock Replenishment'].iter_rows(min_row=4)] == \
+        ['REP-0', 'REP-1', 'REP-2']
+    assert wb.defined_names['StockReplenishment_DurationHrs'].attr_text == \
+        "'Stock Replenishment'!$I$4:$I$1006"
+
+
+def test_ranges_cover_rows_typed_past_them():
+    """An append widens the ranges of every sheet whose rows have used up the headroom"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_quietly(FormulaBasedExcelGenerator(cache_values=False, range_headroom=3),
+                                os.path.join(tmp, 'tracking.xlsx'),
+                                data={'Stock Replenishment': list(stock_rows(2))})
+        wb = openpyxl.load_workbook(path)
+        assert wb.defined_names['StockReplenishment_SKU'].attr_text == \
+            "'Stock Replenishment'!$B$4:$B$8"
+        # Rows typed in Excel below the end of the ranges
+        for row in stock_rows(7):
+            wb['Stock Replenishment'].append(row)
+        wb.save(path)
+
+        messages = []
+        WorkbookAppender(path, range_headroom=3).append({'Wave Tracking': wave_rows(1)},
+                                                         progress=messages.append)
+        wb = openpyxl.load_workbook(path)
+    assert wb.defined_names['StockReplenishment_SKU'].attr_text == \
+        "'Stock Replenishment'!$B$4:$B$15"
+    assert wb.defined_names['WaveTracking_Status'].attr_text == "'Wave Tracking'!$H$4:$H$7"
+    assert wb.defined_names['QualityAudit_Pass'].attr_text == "'Quality Audit'!$G$4:$G$7"
+    assert any('Stock Replenishment - rows 9-12 were below its named ranges' in message
+               for message in messages)
+
+
+def test_append_cost_on_large_workbook():
+    """Appending a row to a 200,000-row sheet copies the existing rows without reading them"""
+    index = np.arange(200_000)
+    start = np.datetime64('2026-01-05T08:00') + index.astype('timedelta64[m]')
+    waves = ColumnSheet('Wave Tracking', {'Wave ID': np.char.add('W-', index.astype(str)),
+                                          'Start Time': start, 'Actual End': start + 45,
+                                          'Tasks Total': index % 50,
+                                          'Status': np.full(len(index), 'Complete')})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'large.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            ParallelExcelGenerator(workers=2, cache_values=False).generate(
+                path, data={'Wave Tracking': waves})
+        appender = WorkbookAppender(path)
+        # The first append recompresses the sheet as segments
+        appender.append({'Wave Tracking': wave_rows(1)}, progress=None)
+        times = []
+        for _ in range(3):
+            start_time = time.perf_counter()
+            appender.append({'Wave Tracking': wave_rows(1)}, progress=None)
+            times.append(time.perf_counter() - start_time)
+        with zipfile.ZipFile(path) as zf:
+            assert read_split(zf.getinfo('xl/worksheets/sheet3.xml'))[3] == 3 + 200_004
+    assert min(times) < 0.5, times
+
+
+if __name__ == '__main__':
+    test_append_rewrites_only_affected_parts()
+    test_append_kpis()
+    test_ranges_cover_rows_typed_past_them()
+    test_append_cost_on_large_workbook()
+    print("✅ Append tests passed")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark suite
+"""
+
+import copy
+
+from benchmark import SyntheticRows, compare_reports, run_benchmarks
+
+
+def test_synthetic_rows_have_formulas():
+    """Synthetic rows carry the per-row formulas for their worksheet rows"""
+    rows = list(SyntheticRows('Picking Tasks', 3).iter_rows(5))
+    assert len(rows) == 3
+    assert rows[2][7] == '=(E7-D7)*24*60'
+    assert rows[2][8] == '=G7/H7'
+
+
+def test_report_and_regressions():
+    """A small run produces one ok record per scenario; regressions are flagged"""
+    report = run_benchmarks([20], ['generate-streaming', 'load-read-only'],
+                            sheets=['Wave Tracking'], timeout=120, progress=None)
+    assert [(r['scenario'], r['status']) for r in report['results']] == \
+        [('generate-streaming', 'ok'), ('load-read-only', 'ok')]
+    for result in report['results']:
+        assert result['seconds'] > 0 and result['peak_rss_mb'] > 0
+    assert compare_reports(report, report) == []
+
+    slower = copy.deepcopy(report)
+    slower['results'][1]['seconds'] = report['results'][1]['seconds'] * 2
+    regressions = compare_reports(report, slower, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith('load-read-only @ 20')
+
+
+if __name__ == '__main__':
+    test_synthetic_rows_have_formulas()
+    test_report_and_regressions()
+    print("✅ Benchmark tests passed")
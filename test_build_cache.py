@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for reproducible workbook output and the build cache
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+
+import openpyxl
+
+from build_cache import BuildCache
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from deploy_xlsm import XLSMDeployer
+from test_generator import generate_quietly, wave_rows
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_generated_workbooks_are_reproducible(monkeypatch):
+    """Two builds of the same data are byte-identical; SOURCE_DATE_EPOCH sets the dates"""
+    monkeypatch.delenv('SOURCE_DATE_EPOCH', raising=False)
+    data = {'Wave Tracking': list(wave_rows(20))}
+    with tempfile.TemporaryDirectory() as tmp:
+        first = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'a.xlsx'),
+                                 data=data)
+        second = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'b.xlsx'),
+                                  data=data)
+        assert read_bytes(first) == read_bytes(second)
+        with zipfile.ZipFile(first) as zf:
+            assert zf.namelist()[0] == '[Content_Types].xml'
+            assert {info.date_time for info in zf.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+            assert b'1980-01-01T00:00:00Z' in zf.read('docProps/core.xml')
+
+        monkeypatch.setenv('SOURCE_DATE_EPOCH', '1767603600')  # 2026-01-05 09:00 UTC
+        dated = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'c.xlsx'),
+                                 data=data)
+        with zipfile.ZipFile(dated) as zf:
+            assert b'2026-01-05T09:00:00Z' in zf.read('docProps/core.xml')
+            assert zf.getinfo('xl/workbook.xml').date_time == (2026, 1, 5, 9, 0, 0)
+        # The cached Last Updated value is the build time
+        wb = openpyxl.load_workbook(dated, data_only=True)
+        assert wb['Dashboard']['B2'].value == datetime(2026, 1, 5, 9, 0)
+
+
+def test_cache_hit_skips_the_build(monkeypatch):
+    """An unchanged build is copied from the cache; changed data misses"""
+    monkeypatch.delenv('SOURCE_DATE_EPOCH', raising=False)
+    data = {'Wave Tracking': list(wave_rows(5))}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = BuildCache(os.path.join(tmp, 'cache'))
+        path = os.path.join(tmp, 'tracking.xlsx')
+        generate_quietly(FormulaBasedExcelGenerator(), path, data=data, cache=cache)
+        built = read_bytes(path)
+        os.unlink(path)
+
+        generator = FormulaBasedExcelGenerator()
+        generator.build = None  # a cache hit never builds
+        generate_quietly(generator, path, data=data, cache=cache)
+        assert read_bytes(path) == built
+
+        changed = {'Wave Tracking': list(wave_rows(6))}
+        assert generator.cache_key(cache, changed) != generator.cache_key(cache, data)
+        # One-shot iterables cannot be hashed, so they are never cached
+        assert generator.cache_key(cache, {'Wave Tracking': wave_rows(5)}) is None
+
+
+def test_deployed_xlsm_is_reproducible(monkeypatch):
+    """The .xlsm built from the same source workbook is byte-identical"""
+    monkeypatch.delenv('SOURCE_DATE_EPOCH', raising=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy('Ecom_Operations_Tracking_System.xlsx', tmp)
+        deployer = XLSMDeployer(base_dir=tmp)
+        builds = []
+        for _ in range(2):
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert deployer.create_xlsm()
+            builds.append(read_bytes(deployer.output_xlsm))
+        assert builds[0] == builds[1]
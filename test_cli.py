@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the ecom.py command line
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+import ecom
+from test_vba_project import _project_bytes, build_project
+from xlsx_package import inject_vba_project
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, 'ecom.py', *args], capture_output=True, text=True)
+
+
+def test_help_lists_commands():
+    result = run_cli('--help')
+    assert result.returncode == 0
+    for name in ecom.COMMANDS:
+        assert name in result.stdout
+
+
+def test_command_help_comes_from_the_script():
+    result = run_cli('build-vba', '--help')
+    assert result.returncode == 0
+    assert result.stdout.startswith('usage: ecom.py build-vba')
+    assert '--force' in result.stdout
+
+
+@pytest.mark.parametrize('command', ecom.LIGHT_COMMANDS)
+def test_light_commands_skip_heavy_imports(command):
+    code = ('import sys, ecom\n'
+            'try:\n'
+            f'    ecom.main([{command!r}, "--help"])\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            'print(",".join(m for m in ecom.HEAVY_MODULES if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[-1] == ''
+
+
+def test_extract_and_verify():
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsm = os.path.join(tmp, 'tracking.xlsm')
+        inject_vba_project('Ecom_Operations_Tracking_System.xlsx',
+                           _project_bytes(build_project()), xlsm)
+        output = os.path.join(tmp, 'vbaProject.bin')
+        assert run_cli('extract', xlsm, '--output', output).returncode == 0
+        with open(output, 'rb') as f:
+            assert f.read() == _project_bytes(build_project())
+        result = run_cli('verify', '--summary', xlsm)
+        assert result.returncode == 0 and '1 of 1 file(s) match' in result.stdout
+        assert run_cli('extract', os.path.join(tmp, 'missing.xlsm')).returncode == 1
+
+
+def test_measure_startup():
+    results = ecom.measure_startup([['--help']], repeat=1)
+    (args, seconds, overhead), = results
+    assert args == ['--help'] and 0 <= overhead <= seconds
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized column writer
+"""
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pytest
+
+from build_cache import data_fingerprint
+from column_writer import ColumnSheet
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from parallel_generator import (
+    DATE_NUMBER_FORMATS, ParallelExcelGenerator, formula_columns, render_rows,
+)
+
+DATE_STYLES = {kind: i for i, kind in enumerate(DATE_NUMBER_FORMATS, start=20)}
+CELL = re.compile(rb'<c r="([A-Z]+\d+)"([^>]*)>(.*?)</c>')
+NUMBERS = [0.0, 7.0, -2.5, 0.37, 1e-7, 123456.789, 1 / 3, 0.1 + 0.2, 1e20, -1e300, 5e-324,
+           2.0 ** 53 + 2, np.nan, np.inf]
+
+
+def picking_columns(count):
+    """Picking Tasks columns of every kind, with blanks and awkward text"""
+    index = np.arange(count)
+    start = np.datetime64('2026-01-05T08:00:00.250') + (index * 97).astype('timedelta64[s]')
+    start[::13] = np.datetime64('NaT')
+    return {
+        'task_id': np.char.add('PT-', index.astype(str)),
+        'Employee ID': np.array(['E1', 'E2 & co', '', ' lead', 'trail ', 'ünï'])[index % 6],
+        'Employee Name': np.array(['Ann', None, 3, float('nan')], dtype=object)[index % 4],
+        'Start Time': start,
+        'End Time': start.astype('datetime64[D]'),
+        'Items Picked': np.array(NUMBERS * (count // len(NUMBERS) + 1))[:count],
+        'Target Time (mins)': memoryview(index.astype(np.int32)),
+        'Efficiency %': np.ones(count),
+        'Errors': index % 3 == 0,
+        'Status': np.array(['Complete', 'Pending', '<b>'])[index % 3],
+    }
+
+
+def cells(xml):
+    return {ref: (attrs, body) for ref, attrs, body in CELL.findall(xml)}
+
+
+def test_matches_render_rows():
+    """Every cell matches render_rows on the same values; dates to ten decimals of a day"""
+    sheet = ColumnSheet('Picking Tasks', picking_columns(300))
+    assert sheet.ignored == ['Efficiency %'] and len(sheet) == 300
+    xml, width = sheet.render(5, DATE_STYLES, {7: 3, 8: 4})
+    expected, expected_width = render_rows(list(sheet.iter_rows(5)), 5, DATE_STYLES, {7: 3, 8: 4},
+                                           formula_columns('Picking Tasks'))
+    assert width == expected_width == 11
+    assert xml.count(b'<row ') == 300 and xml.startswith(b'<row r="5"><c r="A5" t="inlineStr">')
+
+    written, wanted = cells(xml), cells(expected)
+    assert written.keys() == wanted.keys()
+    for ref, (attrs, body) in written.items():
+        assert attrs == wanted[ref][0], ref
+        if body == wanted[ref][1]:
+            continue
+        # Numbers may be spelled differently; date serials may differ in the last places
+        value, other = (float(re.search(rb'<v>(.*)</v>', text).group(1))
+                        for text in (body, wanted[ref][1]))
+        assert value == other or ref[:1] in b'DE' and abs(value - other) < 1e-10, ref
+    assert written[b'E6'] == (b' s="%d"' % DATE_STYLES['date'], b'<v>46027</v>')
+    assert written[b'H5'][1].startswith(b'<f>(E5-D5)*24*60</f>')
+    assert written[b'B6'][1] == b'<is><t>E2 &amp; co</t></is>'
+    assert written[b'B8'][1] == b'<is><t xml:space="preserve"> lead</t></is>'
+
+
+def test_number_text():
+    """Numbers are written with the fewest digits that read back exactly"""
+    sheet = ColumnSheet('Wave Tracking', {'Tasks Total': NUMBERS})
+    xml, _ = sheet.render(5, DATE_STYLES)
+    values = [re.search(rb'<v>(.*?)</v>', row) for row in xml.split(b'</row>')[:len(NUMBERS)]]
+    text = [value.group(1).decode() if value else None for value in values]
+    assert text[:6] == ['0', '7', '-2.5', '0.37', '0.0000001', '123456.789']
+    assert text[12:] == [None, None]
+    for number, written in zip(NUMBERS[:12], text):
+        assert float(written) == number
+
+
+def test_generators_take_columns():
+    """Both generators write columns; the parallel one renders them in chunks"""
+    columns = picking_columns(250)
+    with tempfile.TemporaryDirectory() as tmp:
+        values = {}
+        for name, generator in [('columns', ParallelExcelGenerator(workers=2, chunk_rows=64,
+                                                                   cache_values=False)),
+                                ('openpyxl', FormulaBasedExcelGenerator(cache_values=False))]:
+            path = os.path.join(tmp, f'{name}.xlsx')
+            with contextlib.redirect_stdout(io.StringIO()):
+                generator.generate(path, data={'Picking Tasks': columns})
+            ws = openpyxl.load_workbook(path)['Picking Tasks']
+            values[name] = [[cell.value for cell in row] for row in ws.iter_rows(min_row=4)]
+
+    assert len(values['columns']) == 250
+    for row, other, items in zip(values['columns'], values['openpyxl'], columns['Items Picked']):
+        assert row[:3] == other[:3] and row[6:] == other[6:]
+        # openpyxl rounds some floats (0.1 + 0.2) when writing; the column writer does not
+        assert row[5] == (items if np.isfinite(items) else None)
+        for moment, expected in zip(row[3:5], other[3:5]):
+            assert moment == expected or abs((moment - expected).total_seconds()) < 0.001
+    assert values['columns'][1][:4] == ['PT-1', 'E2 & co', None, datetime(2026, 1, 5, 8, 1, 37, 250000)]
+    assert values['columns'][249][7:9] == ['=(E253-D253)*24*60', '=G253/H253']
+    # Columns are hashed by value, so such builds can be cached
+    assert data_fingerprint({'Picking Tasks': ColumnSheet('Picking Tasks', columns)}) is not None
+
+
+def test_errors():
+    """Unknown sheets and columns, and columns of different lengths"""
+    with pytest.raises(ValueError, match='not a tracking sheet'):
+        ColumnSheet('Dashboard', {})
+    with pytest.raises(ValueError, match='has no column'):
+        ColumnSheet('Wave Tracking', {'Wave ID': ['W-1'], 'Shift': ['A']})
+    with pytest.raises(ValueError, match='differ in length'):
+        ColumnSheet('Wave Tracking', {'Wave ID': ['W-1'], 'Tasks Total': [1, 2]})
+
+
+if __name__ == '__main__':
+    test_matches_render_rows()
+    test_number_text()
+    test_generators_take_columns()
+    test_errors()
+    print("✅ Column writer tests passed")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming .xlsx -> .xlsm conversion
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+import openpyxl
+
+from deploy_xlsm import XLSMDeployer
+from test_append_workbook import raw_members
+from xlsx_package import VBA_RELATIONSHIP, inject_vba_project, sheet_layout, sheet_parts
+
+SOURCE = 'Ecom_Operations_Tracking_System.xlsx'
+PATCHED_PARTS = {'[Content_Types].xml', 'xl/_rels/workbook.xml.rels'}
+
+
+def test_copy_keeps_styles_merges_and_widths():
+    """Values, number formats, fonts, fills, merges and widths survive the copy"""
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(SOURCE, tmp)
+        deployer = XLSMDeployer(base_dir=tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert deployer.create_xlsm()
+
+        with zipfile.ZipFile(SOURCE) as src, zipfile.ZipFile(deployer.output_xlsm) as dst:
+            src_parts, dst_parts = sheet_parts(src), sheet_parts(dst)
+            assert list(src_parts) == list(dst_parts)
+            for name in src_parts:
+                before = sheet_layout(src, src_parts[name])
+                after = sheet_layout(dst, dst_parts[name])
+                assert sorted(before['merges']) == sorted(after['merges'])
+                widths = {col: width for first, last, width in after['widths']
+                          for col in range(first, last + 1)}
+                for first, last, width in before['widths']:
+                    assert all(widths[col] == width for col in range(first, last + 1))
+
+        source = openpyxl.load_workbook(SOURCE)
+        copy = openpyxl.load_workbook(deployer.output_xlsm)
+        for ws in source:
+            for row in ws.iter_rows():
+                for cell in row:
+                    copied = copy[ws.title][cell.coordinate]
+                    assert copied.value == cell.value
+                    assert copied.number_format == cell.number_format
+                    # Fonts without a size use the default 11pt
+                    assert (copied.font.b, copied.font.sz) == (cell.font.b, cell.font.sz or 11)
+                    assert copied.alignment.horizontal == cell.alignment.horizontal
+                    if cell.fill.patternType == 'solid':
+                        assert copied.fill.fgColor.rgb[-6:] == cell.fill.fgColor.rgb[-6:]
+        assert copy['Wave Tracking'].freeze_panes == 'A2'
+
+
+def test_inject_vba_copies_other_parts_unchanged():
+    """Only the content types and workbook relationships are rewritten"""
+    vba_project = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + bytes(504)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'tracking.xlsm')
+        inject_vba_project(SOURCE, vba_project, output)
+        before, after = raw_members(SOURCE), raw_members(output)
+        assert set(after) == set(before) | {'xl/vbaProject.bin'}
+        assert {name for name in before if before[name] != after[name]} == PATCHED_PARTS
+
+        # Injecting again replaces the project instead of adding a second one
+        inject_vba_project(output, vba_project, output)
+        with zipfile.ZipFile(output) as zf:
+            assert zf.read('xl/vbaProject.bin') == vba_project
+            content_types = zf.read('[Content_Types].xml').decode()
+            assert 'application/vnd.ms-excel.sheet.macroEnabled.main+xml' in content_types
+            assert content_types.count('/xl/vbaProject.bin') == 1
+            assert zf.read('xl/_rels/workbook.xml.rels').decode().count(VBA_RELATIONSHIP) == 1
+        assert openpyxl.load_workbook(output, keep_vba=True).sheetnames == \
+            openpyxl.load_workbook(SOURCE).sheetnames
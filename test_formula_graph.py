@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the formula dependency graph analyzer
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from openpyxl import Workbook
+
+from formula_graph import EXCEL_ROWS, analyse_workbook, build_graph, chain_depths
+
+WORKBOOK = 'Ecom_Operations_Tracking_System_Formula_Based.xlsx'
+
+
+def test_generated_workbook():
+    """NOW() cells, per-row formulas as one node and the alert chain"""
+    report = analyse_workbook(WORKBOOK)
+    assert report['exceeded'] == {}
+    assert [item['cells'] for item in report['volatile']] == ['Dashboard!B2', 'Dashboard!E6:E13']
+    assert report['measures']['volatile_cells'] == 9
+    assert report['measures']['whole_column_refs'] == 0
+    assert report['unresolved'] == [] and report['unparsed'] == []
+
+    nodes = {node.label: node for node in build_graph(WORKBOOK)}
+    # The wave KPI reads Status twice and Duration once through named ranges
+    assert nodes['Dashboard!C6'].fan_in == 3 * 1001
+    assert nodes["'Wave Tracking'!E4"] in nodes['Dashboard!C6'].precedents
+    # Stock alert -> Stock KPI -> Duration (hrs) of each request
+    depths, circular = chain_depths(list(nodes.values()))
+    assert not circular
+    assert nodes['Dashboard!C8'] in nodes['Dashboard!A22'].precedents
+    assert depths[nodes['Dashboard!A22']] == 3
+
+
+def test_thresholds():
+    """Whole-column scans, volatile dependents and circular references fail the build"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Data'
+    for row in range(1, 4):
+        ws[f'A{row}'] = row
+        ws[f'B{row}'] = f'=A{row}*2'
+    ws['C1'] = '=SUM(B:B)'
+    ws['C2'] = '=OFFSET(A1,1,0)+C1'
+    ws['D1'] = '=D2+1'
+    ws['D2'] = '=D1+1'
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'hot.xlsx')
+        wb.save(path)
+        report = analyse_workbook(path, {'volatile_cells': 0})
+
+        nodes = {node.label: node for node in build_graph(path)}
+        assert nodes['Data!B1:B3'].cells == 3
+        assert nodes['Data!C1'].fan_in == EXCEL_ROWS
+
+        result = subprocess.run([sys.executable, 'formula_graph.py', path,
+                                 '--max', 'volatile_cells=0', '--max', 'whole_column_refs=1',
+                                 '--max', 'circular_refs=2',
+                                 '--max', 'max_fan_in=2e6', '--max', 'recalc_cost=1e7',
+                                 '--max', 'volatile_cost=1e7'],
+                                capture_output=True, text=True)
+    assert set(report['exceeded']) == {'volatile_cells', 'whole_column_refs', 'circular_refs',
+                                       'max_fan_in'}
+    assert report['whole_column'] == [{'cells': 'Data!C1', 'reference': 'Data!B:B'}]
+    # C2 is volatile itself; nothing reads it
+    assert report['volatile_dependents'] == []
+    assert report['measures']['volatile_cost'] == 1 + 1 + 1
+    assert report['circular'] == ['Data!D1', 'Data!D2']
+    assert report['longest_chain'][0] == 'Data!C2'
+    # Only the volatile cell is over the limits given on the command line
+    assert result.returncode == 1, result.stdout
+    assert 'volatile_cells' in result.stdout.splitlines()[-2]
+
+
+if __name__ == '__main__':
+    test_generated_workbook()
+    test_thresholds()
+    print("✅ Formula graph tests passed")
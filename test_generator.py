@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for FormulaBasedExcelGenerator generation modes
+"""
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+from copy import copy
+
+import openpyxl
+
+from create_formula_based_excel import FormulaBasedExcelGenerator
+
+
+def wave_rows(count, first_row=4):
+    """Sample Wave Tracking rows"""
+    for i in range(count):
+        row = first_row + i
+        yield [f'W-{i + 100:03d}', None, None, None, f'=(D{row}-B{row})*24*60',
+               20, 20, 'Complete', '']
+
+
+def generate_quietly(generator, path, **kwargs):
+    """Run generate() without its console banner"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generator.generate(path, **kwargs)
+
+
+def test_streaming_matches_standard():
+    """Streaming mode produces the same layout, styles and formulas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        standard = generate_quietly(FormulaBasedExcelGenerator(), os.path.join(tmp, 'standard.xlsx'),
+                                    data={'Wave Tracking': wave_rows(25)})
+        streamed = generate_quietly(FormulaBasedExcelGenerator(streaming=True),
+                                    os.path.join(tmp, 'streamed.xlsx'),
+                                    data={'Wave Tracking': wave_rows(25)})
+        
+        wb_a = openpyxl.load_workbook(standard)
+        wb_b = openpyxl.load_workbook(streamed)
+        assert wb_a.sheetnames == wb_b.sheetnames
+        assert len(wb_b.sheetnames) == 12
+        
+        for name in wb_a.sheetnames:
+            ws_a, ws_b = wb_a[name], wb_b[name]
+            assert (ws_a.max_row, ws_a.max_column) == (ws_b.max_row, ws_b.max_column), name
+            assert set(map(str, ws_a.merged_cells.ranges)) == set(map(str, ws_b.merged_cells.ranges))
+            for row_a, row_b in zip(ws_a.iter_rows(), ws_b.iter_rows()):
+                for cell_a, cell_b in zip(row_a, row_b):
+                    assert cell_a.value == cell_b.value, (name, cell_a.coordinate)
+                    assert cell_a.number_format == cell_b.number_format
+                    for attr in ('font', 'fill', 'alignment', 'border'):
+                        assert copy(getattr(cell_a, attr)) == copy(getattr(cell_b, attr))
+            for key, dim in ws_a.column_dimensions.items():
+                assert ws_b.column_dimensions[key].width == dim.width
+        
+        # The first data row takes the place of the sample row
+        assert wb_b['Wave Tracking'].max_row == 3 + 25
+        assert wb_b['Wave Tracking']['A4'].value == 'W-100'
+        assert wb_b['Stock Replenishment']['A4'].value == 'REP-001'
+        # Named ranges start at row 4, sample row or not
+        for wb in (wb_a, wb_b):
+            assert wb.defined_names['WaveTracking_Status'].attr_text == \
+                "'Wave Tracking'!$H$4:$H$1028"
+            assert wb.defined_names['StockReplenishment_DurationHrs'].attr_text == \
+                "'Stock Replenishment'!$I$4:$I$1004"
+            assert wb.defined_names['EmployeeTraining_Status'].attr_text == \
+                "'Employee Training'!$G$4:$G$1004"
+
+
+def test_dashboard_reads_named_ranges():
+    """Every Dashboard formula reads the tracking sheets through defined names only"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = generate_quietly(FormulaBasedExcelGenerator(cache_values=False),
+                                os.path.join(tmp, 'tracking.xlsx'))
+        wb = openpyxl.load_workbook(path)
+    dashboard = wb['Dashboard']
+    formulas = {cell.coordinate: cell.value for row in dashboard.iter_rows() for cell in row
+                if isinstance(cell.value, str) and cell.value.startswith('=')}
+    reading = {}
+    for ref, formula in formulas.items():
+        assert '!' not in formula and ':' not in formula, (ref, formula)
+        names = set(re.findall(r'\b[A-Za-z]+_[A-Za-z]+\b', formula))
+        assert names <= set(wb.defined_names), (ref, names - set(wb.defined_names))
+        if names:
+            reading[dashboard[f'A{dashboard[ref].row}'].value] = formula
+    assert reading['Total Orders Today'] == '=SUM(OrderVolumes_TotalOrders)'
+    assert {'Active Employees', 'Pending Tasks', 'System Alerts',
+            'Wave Completion (1 hour)', 'Inventory Accuracy'} <= set(reading)
+
+
+if __name__ == '__main__':
+    test_streaming_matches_standard()
+    test_dashboard_reads_named_ranges()
+    print("✅ Generator tests passed")
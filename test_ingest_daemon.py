@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio ingest daemon
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from ingest_daemon import IngestService, RecordValidator, StoreTarget, WorkbookTarget, serve
+from ops_store import OperationalStore
+
+WAVE = {'sheet': 'Wave Tracking', 'wave_id': 'W-1', 'Start Time': '2026-01-05T08:00:00',
+        'Actual End': '2026-01-05 08:45', 'Tasks Total': '12', 'Status': 'Complete'}
+
+
+class SlowTarget:
+    """Target whose writes wait until released"""
+
+    name = path = 'slow'
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.batches = []
+
+    def write(self, batches):
+        self.release.wait(5)
+        self.batches.append({name: list(batch.iter_rows(5)) for name, batch in batches.items()})
+
+    def close(self):
+        pass
+
+
+class FailingTarget:
+    """Target whose first writes raise, as when the workbook is open in Excel"""
+
+    name = 'failing'
+
+    def __init__(self, path, failures):
+        self.path = path
+        self.failures = failures
+        self.wave_ids = []
+
+    def write(self, batches):
+        if self.failures:
+            self.failures -= 1
+            raise PermissionError('workbook is locked')
+        self.wave_ids.extend(row[0] for row in batches['Wave Tracking'].iter_rows(4))
+
+    def close(self):
+        pass
+
+
+def test_validation():
+    """Fields match headers by name; unknown fields and bad values are rejected"""
+    validator = RecordValidator()
+    sheet_name, row = validator.validate(WAVE)
+    assert sheet_name == 'Wave Tracking'
+    assert row == ['W-1', datetime(2026, 1, 5, 8), None, datetime(2026, 1, 5, 8, 45), None,
+                   12, None, 'Complete', None]
+    # Formula columns are recalculated, not taken from the record
+    assert validator.validate(dict(WAVE, duration_mins=999))[1][4] is None
+    for record, message in [({'sheet': 'Nope'}, 'unknown sheet'),
+                            ([WAVE], 'JSON object'),
+                            (dict(WAVE, shift='A'), 'no column'),
+                            (dict(WAVE, **{'Start Time': 'soon'}), 'Start Time'),
+                            ({'sheet': 'Picking Tasks'}, 'no Picking Tasks fields'),
+                            (dict(WAVE, Notes='=HYPERLINK("http://attacker.test","Open")'),
+                             'formulas are not accepted: Notes'),
+                            (dict(WAVE, wave_id='=1+1', Status='=A1'),
+                             'formulas are not accepted: Wave ID, Status')]:
+        with pytest.raises(ValueError, match=message):
+            validator.validate(record)
+
+
+def test_socket_to_store_in_batches():
+    """Size and time triggers; every line is answered"""
+    async def run(db, sock):
+        service = IngestService(StoreTarget(db), batch_size=3, flush_seconds=0.2, progress=None)
+        stop = asyncio.Event()
+        server = asyncio.create_task(serve(service, socket_path=sock, stop=stop))
+        while not os.path.exists(sock):
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_unix_connection(sock)
+        lines = [json.dumps(dict(WAVE, wave_id=f'W-{i}')) for i in range(4)]
+        lines += ['not json', json.dumps([dict(WAVE, wave_id='W-9'), {'sheet': 'Nope'}]),
+                  json.dumps(dict(WAVE, Notes='=HYPERLINK("http://attacker.test")'))]
+        writer.write(('\n'.join(lines) + '\n').encode())
+        replies = [json.loads(await reader.readline()) for _ in lines]
+        # The fifth wave waits for the time trigger
+        await asyncio.sleep(0.5)
+        stats = dict(service.stats)
+        writer.close()
+        stop.set()
+        await server
+        return replies, stats
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'ops.db')
+        replies, stats = asyncio.run(run(db, os.path.join(tmp, 'ingest.sock')))
+        with OperationalStore(db) as store:
+            waves = store.find('Wave Tracking', status='complete')
+
+    assert replies[0] == {'accepted': 1}
+    assert 'invalid JSON' in replies[4]['errors'][0]
+    assert replies[5] == {'accepted': 1, 'errors': ["record 2: unknown sheet: 'Nope'"]}
+    assert replies[6] == {'accepted': 0, 'errors': ['formulas are not accepted: Notes']}
+    assert stats == {'received': 8, 'rejected': 3, 'written': 5, 'flushes': 2, 'dead_lettered': 0}
+    assert [wave['Wave ID'] for wave in waves] == ['W-0', 'W-1', 'W-2', 'W-3', 'W-9']
+    assert abs(waves[0]['Duration (mins)'] - 45) < 1e-6
+
+
+def test_drop_directory_to_workbook():
+    """Dropped files are appended with formulas numbered from the first free row"""
+    async def run(path, drop):
+        service = IngestService(WorkbookTarget(path), flush_seconds=0.1, progress=None)
+        stop = asyncio.Event()
+        server = asyncio.create_task(serve(service, drop_dir=drop, stop=stop))
+        while os.listdir(drop) != ['processed']:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'site.xlsx')
+        shutil.copy('Ecom_Operations_Tracking_System_Formula_Based.xlsx', path)
+        drop = os.path.join(tmp, 'incoming')
+        os.makedirs(drop)
+        with open(os.path.join(drop, 'picks.jsonl'), 'w') as f:
+            f.write(json.dumps({'sheet': 'Picking Tasks', 'Task ID': 'PT-1', 'Employee ID': 'E1',
+                                'Start Time': '2026-01-05T08:00', 'End Time': '2026-01-05T08:20',
+                                'Target Time (mins)': 30}) + '\n')
+            f.write(json.dumps({'sheet': 'Picking Tasks', 'Task': 'PT-2'}) + '\n')
+        with open(os.path.join(drop, 'waves.json'), 'w') as f:
+            json.dump([WAVE, dict(WAVE, wave_id='W-2')], f)
+
+        asyncio.run(run(path, drop))
+
+        assert sorted(os.listdir(os.path.join(drop, 'processed'))) == [
+            'picks.jsonl', 'picks.jsonl.errors', 'waves.json']
+        with open(os.path.join(drop, 'processed', 'picks.jsonl.errors')) as f:
+            assert f.read().startswith('line 2: Picking Tasks has no column(s): Task')
+        wb = openpyxl.load_workbook(path)
+        picks = [[cell.value for cell in row] for row in wb['Picking Tasks'].iter_rows(min_row=4)]
+        waves = [row[0].value for row in wb['Wave Tracking'].iter_rows(min_row=4)]
+    assert picks[0][:2] == ['PT-1', 'E1'] and picks[0][7:9] == ['=(E4-D4)*24*60', '=G4/H4']
+    assert len(picks) == 1 and waves == ['W-1', 'W-2']
+
+
+def test_backpressure():
+    """A full buffer holds producers back until a flush makes room"""
+    async def run(target):
+        service = IngestService(target, batch_size=1, flush_seconds=10, max_pending=2,
+                                progress=None)
+        service.start()
+        await service.submit(WAVE)
+        await asyncio.sleep(0.05)           # taken by the flusher, which blocks
+        await service.submit(WAVE)
+        await service.submit(WAVE)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(service.submit(WAVE), 0.2)
+        target.release.set()
+        await asyncio.wait_for(service.submit(WAVE), 2)
+        await service.close()
+        return service.stats
+
+    target = SlowTarget()
+    stats = asyncio.run(run(target))
+    # The record that timed out was cancelled before it was buffered
+    assert stats['written'] == 4
+    assert target.batches[0]['Wave Tracking'][0][4] == '=(D5-B5)*24*60'
+
+
+def test_failed_flush_is_retried():
+    """A failed batch is kept and retried; its drop file waits until it is written"""
+    async def run(target, drop):
+        service = IngestService(target, flush_seconds=0.05, retry_seconds=0.1, progress=None)
+        stop = asyncio.Event()
+        server = asyncio.create_task(serve(service, drop_dir=drop, stop=stop))
+        # Two failures: written after about 0.05 + 0.1 + 0.2 seconds
+        await asyncio.sleep(0.2)
+        waiting = sorted(os.listdir(drop))
+        while os.listdir(drop) != ['processed']:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await server
+        return waiting, service.stats
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = FailingTarget(os.path.join(tmp, 'site.xlsx'), failures=2)
+        drop = os.path.join(tmp, 'incoming')
+        os.makedirs(drop)
+        with open(os.path.join(drop, 'waves.jsonl'), 'w') as f:
+            f.writelines(json.dumps(dict(WAVE, wave_id=f'W-{i}')) + '\n' for i in range(5))
+        waiting, stats = asyncio.run(run(target, drop))
+        assert not os.path.exists(target.path + '.failed.jsonl')
+
+    assert waiting == ['processed', 'waves.jsonl']
+    assert target.wave_ids == ['W-0', 'W-1', 'W-2', 'W-3', 'W-4']
+    assert stats['written'] == 5 and stats['flushes'] == 1 and stats['dead_lettered'] == 0
+
+
+def test_dead_letter_on_close():
+    """Records that still cannot be written at shutdown are saved as records to drop in again"""
+    async def run(target):
+        service = IngestService(target, flush_seconds=0.05, retry_seconds=10, progress=None)
+        service.start()
+        await service.submit_line(json.dumps([WAVE, dict(WAVE, wave_id='W-2')]))
+        await asyncio.sleep(0.2)            # failed once, waiting to retry
+        await asyncio.wait_for(service.close(), 2)
+        return service
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = FailingTarget(os.path.join(tmp, 'site.xlsx'), failures=100)
+        service = asyncio.run(run(target))
+        assert service.dead_letter == target.path + '.failed.jsonl'
+        with open(service.dead_letter) as f:
+            records = [json.loads(line) for line in f]
+
+    assert service.stats['dead_lettered'] == 2 and service.stats['written'] == 0
+    assert records[0] == {'sheet': 'Wave Tracking', 'Wave ID': 'W-1',
+                          'Start Time': '2026-01-05T08:00:00', 'Actual End': '2026-01-05T08:45:00',
+                          'Tasks Total': 12, 'Status': 'Complete'}
+    assert records[1]['Wave ID'] == 'W-2'
+    validator = RecordValidator()
+    assert validator.validate(records[0]) == validator.validate(WAVE)
+
+
+if __name__ == '__main__':
+    test_validation()
+    test_socket_to_store_in_batches()
+    test_drop_directory_to_workbook()
+    test_backpressure()
+    test_failed_flush_is_retried()
+    test_dead_letter_on_close()
+    print("✅ Ingest daemon tests passed")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the Dashboard KPI evaluation engine
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from kpi_engine import (ExcelError, WorkbookModel, evaluate_dashboard, parse_formula,
+                        relative_template)
+
+START = datetime(2026, 1, 5, 8, 0)
+
+
+def build_workbook(path):
+    """Generate a workbook with a few Wave Tracking and Stock Replenishment rows"""
+    waves = []
+    for i, minutes in enumerate([30, 45, 60, 75, 50]):
+        row = 4 + i
+        status = 'In Progress' if i == 4 else 'Complete'
+        waves.append([f'W-{i:03d}', START, START + timedelta(hours=1),
+                      START + timedelta(minutes=minutes), f'=(D{row}-B{row})*24*60',
+                      10, 10, status, ''])
+    stock = []
+    for i, hours in enumerate([1, 2, 3]):
+        row = 4 + i
+        stock.append([f'REP-{i:03d}', 'SKU-1', 'Tote', 10, 5, 20, START,
+                      START + timedelta(hours=hours), f'=(H{row}-G{row})*24', 'Complete', 'High'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        FormulaBasedExcelGenerator().generate(path, data={'Wave Tracking': waves,
+                                                          'Stock Replenishment': stock})
+    return path
+
+
+def test_relative_template_groups_rows():
+    """Per-row formulas on different rows share one template"""
+    assert relative_template('=(D5-B5)*24*60', 5) == relative_template('=(D9-B9)*24*60', 9)
+    assert relative_template('=$D$5-B5', 5) == '=$D$5-B0'
+    assert parse_formula('=1+2*3') == ('op', '+', ('num', 1.0), ('op', '*', ('num', 2.0), ('num', 3.0)))
+
+
+def test_dashboard_values():
+    """KPI formulas and status chains evaluate like Excel"""
+    with tempfile.TemporaryDirectory() as tmp:
+        values = evaluate_dashboard(build_workbook(os.path.join(tmp, 'kpi.xlsx')))
+    
+    assert abs(values['C6'] - 0.75) < 1e-9          # 3 of 4 complete waves within 60 mins
+    assert values['D6'] == 'Critical'
+    # The first data row replaces the sample row, so only data is averaged
+    assert abs(values['C8'] - 2) < 1e-6
+    assert values['D8'] == 'On Time'
+    assert values['C7'] == ExcelError('#DIV/0!')     # no training rows yet
+    assert values['D11'] == 'Excellent'              # text '0.96' compares above numbers
+    assert values['B18'] == 1                        # pending tasks
+    assert values['A22'] == ''                       # replenishment alert not raised
+
+
+def test_cached_values_readable_headless():
+    """Generated workbooks carry cached values for data_only readers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_workbook(os.path.join(tmp, 'kpi.xlsx'))
+        dashboard = openpyxl.load_workbook(path, data_only=True)['Dashboard']
+        assert abs(dashboard['C6'].value - 0.75) < 1e-9
+        assert dashboard['D8'].value == 'On Time'
+        assert dashboard['C7'].value == '#DIV/0!'
+        # Formulas are kept alongside the cached values
+        formulas = openpyxl.load_workbook(path)['Dashboard']
+        assert formulas['C8'].value == '=AVERAGE(StockReplenishment_DurationHrs)'
+
+
+def test_data_typed_over_sample_row():
+    """Sample rows add nothing to the KPIs until data is typed over them, then count"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kpi.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            FormulaBasedExcelGenerator().generate(path)
+        assert evaluate_dashboard(path)['C8'] == ExcelError('#DIV/0!')
+        wb = openpyxl.load_workbook(path)
+        stock = wb['Stock Replenishment']
+        stock['A4'], stock['G4'], stock['H4'] = 'REP-1', START, START + timedelta(hours=3)
+        wb.save(path)
+        values = evaluate_dashboard(path)
+
+    assert abs(values['C8'] - 3) < 1e-6 and values['D8'] == 'Critical'
+    # The Quality Audit sample row is still blank, not a 0% audit
+    assert values['C9'] == ExcelError('#DIV/0!')
+
+
+def test_column_comparisons():
+    """Per-row comparisons run on whole columns: case-blind text, blanks, mixed types"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = WorkbookModel(build_workbook(os.path.join(tmp, 'kpi.xlsx')))
+        # Rows 1-9: blank, header, description, five waves, blank
+        rows = np.arange(9)
+
+        def column(formula):
+            values = model.evaluate(parse_formula(formula), 'Wave Tracking', rows)
+            return [values.item(i) for i in range(len(values))]
+
+        assert column('=H0="complete"') == [False] * 3 + [True] * 4 + [False] * 2
+        # Blanks count as 0, text ranks above numbers
+        assert column('=E0<=45') == [True, False, False, True, True, False, False, False, True]
+        assert column('=E0>"A"') == [False, True, True] + [False] * 6
+        # A blank is FALSE next to a boolean and "" next to text
+        assert column('=I0=FALSE') == [True] + [False] * 7 + [True]
+        assert column('=I0=""') == [True, False, False] + [True] * 6
+        assert column('=1/0<A0') == [ExcelError('#DIV/0!')] * 9
+        model.close()
+
+
+if __name__ == '__main__':
+    test_relative_template_groups_rows()
+    test_dashboard_values()
+    test_cached_values_readable_headless()
+    test_data_typed_over_sample_row()
+    test_column_comparisons()
+    print("✅ KPI engine tests passed")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless Dashboard KPI reader
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+from column_writer import ColumnSheet
+from kpi_engine import ExcelError, dashboard_kpis, evaluate_dashboard
+from kpi_reader import KpiPoller, _cell_value, read_kpis, shift_formula
+from parallel_generator import ParallelExcelGenerator, set_cells
+from test_kpi_engine import build_workbook
+from test_parallel_generator import training_rows
+from xlsx_package import rewrite_members, sheet_parts
+
+NOW = datetime(2026, 1, 5, 12, 0)
+
+
+def assert_same_kpis(path):
+    """The streaming reader agrees with the openpyxl-based engine"""
+    expected = dashboard_kpis(path, evaluate_dashboard(path, now=NOW))
+    kpis = read_kpis(path, now=NOW)['kpis']
+    assert [kpi['metric'] for kpi in kpis] == [kpi['metric'] for kpi in expected]
+    for kpi, other in zip(kpis, expected):
+        # Both read the sheets with xml_loader, so the numbers agree to the last digit
+        assert kpi['current'] == other['current'], kpi['metric']
+        assert kpi['status'] == other['status'], kpi['metric']
+    return kpis
+
+
+def test_matches_engine_shared_strings():
+    """openpyxl output: text in the shared string table"""
+    with tempfile.TemporaryDirectory() as tmp:
+        kpis = assert_same_kpis(build_workbook(os.path.join(tmp, 'kpi.xlsx')))
+    waves = kpis[0]
+    assert abs(waves['current'] - 0.75) < 1e-9 and waves['status'] == 'Critical'
+    # Duration (E) is worked out from Start Time (B) and Actual End (D)
+    assert waves['depends_on'] == {'Wave Tracking': ['B', 'D', 'E', 'H']}
+    assert kpis[1]['current'] == ExcelError('#DIV/0!')
+    # Text targets are taken as they are
+    assert kpis[5]['current'] == '0.96' and kpis[5]['depends_on'] == {}
+
+
+def test_matches_engine_inline_strings():
+    """Parallel generator output: inline strings, only the needed columns read"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'parallel.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            ParallelExcelGenerator(workers=1, chunk_rows=40).generate(
+                path, data={'Employee Training': training_rows(75)})
+        kpis = assert_same_kpis(path)
+        report = read_kpis(path, now=NOW)
+    assert abs(kpis[1]['current'] - 50 / 75) < 1e-9
+    assert kpis[1]['depends_on'] == {'Employee Training': ['A', 'G']}
+    # Employee ID and Status of 75 rows plus the header rows, nothing else
+    assert report['cells_read']['Employee Training'] < 2 * 80
+    assert not report['volatile']
+
+
+def test_shared_formulas():
+    """Shared formulas written by Excel are moved from their first cell"""
+    assert shift_formula('(D5-B5)*24*60', 3, 0) == '(D8-B8)*24*60'
+    assert shift_formula('$D$5-B5&"B5"', 1, 1) == '$D$5-C6&"B5"'
+    shared = {}
+    assert _cell_value(5, 5, b'', b'<f t="shared" ref="E5:E9" si="0">(D5-B5)*24*60</f><v>30</v>',
+                       shared) == '=(D5-B5)*24*60'
+    assert _cell_value(7, 5, b'', b'<f t="shared" si="0"/><v>60</v>', shared) == '=(D7-B7)*24*60'
+    # Without the group's first cell, the cached value is used
+    assert _cell_value(7, 5, b'', b'<f t="shared" si="1"/><v>60</v>', shared) == 60
+
+
+def test_poller_rereads_changed_sheets_only():
+    """Unchanged worksheet parts are not parsed again"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_workbook(os.path.join(tmp, 'kpi.xlsx'))
+        poller = KpiPoller(path)
+        first = poller.poll(now=NOW)
+        assert 'Wave Tracking' in first['changed'] and 'Dashboard' in first['changed']
+        assert poller.poll(now=NOW)['changed'] == []
+
+        # The last wave (50 minutes) is now complete as well
+        with zipfile.ZipFile(path) as zf:
+            part = sheet_parts(zf)['Wave Tracking']
+            xml = set_cells(zf.read(part), {'H8': 'Complete'})
+        rewrite_members(path, {part: xml})
+        report = poller.poll(now=NOW)
+        assert report['changed'] == ['Wave Tracking']
+        assert abs(report['kpis'][0]['current'] - 4 / 5) < 1e-9
+        assert_same_kpis(path)
+
+
+def test_cold_poll_of_large_sheet():
+    """A first poll of a 200,000-row sheet converts the four columns the KPI needs in bulk"""
+    index = np.arange(200_000)
+    start = np.datetime64('2026-01-05T08:00') + index.astype('timedelta64[m]')
+    waves = ColumnSheet('Wave Tracking', {
+        'Wave ID': np.char.add('W-', index.astype(str)), 'Start Time': start,
+        'Actual End': start + np.where(index % 3, 45, 75).astype('timedelta64[m]'),
+        'Tasks Total': index % 50, 'Status': np.where(index % 4, 'Complete', 'In Progress')})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'large.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            ParallelExcelGenerator(workers=2, cache_values=False).generate(
+                path, data={'Wave Tracking': waves})
+        times = []
+        for _ in range(2):
+            start_time = time.perf_counter()
+            report = KpiPoller(path).poll(now=NOW)
+            times.append(time.perf_counter() - start_time)
+    kpi = report['kpis'][0]
+    complete = index % 4 != 0
+    assert kpi['current'] == (complete & (index % 3 != 0)).sum() / complete.sum()
+    # Start Time, Actual End, Duration and Status, plus their two header rows
+    assert kpi['depends_on'] == {'Wave Tracking': ['B', 'D', 'E', 'H']}
+    assert report['cells_read']['Wave Tracking'] == 4 * 200_002
+    # About 3 s here; reading cell by cell took over 5 s
+    assert min(times) < 4.0, times
+
+
+def test_cli_json_without_openpyxl():
+    """The kpis command prints JSON and never imports openpyxl"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_workbook(os.path.join(tmp, 'kpi.xlsx'))
+        code = ('import sys, ecom\n'
+                f'code = ecom.main(["kpis", {path!r}])\n'
+                'print("openpyxl" in sys.modules)\n'
+                'sys.exit(code)')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        output, imported = result.stdout.splitlines()
+        assert imported == 'False'
+        report = json.loads(output)
+        assert report['kpis'][1]['current'] == '#DIV/0!'
+        assert 'Quality Audit' in report['cells_read']
+
+        missing = subprocess.run([sys.executable, 'ecom.py', 'kpis', os.path.join(tmp, 'none.xlsx')],
+                                 capture_output=True, text=True)
+        assert missing.returncode == 1 and 'error' in json.loads(missing.stdout)
+
+
+if __name__ == '__main__':
+    test_matches_engine_shared_strings()
+    test_matches_engine_inline_strings()
+    test_shared_formulas()
+    test_poller_rereads_changed_sheets_only()
+    test_cold_poll_of_large_sheet()
+    test_cli_json_without_openpyxl()
+    print("✅ KPI reader tests passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-site batch builder
+"""
+
+import csv
+import json
+import os
+import tempfile
+
+import openpyxl
+import pytest
+
+from multi_site import build_sites, load_manifest
+from parallel_generator import set_cells
+from vba_project import diff_modules
+
+
+def write_manifest(tmp, sites, **settings):
+    path = os.path.join(tmp, 'sites.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'sites': sites, **settings}, f)
+    return path
+
+
+def write_waves(path, count):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Wave ID', 'Start Time', 'Target End', 'Actual End',
+                         'Tasks Total', 'Tasks Complete', 'Status', 'Notes'])
+        for i in range(count):
+            writer.writerow([f'W{i}', '2024-01-05 06:00', '2024-01-05 07:00',
+                             '2024-01-05 06:50', 10, 10, 'Complete', ''])
+
+
+def test_load_manifest():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_manifest(tmp, [
+            {'name': 'Leeds North', 'vba': True, 'prefill': ['Wave Tracking=waves.csv'],
+             'kpi_targets': {'Picking Efficiency': {'target': '> 97%'}}},
+            {'name': 'Bristol', 'output': 'b/tracking.xlsx', 'vba': False},
+        ], defaults={'vba': True, 'kpi_targets': {'System Uptime': {'target': '> 99.5%'}}})
+        leeds, bristol = load_manifest(path)
+        assert leeds.output == os.path.join(tmp, 'sites', 'Leeds_North.xlsm')
+        assert leeds.prefill == ['Wave Tracking=' + os.path.join(tmp, 'waves.csv')]
+        assert sorted(leeds.kpi_targets) == ['Picking Efficiency', 'System Uptime']
+        assert bristol.output == os.path.join(tmp, 'b', 'tracking.xlsx')
+        assert not bristol.vba and list(bristol.kpi_targets) == ['System Uptime']
+
+        path = write_manifest(tmp, [{'name': 'A'}, {'name': 'A'}])
+        with pytest.raises(ValueError):
+            load_manifest(path)
+
+
+def test_build_sites():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_waves(os.path.join(tmp, 'waves.csv'), 50)
+        path = write_manifest(tmp, [
+            {'name': 'Leeds', 'vba': True, 'prefill': ['waves.csv'],
+             'kpi_targets': {'Picking Efficiency': {'target': '> 97%',
+                                                    'thresholds': [0.97, 0.92]}}},
+            {'name': 'Bristol'},
+            {'name': 'Broken', 'prefill': ['missing.csv']},
+        ])
+        report = build_sites(load_manifest(path), workers=2, progress=None)
+        leeds, bristol, broken = report['sites']
+        assert report['failed'] == 1
+        assert broken['status'] == 'error' and 'missing.csv' in broken['error']
+        assert leeds['status'] == bristol['status'] == 'ok'
+        assert leeds['rows'] == 50 and bristol['rows'] == 0
+
+        assert diff_modules(leeds['output'], ['VBA_Modules.bas']) == {'EcomOperations': []}
+        assert not os.path.exists(os.path.splitext(leeds['output'])[0] + '.build.xlsx')
+        dashboard = openpyxl.load_workbook(leeds['output'])['Dashboard']
+        assert dashboard['B10'].value == '> 97%'
+        assert '0.97' in dashboard['D10'].value
+        dashboard = openpyxl.load_workbook(bristol['output'])['Dashboard']
+        assert dashboard['B10'].value == '> 95%'
+
+
+def test_set_cells_keeps_style():
+    xml = b'<sheetData><row r="6"><c r="B6" s="3" t="inlineStr"><is><t>x</t></is></c></row></sheetData>'
+    patched = set_cells(xml, {'B6': '> 97%'})
+    assert b'<c r="B6" s="3"' in patched and b'&gt; 97%' in patched
+    with pytest.raises(KeyError):
+        set_cells(xml, {'C6': 1})
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite operational store
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from create_formula_based_excel import TRACKING_SHEETS
+from kpi_engine import ExcelError
+from kpi_reader import read_kpis
+from ops_store import OperationalStore, sql_name
+from parallel_generator import ParallelExcelGenerator
+from test_bulk_import import WAVES_CSV, write_file
+
+START = datetime(2026, 1, 5, 8, 0)
+
+REPLEN_CSV = """replen_id,sku,request_time,received_time,status
+R-1,SKU-1,2026-01-05 08:00,2026-01-05 11:00,Complete
+R-2,SKU-2,2026-01-05 09:00,2026-01-05 10:00,Complete
+"""
+
+
+def wave_rows(count):
+    """Waves of 10.5 to 89.5 minutes; every third one still in progress"""
+    return [[f'W-{i}', START + timedelta(hours=i), None,
+             START + timedelta(hours=i, minutes=10 + i % 80, seconds=30), None, 10, 10,
+             'In Progress' if i % 3 == 0 else 'Complete', '']
+            for i in range(count)]
+
+
+def test_schema_mirrors_sheets():
+    """One column per header, formula columns generated, lookup columns indexed"""
+    with OperationalStore() as store:
+        for sheet_name, headers in TRACKING_SHEETS.items():
+            columns = store.conn.execute(
+                f'PRAGMA table_xinfo({sql_name(sheet_name)})').fetchall()
+            assert [column[1] for column in columns] == [sql_name(h) for h in headers]
+        indexes = {row[0] for row in store.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_system_errors_status', 'idx_system_errors_date_time',
+            'idx_picking_tasks_employee_id', 'idx_inventory_mismatch_sku',
+            'idx_wave_tracking_status_duration_mins'} <= indexes
+    assert sql_name('Return Rate %') == 'return_rate_pct'
+
+
+def test_batched_inserts_and_lookups():
+    """Rows as lists or dicts; filters use Excel's case-insensitive match"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with OperationalStore(os.path.join(tmp, 'ops.db')) as store:
+            assert store.insert('Wave Tracking', wave_rows(30), batch_rows=7) == 30
+            store.insert('Inventory Mismatch', [
+                {'Mismatch ID': 'INV-1', 'Date': START, 'SKU': 'SKU-9', 'System Count': '10',
+                 'Physical Count': 8, 'Status': 'Open'},
+                {'mismatch_id': 'INV-2', 'date': START, 'sku': 'SKU-1', 'status': 'Resolved'},
+            ])
+
+            waves = store.find('Wave Tracking', status='in progress')
+            assert len(waves) == 10 and waves[0]['Wave ID'] == 'W-0'
+            # Duration (mins) is the =(D-B)*24*60 formula of the sheet
+            assert abs(waves[1]['Duration (mins)'] - 13.5) < 1e-6
+            assert waves[1]['Start Time'] == START + timedelta(hours=3)
+            assert len(store.find('Wave Tracking', since=START + timedelta(hours=5),
+                                  until=START + timedelta(hours=8))) == 3
+
+            mismatch = store.find('Inventory Mismatch', sku='sku-9')[0]
+            # Numbers stored as text become numbers
+            assert mismatch['System Count'] == 10 and mismatch['Variance'] == -2
+            with pytest.raises(ValueError):
+                store.find('Wave Tracking', sku='SKU-9')
+
+        # A bad row rolls back the whole load
+        with OperationalStore(os.path.join(tmp, 'ops.db')) as store:
+            with pytest.raises(ValueError):
+                store.load({'System Errors': [['E-1']], 'Wave Tracking': [['W-x'] * 10]})
+            assert store.count('System Errors') == 0 and store.count('Wave Tracking') == 30
+
+
+def test_kpis_and_workbook_export():
+    """KPIs from SQL match the Dashboard of the exported workbook"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with OperationalStore() as store:
+            store.insert('Wave Tracking', wave_rows(120))
+            store.insert('Employee Training', [[f'E-{i}', 'Name', 'Picking', 'Safety', START,
+                                                None, 'Completed' if i % 4 else 'Pending']
+                                               for i in range(8)])
+            store.import_files([f"Stock Replenishment={write_file(tmp, 'replen.csv', REPLEN_CSV)}"])
+            kpis = {kpi['metric']: kpi for kpi in store.kpis()}
+
+            path = os.path.join(tmp, 'site.xlsx')
+            with contextlib.redirect_stdout(io.StringIO()):
+                store.export(path, ParallelExcelGenerator(workers=1, chunk_rows=50))
+        exported = {kpi['metric']: kpi for kpi in read_kpis(path)['kpis']}
+
+    waves = kpis['Wave Completion (1 hour)']
+    assert abs(waves['current'] - 60 / 80) < 1e-9 and waves['status'] == 'Critical'
+    assert kpis['Employee Training Completion']['current'] == 6 / 8
+    # Average of the 3- and 1-hour requests
+    assert abs(kpis['Stock Replenishment Time']['current'] - 2) < 1e-6
+    assert kpis['Stock Replenishment Time']['status'] == 'On Time'
+    assert kpis['Picking Efficiency']['current'] == ExcelError('#DIV/0!')
+    assert kpis['SLA Compliance'] == {'metric': 'SLA Compliance', 'target': '> 95%',
+                                      'current': '0.96', 'status': 'Excellent'}
+    for metric in ['Wave Completion (1 hour)', 'Employee Training Completion',
+                   'Inventory Accuracy', 'SLA Compliance']:
+        assert exported[metric]['status'] == kpis[metric]['status'], metric
+        if isinstance(kpis[metric]['current'], float):
+            assert abs(exported[metric]['current'] - kpis[metric]['current']) < 1e-9, metric
+        else:
+            assert exported[metric]['current'] == kpis[metric]['current'], metric
+
+
+def test_csv_import():
+    """Exports go through bulk_import; the CSV's Duration column is recalculated"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with OperationalStore() as store:
+            counts = store.import_files([write_file(tmp, 'waves.csv', WAVES_CSV)])
+            assert counts == {'Wave Tracking': 3}
+            wave = store.find('Wave Tracking', status='COMPLETE')[0]
+    assert wave['Tasks Total'] == 1200 and wave['Duration (mins)'] == pytest.approx(45)
+
+
+if __name__ == '__main__':
+    test_schema_mirrors_sheets()
+    test_batched_inserts_and_lookups()
+    test_kpis_and_workbook_export()
+    test_csv_import()
+    print("✅ Operational store tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel workbook generator and its ZIP assembly
+"""
+
+import os
+import tempfile
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from parallel_generator import ParallelExcelGenerator, render_rows
+from test_generator import generate_quietly, wave_rows
+from xlsx_package import RawZipWriter, crc32_combine
+
+
+def training_rows(count):
+    """Sample Employee Training rows with dates and blanks"""
+    start = datetime(2024, 1, 1, 9, 30)
+    for i in range(count):
+        yield [f'E{i:04d}', f'Employee {i}', 'Fulfilment', 'Safety', start + timedelta(days=i),
+               None, 'Completed' if i % 3 else 'Pending', 0.9, '', ' note ']
+
+
+def test_crc32_combine():
+    """CRC of concatenated data from the CRCs of its parts"""
+    first, second = os.urandom(1000), b'<row r="5"/>' * 300
+    combined = crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second))
+    assert combined == zlib.crc32(first + second)
+
+
+def test_raw_zip_writer():
+    """RawZipWriter output is a valid ZIP readable by zipfile"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'parts.zip')
+        with RawZipWriter(path) as writer:
+            writer.writestr('[Content_Types].xml', '<Types/>')
+            writer.writestr('xl/worksheets/sheet1.xml', b'<worksheet/>' * 1000)
+        with zipfile.ZipFile(path) as zf:
+            assert zf.testzip() is None
+            assert zf.namelist() == ['[Content_Types].xml', 'xl/worksheets/sheet1.xml']
+            assert zf.read('xl/worksheets/sheet1.xml') == b'<worksheet/>' * 1000
+            assert zf.getinfo('[Content_Types].xml').date_time == (1980, 1, 1, 0, 0, 0)
+
+
+def test_numpy_scalars():
+    """NumPy booleans are written as booleans, NumPy numbers as numbers"""
+    xml, width = render_rows([[np.bool_(True), np.bool_(False), np.int64(7), np.float32(0.5)]],
+                             4, {})
+    assert width == 4
+    assert xml.decode() == ('<row r="4"><c r="A4" t="b"><v>1</v></c><c r="B4" t="b"><v>0</v></c>'
+                            '<c r="C4"><v>7</v></c><c r="D4"><v>0.5</v></c></row>')
+
+
+def test_parallel_matches_standard():
+    """Parallel generation produces the same cells and named ranges"""
+    def data():
+        return {'Wave Tracking': wave_rows(120), 'Employee Training': training_rows(75)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        standard = generate_quietly(FormulaBasedExcelGenerator(cache_values=False),
+                                    os.path.join(tmp, 'standard.xlsx'), data=data())
+        parallel = generate_quietly(ParallelExcelGenerator(workers=2, chunk_rows=40),
+                                    os.path.join(tmp, 'parallel.xlsx'), data=data())
+
+        wb_a = openpyxl.load_workbook(standard)
+        wb_b = openpyxl.load_workbook(parallel)
+        assert wb_a.sheetnames == wb_b.sheetnames
+        for name in wb_a.sheetnames:
+            rows_a = list(wb_a[name].iter_rows(values_only=True))
+            rows_b = list(wb_b[name].iter_rows(values_only=True))
+            assert rows_a == rows_b, name
+        assert ({name: dn.attr_text for name, dn in wb_a.defined_names.items()} ==
+                {name: dn.attr_text for name, dn in wb_b.defined_names.items()})
+        assert wb_b.defined_names['WaveTracking_Status'].attr_text == "'Wave Tracking'!$H$4:$H$1123"
+
+        dashboard = openpyxl.load_workbook(parallel, data_only=True)['Dashboard']
+        assert abs(dashboard['C7'].value - 50 / 75) < 1e-9  # training completion
+
+
+if __name__ == '__main__':
+    test_crc32_combine()
+    test_raw_zip_writer()
+    test_numpy_scalars()
+    test_parallel_matches_standard()
+    print("✅ Parallel generator tests passed")
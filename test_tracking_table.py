@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar tracking tables
+"""
+
+import contextlib
+import io
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from kpi_engine import to_serial
+from tracking_table import Categorical, TextColumn, TrackingTable
+
+START = datetime(2026, 1, 5, 8, 0)
+STATUSES = ['Complete', 'In Progress', 'Pending']
+
+
+def picking_rows(count):
+    """Picks of 10-29 minutes against a 20 minute target, by 7 employees"""
+    return [[f'PT-{i}', f'E{i % 7}', f'Picker {i % 7}', START + timedelta(minutes=i),
+             START + timedelta(minutes=i + 10 + i % 20), 20 + i % 5, 20, None, None, i % 2,
+             STATUSES[i % 3]]
+            for i in range(count)]
+
+
+def test_column_types():
+    """Typed arrays, dictionary-encoded categoricals and per-row formulas"""
+    picks = TrackingTable.from_rows('Picking Tasks', picking_rows(300), chunk_rows=64)
+    assert len(picks) == 300
+    assert isinstance(picks['Task ID'], TextColumn)
+    status = picks['Status']
+    assert isinstance(status, Categorical) and status.codes.dtype == np.int8
+    assert status.categories == STATUSES
+    # Employee ID repeats, so it is encoded too
+    assert isinstance(picks['Employee ID'], Categorical)
+    assert picks['Start Time'][1] == pytest.approx(to_serial(START + timedelta(minutes=1)))
+    # Actual Time = (End - Start) * 24 * 60, Efficiency = Target / Actual
+    assert picks['Actual Time (mins)'][3] == pytest.approx(13)
+    assert picks['Efficiency %'][3] == pytest.approx(20 / 13)
+    assert picks.values('Status')[:4] == ['Complete', 'In Progress', 'Pending', 'Complete']
+    # 11 columns of 300 rows: a few bytes per value
+    assert picks.nbytes < 300 * 11 * 8
+
+
+def test_filter_group_by_aggregate():
+    """Vectorized results agree with plain Python over the rows"""
+    rows = picking_rows(500)
+    picks = TrackingTable.from_rows('Picking Tasks', rows)
+    mask = picks.eq('Status', 'complete') & (picks['Efficiency %'] < 0.95)
+    slow = picks.filter(mask)
+    expected = [row for i, row in enumerate(rows)
+                if row[10] == 'Complete' and 20 / (10 + i % 20) < 0.95]
+    assert len(slow) == len(expected) and slow.values('Task ID') == [row[0] for row in expected]
+
+    summary = slow.group_by('Employee ID', tasks=(None, 'count'), items=('Items Picked', 'sum'),
+                            fastest=('Actual Time (mins)', 'min'), pickers=('Employee Name', 'nunique'))
+    assert summary['Employee ID'] == [f'E{i}' for i in range(7)]
+    for i, employee in enumerate(summary['Employee ID']):
+        mine = [row for row in expected if row[1] == employee]
+        assert summary['tasks'][i] == len(mine)
+        assert summary['items'][i] == sum(row[5] for row in mine)
+        assert summary['pickers'][i] == 1
+    assert min(summary['fastest']) == pytest.approx(22)
+
+    assert picks.aggregate('Errors', 'sum') == 250
+    assert picks.aggregate(None, 'count', picks.eq('Status', 'Pending')) == 166
+    assert picks.aggregate('Efficiency %', 'mean') == pytest.approx(
+        sum(20 / (10 + i % 20) for i in range(500)) / 500)
+    by_two = picks.group_by(['Status', 'Errors'], rows=(None, 'count'))
+    assert list(zip(by_two['Status'], by_two['Errors']))[:2] == [('Complete', 0.0), ('Complete', 1.0)]
+    with pytest.raises(ValueError):
+        picks.aggregate('Status', 'sum')
+
+
+def test_from_workbook():
+    """Sheets of the generated workbook; text that is not a number is counted"""
+    rows = [[f'INV-{i}', START, f'SKU-{i % 3}', 'Widget', 10, 10 - i % 4, None, None,
+             None, None, None, 'Resolved' if i % 2 else 'Open'] for i in range(12)]
+    rows[5][4] = 'n/a'
+    rows[6][11] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'site.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            FormulaBasedExcelGenerator(cache_values=False).generate(
+                path, data={'Inventory Mismatch': rows})
+        table = TrackingTable.from_workbook(path, 'Inventory Mismatch')
+
+    assert len(table) == 12 and table.unconverted == {'System Count': 1}
+    # Variance = Physical - System; the unreadable System Count counts as blank (0)
+    assert table['Variance'][1] == -1 and table['Variance'][5] == 9
+    assert math.isnan(table['Variance %'][5])
+    summary = table.group_by('Status', rows=(None, 'count'), variance=('Variance', 'sum'))
+    assert summary['Status'] == ['Open', 'Resolved', None]
+    assert summary['rows'] == [5, 6, 1]
+    assert table.isblank('Status').sum() == 1
+
+
+if __name__ == '__main__':
+    test_column_types()
+    test_filter_group_by_aggregate()
+    test_from_workbook()
+    print("✅ Tracking table tests passed")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the MS-OVBA compression codec
+"""
+
+import random
+
+import pytest
+
+from benchmark import module_source
+from vba_compression import CHUNK_SIZE, compress, decompress
+
+# Examples from [MS-OVBA] 3.2
+SPEC_VECTORS = [
+    (b'abcdefghijklmnopqrstuv.',
+     '0119b000616263646566676800696a6b6c6d6e6f70007172737475762e'),
+    (b'#aaabcdefaaaaghijaaaaaklaaamnopqaaaaaaaaaaaarstuvwxyzaaa',
+     '012fb000236161616263646582660070616768696a013808616b6c00306d6e6f70'
+     '0671027004107273747576107778797a003c'),
+    (b'a' * 73, '0103b002614500'),
+]
+
+
+@pytest.mark.parametrize('data, expected', SPEC_VECTORS)
+def test_spec_examples(data, expected):
+    assert compress(data).hex() == expected
+    assert decompress(bytes.fromhex(expected)) == data
+
+
+@pytest.mark.parametrize('path', ['VBA_Modules.bas', 'BashQueryForm.frm'])
+def test_module_sources_round_trip(path):
+    with open(path, 'rb') as f:
+        source = f.read()
+    compressed = compress(source)
+    assert len(compressed) < len(source) / 2
+    assert decompress(compressed) == source
+
+
+@pytest.mark.parametrize('size', [0, 1, 3, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 10_000])
+def test_chunk_boundaries(size):
+    rng = random.Random(size)
+    for data in (bytes(rng.getrandbits(8) for _ in range(size)), b'ab' * (size // 2)):
+        out = decompress(compress(data))
+        # Raw chunks are stored padded to 4096 bytes with zeros
+        assert out[:len(data)] == data
+        assert not out[len(data):].strip(b'\x00')
+
+
+def test_large_source_and_offset():
+    source = module_source(20_000)
+    stream = b'p-code' + compress(source)
+    assert decompress(stream, offset=6) == source
+
+
+def test_invalid_containers_raise():
+    with pytest.raises(ValueError):
+        decompress(b'\x00\x19\xb0abc')
+    with pytest.raises(ValueError):
+        decompress(b'\x01\x19\x00abc')
+    with pytest.raises(ValueError):
+        # Copy token at the start of a chunk has nothing to copy from
+        decompress(b'\x01\x02\xb0\x01\x00\x00')
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for the compound file writer/reader and the VBA project builder
+"""
+
+import io
+import os
+import re
+import struct
+import tempfile
+import zipfile
+
+import olefile
+import pytest
+
+from compound_file import CompoundFileReader, CompoundFileWriter
+from vba_compression import decompress
+from vba_project import (VBAProject, decrypt_data, diff_modules, encrypt_data, read_modules,
+                         read_source, workbook_documents)
+from xlsx_package import inject_vba_project
+
+WORKBOOK = 'Ecom_Operations_Tracking_System.xlsx'
+
+
+def build_project():
+    project = VBAProject()
+    for name in workbook_documents(WORKBOOK):
+        project.add_document(name)
+    project.add_source('VBA_Modules.bas')
+    project.add_source('BashQueryForm.frm')
+    return project
+
+
+def _project_bytes(project):
+    buffer = io.BytesIO()
+    project.write(buffer)
+    return buffer.getvalue()
+
+
+def dir_records(data):
+    """(id, payload) records of an uncompressed dir stream"""
+    records, pos = [], 0
+    while pos < len(data):
+        record_id, size = struct.unpack_from('<HI', data, pos)
+        if record_id == 0x0009:
+            # PROJECTVERSION: Reserved, then a 4- and a 2-byte version
+            size = 6
+        records.append((record_id, data[pos + 6:pos + 6 + size]))
+        pos += 6 + size
+    return records
+
+
+@pytest.mark.parametrize('sizes', [
+    [0, 1, 63, 64, 4095],                # mini stream only
+    [4096, 10_000, 100],                 # regular and mini streams
+    [200_000] * 40,                      # more than 109 FAT sectors: DIFAT chain
+])
+def test_compound_file_round_trip(sizes):
+    writer = CompoundFileWriter()
+    streams = {f'Storage{i % 3}/Stream{i}': os.urandom(size) for i, size in enumerate(sizes)}
+    for path, data in streams.items():
+        writer.add_stream(path, data)
+    data = writer.to_bytes()
+    assert len(data) % 512 == 0
+    with olefile.OleFileIO(io.BytesIO(data), raise_defects=olefile.DEFECT_INCORRECT) as ole:
+        for path, content in streams.items():
+            assert ole.openstream(path).read() == content
+
+
+def test_reader_reads_only_what_it_needs():
+    writer = CompoundFileWriter()
+    streams = {f'S{i % 7}/Stream{i}': os.urandom(i * 97) for i in range(400)}
+    for path, data in streams.items():
+        writer.add_stream(path, data)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.bin')
+        writer.write(path)
+        with CompoundFileReader(path) as ole:
+            assert ole.read_stream('S3/Stream52') == streams['S3/Stream52']
+            # A tree search, not a scan of all 408 directory entries
+            assert len(ole._entries) < 20
+            assert ole.find('S3/Missing') is None
+            with pytest.raises(KeyError):
+                ole.read_stream('S3')
+            assert ole.listdir() == sorted(streams)
+            assert all(ole.read_stream(p) == data for p, data in streams.items())
+    with pytest.raises(ValueError):
+        CompoundFileReader(bytes(1024))
+
+
+def test_invalid_names_raise():
+    writer = CompoundFileWriter()
+    with pytest.raises(ValueError):
+        writer.add_stream('VBA/a:b', b'')
+    writer.add_stream('VBA/dir', b'')
+    with pytest.raises(ValueError):
+        writer.add_stream('VBA/dir/x', b'')
+
+
+def test_project_streams_hold_the_module_sources():
+    project = build_project()
+    data = io.BytesIO()
+    project.write(data)
+    # No .frx designer in the repository: the form is skipped with a warning
+    assert [m.name for m in project.modules if m.kind != 'document'] == ['EcomOperations']
+    assert any('BashQueryForm' in warning for warning in project.warnings)
+    # Without a workbook only ThisWorkbook gets a document module
+    assert workbook_documents() == ['ThisWorkbook']
+
+    with olefile.OleFileIO(io.BytesIO(data.getvalue())) as ole:
+        assert ole.openstream('VBA/_VBA_PROJECT').read() == b'\xcc\x61\xff\xff\x00\x00\x00'
+        records = dir_records(decompress(ole.openstream('VBA/dir').read()))
+        assert records[-1][0] == 0x0010
+        names = [payload.decode('cp1252') for record_id, payload in records if record_id == 0x0019]
+        assert names == [m.name for m in project.modules]
+
+        _, _, source, _ = read_source('VBA_Modules.bas')
+        stored = decompress(ole.openstream('VBA/EcomOperations').read()).decode('cp1252')
+        assert stored.startswith('Attribute VB_Name = "EcomOperations"\r\n')
+        assert stored.splitlines() == source.encode('cp1252', 'replace').decode('cp1252').splitlines()
+
+        text = ole.openstream('PROJECT').read().decode('cp1252')
+        assert 'Module=EcomOperations\r\n' in text
+        assert 'Document=Sheet12/&H00000000\r\n' in text
+        protection = dict(re.findall(r'^(CMG|DPB|GC)="([0-9A-F]+)"', text, re.MULTILINE))
+        assert decrypt_data(protection['CMG']) == bytes(4)
+        assert decrypt_data(protection['GC']) == b'\xff'
+
+
+def test_project_build_is_reproducible():
+    first, second = io.BytesIO(), io.BytesIO()
+    build_project().write(first)
+    build_project().write(second)
+    assert first.getvalue() == second.getvalue()
+
+
+def test_encryption_round_trip():
+    for seed in range(0, 256, 37):
+        text = encrypt_data('{00000000-0000-0000-0000-000000000000}', b'secret', seed)
+        assert decrypt_data(text) == b'secret'
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_read_and_diff_modules_in_xlsm(compression):
+    project = build_project()
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsm = os.path.join(tmp, 'tracking.xlsm')
+        with zipfile.ZipFile(xlsm, 'w') as zf:
+            zf.writestr('xl/vbaProject.bin', _project_bytes(project), compress_type=compression)
+        modules = read_modules(xlsm)
+        assert list(modules) == [m.name for m in project.modules]
+        assert diff_modules(xlsm, ['VBA_Modules.bas', 'BashQueryForm.frm']) == \
+            {'EcomOperations': [], 'BashQueryForm': None}
+
+        changed = os.path.join(tmp, 'VBA_Modules.bas')
+        with open('VBA_Modules.bas', encoding='utf-8') as f:
+            source = f.read()
+        with open(changed, 'w', encoding='utf-8') as f:
+            f.write(source.replace('Sub ShowDashboard()', 'Sub ShowDashboardNow()'))
+        diff = diff_modules(xlsm, [changed])['EcomOperations']
+        assert '-Sub ShowDashboardNow()' in diff and '+Sub ShowDashboard()' in diff
+
+
+def test_inject_built_project_into_workbook():
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'tracking.xlsm')
+        inject_vba_project(WORKBOOK, _project_bytes(build_project()), output)
+        assert diff_modules(output, ['VBA_Modules.bas']) == {'EcomOperations': []}
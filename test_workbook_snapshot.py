@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the pre-rendered workbook snapshot
+"""
+
+import os
+import tempfile
+
+import openpyxl
+import pytest
+
+import workbook_snapshot
+from build_cache import BuildCache
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from workbook_snapshot import WorkbookSnapshot, get_snapshot
+
+
+def test_snapshot_matches_openpyxl_build():
+    generator = FormulaBasedExcelGenerator()
+    layout_rows = generator.build()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'built.xlsx')
+        generator.save(path)
+        with open(path, 'rb') as f:
+            built = f.read()
+        snapshot = get_snapshot()
+        assert snapshot.layout_rows == layout_rows
+
+        copy = snapshot.instantiate(os.path.join(tmp, 'copy.xlsx'))
+        with open(copy, 'rb') as f:
+            assert f.read() == built
+
+
+def test_kpi_targets_are_spliced_and_evaluated():
+    targets = {'Picking Efficiency': {'target': '> 97%', 'thresholds': [0.97, 0.92]}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = get_snapshot().instantiate(os.path.join(tmp, 'site.xlsx'), targets)
+        dashboard = openpyxl.load_workbook(path)['Dashboard']
+        assert dashboard['B10'].value == '> 97%'
+        assert '0.97' in dashboard['D10'].value and '0.92' in dashboard['D10'].value
+        values = openpyxl.load_workbook(path, data_only=True)['Dashboard']
+        assert values['D10'].value is not None
+
+        with pytest.raises(ValueError):
+            get_snapshot().instantiate(os.path.join(tmp, 'bad.xlsx'), {'Nope': {}})
+
+
+def test_snapshot_is_kept_in_the_build_cache(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = BuildCache(tmp)
+        monkeypatch.setattr(workbook_snapshot, '_SNAPSHOTS', {})
+        rendered = get_snapshot(range_headroom=50, cache=cache)
+        assert get_snapshot(range_headroom=50) is rendered
+
+        def render(*args):
+            raise AssertionError('snapshot rendered again')
+
+        # A new process finds the snapshot on disk
+        monkeypatch.setattr(workbook_snapshot, '_SNAPSHOTS', {})
+        monkeypatch.setattr(WorkbookSnapshot, 'render', render)
+        loaded = get_snapshot(range_headroom=50, cache=cache)
+        assert loaded.data == rendered.data
+        assert loaded.layout_rows == rendered.layout_rows
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the XML-streaming workbook loader
+"""
+
+import contextlib
+import io
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+import xlsxwriter
+
+from create_formula_based_excel import FormulaBasedExcelGenerator
+from kpi_engine import ExcelError
+from test_tracking_table import picking_rows
+from tracking_table import Categorical, TrackingTable
+from xml_loader import is_date_format, load_sheets, load_tables, read_sheet, serials_to_datetimes
+
+START = datetime(2026, 1, 5, 8, 0)
+
+
+def write_mixed(path):
+    """Shared strings, dates, booleans, rich text, entities and cached formula results"""
+    wb = xlsxwriter.Workbook(path)
+    ws = wb.add_worksheet('Data')
+    date = wb.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+    bold = wb.add_format({'bold': True})
+    ws.write_row(0, 0, ['ID', 'When', 'Qty', 'Flag', 'Note', 'Double', 'Label'])
+    for i in range(1, 30):
+        ws.write(i, 0, f'ID-{i % 5}')
+        ws.write_datetime(i, 1, START + timedelta(hours=i), date)
+        ws.write_number(i, 2, i * 1.5)
+        ws.write_boolean(i, 3, i % 2 == 0)
+        if i % 3 == 0:
+            ws.write_rich_string(i, 4, 'a ', bold, 'bold', ' & <x>')
+        elif i % 3 == 1:
+            ws.write(i, 4, '  spaced & "quoted"  ')
+        ws.write_formula(i, 5, f'=C{i + 1}*2', None, i * 3.0)
+        ws.write_formula(i, 6, f'=A{i + 1}&"x"', None, f'ID-{i % 5}x')
+    ws.write_formula(30, 2, '=1/0', None, '#DIV/0!')
+    wb.close()
+
+
+def test_matches_openpyxl():
+    """Every cell agrees with openpyxl, for cached values and for formulas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mixed.xlsx')
+        write_mixed(path)
+        for formulas in (False, True):
+            ws = openpyxl.load_workbook(path, data_only=not formulas)['Data']
+            sheet = read_sheet(path, 'Data', formulas=formulas)
+            for row, values in enumerate(ws.iter_rows(values_only=True), 1):
+                assert sheet.row(row)[:len(values)] == list(values), (formulas, row)
+        assert sheet.row(2)[5:] == ['=C2*2', '=A2&"x"']
+
+        # Below the headers, the columns are typed
+        data = read_sheet(path, 'Data', first_row=2)
+    assert data.date_columns == {2}
+    assert data['B'].dtype == 'datetime64[ms]' and data['B'][0] == np.datetime64('2026-01-05T09:00')
+    assert data['F'].dtype == np.float64 and data['F'][1] == 6
+    assert data['E'][2] == 'a bold & <x>' and data['E'][0] == '  spaced & "quoted"  '
+    assert data['C'][29] == ExcelError('#DIV/0!') and len(data) == 30
+
+
+def test_tables_match_rows():
+    """Tracking sheets load as the same TrackingTable as the rows they were written from"""
+    rows = picking_rows(200)
+    rows[7][10] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'site.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            FormulaBasedExcelGenerator(cache_values=False).generate(
+                path, data={'Picking Tasks': rows})
+        tables = load_tables(path, ['Picking Tasks', 'Wave Tracking'], workers=2)
+        sheets = load_sheets(path, ['Picking Tasks'], workers=1, first_row=4, formulas=True)
+
+    expected = TrackingTable.from_rows('Picking Tasks', rows)
+    picks = tables['Picking Tasks']
+    # The W-001 sample row of the empty sheet is not data
+    assert len(picks) == 200 and len(tables['Wave Tracking']) == 0
+    for header in expected.headers:
+        if isinstance(expected[header], np.ndarray):
+            assert np.allclose(picks[header], expected[header], equal_nan=True), header
+        else:
+            assert picks.values(header) == expected.values(header), header
+    assert isinstance(picks['Status'], Categorical) and picks.isblank('Status').sum() == 1
+    assert sheets['Picking Tasks'].date_columns == {4, 5}
+    assert sheets['Picking Tasks'].row(4)[:2] == ['PT-0', 'E0']
+
+
+def test_dates():
+    """Date formats are recognised and serials convert like openpyxl"""
+    assert is_date_format('yyyy-mm-dd hh:mm') and is_date_format('[h]:mm:ss')
+    assert not is_date_format('0.00%') and not is_date_format('"days" 0') \
+        and not is_date_format('[Red]#,##0')
+    serials = serials_to_datetimes([61, 45000.5, math.nan, 1])
+    assert serials[0] == np.datetime64('1900-03-01')
+    assert serials[1] == np.datetime64('2023-03-15T12:00')
+    assert np.isnat(serials[2]) and serials[3] == np.datetime64('1900-01-01')
+
+
+if __name__ == '__main__':
+    test_matches_openpyxl()
+    test_tables_match_rows()
+    test_dates()
+    print("✅ XML loader tests passed")
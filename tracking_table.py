@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Columnar In-Memory Tables for the Tracking Sheets
+
+Holds a tracking sheet as one typed NumPy array per column instead of
+openpyxl cells, for analysis code that works on whole sheets:
+
+    • Dates and numbers are float64 arrays (dates as Excel date serials),
+      with NaN for blank cells
+    • Status, Department, Priority and Severity are dictionary-encoded: one
+      small integer code per row plus the list of distinct values. Other
+      text columns are encoded the same way when values repeat (Employee
+      ID, Auditor, ...), and kept as UTF-8 byte strings when they are
+      mostly unique (Task ID, Notes, ...)
+    • Per-row formula columns (duration, efficiency, variance, coverage)
+      are worked out from the other columns with the sheet's own formulas
+    • filter(), group_by() and aggregate() run on whole arrays; text
+      compares case-insensitively, as in Excel
+
+A million Picking Tasks rows take about 80 MB, against several GB as
+openpyxl cells.
+
+Usage:
+    python3 tracking_table.py site.xlsx "Picking Tasks" --by "Employee ID"
+
+    from tracking_table import TrackingTable
+    picks = TrackingTable.from_rows('Picking Tasks', rows)
+    slow = picks.filter(picks.eq('Status', 'Complete') & (picks['Efficiency %'] < 0.9))
+    slow.group_by('Employee ID', tasks=('Task ID', 'count'), items=('Items Picked', 'sum'))
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+from itertools import islice
+
+import numpy as np
+
+from bulk_import import (
+    DATE_FORMATS, DATE_HEADERS, NUMBER_HEADERS, PERCENT_HEADERS, TIME_FORMATS, _to_date, _to_number,
+)
+from create_formula_based_excel import DATA_START_ROW, DERIVED_COLUMNS, TRACKING_SHEETS
+from kpi_engine import (
+    DEFAULT_WORKBOOK, EXCEL_EPOCH, column_index, parse_formula, to_serial,
+)
+
+# Text columns that are always dictionary-encoded
+CATEGORICAL_HEADERS = {'Status', 'Department', 'Priority', 'Severity'}
+
+# Rows converted to arrays at a time while a table is built
+CHUNK_ROWS = 65_536
+
+# Other text columns are dictionary-encoded when at most this share of the
+# first chunk's values are distinct
+CATEGORICAL_RATIO = 0.5
+
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'nunique')
+
+# Excel serials of datetimes from here on are plain day counts since EXCEL_EPOCH
+_LEAP_DAY = datetime(1900, 3, 1)
+_DAY = timedelta(days=1)
+_LEAP_DAY_SERIAL = 61
+
+
+class Categorical:
+    """Dictionary-encoded text: codes into ``categories``, -1 for blank"""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + sum(len(text) + 49 for text in self.categories)
+
+    def take(self, index):
+        return Categorical(self.codes[index], self.categories)
+
+    def tolist(self):
+        lookup = np.array(self.categories + [None], dtype=object)
+        return lookup[self.codes].tolist()
+
+    def isin(self, values):
+        """Mask of rows equal to any of the values, ignoring case"""
+        wanted = {str(value).casefold() for value in values}
+        codes = [code for code, text in enumerate(self.categories) if text.casefold() in wanted]
+        return np.isin(self.codes, codes)
+
+    def isblank(self):
+        return self.codes < 0
+
+    def group_codes(self):
+        """(codes with blanks as the last group, key values)"""
+        return np.where(self.codes < 0, len(self.categories), self.codes), self.categories + [None]
+
+
+class TextColumn:
+    """Mostly unique text, as UTF-8 byte strings; b'' is blank"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def take(self, index):
+        return TextColumn(self.data[index])
+
+    def tolist(self):
+        return [value.decode('utf-8') if value else None for value in self.data.tolist()]
+
+    def isin(self, values):
+        wanted = {str(value).casefold() for value in values}
+        folded = np.char.lower(self.data)
+        return np.isin(folded, [value.encode('utf-8') for value in wanted])
+
+    def isblank(self):
+        return self.data == b''
+
+    def group_codes(self):
+        keys, codes = np.unique(self.data, return_inverse=True)
+        return codes, [key.decode('utf-8') if key else None for key in keys.tolist()]
+
+
+def _serial(value, formats):
+    """Excel serial of a date/time cell, or NaN"""
+    if type(value) is datetime and value >= _LEAP_DAY:
+        return (value - EXCEL_EPOCH) / _DAY
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (datetime, date, time_of_day)):
+        return to_serial(value)
+    return to_serial(_to_date(value, formats))
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        return float(_to_number(value, percent=True))
+    return float(value)
+
+
+def _evaluate(node, columns):
+    """Evaluate a per-row formula template on whole columns; blanks count as 0"""
+    kind = node[0]
+    if kind == 'num':
+        return node[1]
+    if kind == 'ref':
+        return np.nan_to_num(columns[column_index(node[1].rstrip('0123456789'))], nan=0.0)
+    if kind == 'neg':
+        return -_evaluate(node[1], columns)
+    if kind == 'pct':
+        return _evaluate(node[1], columns) / 100
+    if kind == 'op':
+        left = _evaluate(node[2], columns)
+        right = _evaluate(node[3], columns)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if node[1] == '+':
+                return left + right
+            if node[1] == '-':
+                return left - right
+            if node[1] == '*':
+                return left * right
+            if node[1] == '^':
+                return np.power(left, right)
+            if node[1] == '/':
+                # #DIV/0! becomes NaN
+                return np.where(right == 0, np.nan, left / np.where(right == 0, 1, right))
+    raise ValueError(f"Unsupported formula in a per-row column: {node}")
+
+
+class TableBuilder:
+    """
+    Converts rows to column arrays a chunk at a time
+
+    Only one chunk of Python values is held at once; text columns keep one
+    dictionary of distinct values.
+    """
+
+    def __init__(self, sheet_name):
+        if sheet_name not in TRACKING_SHEETS:
+            raise ValueError(f"'{sheet_name}' is not a tracking sheet")
+        self.sheet_name = sheet_name
+        self.headers = TRACKING_SHEETS[sheet_name]
+        derived = DERIVED_COLUMNS.get(sheet_name, {})
+        self.kinds = ['derived' if header in derived else
+                      'date' if header in DATE_HEADERS else
+                      'number' if header in NUMBER_HEADERS or header in PERCENT_HEADERS else
+                      'text' if header in CATEGORICAL_HEADERS else None
+                      for header in self.headers]
+        self.chunks = [[] for _ in self.headers]
+        # Text column -> {value: code}; None until the first chunk decides
+        self.dictionaries = {}
+        self.date_formats = {}
+        self.unconverted = {}
+        self.rows = 0
+
+    @staticmethod
+    def _text_kind(values):
+        """Dictionary-encode ('text') or keep as bytes, from a column's first chunk"""
+        distinct = len({value for value in values if value is not None and value != ''})
+        return 'text' if distinct <= max(1, len(values) * CATEGORICAL_RATIO) else 'bytes'
+
+    def _convert(self, i, values):
+        kind = self.kinds[i]
+        if kind in ('date', 'number', 'derived') and getattr(values, 'dtype', None) == np.float64:
+            # Already columnar (xml_loader): serials and numbers with NaN blanks
+            return values
+        if kind == 'text':
+            # Blank cells share code -1; a new value gets the next free code
+            dictionary = self.dictionaries.setdefault(i, {None: -1, '': -1})
+            return np.array([dictionary.setdefault(value, len(dictionary) - 2)
+                             for value in values], dtype=np.int32)
+        if kind == 'bytes':
+            return np.array([b'' if value is None else str(value).encode('utf-8')
+                             for value in values])
+        if kind == 'date':
+            # Chunks of datetimes, without to_serial()'s checks
+            try:
+                serials = np.array([np.nan if value is None else (value - EXCEL_EPOCH) / _DAY
+                                    for value in values])
+            except TypeError:
+                pass
+            else:
+                if not (serials < _LEAP_DAY_SERIAL).any():
+                    return serials
+        elif kind == 'number':
+            # None becomes NaN; numbers stored as text convert too
+            try:
+                return np.array(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                pass
+        result = np.full(len(values), np.nan)
+        formats = self.date_formats.setdefault(i, DATE_FORMATS + TIME_FORMATS)
+        failed = 0
+        for j, value in enumerate(values):
+            if value is None or value == '':
+                continue
+            if kind == 'derived' and isinstance(value, str) and value.startswith('='):
+                continue
+            try:
+                result[j] = _serial(value, formats) if kind == 'date' else _number(value)
+            except (ValueError, TypeError, OverflowError):
+                failed += 1
+        if failed:
+            header = self.headers[i]
+            self.unconverted[header] = self.unconverted.get(header, 0) + failed
+        return result
+
+    def append(self, rows):
+        """Add a list of rows (value lists in header order)"""
+        width = len(self.headers)
+        if any(len(row) != width for row in rows):
+            rows = [list(row[:width]) + [None] * (width - len(row)) for row in rows]
+        self.append_columns(list(zip(*rows)))
+
+    def append_columns(self, columns):
+        """Add a chunk given as one value sequence per header (lists or arrays)"""
+        if not columns or not len(columns[0]):
+            return
+        for i, values in enumerate(columns):
+            if self.kinds[i] is None:
+                self.kinds[i] = self._text_kind(values)
+            self.chunks[i].append(self._convert(i, values))
+        self.rows += len(columns[0])
+
+    def extend(self, rows, chunk_rows=CHUNK_ROWS):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            self.append(chunk)
+
+    def build(self):
+        """Return the TrackingTable; the builder must not be used afterwards"""
+        columns = {}
+        numeric = {}
+        for i, header in enumerate(self.headers):
+            kind = self.kinds[i] or 'text'
+            chunks = self.chunks[i]
+            self.chunks[i] = None
+            if kind == 'text':
+                codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+                categories = [value if isinstance(value, str) else str(value)
+                              for value in self.dictionaries.get(i, {}) if value not in (None, '')]
+                # The smallest code type that fits
+                dtype = np.int8 if len(categories) < 127 else np.int16 \
+                    if len(categories) < 32767 else np.int32
+                columns[header] = Categorical(codes.astype(dtype), categories)
+            elif kind == 'bytes':
+                columns[header] = TextColumn(np.concatenate(chunks) if chunks
+                                             else np.empty(0, dtype='S1'))
+            else:
+                columns[header] = np.concatenate(chunks) if chunks else np.empty(0)
+                numeric[i + 1] = columns[header]
+
+        # Per-row formulas: cells holding a number keep it (typed over the formula)
+        for header, (template, _) in DERIVED_COLUMNS.get(self.sheet_name, {}).items():
+            tree = parse_formula(template.format(row=DATA_START_ROW))
+            values = columns[header]
+            computed = np.broadcast_to(_evaluate(tree, numeric), values.shape)
+            blank = np.isnan(values)
+            values[blank] = computed[blank]
+        return TrackingTable(self.sheet_name, columns, self.unconverted)
+
+
+class TrackingTable:
+    """One tracking sheet as typed column arrays"""
+
+    def __init__(self, sheet_name, columns, unconverted=None):
+        self.sheet_name = sheet_name
+        self.headers = list(columns)
+        self.columns = columns
+        # Cells that could not be read as a date or number, per header
+        self.unconverted = unconverted or {}
+
+    @classmethod
+    def from_rows(cls, sheet_name, rows, chunk_rows=CHUNK_ROWS):
+        """
+        Build a table from rows in the generator's ``data`` format
+
+        Rows are value lists in header order; formula strings in per-row
+        formula columns are worked out again. Bulk import sources
+        (bulk_import.TrackingImport) work too.
+        """
+        if hasattr(rows, 'iter_rows'):
+            rows = rows.iter_rows(DATA_START_ROW)
+        builder = TableBuilder(sheet_name)
+        builder.extend(rows, chunk_rows)
+        return builder.build()
+
+    @classmethod
+    def from_workbook(cls, path, sheet_name, chunk_rows=CHUNK_ROWS):
+        """
+        Load a tracking sheet of the formula-based workbook
+
+        The layout rows (title, headers, instructions and any sample row)
+        are skipped. The worksheet XML is read directly (see xml_loader),
+        not through openpyxl.
+        """
+        from xml_loader import read_table
+        return read_table(path, sheet_name)
+
+    def __len__(self):
+        first = self.columns[self.headers[0]] if self.headers else ()
+        return len(first)
+
+    def __getitem__(self, header):
+        """The column of a header: float64 array, Categorical or TextColumn"""
+        return self.columns[header]
+
+    @property
+    def nbytes(self):
+        """Memory held by the column data"""
+        return sum(column.nbytes for column in self.columns.values())
+
+    def values(self, header):
+        """A column as Python values (dates as Excel serials)"""
+        column = self.columns[header]
+        if isinstance(column, np.ndarray):
+            return [None if value != value else value for value in column.tolist()]
+        return column.tolist()
+
+    def eq(self, header, *values):
+        """Mask of rows whose cell equals any of the values (text ignores case)"""
+        column = self.columns[header]
+        if isinstance(column, np.ndarray):
+            return np.isin(column, [float(value) for value in values])
+        return column.isin(values)
+
+    def isblank(self, header):
+        column = self.columns[header]
+        return np.isnan(column) if isinstance(column, np.ndarray) else column.isblank()
+
+    def filter(self, mask):
+        """New table with the rows where ``mask`` is true (or at the given indexes)"""
+        index = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+        return TrackingTable(self.sheet_name,
+                             {header: column[index] if isinstance(column, np.ndarray)
+                              else column.take(index)
+                              for header, column in self.columns.items()},
+                             self.unconverted)
+
+    def _aggregate(self, header, func, groups, count):
+        """Aggregate a column per group id (0..count-1)"""
+        if func == 'count':
+            if header is None:
+                return np.bincount(groups, minlength=count)
+            return np.bincount(groups, weights=~self.isblank(header), minlength=count).astype(int)
+        column = self.columns[header]
+        if func == 'nunique':
+            codes, _ = (column.group_codes() if not isinstance(column, np.ndarray)
+                        else (np.unique(column, return_inverse=True)[1], None))
+            present = ~self.isblank(header)
+            pairs = np.unique(np.stack([groups[present], codes[present]]), axis=1)
+            return np.bincount(pairs[0], minlength=count)
+        if not isinstance(column, np.ndarray):
+            raise ValueError(f"{header} is text; only count and nunique apply")
+        present = ~np.isnan(column)
+        sums = np.bincount(groups[present], weights=column[present], minlength=count)
+        if func == 'sum':
+            return sums
+        counts = np.bincount(groups[present], minlength=count)
+        if func == 'mean':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return sums / counts
+        fill = np.inf if func == 'min' else -np.inf
+        result = np.full(count, fill)
+        (np.minimum if func == 'min' else np.maximum).at(result, groups[present], column[present])
+        result[counts == 0] = np.nan
+        return result
+
+    def aggregate(self, header, func, mask=None):
+        """
+        One aggregate of a column, optionally over the rows of a mask
+
+        Args:
+            header: Column, or None with 'count' to count rows
+            func: 'count', 'sum', 'mean', 'min', 'max' or 'nunique'; blank
+                cells are left out, like Excel's COUNT/SUM/AVERAGE
+        """
+        if func not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {func}")
+        table = self.filter(mask) if mask is not None else self
+        groups = np.zeros(len(table), dtype=np.intp)
+        result = table._aggregate(header, func, groups, 1)[0]
+        return result.item() if hasattr(result, 'item') else result
+
+    def group_by(self, keys, **aggregates):
+        """
+        Aggregate per distinct key (or combination of keys)
+
+        Args:
+            keys: Header or list of headers to group on; blank is a group
+            **aggregates: name=(header, func) per output column (see aggregate)
+
+        Returns:
+            dict: Column name -> list of values, one per group, ordered by key
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        key_codes, key_values = [], []
+        for header in keys:
+            column = self.columns[header]
+            if isinstance(column, np.ndarray):
+                values, codes = np.unique(column, return_inverse=True)
+                values = [None if value != value else value for value in values.tolist()]
+            else:
+                codes, values = column.group_codes()
+            key_codes.append(codes)
+            key_values.append(values)
+        if self.headers and len(self):
+            combined, groups = np.unique(np.stack(key_codes), axis=1, return_inverse=True)
+            groups = groups.ravel()
+        else:
+            combined, groups = np.empty((len(keys), 0), dtype=int), np.empty(0, dtype=np.intp)
+        count = combined.shape[1]
+
+        result = {header: [values[code] for code in combined[i].tolist()]
+                  for i, (header, values) in enumerate(zip(keys, key_values))}
+        for name, (header, func) in aggregates.items():
+            if func not in AGGREGATES:
+                raise ValueError(f"Unknown aggregate: {func}")
+            result[name] = self._aggregate(header, func, groups, count).tolist()
+        return result
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Load a tracking sheet into a columnar table and summarise it'
+    )
+    parser.add_argument('workbook', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             DEFAULT_WORKBOOK))
+    parser.add_argument('sheet', nargs='?', default='Picking Tasks', choices=list(TRACKING_SHEETS))
+    parser.add_argument('--by', metavar='HEADER', default='Status',
+                        help='Column to group on (default: Status)')
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("Columnar Sheet Summary")
+    print("=" * 70)
+    print()
+
+    try:
+        start = time.perf_counter()
+        table = TrackingTable.from_workbook(args.workbook, args.sheet)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    if args.by not in table.columns:
+        print(f"❌ Error: {args.sheet} has no column {args.by!r}")
+        return 1
+    print(f"📄 {args.sheet}: {len(table):,} rows in {time.perf_counter() - start:.2f}s, "
+          f"{table.nbytes / 1e6:.1f} MB")
+    for header, count in table.unconverted.items():
+        print(f"  ⚠ {count:,} cells of {header} are not numbers or dates")
+    print()
+
+    numbers = [header for header, column in table.columns.items()
+               if isinstance(column, np.ndarray) and header not in DATE_HEADERS]
+    summary = table.group_by(args.by, rows=(None, 'count'),
+                             **{header: (header, 'mean') for header in numbers})
+    print(f"📊 By {args.by}:")
+    for i, key in enumerate(summary[args.by]):
+        print(f"  • {str(key if key is not None else '(blank)'):<24} {summary['rows'][i]:>10,} rows")
+        for header in numbers:
+            mean = summary[header][i]
+            if mean == mean:
+                print(f"      average {header:<24} {mean:>12,.2f}")
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+VBA Project Builder
+
+Builds xl/vbaProject.bin from exported VBA sources (.bas, .cls, .frm) on any
+platform. The project layout follows [MS-OVBA]:
+
+    PROJECT             Project properties as text (modules, name, protection)
+    PROJECTwm           Module names in the code page and in UTF-16
+    VBA/_VBA_PROJECT    Version 0xFFFF: no compiled p-code, so Office compiles
+                        the project from source the first time it is opened
+    VBA/dir             Compressed project information, references and modules
+    VBA/<module>        Compressed module source
+    <Form>/...          Designer storage of each UserForm
+
+Streams are compressed with vba_compression and the file is written with
+compound_file.CompoundFileWriter in one pass. The project ID and the seeds of
+the protection fields derive from the sources, so the output is reproducible.
+
+In the other direction, read_modules() decompiles the module sources of a
+vbaProject.bin (or of the one inside an .xlsm) through the lazy, mmap-based
+compound_file.CompoundFileReader, and diff_modules() compares them with the
+exported source files.
+
+Usage:
+    from vba_project import VBAProject, workbook_documents
+    project = VBAProject()
+    for name in workbook_documents(12):
+        project.add_document(name)
+    project.add_source('VBA_Modules.bas')
+    project.write('vbaProject.bin')
+
+    modules = read_modules('Ecom_Operations_Tracking_System.xlsm')
+    changes = diff_modules('Ecom_Operations_Tracking_System.xlsm', ['VBA_Modules.bas'])
+"""
+
+import difflib
+import hashlib
+import os
+import re
+import struct
+import uuid
+import zipfile
+
+from compound_file import SIGNATURE, CompoundFileReader, CompoundFileWriter
+from vba_compression import compress, decompress
+
+# Module kinds
+PROCEDURAL = 'module'
+CLASS = 'class'
+DOCUMENT = 'document'
+FORM = 'form'
+
+# VB_Base of the Excel document modules
+WORKBOOK_BASE = '0{00020819-0000-0000-C000-000000000046}'
+WORKSHEET_BASE = '0{00020820-0000-0000-C000-000000000046}'
+
+FORMS_PACKAGE = '{AC9F2F90-E877-11CE-9F68-00AA00574A4F}'
+HOST_EXTENDER = '&H00000001={3832D640-CF90-11CF-8E43-00A0C911005A};VBE;&H00000000'
+
+# Registered type libraries every Excel project references
+REFERENCES = [
+    ('stdole', r'*\G{00020430-0000-0000-C000-000000000046}#2.0#0#'
+               r'C:\Windows\System32\stdole2.tlb#OLE Automation'),
+    ('Office', r'*\G{2DF8D04C-5BFA-101B-BDE5-00AA0044DE52}#2.0#0#'
+               r'C:\Program Files\Common Files\Microsoft Shared\OFFICE16\MSO.DLL'
+               r'#Microsoft Office 16.0 Object Library'),
+]
+
+# ProjectVisibilityState of a project that can be viewed
+VISIBLE = b'\xff'
+
+# _VBA_PROJECT with version 0xFFFF and no performance cache
+VBA_PROJECT_STREAM = b'\xcc\x61\xff\xff\x00\x00\x00'
+
+# Export headers that are not part of the module source
+_CLASS_HEADER = re.compile(r'^VERSION \d+\.\d+ CLASS$', re.IGNORECASE)
+_FORM_HEADER = re.compile(r'^VERSION \d+\.\d+$', re.IGNORECASE)
+_VB_NAME = re.compile(r'^Attribute VB_Name = "([^"]+)"', re.IGNORECASE | re.MULTILINE)
+
+
+class VBAModule:
+    """A module of the project: its name, kind, source text and designer"""
+
+    def __init__(self, name, kind, source, designer=None):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        # Streams of a form's designer storage, by name
+        self.designer = designer or {}
+
+    @property
+    def type_record(self):
+        """MODULETYPE record id: 0x21 procedural, 0x22 everything else"""
+        return 0x0021 if self.kind == PROCEDURAL else 0x0022
+
+
+def workbook_documents(sheets=None):
+    """
+    Document module names of a workbook: ThisWorkbook, Sheet1..SheetN
+
+    Args:
+        sheets: Number of worksheets, or the path of an .xlsx/.xlsm to count
+            (default: ThisWorkbook only)
+
+    Returns:
+        list: Module names
+    """
+    if sheets is None:
+        sheets = 0
+    elif not isinstance(sheets, int):
+        import zipfile
+        from xlsx_package import sheet_parts
+        with zipfile.ZipFile(sheets) as zf:
+            sheets = len(sheet_parts(zf))
+    return ['ThisWorkbook'] + [f'Sheet{index}' for index in range(1, sheets + 1)]
+
+
+def document_source(name, base=None):
+    """Source of an empty Excel document module"""
+    if base is None:
+        base = WORKBOOK_BASE if name == 'ThisWorkbook' else WORKSHEET_BASE
+    return '\r\n'.join([
+        f'Attribute VB_Name = "{name}"',
+        f'Attribute VB_Base = "{base}"',
+        'Attribute VB_GlobalNameSpace = False',
+        'Attribute VB_Creatable = False',
+        'Attribute VB_PredeclaredId = True',
+        'Attribute VB_Exposed = True',
+        'Attribute VB_TemplateDerived = False',
+        'Attribute VB_Customizable = True',
+    ]) + '\r\n'
+
+
+def read_source(path):
+    """
+    Read an exported module
+
+    Args:
+        path: .bas, .cls or .frm file
+
+    Returns:
+        tuple: (name, kind, source, frame) where source has CRLF line endings
+        and no export header, and frame is a form's designer header (or None)
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = raw.decode('cp1252')
+    lines = text.splitlines()
+
+    extension = os.path.splitext(path)[1].lower()
+    kind = {'.cls': CLASS, '.frm': FORM}.get(extension, PROCEDURAL)
+    frame = None
+    if kind == CLASS and lines and _CLASS_HEADER.match(lines[0].strip()):
+        # VERSION 1.0 CLASS / BEGIN ... END
+        end = next(i for i, line in enumerate(lines) if line.strip().upper() == 'END')
+        lines = lines[end + 1:]
+    elif kind == FORM and lines and _FORM_HEADER.match(lines[0].strip()):
+        # VERSION 5.00 / Begin {GUID} Name ... End: the designer's properties
+        end = next(i for i, line in enumerate(lines) if line.rstrip() == 'End')
+        frame = [line for line in lines[:end + 1]
+                 if not line.strip().startswith('OleObjectBlob')]
+        frame = '\r\n'.join(frame) + '\r\n'
+        lines = lines[end + 1:]
+
+    source = '\r\n'.join(lines) + '\r\n'
+    match = _VB_NAME.search(source)
+    name = match.group(1) if match else os.path.splitext(os.path.basename(path))[0]
+    return name, kind, source, frame
+
+
+def encrypt_data(project_id, data, seed):
+    """
+    Encrypt a PROJECT protection value ([MS-OVBA] 2.4.3.2)
+
+    Args:
+        project_id: Project ID text, e.g. '{...}'
+        data: bytes to encrypt
+        seed: Seed byte
+
+    Returns:
+        str: Upper-case hex, as written to the PROJECT stream
+    """
+    version = 2
+    project_key = sum(project_id.encode('ascii')) & 0xFF
+    out = bytearray([seed, seed ^ version, seed ^ project_key])
+    unencrypted = project_key
+    encrypted1, encrypted2 = out[2], out[1]
+    ignored = bytes((seed & 6) // 2)
+    for byte in ignored + struct.pack('<I', len(data)) + bytes(data):
+        byte_enc = byte ^ ((encrypted2 + unencrypted) & 0xFF)
+        out.append(byte_enc)
+        encrypted2, encrypted1, unencrypted = encrypted1, byte_enc, byte
+    return out.hex().upper()
+
+
+def decrypt_data(text):
+    """Decrypt a PROJECT protection value; inverse of encrypt_data"""
+    data = bytes.fromhex(text)
+    seed = data[0]
+    unencrypted = seed ^ data[2]
+    encrypted1, encrypted2 = data[2], data[1]
+    out = bytearray()
+    for byte_enc in data[3:]:
+        byte = byte_enc ^ ((encrypted2 + unencrypted) & 0xFF)
+        out.append(byte)
+        encrypted2, encrypted1, unencrypted = encrypted1, byte_enc, byte
+    ignored = (seed & 6) // 2
+    length = struct.unpack_from('<I', out, ignored)[0]
+    return bytes(out[ignored + 4:ignored + 4 + length])
+
+
+class VBAProject:
+    """
+    A VBA project assembled from module sources
+
+    Args:
+        name: Project name shown in the VBA editor
+        code_page: Windows code page of the module sources
+        lcid: Locale ID of the project
+    """
+
+    def __init__(self, name='VBAProject', code_page=1252, lcid=0x0409):
+        self.name = name
+        self.code_page = code_page
+        self.lcid = lcid
+        self.modules = []
+        self.warnings = []
+
+    @property
+    def codec(self):
+        return f'cp{self.code_page}'
+
+    def _encode(self, text, what=None):
+        """Text in the project's code page; unmappable characters become '?'"""
+        try:
+            return text.encode(self.codec)
+        except UnicodeEncodeError:
+            encoded = text.encode(self.codec, errors='replace')
+            if what:
+                lost = sum(1 for ch in text if ch.encode(self.codec, errors='replace') == b'?'
+                           and ch != '?')
+                self.warnings.append(f"{what}: {lost} character(s) not in code page "
+                                     f"{self.code_page} replaced with '?'")
+            return encoded
+
+    def add_module(self, name, source, kind=PROCEDURAL, designer=None):
+        """
+        Add a module
+
+        Args:
+            name: Module name
+            source: Module source text (CRLF line endings)
+            kind: PROCEDURAL, CLASS, DOCUMENT or FORM
+            designer: For forms, the designer storage's streams by name
+
+        Returns:
+            VBAModule: The added module
+        """
+        if any(module.name.upper() == name.upper() for module in self.modules):
+            raise ValueError(f"Duplicate module name: {name}")
+        module = VBAModule(name, kind, source, designer)
+        self.modules.append(module)
+        return module
+
+    def add_document(self, name, base=None):
+        """Add an empty document module (ThisWorkbook or a worksheet)"""
+        return self.add_module(name, document_source(name, base), DOCUMENT)
+
+    def add_source(self, path):
+        """
+        Add a module from an exported .bas, .cls or .frm file
+
+        A form needs its designer: the .frx next to the .frm holding the
+        form's compound file. Without it the form is skipped with a warning.
+
+        Args:
+            path: Source file
+
+        Returns:
+            VBAModule: The added module, or None if it was skipped
+        """
+        name, kind, source, frame = read_source(path)
+        designer = None
+        if kind == FORM:
+            frx = os.path.splitext(path)[0] + '.frx'
+            designer = self._read_designer(frx)
+            if designer is None:
+                problem = ('is not a readable compound file' if os.path.exists(frx)
+                           else 'is missing')
+                self.warnings.append(
+                    f"{os.path.basename(path)}: skipped, the form designer "
+                    f"({os.path.basename(frx)}) {problem}; "
+                    f"import the form in the VBA editor instead")
+                return None
+            designer['\x03VBFrame'] = self._encode(frame)
+        return self.add_module(name, source, kind, designer)
+
+    @staticmethod
+    def _read_designer(frx):
+        """Streams of a form's designer compound file, or None"""
+        if not os.path.exists(frx):
+            return None
+        with open(frx, 'rb') as f:
+            if f.read(len(SIGNATURE)) != SIGNATURE:
+                return None
+        with CompoundFileReader(frx) as ole:
+            return {path: ole.read_stream(path) for path in ole.listdir()}
+
+    @property
+    def project_id(self):
+        """Deterministic project GUID derived from the module sources"""
+        digest = hashlib.sha256(self.name.encode('utf-8'))
+        for module in self.modules:
+            digest.update(module.name.encode('utf-8') + b'\0' + module.source.encode('utf-8'))
+        return '{' + str(uuid.UUID(bytes=digest.digest()[:16], version=4)).upper() + '}'
+
+    def project_stream(self):
+        """The PROJECT stream: project properties as text"""
+        project_id = self.project_id
+        seeds = hashlib.sha256(project_id.encode('ascii')).digest()
+        lines = [f'ID="{project_id}"']
+        for module in self.modules:
+            if module.kind == DOCUMENT:
+                lines.append(f'Document={module.name}/&H00000000')
+            elif module.kind == PROCEDURAL:
+                lines.append(f'Module={module.name}')
+            elif module.kind == CLASS:
+                lines.append(f'Class={module.name}')
+            else:
+                lines.append(f'BaseClass={module.name}')
+        if any(module.kind == FORM for module in self.modules):
+            lines.append(f'Package={FORMS_PACKAGE}')
+        lines += [
+            f'Name="{self.name}"',
+            'HelpContextID="0"',
+            'VersionCompatible32="393222000"',
+            # Not protected, no password, visible
+            f'CMG="{encrypt_data(project_id, bytes(4), seeds[0])}"',
+            f'DPB="{encrypt_data(project_id, bytes(1), seeds[1])}"',
+            f'GC="{encrypt_data(project_id, VISIBLE, seeds[2])}"',
+            '',
+            '[Host Extender Info]',
+            HOST_EXTENDER,
+            '',
+            '[Workspace]',
+        ]
+        lines += [f'{module.name}=0, 0, 0, 0, C' for module in self.modules]
+        return self._encode('\r\n'.join(lines) + '\r\n')
+
+    def name_map_stream(self):
+        """The PROJECTwm stream: module names in the code page and in UTF-16"""
+        out = bytearray()
+        for module in self.modules:
+            out += self._encode(module.name) + b'\0'
+            out += module.name.encode('utf-16-le') + b'\0\0'
+        return bytes(out + b'\0\0')
+
+    def dir_stream(self):
+        """The uncompressed dir stream ([MS-OVBA] 2.3.4.2)"""
+        out = bytearray()
+
+        def record(record_id, data):
+            out.extend(struct.pack('<HI', record_id, len(data)))
+            out.extend(data)
+
+        def text_record(record_id, text, unicode_id):
+            record(record_id, self._encode(text))
+            record(unicode_id, text.encode('utf-16-le'))
+
+        # PROJECTINFORMATION
+        record(0x0001, struct.pack('<I', 1))                    # SYSKIND: 32-bit Windows
+        record(0x0002, struct.pack('<I', self.lcid))            # LCID
+        record(0x0014, struct.pack('<I', self.lcid))            # LCIDINVOKE
+        record(0x0003, struct.pack('<H', self.code_page))       # CODEPAGE
+        record(0x0004, self._encode(self.name))                 # NAME
+        text_record(0x0005, '', 0x0040)                         # DOCSTRING
+        text_record(0x0006, '', 0x003D)                         # HELPFILEPATH
+        record(0x0007, struct.pack('<I', 0))                    # HELPCONTEXT
+        record(0x0008, struct.pack('<I', 0))                    # LIBFLAGS
+        # VERSION: the Reserved field takes the place of a size
+        out.extend(struct.pack('<HIIH', 0x0009, 4, 1, 0))
+        text_record(0x000C, '', 0x003C)                         # CONSTANTS
+
+        # PROJECTREFERENCES
+        for name, libid in REFERENCES:
+            text_record(0x0016, name, 0x003E)                   # REFERENCENAME
+            encoded = self._encode(libid)
+            record(0x000D, struct.pack('<I', len(encoded)) + encoded + bytes(6))
+
+        # PROJECTMODULES
+        record(0x000F, struct.pack('<H', len(self.modules)))
+        record(0x0013, struct.pack('<H', 0xFFFF))               # PROJECTCOOKIE
+        for module in self.modules:
+            record(0x0019, self._encode(module.name))           # MODULENAME
+            record(0x0047, module.name.encode('utf-16-le'))     # MODULENAMEUNICODE
+            text_record(0x001A, module.name, 0x0032)            # MODULESTREAMNAME
+            text_record(0x001C, '', 0x0048)                     # MODULEDOCSTRING
+            record(0x0031, struct.pack('<I', 0))                # MODULEOFFSET: no p-code
+            record(0x001E, struct.pack('<I', 0))                # MODULEHELPCONTEXT
+            record(0x002C, struct.pack('<H', 0xFFFF))           # MODULECOOKIE
+            record(module.type_record, b'')                     # MODULETYPE
+            record(0x002B, b'')                                 # Terminator
+        record(0x0010, b'')                                     # dir Terminator
+        return bytes(out)
+
+    def streams(self):
+        """
+        All streams of vbaProject.bin
+
+        Returns:
+            dict: Stream path -> bytes
+        """
+        if not self.modules:
+            raise ValueError("A VBA project needs at least one module")
+        streams = {
+            'PROJECT': self.project_stream(),
+            'PROJECTwm': self.name_map_stream(),
+            'VBA/_VBA_PROJECT': VBA_PROJECT_STREAM,
+            'VBA/dir': compress(self.dir_stream()),
+        }
+        for module in self.modules:
+            source = self._encode(module.source, what=module.name)
+            streams[f'VBA/{module.name}'] = compress(source)
+            for path, data in module.designer.items():
+                streams[f'{module.name}/{path}'] = data
+        return streams
+
+    def write(self, output):
+        """
+        Write vbaProject.bin
+
+        Args:
+            output: Path or binary file object
+
+        Returns:
+            int: Bytes written
+        """
+        writer = CompoundFileWriter()
+        for path, data in self.streams().items():
+            writer.add_stream(path, data)
+        return writer.write(output)
+
+
+def parse_dir_stream(data):
+    """
+    Project code page and module records of a decompressed dir stream
+
+    Args:
+        data: Decompressed dir stream
+
+    Returns:
+        tuple: (code_page, modules) where each module is a dict with 'name',
+        'stream', 'offset' and 'kind' (PROCEDURAL or CLASS for non-procedural)
+    """
+    code_page = 1252
+    modules = []
+    module = None
+    pos = 0
+    while pos + 6 <= len(data):
+        record_id, size = struct.unpack_from('<HI', data, pos)
+        if record_id == 0x0009:
+            # PROJECTVERSION: Reserved, then a 4- and a 2-byte version
+            size = 6
+        payload = data[pos + 6:pos + 6 + size]
+        pos += 6 + size
+        if record_id == 0x0003:
+            code_page = struct.unpack('<H', payload)[0]
+        elif record_id == 0x0019:
+            module = {'name': payload.decode(f'cp{code_page}', errors='replace'),
+                      'stream': None, 'offset': 0, 'kind': PROCEDURAL}
+            modules.append(module)
+        elif module is None:
+            continue
+        elif record_id == 0x0047:
+            module['name'] = payload.decode('utf-16-le', errors='replace')
+        elif record_id == 0x001A and module['stream'] is None:
+            module['stream'] = payload.decode(f'cp{code_page}', errors='replace')
+        elif record_id == 0x0032:
+            module['stream'] = payload.decode('utf-16-le', errors='replace')
+        elif record_id == 0x0031:
+            module['offset'] = struct.unpack('<I', payload)[0]
+        elif record_id == 0x0022:
+            module['kind'] = CLASS
+        elif record_id == 0x0010:
+            break
+    return code_page, modules
+
+
+def _open_project(source):
+    """
+    CompoundFileReader for a vbaProject.bin or the project inside an .xlsm
+
+    A project stored uncompressed in the package is mapped in place; a
+    deflated one has to be inflated first.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return CompoundFileReader(source)
+    if not zipfile.is_zipfile(source):
+        return CompoundFileReader(source)
+    from xlsx_package import member_data_offset
+    with zipfile.ZipFile(source) as zf:
+        names = [name for name in zf.namelist() if name.lower().endswith('vbaproject.bin')]
+        if not names:
+            raise KeyError(f"No VBA project in {source}")
+        info = zf.getinfo(names[0])
+        if info.compress_type != zipfile.ZIP_STORED:
+            return CompoundFileReader(zf.read(info))
+        with open(source, 'rb') as fp:
+            offset = member_data_offset(fp, info)
+            return CompoundFileReader(fp, offset=offset)
+
+
+def read_modules(source):
+    """
+    Decompile the module sources of a VBA project
+
+    Only the dir stream and the module streams are read; compiled p-code in
+    front of each source (at the module's MODULEOFFSET) is skipped.
+
+    Args:
+        source: vbaProject.bin or .xlsm path, or the project's bytes
+
+    Returns:
+        dict: Module name -> source text, in project order
+
+    Raises:
+        KeyError: If an .xlsm has no VBA project
+        ValueError: If the project is not a valid compound file
+    """
+    with _open_project(source) as ole:
+        code_page, modules = parse_dir_stream(decompress(ole.read_stream('VBA/dir')))
+        sources = {}
+        for module in modules:
+            stream = ole.read_stream(f"VBA/{module['stream'] or module['name']}")
+            text = decompress(stream, module['offset'])
+            sources[module['name']] = text.decode(f'cp{code_page}', errors='replace')
+        return sources
+
+
+def _normalized_lines(text):
+    return [line.rstrip() for line in text.splitlines()]
+
+
+def diff_modules(source, paths, code_page=1252):
+    """
+    Compare the modules of a VBA project with exported source files
+
+    Sources are compared line by line, ignoring line endings and trailing
+    blanks. Characters the code page cannot hold are compared as '?', as
+    they are stored when the project is built.
+
+    Args:
+        source: vbaProject.bin or .xlsm path, or the project's bytes
+        paths: Exported .bas/.cls/.frm files to compare against
+        code_page: Code page the sources are stored in
+
+    Returns:
+        dict: Module name -> unified diff lines ([] if identical, None if
+        the module is missing from the project)
+    """
+    embedded = {name.upper(): text for name, text in read_modules(source).items()}
+    codec = f'cp{code_page}'
+    changes = {}
+    for path in paths:
+        name, _, expected, _ = read_source(path)
+        expected = expected.encode(codec, errors='replace').decode(codec)
+        actual = embedded.get(name.upper())
+        if actual is None:
+            changes[name] = None
+            continue
+        changes[name] = list(difflib.unified_diff(
+            _normalized_lines(expected), _normalized_lines(actual),
+            fromfile=os.path.basename(path), tofile=f'{name} (embedded)', lineterm=''))
+    return changes
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Pre-Rendered Workbook Skeleton Snapshots
+
+Every tracking workbook starts from the same 12-sheet layout: titles,
+headers, instruction rows, merges, widths, formulas and named ranges.
+Building it through the openpyxl object model takes a few hundred
+milliseconds. A snapshot renders the layout once into the serialized .xlsx
+package; new workbooks are then created by copying those bytes, rewriting
+only the parts that differ:
+
+    • An empty workbook with the default targets is the snapshot itself
+    • KPI targets are spliced into the Dashboard part only
+    • Data rows are spliced into the worksheet parts by
+      ParallelExcelGenerator, which uses a snapshot as its skeleton
+
+Snapshots are kept for the life of the process and, given a BuildCache, on
+disk, so later runs skip the render as well.
+
+Usage:
+    from workbook_snapshot import get_snapshot
+    get_snapshot().instantiate('tracking.xlsx')
+    get_snapshot().instantiate('leeds.xlsx', kpi_targets={'Picking Efficiency': {'target': '> 97%'}})
+
+    python3 workbook_snapshot.py tracking.xlsx --repeat 100   # time instantiation
+"""
+
+import argparse
+import io
+import os
+import re
+import tempfile
+import time
+import zipfile
+
+from create_formula_based_excel import (
+    DERIVED_COLUMNS, RANGE_HEADROOM, TRACKING_SHEETS, FormulaBasedExcelGenerator,
+    kpi_target_cells,
+)
+from kpi_engine import cache_dashboard_values
+from parallel_generator import set_cells
+from xlsx_package import build_timestamp, rewrite_members, sheet_parts
+
+# Snapshots rendered in this process, by (range_headroom, cache_values,
+# SOURCE_DATE_EPOCH)
+_SNAPSHOTS = {}
+
+
+class WorkbookSnapshot:
+    """
+    The serialized package of an empty tracking workbook
+
+    Attributes:
+        data: Bytes of the reproducible .xlsx package
+        layout_rows: Last layout row of every sheet (data starts below it, or
+            in place of the sample row)
+        cache_values: Whether the Dashboard formulas carry cached values
+    """
+
+    def __init__(self, data, cache_values=True):
+        self.data = data
+        self.cache_values = cache_values
+        self.layout_rows = {}
+        with self.open() as zf:
+            for name, part in sheet_parts(zf).items():
+                dimension = re.search(rb'<dimension ref="[A-Z]+\d+:?[A-Z]*(\d*)"',
+                                      zf.read(part))
+                self.layout_rows[name] = int(dimension.group(1) or 1) if dimension else 0
+
+    @classmethod
+    def render(cls, range_headroom=RANGE_HEADROOM, cache_values=True):
+        """
+        Build the empty workbook through openpyxl and keep its bytes
+
+        Returns:
+            WorkbookSnapshot
+        """
+        generator = FormulaBasedExcelGenerator(range_headroom=range_headroom,
+                                               cache_values=cache_values)
+        generator.build()
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            generator.save(path)
+            with open(path, 'rb') as f:
+                return cls(f.read(), cache_values)
+        finally:
+            os.unlink(path)
+
+    def open(self):
+        """The snapshot as a read-only ZipFile"""
+        return zipfile.ZipFile(io.BytesIO(self.data))
+
+    def instantiate(self, path, kpi_targets=None):
+        """
+        Write a new empty workbook from the snapshot
+
+        With the default targets this is a plain copy of the package. Other
+        targets rewrite the Dashboard part; when the snapshot caches values,
+        the Dashboard is then evaluated again so the Status cells match.
+
+        Args:
+            path: Output workbook
+            kpi_targets: Optional site-specific targets (see dashboard_kpis)
+
+        Returns:
+            str: ``path``
+        """
+        cells = kpi_target_cells(kpi_targets)
+        with open(path, 'wb') as f:
+            f.write(self.data)
+        if not cells:
+            return path
+        with self.open() as zf:
+            part = sheet_parts(zf)['Dashboard']
+            xml = set_cells(zf.read(part), cells)
+        rewrite_members(path, {part: xml})
+        if self.cache_values:
+            build_time = build_timestamp()
+            cache_dashboard_values(path, now=build_time, volatile=build_time is not None)
+        return path
+
+
+def snapshot_cache_key(cache, range_headroom=RANGE_HEADROOM, cache_values=True):
+    """Build cache key of a snapshot"""
+    return cache.key(
+        'workbook-snapshot',
+        schema={'sheets': TRACKING_SHEETS, 'derived': DERIVED_COLUMNS},
+        options={'range_headroom': range_headroom, 'cache_values': cache_values},
+    )
+
+
+def get_snapshot(range_headroom=RANGE_HEADROOM, cache_values=True, cache=None):
+    """
+    The snapshot for the given options, rendering it at most once
+
+    Args:
+        range_headroom: Rows the named data ranges reach below the layout
+        cache_values: Store evaluated Dashboard values in the snapshot
+        cache: Optional build_cache.BuildCache holding snapshots across runs
+
+    Returns:
+        WorkbookSnapshot
+    """
+    key = (range_headroom, cache_values, os.environ.get('SOURCE_DATE_EPOCH'))
+    if key in _SNAPSHOTS:
+        return _SNAPSHOTS[key]
+
+    snapshot = None
+    cache_key = snapshot_cache_key(cache, range_headroom, cache_values) if cache else None
+    if cache_key:
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            if cache.fetch(cache_key, path):
+                with open(path, 'rb') as f:
+                    snapshot = WorkbookSnapshot(f.read(), cache_values)
+        finally:
+            os.unlink(path)
+    if snapshot is None:
+        snapshot = WorkbookSnapshot.render(range_headroom, cache_values)
+        if cache_key:
+            fd, path = tempfile.mkstemp(suffix='.xlsx')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(snapshot.data)
+                cache.store(cache_key, path)
+            finally:
+                os.unlink(path)
+    _SNAPSHOTS[key] = snapshot
+    return snapshot
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Create empty tracking workbooks from the pre-rendered snapshot'
+    )
+    parser.add_argument('output', nargs='?',
+                        default='Ecom_Operations_Tracking_System_Formula_Based.xlsx',
+                        help='Output file name')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Instantiate the workbook N times and report the timings')
+    parser.add_argument('--no-cache-values', action='store_true',
+                        help='Skip storing evaluated Dashboard values in the file')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None,
+                        help='Build cache directory (default: ~/.cache/ecom-tracking)')
+    args = parser.parse_args()
+
+    from build_cache import BuildCache
+
+    start = time.perf_counter()
+    snapshot = get_snapshot(cache_values=not args.no_cache_values,
+                            cache=BuildCache(args.cache_dir))
+    load_seconds = time.perf_counter() - start
+    timings = []
+    for _ in range(max(1, args.repeat)):
+        start = time.perf_counter()
+        snapshot.instantiate(args.output)
+        timings.append(time.perf_counter() - start)
+
+    print()
+    print(f"📸 Snapshot ready in {load_seconds * 1000:.1f} ms ({len(snapshot.data) / 1024:.0f} KB)")
+    print(f"✅ {args.output}: {min(timings) * 1000:.2f} ms per workbook "
+          f"(best of {len(timings)})")
+    print()
+
+
+if __name__ == '__main__':
+    main()
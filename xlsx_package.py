@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Package-level helpers for .xlsx/.xlsm files
+
+An Excel workbook is a ZIP archive of XML parts. These helpers locate and
+rewrite individual parts (worksheets, workbook.xml, ...) without loading the
+whole workbook through openpyxl.
+"""
+
+import os
+import posixpath
+import re
+import struct
+import tempfile
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+# Fixed ZIP timestamp (the earliest DOS date) for parts written by RawZipWriter
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# Parts written first by make_reproducible(); the rest follow sorted by name
+CANONICAL_ORDER = ['[Content_Types].xml', '_rels/.rels', 'docProps/app.xml', 'docProps/core.xml']
+
+# Content types and relationship of an embedded VBA project
+VBA_CONTENT_TYPE = 'application/vnd.ms-office.vbaProject'
+VBA_RELATIONSHIP = 'http://schemas.microsoft.com/office/2006/relationships/vbaProject'
+MACRO_CONTENT_TYPES = {
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml':
+        'application/vnd.ms-excel.sheet.macroEnabled.main+xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml':
+        'application/vnd.ms-excel.template.macroEnabled.main+xml',
+}
+OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+_CORE_DATE = re.compile(rb'(<dcterms:(created|modified)\b[^>]*>)[^<]*(</dcterms:\2>)')
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_COUNT_LIMIT = 0xFFFF
+
+
+def read_relationships(zf, rels_path):
+    """Return {relationship id: target part path} for a .rels part"""
+    base = posixpath.dirname(posixpath.dirname(rels_path))
+    root = ET.fromstring(zf.read(rels_path))
+    targets = {}
+    for rel in root.findall(f'{{{NS_PKG_REL}}}Relationship'):
+        target = rel.get('Target')
+        if target.startswith('/'):
+            target = target.lstrip('/')
+        else:
+            target = posixpath.normpath(posixpath.join(base, target))
+        targets[rel.get('Id')] = target
+    return targets
+
+
+def sheet_parts(zf):
+    """
+    Map sheet names to their worksheet part paths, in workbook order
+
+    Args:
+        zf: Open zipfile.ZipFile of the workbook
+
+    Returns:
+        dict: e.g. {'Dashboard': 'xl/worksheets/sheet1.xml', ...}
+    """
+    targets = read_relationships(zf, 'xl/_rels/workbook.xml.rels')
+    root = ET.fromstring(zf.read('xl/workbook.xml'))
+    parts = {}
+    for sheet in root.iter(f'{{{NS_MAIN}}}sheet'):
+        parts[sheet.get('name')] = targets[sheet.get(f'{{{NS_REL}}}id')]
+    return parts
+
+
+def defined_names(zf):
+    """Return {name: reference} for the workbook-level defined names"""
+    root = ET.fromstring(zf.read('xl/workbook.xml'))
+    return {
+        name.get('name'): name.text
+        for name in root.iter(f'{{{NS_MAIN}}}definedName')
+        if name.get('localSheetId') is None
+    }
+
+
+def sheet_layout(zf, part):
+    """
+    Read a worksheet's column widths, merged ranges and frozen panes
+
+    The part is stream-parsed and rows are discarded as they are read, so
+    memory does not grow with the number of rows.
+
+    Returns:
+        dict: {'widths': [(first column, last column, width), ...] (1-based),
+               'merges': ['A1:H1', ...],
+               'freeze': (rows, columns) frozen, or None}
+    """
+    layout = {'widths': [], 'merges': [], 'freeze': None}
+    sheet_data = None
+    with zf.open(part) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            tag = elem.tag.rpartition('}')[2]
+            if event == 'start':
+                if tag == 'sheetData':
+                    sheet_data = elem
+                continue
+            if tag == 'row':
+                sheet_data.clear()
+            elif tag == 'col' and elem.get('width'):
+                layout['widths'].append((int(elem.get('min')), int(elem.get('max')),
+                                         float(elem.get('width'))))
+            elif tag == 'mergeCell':
+                layout['merges'].append(elem.get('ref'))
+            elif tag == 'pane' and elem.get('state') in ('frozen', 'frozenSplit'):
+                layout['freeze'] = (int(float(elem.get('ySplit', 0))),
+                                    int(float(elem.get('xSplit', 0))))
+    return layout
+
+
+def main_part(zf):
+    """Path of the workbook part (normally 'xl/workbook.xml')"""
+    root = ET.fromstring(zf.read('_rels/.rels'))
+    for rel in root.findall(f'{{{NS_PKG_REL}}}Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT:
+            return rel.get('Target').lstrip('/')
+    raise zipfile.BadZipFile("Package has no officeDocument relationship")
+
+
+def _xml_attr(name, value):
+    return f' {name}="{escape(value, {chr(34): "&quot;"})}"'.encode('utf-8')
+
+
+def _patch_content_types(xml, workbook_part, vba_part):
+    """Mark the workbook macro-enabled and declare the VBA project part"""
+    def override(match):
+        element = match.group(0)
+        if re.search(rb'PartName="/%s"' % re.escape(workbook_part.encode()), element):
+            element = re.sub(rb'ContentType="([^"]*)"',
+                             lambda m: b'ContentType="%s"' % MACRO_CONTENT_TYPES.get(
+                                 m.group(1).decode(), m.group(1).decode()).encode(),
+                             element)
+        return element
+
+    xml = re.sub(rb'<Override\b[^>]*>', override, xml)
+    if not re.search(rb'PartName="/%s"' % re.escape(vba_part.encode()), xml):
+        entry = (b'<Override' + _xml_attr('PartName', '/' + vba_part) +
+                 _xml_attr('ContentType', VBA_CONTENT_TYPE) + b'/>')
+        xml = xml.replace(b'</Types>', entry + b'</Types>')
+    return xml
+
+
+def _patch_workbook_rels(xml):
+    """Add the vbaProject relationship to workbook.xml.rels"""
+    if VBA_RELATIONSHIP.encode() in xml:
+        return xml
+    used = set(re.findall(rb'Id="([^"]*)"', xml))
+    number = 1
+    while b'rId%d' % number in used:
+        number += 1
+    entry = (b'<Relationship' + _xml_attr('Id', f'rId{number}') +
+             _xml_attr('Type', VBA_RELATIONSHIP) + _xml_attr('Target', 'vbaProject.bin') + b'/>')
+    return xml.replace(b'</Relationships>', entry + b'</Relationships>')
+
+
+def inject_vba_project(path, vba_project, output_path):
+    """
+    Turn a workbook into a macro-enabled one by adding a VBA project
+
+    Works on the package only: [Content_Types].xml and the workbook's .rels
+    are patched, xl/vbaProject.bin is added (or replaced), and every other
+    member is copied as raw compressed bytes. Sheets are never parsed, so
+    the cost is close to a file copy and all formatting is kept.
+
+    Args:
+        path: Source .xlsx (or .xlsm)
+        vba_project: Path of a vbaProject.bin, or its bytes
+        output_path: Destination .xlsm
+
+    Returns:
+        str: ``output_path``
+    """
+    if not isinstance(vba_project, (bytes, bytearray)):
+        with open(vba_project, 'rb') as f:
+            vba_project = f.read()
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path, 'r') as src, open(path, 'rb') as fp:
+            workbook_part = main_part(src)
+            base = posixpath.dirname(workbook_part)
+            vba_part = posixpath.join(base, 'vbaProject.bin')
+            rels_part = posixpath.join(base, '_rels', posixpath.basename(workbook_part) + '.rels')
+            date_time = src.getinfo('[Content_Types].xml').date_time
+            with RawZipWriter(tmp_path, date_time=date_time) as dst:
+                for info in src.infolist():
+                    if info.filename == '[Content_Types].xml':
+                        dst.writestr(info.filename, _patch_content_types(
+                            src.read(info), workbook_part, vba_part), date_time=info.date_time)
+                    elif info.filename == rels_part:
+                        dst.writestr(info.filename, _patch_workbook_rels(src.read(info)),
+                                     date_time=info.date_time)
+                    elif info.filename != vba_part:
+                        copy_member(dst, fp, info)
+                dst.writestr(vba_part, vba_project)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return output_path
+
+
+def rewrite_members(path, replacements, output_path=None):
+    """
+    Write a copy of a workbook package with some parts replaced
+
+    Unchanged parts are copied as their raw compressed bytes, so the cost
+    depends on the size of the replaced parts only.
+
+    Args:
+        path: Source workbook
+        replacements: Mapping of part name to new bytes
+        output_path: Destination (defaults to replacing ``path`` in place)
+
+    Returns:
+        str: Path of the written workbook
+    """
+    output_path = output_path or path
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path, 'r') as src, open(path, 'rb') as fp, \
+                RawZipWriter(tmp_path) as dst:
+            for info in src.infolist():
+                data = replacements.get(info.filename)
+                if data is None:
+                    copy_member(dst, fp, info)
+                else:
+                    dst.writestr(info.filename, data, date_time=info.date_time)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return output_path
+
+
+def build_timestamp():
+    """
+    Fixed build time from the SOURCE_DATE_EPOCH environment variable
+
+    Returns:
+        datetime: Naive UTC time, or None when the variable is not set
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if not epoch:
+        return None
+    return datetime.fromtimestamp(int(epoch), timezone.utc).replace(tzinfo=None)
+
+
+def make_reproducible(path, build_time=None):
+    """
+    Rewrite a package so identical content gives identical bytes
+
+    Members are written in a canonical order with one fixed timestamp, and the
+    created/modified dates in docProps/core.xml are set to the build time.
+    Member data is copied without recompressing.
+
+    Args:
+        path: Workbook to rewrite in place
+        build_time: Timestamp to record (defaults to ZIP_EPOCH)
+
+    Returns:
+        str: ``path``
+    """
+    build_time = max(build_time or datetime(*ZIP_EPOCH), datetime(*ZIP_EPOCH))
+    date_time = build_time.timetuple()[:6]
+    stamp = build_time.strftime('%Y-%m-%dT%H:%M:%SZ').encode('ascii')
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path, 'r') as src, open(path, 'rb') as fp, \
+                RawZipWriter(tmp_path, date_time=date_time) as dst:
+            members = {info.filename: info for info in src.infolist()}
+            order = [name for name in CANONICAL_ORDER if name in members]
+            order += sorted(name for name in members if name not in CANONICAL_ORDER)
+            for name in order:
+                info = members[name]
+                if name == 'docProps/core.xml':
+                    core = _CORE_DATE.sub(lambda m: m.group(1) + stamp + m.group(3),
+                                          src.read(info))
+                    dst.writestr(name, core)
+                    continue
+                copy_member(dst, fp, info, date_time=date_time)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def member_data_offset(fp, info):
+    """File offset of a member's compressed data (after its local header)"""
+    fp.seek(info.header_offset)
+    header = fp.read(30)
+    if header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename!r}")
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    return info.header_offset + 30 + name_length + extra_length
+
+
+def iter_raw(fp, info, start=0, stop=None, block_size=1 << 20):
+    """
+    Yield a member's raw compressed bytes, optionally only [start:stop)
+
+    Args:
+        fp: Binary file object of the package
+        info: zipfile.ZipInfo of the member
+    """
+    stop = info.compress_size if stop is None else stop
+    offset = member_data_offset(fp, info) + start
+    remaining = stop - start
+    while remaining > 0:
+        fp.seek(offset)
+        block = fp.read(min(block_size, remaining))
+        if not block:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename!r}")
+        offset += len(block)
+        remaining -= len(block)
+        yield block
+
+
+def extra_fields(extra):
+    """Parse a ZIP extra field into {header id: payload}"""
+    fields = {}
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack('<HH', extra[pos:pos + 4])
+        fields[header_id] = extra[pos + 4:pos + 4 + size]
+        pos += 4 + size
+    return fields
+
+
+def pack_extra_fields(fields):
+    """Build a ZIP extra field from {header id: payload}"""
+    return b''.join(struct.pack('<HH', header_id, len(payload)) + payload
+                    for header_id, payload in fields.items())
+
+
+def copy_member(writer, fp, info, date_time=None):
+    """
+    Copy a member to a RawZipWriter byte-for-byte, without recompressing
+
+    Args:
+        writer: Destination RawZipWriter
+        fp: Binary file object of the source package
+        info: zipfile.ZipInfo of the member
+        date_time: New member timestamp (defaults to the member's own)
+    """
+    fields = extra_fields(info.extra)
+    fields.pop(0x0001, None)  # ZIP64 sizes are rewritten by the writer
+    writer.write_compressed(info.filename, iter_raw(fp, info), info.CRC, info.compress_size,
+                            info.file_size, method=info.compress_type,
+                            date_time=date_time or info.date_time,
+                            extra=pack_extra_fields(fields))
+
+
+def deflate_raw(data, level=6):
+    """Raw deflate (no zlib header) as stored in ZIP members"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _gf2_times(matrix, vector):
+    total = 0
+    i = 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return total
+
+
+def _gf2_square(matrix):
+    return [_gf2_times(matrix, row) for row in matrix]
+
+
+def crc32_combine(crc1, crc2, len2):
+    """
+    CRC-32 of A+B from crc32(A), crc32(B) and len(B)
+
+    Port of zlib's crc32_combine, which Python's zlib module does not expose.
+    Lets worker processes checksum their chunks of one ZIP member independently.
+    """
+    if len2 <= 0:
+        return crc1
+    odd = [0xEDB88320] + [1 << i for i in range(31)]
+    even = _gf2_square(odd)
+    odd = _gf2_square(even)
+    while True:
+        even = _gf2_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_square(even)
+        if len2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return crc1 ^ crc2
+
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return ((hour << 11) | (minute << 5) | (second // 2),
+            ((year - 1980) << 9) | (month << 5) | day)
+
+
+class RawZipWriter:
+    """
+    Minimal ZIP writer that accepts already-compressed member data
+
+    zipfile.ZipFile always compresses in the writing thread. This writer lets
+    worker processes deflate parts in parallel, and lets unchanged members of
+    an existing package be copied as raw compressed bytes. ZIP64 records are
+    written when sizes, offsets or the member count require them.
+    """
+
+    def __init__(self, path, date_time=ZIP_EPOCH):
+        self.path = path
+        self.fp = open(path, 'wb')
+        self.date_time = date_time
+        self.entries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.fp.close()
+
+    def write_compressed(self, name, chunks, crc, compress_size, file_size,
+                         method=zipfile.ZIP_DEFLATED, date_time=None, extra=b''):
+        """
+        Add a member from compressed data
+
+        Args:
+            name: Member name
+            chunks: Iterable of compressed byte chunks (or a single bytes object)
+            crc: CRC-32 of the uncompressed data
+            compress_size: Total size of the compressed chunks
+            file_size: Uncompressed size
+            method: ZIP compression method of the data
+            date_time: Member timestamp (defaults to the writer's)
+            extra: Extra field data stored with the member (without ZIP64 fields)
+        """
+        offset = self.fp.tell()
+        encoded = name.encode('utf-8')
+        flags = 0x800 if not name.isascii() else 0
+        dos_time, dos_date = _dos_datetime(date_time or self.date_time)
+        zip64 = file_size >= _ZIP64_LIMIT or compress_size >= _ZIP64_LIMIT
+        local_extra = extra
+        if zip64:
+            local_extra = struct.pack('<HHQQ', 0x0001, 16, file_size, compress_size) + extra
+        self.fp.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, flags, method, dos_time, dos_date,
+            crc, _ZIP64_LIMIT if zip64 else compress_size, _ZIP64_LIMIT if zip64 else file_size,
+            len(encoded), len(local_extra)))
+        self.fp.write(encoded)
+        self.fp.write(local_extra)
+        if isinstance(chunks, (bytes, bytearray, memoryview)):
+            chunks = [chunks]
+        for chunk in chunks:
+            self.fp.write(chunk)
+        self.entries.append((encoded, flags, method, dos_time, dos_date, crc,
+                             compress_size, file_size, offset, extra))
+
+    def write_compressed_file(self, name, path, crc, compress_size, file_size, **kwargs):
+        """Add a member whose compressed bytes are stored in a file"""
+        with open(path, 'rb') as f:
+            self.write_compressed(name, iter(lambda: f.read(1 << 20), b''),
+                                  crc, compress_size, file_size, **kwargs)
+
+    def writestr(self, name, data, level=6, date_time=None):
+        """Compress and add a member"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        compressed = deflate_raw(data, level)
+        self.write_compressed(name, compressed, zlib.crc32(data), len(compressed), len(data),
+                              date_time=date_time)
+
+    def close(self):
+        """Write the central directory"""
+        cd_offset = self.fp.tell()
+        for encoded, flags, method, dos_time, dos_date, crc, csize, usize, offset, extra in \
+                self.entries:
+            zip64_fields = []
+            if usize >= _ZIP64_LIMIT:
+                zip64_fields.append(usize)
+            if csize >= _ZIP64_LIMIT:
+                zip64_fields.append(csize)
+            if offset >= _ZIP64_LIMIT:
+                zip64_fields.append(offset)
+            if zip64_fields:
+                extra = struct.pack('<HH', 0x0001, 8 * len(zip64_fields)) + \
+                    struct.pack(f'<{len(zip64_fields)}Q', *zip64_fields) + extra
+            version = 45 if zip64_fields else 20
+            self.fp.write(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, version, version, flags, method,
+                dos_time, dos_date, crc, min(csize, _ZIP64_LIMIT), min(usize, _ZIP64_LIMIT),
+                len(encoded), len(extra), 0, 0, 0, 0, min(offset, _ZIP64_LIMIT)))
+            self.fp.write(encoded)
+            self.fp.write(extra)
+        cd_end = self.fp.tell()
+        cd_size = cd_end - cd_offset
+        count = len(self.entries)
+        if count >= _ZIP64_COUNT_LIMIT or cd_offset >= _ZIP64_LIMIT or cd_size >= _ZIP64_LIMIT:
+            self.fp.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                                      count, count, cd_size, cd_offset))
+            self.fp.write(struct.pack('<IIQI', 0x07064b50, 0, cd_end, 1))
+        self.fp.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0,
+                                  min(count, _ZIP64_COUNT_LIMIT), min(count, _ZIP64_COUNT_LIMIT),
+                                  min(cd_size, _ZIP64_LIMIT), min(cd_offset, _ZIP64_LIMIT), 0))
+        self.fp.close()
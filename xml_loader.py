@@ -0,0 +1,717 @@
+#!/usr/bin/env python3
+"""
+Fast XML-Streaming Workbook Loader
+
+Loads the cells of large filled workbooks as column arrays without building
+an openpyxl object per cell:
+
+    1. Each worksheet part is decompressed in blocks and the <c> elements of
+       complete rows are picked out with one regular expression. When only
+       some columns are wanted, the expression only matches those, so the
+       other cells are never turned into objects. (ElementTree.iterparse
+       builds an element per cell and takes several times longer, and lxml
+       is not a dependency.)
+    2. The cells of a block are converted a kind at a time: plain numbers,
+       shared string indexes, plain inline strings and plain formulas in
+       bulk, into NumPy arrays per column. Only shared formulas, booleans,
+       errors and rich text are looked at one by one.
+    3. The shared strings a sheet uses are read from sharedStrings.xml once,
+       and numbers styled as dates are converted from Excel date serials.
+    4. Sheets are parsed in parallel, one per process.
+
+About ten times faster than openpyxl.load_workbook on the benchmark
+workbooks, on a single CPU.
+
+A sheet comes back as a SheetColumns: one array per column, indexed from
+its first row. Columns holding only numbers are float64 (NaN for blanks),
+date columns datetime64 (or the serials themselves with dates='serial'),
+and anything else an object array of Python values. Tracking sheets can go
+straight into a tracking_table.TrackingTable. kpi_engine and kpi_reader read
+the columns formulas need with read_values(), as kpi_engine.Values.
+
+Usage:
+    python3 xml_loader.py site.xlsx
+    python3 xml_loader.py site.xlsx --sheets "Picking Tasks" "Wave Tracking" --workers 4
+    python3 xml_loader.py site.xlsx --compare     # Also time openpyxl read-only
+    python3 ecom.py load site.xlsx
+
+    from xml_loader import load_sheets, load_tables
+    sheets = load_sheets('site.xlsx')              # {name: SheetColumns}
+    picks = load_tables('site.xlsx')['Picking Tasks']
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# create_formula_based_excel and tracking_table are imported by the table
+# functions only: they load openpyxl, which read_values() users go without
+from kpi_engine import DEFAULT_WORKBOOK, NUMBER, TEXT, Values, column_index, column_letter
+from kpi_reader import BLOCK_SIZE, _TYPE, _cell_value, _text, read_shared_strings
+from xlsx_package import NS_MAIN, sheet_parts
+
+# Built-in number formats that show dates or times
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+
+
+def _cells_pattern(columns=None):
+    """
+    Regular expression matching the <c> elements of the given columns (default: all)
+
+    The value of a plain number or shared string, the text of a plain inline
+    string and the text and cached value of a plain formula are split out;
+    any other content is left in the body (the last group).
+    """
+    if columns is None:
+        letters = rb'[A-Z]{1,3}'
+    else:
+        letters = b'|'.join(column_letter(col).encode() for col in sorted(columns))
+    return re.compile(
+        rb'<c r="(' + letters + rb')(\d+)"([^>/]*)(?:/>|>(?:<v>([^<]*)</v>|<is><t>([^<]*)</t></is>|'
+        rb'<f>([^<]*)</f>(?:<v\s*/>|<v>([^<]*)</v>)?|([^<]*(?:<(?!/c>)[^<]*)*))</c>)')
+
+
+_STYLE = re.compile(rb'\bs="(\d+)"')
+# Cell kinds by type attribute; booleans, errors, formula text, ... are _OTHER
+_NUMBER, _SHARED, _INLINE, _OTHER = range(4)
+_KINDS = {b'n': _NUMBER, b's': _SHARED, b'inlineStr': _INLINE}
+# Number format codes: quoted text, [colour]/[h] sections and escapes don't count
+_FORMAT_TOKEN = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.|([dmyhs])', re.I)
+_EXCEL_EPOCH = np.datetime64('1899-12-30', 'ms')
+_MS_PER_DAY = 86_400_000
+
+
+def is_date_format(code):
+    """Whether a custom number format code shows a date or time"""
+    return any(_FORMAT_TOKEN.findall(code))
+
+
+def date_styles(zf):
+    """
+    Cell style indexes (the s attribute) whose number format is a date or time
+
+    Args:
+        zf: Open zipfile.ZipFile of the workbook
+
+    Returns:
+        set: Indexes into cellXfs
+    """
+    try:
+        root = ET.fromstring(zf.read('xl/styles.xml'))
+    except KeyError:
+        return set()
+    date_formats = set(BUILTIN_DATE_FORMATS)
+    for fmt in root.iter(f'{{{NS_MAIN}}}numFmt'):
+        if is_date_format(fmt.get('formatCode', '')):
+            date_formats.add(int(fmt.get('numFmtId')))
+    cell_xfs = root.find(f'{{{NS_MAIN}}}cellXfs')
+    if cell_xfs is None:
+        return set()
+    return {i for i, xf in enumerate(cell_xfs.findall(f'{{{NS_MAIN}}}xf'))
+            if int(xf.get('numFmtId', 0)) in date_formats}
+
+
+def serials_to_datetimes(serials):
+    """
+    Excel date serials to datetime64[ms], NaN becoming NaT
+
+    Serials before 1 March 1900 are moved a day, as openpyxl does for
+    Excel's 29 February 1900.
+    """
+    serials = np.asarray(serials, dtype=np.float64)
+    days = np.where(serials < 61, serials + 1, serials)
+    blank = np.isnan(days)
+    ms = np.rint(np.where(blank, 0, days) * _MS_PER_DAY).astype(np.int64)
+    result = _EXCEL_EPOCH + ms.astype('timedelta64[ms]')
+    result[blank] = np.datetime64('NaT')
+    return result
+
+
+def datetimes_to_serials(values):
+    """
+    datetime64 values to Excel date serials, NaT becoming NaN
+
+    The inverse of serials_to_datetimes: days before 1 March 1900 count
+    Excel's 29 February 1900.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != 'M':
+        values = values.astype('datetime64[us]')
+    days = (values - _EXCEL_EPOCH) / np.timedelta64(1, 'D')
+    return np.where((days >= 1) & (days < 61), days - 1, days)
+
+
+class SheetColumns:
+    """
+    The cells of one worksheet as column arrays
+
+    Attributes:
+        name: Sheet name
+        first_row: Worksheet row of index 0 of every column
+        columns: {column index (1-based): array}, every array the same length
+        date_columns: Column indexes whose numbers are dates
+    """
+
+    def __init__(self, name, first_row, columns, date_columns=()):
+        self.name = name
+        self.first_row = first_row
+        self.columns = columns
+        self.date_columns = set(date_columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, column):
+        """Column by letter ('B') or 1-based index"""
+        return self.columns[column_index(column) if isinstance(column, str) else column]
+
+    def __contains__(self, column):
+        return (column_index(column) if isinstance(column, str) else column) in self.columns
+
+    @property
+    def max_column(self):
+        return max(self.columns, default=0)
+
+    def row(self, row):
+        """Values of one worksheet row, in column order (None for blanks)"""
+        index = row - self.first_row
+        values = []
+        for col in range(1, self.max_column + 1):
+            column = self.columns.get(col)
+            value = column[index] if column is not None and 0 <= index < len(column) else None
+            if value is not None and column.dtype.kind in 'fM':
+                # NaN and NaT are blanks; datetime64 comes back as datetime
+                value = None if value != value else value.item()
+            values.append(value)
+        return values
+
+    def compress(self, mask):
+        """Keep the rows where mask is True"""
+        self.columns = {col: column[mask] for col, column in self.columns.items()}
+
+
+class SheetValues:
+    """
+    The cells of worksheet columns as kpi_engine Values
+
+    Attributes:
+        name: Sheet name
+        max_row: Last row holding a cell of the columns read
+        columns: {column index (1-based): Values of rows 1..max_row}; formula
+            cells are blank in them
+        formulas: {column index: (row indexes (0-based), formula texts with '=')}
+        cells: Number of cells read
+    """
+
+    def __init__(self, name, max_row, columns, formulas, cells):
+        self.name = name
+        self.max_row = max_row
+        self.columns = columns
+        self.formulas = formulas
+        self.cells = cells
+
+
+class _ColumnParts:
+    """Cells of one column gathered block by block, as (rows, values, ...) tuples"""
+
+    __slots__ = ('numbers', 'strings', 'values', 'formulas')
+
+    def __init__(self):
+        # Floats (with their date-styled mask), shared string indexes, other
+        # Python values and formula texts
+        self.numbers, self.strings, self.values, self.formulas = [], [], [], []
+
+
+class _Lookup(dict):
+    """Dictionary filling in missing keys with a function (used through map())"""
+
+    def __init__(self, make):
+        super().__init__()
+        self.make = make
+
+    def __missing__(self, key):
+        value = self[key] = self.make(key)
+        return value
+
+
+def _take(values, index):
+    """Items of a tuple at the given positions, as a tuple"""
+    if len(index) == 1:
+        return (values[index[0]],)
+    return itemgetter(*index.tolist())(values)
+
+
+class _SheetParser:
+    """
+    Parses the blocks of one worksheet part into _ColumnParts
+
+    The attribute text of a sheet's cells takes few distinct values
+    (' s="10" t="n"', ...), so style and type are looked up once per
+    distinct text rather than parsed per cell; plain numbers, shared
+    strings, inline strings and formulas are then converted a block at a
+    time.
+    """
+
+    def __init__(self, first_row, max_col, date_style_ids, formulas, columns=None):
+        self.first_row = first_row
+        self.max_col = max_col
+        self.date_style_ids = date_style_ids
+        self.formulas = formulas
+        self.pattern = _cells_pattern(columns)
+        self.shared_formulas = {}
+        self.parts = {}
+        self.max_row = 0
+        self.cells = 0
+        self.columns = _Lookup(lambda letters: column_index(letters.decode()))
+        # Attribute text -> index into self.kinds and self.date_styled
+        self.attributes = _Lookup(self._add_attributes)
+        self.kinds, self.date_styled = [], []
+
+    def _add_attributes(self, attrs):
+        match = _TYPE.search(attrs)
+        cell_type = match.group(1) if match else b'n'
+        style = _STYLE.search(attrs)
+        self.kinds.append(_KINDS.get(cell_type, _OTHER))
+        self.date_styled.append(bool(style) and int(style.group(1)) in self.date_style_ids)
+        return len(self.kinds) - 1
+
+    def _column(self, col):
+        parts = self.parts.get(col)
+        if parts is None:
+            parts = self.parts[col] = _ColumnParts()
+        return parts
+
+    def parse(self, data, end):
+        """Convert the cells of data[:end] (complete rows)"""
+        cells = self.pattern.findall(data, 0, end)
+        if not cells:
+            return
+        count = len(cells)
+        self.cells += count
+        # Transposed with itemgetter: zip(*cells) is several times slower
+        attrs, values, texts, formulas, bodies = (list(map(itemgetter(i), cells))
+                                                 for i in (2, 3, 4, 5, 7))
+        rows = np.fromiter(map(int, map(itemgetter(1), cells)), np.int64, count)
+        cols = np.fromiter(map(self.columns.__getitem__, map(itemgetter(0), cells)),
+                           np.int64, count)
+        codes = np.fromiter(map(self.attributes.__getitem__, attrs), np.int64, count)
+        kinds = np.array(self.kinds, dtype=np.int8)[codes]
+        self.max_row = max(self.max_row, int(rows.max()))
+        keep = rows >= self.first_row
+        if self.max_col:
+            keep &= cols <= self.max_col
+        date_styled = np.array(self.date_styled, dtype=bool)[codes]
+
+        # Plain formulas: <f>...</f> and a cached value, if any
+        index = np.flatnonzero(np.fromiter(map(bool, formulas), bool, count))
+        if self.formulas:
+            index = index[keep[index]]
+            if len(index):
+                found = np.empty(len(index), dtype=object)
+                plain = _take(formulas, index)
+                found[:] = (['=' + text for text in map(bytes.decode, plain)]
+                            if b'&' not in b''.join(plain) else
+                            ['=' + _text(text) for text in plain])
+                self._add(index, cols, rows, found, 'formulas')
+        else:
+            # The cached result stands in for the formula, typed by the t attribute
+            for i in index.tolist():
+                values[i] = cells[i][6]
+        has_value = np.fromiter(map(bool, values), bool, count)
+        has_body = np.fromiter(map(bool, bodies), bool, count)
+
+        # Plain numbers: <v>...</v> and nothing else
+        index = np.flatnonzero(keep & has_value & (kinds == _NUMBER))
+        if len(index):
+            numbers = np.array(list(map(float, _take(values, index))))
+            self._add(index, cols, rows, numbers, 'numbers', date_styled)
+
+        index = np.flatnonzero(keep & has_value & (kinds == _SHARED))
+        if len(index):
+            strings = np.array(list(map(int, _take(values, index))), dtype=np.int64)
+            self._add(index, cols, rows, strings, 'strings')
+
+        # Inline strings of one run without entities: <is><t>...</t></is>
+        index = np.flatnonzero(keep & ~has_body & (kinds == _INLINE))
+        if len(index):
+            simple = _take(texts, index)
+            if b'&' in b''.join(simple):
+                plain = np.array([b'&' not in text for text in simple], dtype=bool)
+                has_body[index[~plain]] = True
+                index = index[plain]
+                simple = _take(texts, index)
+            strings = np.empty(len(index), dtype=object)
+            strings[:] = list(map(bytes.decode, simple))
+            self._add(index, cols, rows, strings, 'values')
+
+        # Everything else cell by cell: shared formulas, booleans, errors, rich text, ...
+        other = has_body | (has_value & (kinds == _OTHER))
+        if not self.formulas:
+            # Formula cells without a cached value are blank
+            formula = np.flatnonzero(has_body & (kinds == _NUMBER))
+            other[formula] = [b'<v>' in bodies[i] for i in formula.tolist()]
+        index = np.flatnonzero(keep & other)
+        if len(index):
+            found = [self._value(int(rows[i]), int(cols[i]), attrs[i],
+                                 bodies[i] or (b'<is><t>' + texts[i] + b'</t></is>' if texts[i]
+                                               else b'<v>' + values[i] + b'</v>'))
+                     for i in index.tolist()]
+            # Cached formula results that are numbers join the numbers
+            numeric = np.array([type(value) in (int, float) for value in found], dtype=bool)
+            if numeric.any():
+                numbers = np.array([value for value, is_number in zip(found, numeric.tolist())
+                                    if is_number], dtype=np.float64)
+                self._add(index[numeric], cols, rows, numbers, 'numbers', date_styled)
+            objects = np.empty(len(found), dtype=object)
+            objects[:] = found
+            present = np.not_equal(objects, None) & ~numeric
+            if self.formulas:
+                formula = np.array([bodies[i][:2] == b'<f' and type(value) is str
+                                    and value[:1] == '=' for i, value in zip(index.tolist(), found)],
+                                   dtype=bool)
+                self._add(index[formula], cols, rows, objects[formula], 'formulas')
+                present &= ~formula
+            self._add(index[present], cols, rows, objects[present], 'values')
+
+    def _add(self, index, cols, rows, values, field, date_styled=None):
+        """Append the values of the cells at index to their columns' field"""
+        cell_cols = cols[index]
+        for col in np.unique(cell_cols).tolist():
+            in_col = cell_cols == col
+            entry = (rows[index[in_col]], values[in_col])
+            if date_styled is not None:
+                # Numbers also keep which cells are styled as dates
+                entry += (date_styled[index[in_col]],)
+            getattr(self._column(col), field).append(entry)
+
+    def _value(self, row, col, attrs, body):
+        """Python value of a cell that is not a plain number or string"""
+        if not self.formulas and body[:2] == b'<f':
+            # The cached result of the formula, if the workbook has one
+            end = body.find(b'</f>')
+            body = body[end + 4:] if end >= 0 else body[body.find(b'>') + 1:]
+            if not body.startswith(b'<v>') or body.startswith(b'<v></v>'):
+                # No cached result, or an empty one (openpyxl reads None too)
+                return None
+        return _cell_value(row, col, attrs, body, self.shared_formulas)
+
+
+def _string_table(parser, zf):
+    """Array of the shared strings the parsed cells use, by index (None if none)"""
+    indexes = set()
+    for parts in parser.parts.values():
+        for _, strings in parts.strings:
+            indexes.update(np.unique(strings).tolist())
+    if not indexes:
+        return None
+    table = np.full(max(indexes) + 1, None, dtype=object)
+    for index, text in read_shared_strings(zf, indexes).items():
+        table[index] = text
+    return table
+
+
+def _assemble(parser, zf, name, dates):
+    """Turn the parsed parts into equal-length column arrays"""
+    first_row = parser.first_row
+    length = max(parser.max_row - first_row + 1, 0)
+    table = _string_table(parser, zf)
+
+    columns = {}
+    date_columns = set()
+    for col in sorted(parser.parts):
+        parts = parser.parts[col]
+        numbers = np.full(length, np.nan)
+        for rows, values, _ in parts.numbers:
+            numbers[rows - first_row] = values
+        if not parts.strings and not parts.values and not parts.formulas:
+            # Dates when most of the column's numbers are styled as dates
+            count = sum(len(rows) for rows, _, _ in parts.numbers)
+            styled = sum(int(styled.sum()) for _, _, styled in parts.numbers)
+            if count and styled * 2 >= count:
+                date_columns.add(col)
+                if dates == 'datetime64':
+                    numbers = serials_to_datetimes(numbers)
+            columns[col] = numbers
+            continue
+        column = np.full(length, None, dtype=object)
+        for rows, values, styled in parts.numbers:
+            # Whole numbers as int, like openpyxl; dates as datetime
+            whole = values == np.floor(values)
+            column[rows[whole] - first_row] = values[whole].astype(np.int64).tolist()
+            column[rows[~whole] - first_row] = values[~whole].tolist()
+            if styled.any() and dates == 'datetime64':
+                column[rows[styled] - first_row] = serials_to_datetimes(values[styled]).tolist()
+        for rows, strings in parts.strings:
+            column[rows - first_row] = table[strings]
+        for rows, values in parts.values + parts.formulas:
+            column[rows - first_row] = values
+        columns[col] = column
+    return SheetColumns(name, first_row, columns, date_columns)
+
+
+def _assemble_values(parser, zf, name):
+    """Turn the parsed parts into kpi_engine Values, with the formulas apart"""
+    size = parser.max_row
+    table = _string_table(parser, zf)
+    columns = {}
+    formulas = {}
+    for col in sorted(parser.parts):
+        parts = parser.parts[col]
+        values = Values.empty(size)
+        for rows, numbers, _ in parts.numbers:
+            values.kind[rows - 1] = NUMBER
+            values.num[rows - 1] = numbers
+        for rows, strings in parts.strings:
+            values.kind[rows - 1] = TEXT
+            values.txt[rows - 1] = table[strings]
+        for rows, objects in parts.values:
+            # Text stays text, even starting with '=' or reading '#N/A'
+            text = np.array([type(value) is str for value in objects.tolist()], dtype=bool)
+            values.kind[rows[text] - 1] = TEXT
+            values.txt[rows[text] - 1] = objects[text]
+            if not text.all():
+                values.put(rows[~text] - 1, Values.from_python(objects[~text].tolist()))
+        if parts.formulas:
+            rows = np.concatenate([rows for rows, _ in parts.formulas]) - 1
+            texts = np.concatenate([texts for _, texts in parts.formulas])
+            order = np.argsort(rows, kind='stable')
+            formulas[col] = (rows[order], texts[order])
+        columns[col] = values
+    return SheetValues(name, size, columns, formulas, parser.cells)
+
+
+def read_sheet(path, sheet_name, first_row=1, max_col=None, formulas=False, dates='datetime64'):
+    """
+    Load one worksheet as column arrays
+
+    Args:
+        path: Workbook path (or an open zipfile.ZipFile)
+        sheet_name: Sheet to load
+        first_row: First worksheet row to keep
+        max_col: Last column to keep (1-based), default all
+        formulas: Formula cells as '=...' text instead of their cached values
+        dates: 'datetime64' to convert date columns, 'serial' to keep
+            the Excel serials
+
+    Returns:
+        SheetColumns
+    """
+    if isinstance(path, zipfile.ZipFile):
+        return _read_sheet(path, sheet_name, first_row, max_col, formulas, dates)
+    with zipfile.ZipFile(path) as zf:
+        return _read_sheet(zf, sheet_name, first_row, max_col, formulas, dates)
+
+
+def _read_sheet(zf, sheet_name, first_row, max_col, formulas, dates):
+    parser = _SheetParser(first_row, max_col, date_styles(zf), formulas)
+    return _assemble(_parse(zf, sheet_name, parser), zf, sheet_name, dates)
+
+
+def _parse(zf, sheet_name, parser):
+    """Stream a worksheet part through a _SheetParser; returns the parser"""
+    parts = sheet_parts(zf)
+    if sheet_name not in parts:
+        raise KeyError(f"Worksheet {sheet_name!r} does not exist")
+    with zf.open(parts[sheet_name]) as f:
+        pending = b''
+        while True:
+            block = f.read(BLOCK_SIZE)
+            data = pending + block
+            # Only parse complete rows; the rest waits for the next block
+            end = len(data) if not block else data.rfind(b'</row>') + 6
+            if block and end < 6:
+                pending = data
+                continue
+            parser.parse(data, end)
+            pending = data[end:]
+            if not block:
+                break
+    return parser
+
+
+def read_values(path, sheet_name, columns=None):
+    """
+    Load worksheet columns as kpi_engine Values, formulas kept as text
+
+    This is how kpi_engine and kpi_reader read sheets, so both work on the
+    same numbers. Dates stay Excel serials.
+
+    Args:
+        path: Workbook path (or an open zipfile.ZipFile)
+        sheet_name: Sheet to load
+        columns: Column indexes (1-based) to read, default all; the cells of
+            other columns are not looked at
+
+    Returns:
+        SheetValues
+    """
+    if not isinstance(path, zipfile.ZipFile):
+        with zipfile.ZipFile(path) as zf:
+            return read_values(zf, sheet_name, columns)
+    parser = _SheetParser(1, None, set(), True, columns)
+    return _assemble_values(_parse(path, sheet_name, parser), path, sheet_name)
+
+
+def read_table(path, sheet_name):
+    """
+    Load a tracking sheet of the formula-based workbook as a TrackingTable
+
+    The layout rows (title, headers and instructions) are skipped, and so
+    are empty rows and a sample row still in place of the first data row.
+    Per-row formula columns without cached values are worked out from the
+    other columns.
+    """
+    from create_formula_based_excel import DATA_START_ROW, TRACKING_SHEETS, is_sample_row
+    from tracking_table import TableBuilder
+
+    if sheet_name not in TRACKING_SHEETS:
+        raise ValueError(f"'{sheet_name}' is not a tracking sheet")
+    headers = TRACKING_SHEETS[sheet_name]
+    sheet = read_sheet(path, sheet_name, first_row=DATA_START_ROW, max_col=len(headers),
+                       dates='serial')
+    if sheet.columns:
+        occupied = np.zeros(len(sheet), dtype=bool)
+        for column in sheet.columns.values():
+            occupied |= ~np.isnan(column) if column.dtype == np.float64 else \
+                np.not_equal(column, None)
+        if is_sample_row(sheet_name, sheet.row(DATA_START_ROW)):
+            occupied[0] = False
+        sheet.compress(occupied)
+    builder = TableBuilder(sheet_name)
+    columns = []
+    for col, kind in enumerate(builder.kinds, 1):
+        column = sheet.columns.get(col)
+        if column is None:
+            column = np.full(len(sheet), np.nan)
+        if column.dtype == np.float64 and kind not in ('date', 'number', 'derived'):
+            # Numbers in a text column (e.g. numeric employee IDs) as openpyxl gives them
+            column = [None if value != value else int(value) if value.is_integer() else value
+                      for value in column.tolist()]
+        columns.append(column)
+    builder.append_columns(columns)
+    return builder.build()
+
+
+def _load(task):
+    """Worker entry point: load one sheet"""
+    path, sheet_name, table, options = task
+    if table:
+        return read_table(path, sheet_name)
+    return read_sheet(path, sheet_name, **options)
+
+
+def _load_many(path, sheets, workers, table, options):
+    tasks = [(path, name, table, options) for name in sheets]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return {task[1]: _load(task) for task in tasks}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(sheets, pool.map(_load, tasks)))
+
+
+def load_sheets(path, sheets=None, workers=None, **options):
+    """
+    Load worksheets as column arrays, one sheet per process
+
+    Args:
+        path: Workbook path
+        sheets: Sheet names (default: every sheet)
+        workers: Processes to use (default: one per CPU)
+        **options: read_sheet() options (first_row, max_col, formulas, dates)
+
+    Returns:
+        dict: {sheet name: SheetColumns}, in the order asked for
+    """
+    if sheets is None:
+        with zipfile.ZipFile(path) as zf:
+            sheets = list(sheet_parts(zf))
+    return _load_many(path, list(sheets), workers, False, options)
+
+
+def load_tables(path, sheets=None, workers=None):
+    """
+    Load tracking sheets as TrackingTables, one sheet per process
+
+    Args:
+        path: Workbook path
+        sheets: Tracking sheet names (default: every tracking sheet present)
+        workers: Processes to use (default: one per CPU)
+
+    Returns:
+        dict: {sheet name: TrackingTable}
+    """
+    from create_formula_based_excel import TRACKING_SHEETS
+
+    if sheets is None:
+        with zipfile.ZipFile(path) as zf:
+            sheets = [name for name in sheet_parts(zf) if name in TRACKING_SHEETS]
+    return _load_many(path, list(sheets), workers, True, {})
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description='Load workbook sheets as column arrays straight from the worksheet XML'
+    )
+    parser.add_argument('workbook', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             DEFAULT_WORKBOOK))
+    parser.add_argument('--sheets', nargs='+', metavar='SHEET',
+                        help='Sheets to load (default: all)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes to use (default: one per CPU)')
+    parser.add_argument('--compare', action='store_true',
+                        help='Also time openpyxl read-only loading of the same sheets')
+    args = parser.parse_args()
+
+    print()
+    print("=" * 70)
+    print("E-COMMERCE OPERATIONS TRACKING SYSTEM")
+    print("XML-Streaming Workbook Loader")
+    print("=" * 70)
+    print()
+
+    try:
+        start = time.perf_counter()
+        sheets = load_sheets(args.workbook, args.sheets, args.workers)
+        seconds = time.perf_counter() - start
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    cells = 0
+    for name, sheet in sheets.items():
+        values = sum(int(np.count_nonzero(~np.isnan(column))) if column.dtype == np.float64 else
+                     int(np.count_nonzero(~np.isnat(column))) if column.dtype.kind == 'M' else
+                     int(np.count_nonzero(np.not_equal(column, None)))
+                     for column in sheet.columns.values())
+        cells += values
+        dates = ', '.join(column_letter(col) for col in sorted(sheet.date_columns))
+        print(f"📄 {name}: {len(sheet):,} rows x {sheet.max_column} columns, {values:,} cells"
+              + (f" (dates in {dates})" if dates else ""))
+    print()
+    print(f"⏱️  Loaded {cells:,} cells in {seconds:.2f}s ({cells / max(seconds, 1e-9):,.0f} cells/s)")
+
+    if args.compare:
+        import openpyxl
+        start = time.perf_counter()
+        wb = openpyxl.load_workbook(args.workbook, read_only=True)
+        for name in sheets:
+            for _ in wb[name].iter_rows(values_only=True):
+                pass
+        wb.close()
+        baseline = time.perf_counter() - start
+        print(f"   openpyxl read-only: {baseline:.2f}s ({baseline / max(seconds, 1e-9):.1f}x slower)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())